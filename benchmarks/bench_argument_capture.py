@@ -0,0 +1,123 @@
+"""Per-call overhead of argument capture: eager summaries vs deferred snapshots.
+
+Times each call of a watched no-op function and reports the p50 and p99
+overhead over the unwrapped function, for several argument shapes. Events go
+to a running `EventShipper` whose sender renders deferred snapshots and then
+discards the batch, so the flusher thread does the same work it would in
+production without touching the network. Run with:
+
+    python benchmarks/bench_argument_capture.py [--calls N]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from prodwatch.manager.argument_capture import ArgumentCapture  # noqa: E402
+from prodwatch.manager.event_shipper import EventShipper  # noqa: E402
+from prodwatch.manager.snapshot import render_arguments  # noqa: E402
+from prodwatch.manager.wrappers.logged_function import create_logged_function  # noqa: E402
+
+
+class Order:
+    def __init__(self, order_id: int) -> None:
+        self.order_id = order_id
+
+    def __repr__(self) -> str:
+        return f"Order(order_id={self.order_id})"
+
+
+WORKLOADS: Dict[str, Tuple[Tuple[Any, ...], Dict[str, Any]]] = {
+    "scalars": ((42, "user-1"), {"retry": True}),
+    "list[10k]": ((list(range(10_000)),), {}),
+    "dict[1k]": (({str(i): i for i in range(1_000)},), {}),
+    "nested": (([{"id": i, "tags": ["a", "b"]} for i in range(50)],), {"limit": 10}),
+    "objects": (([Order(i) for i in range(20)],), {"order": Order(0)}),
+}
+
+
+def target(*args: Any, **kwargs: Any) -> None:
+    return None
+
+
+def percentiles(samples: List[int]) -> Tuple[float, float]:
+    ordered = sorted(samples)
+    return ordered[len(ordered) // 2], ordered[int(len(ordered) * 0.99)]
+
+
+def time_calls(
+    function: Callable[..., Any], args: Tuple[Any, ...], kwargs: Dict[str, Any], calls: int
+) -> List[int]:
+    for _ in range(min(calls, 1_000)):
+        function(*args, **kwargs)
+    samples = []
+    clock = time.perf_counter_ns
+    for _ in range(calls):
+        start = clock()
+        function(*args, **kwargs)
+        samples.append(clock() - start)
+    return samples
+
+
+def measure(mode: Optional[ArgumentCapture], workload: str, calls: int) -> Tuple[float, float]:
+    args, kwargs = WORKLOADS[workload]
+    if mode is None:
+        return percentiles(time_calls(target, args, kwargs, calls))
+
+    def send_batch(events: List[Dict[str, Any]]) -> None:
+        if mode is ArgumentCapture.DEFERRED:
+            render_arguments(events)
+
+    shipper = EventShipper(send_batch=send_batch, batch_size=100, linger=0.05, buffer_size=4096)
+
+    def log_function_call(
+        function_name: str,
+        args: List[Any],
+        kwargs: Dict[str, Any],
+        execution_time_ms: float,
+        error: Optional[str] = None,
+        sample_weight: float = 1.0,
+    ) -> None:
+        shipper.enqueue(
+            {
+                "event_name": "log-function-call",
+                "function_name": function_name,
+                "timestamp": time.time(),
+                "args": args,
+                "kwargs": kwargs,
+                "execution_time_ms": execution_time_ms,
+                "error": error,
+            }
+        )
+
+    wrapped = create_logged_function(target, "target", log_function_call, argument_capture=mode)
+    shipper.start()
+    try:
+        return percentiles(time_calls(wrapped, args, kwargs, calls))
+    finally:
+        shipper.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20_000)
+    options = parser.parse_args()
+
+    modes = [ArgumentCapture.NONE, ArgumentCapture.EAGER, ArgumentCapture.DEFERRED]
+    print(f"Python {sys.version.split()[0]}, overhead per call in microseconds (p50 / p99)")
+    print(f"{'workload':>10}" + "".join(f"  {mode.value:>17}" for mode in modes))
+    for workload in WORKLOADS:
+        base_p50, base_p99 = measure(None, workload, options.calls)
+        row = f"{workload:>10}"
+        for mode in modes:
+            p50, p99 = measure(mode, workload, options.calls)
+            row += f"  {(p50 - base_p50) / 1000:>7.2f} / {(p99 - base_p99) / 1000:>7.2f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Event capture throughput from 1 to 64 producer threads.
+
+Compares the per-thread ring buffers used by `EventShipper` against a single
+shared `queue.Queue`, while a collector thread drains continuously the way the
+flusher does. Run with:
+
+    python benchmarks/bench_event_buffer.py [--events-per-thread N]
+
+On a free-threaded build (python3.13t) the shared queue stops scaling early,
+while the sharded buffer keeps per-thread capture cost roughly flat.
+"""
+
+import argparse
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from prodwatch.manager.event_buffer import ShardedEventBuffer  # noqa: E402
+
+THREAD_COUNTS = [1, 2, 4, 8, 16, 32, 64]
+EVENT: Dict[str, Any] = {"event_name": "log-function-call", "function_name": "f"}
+
+
+def run(
+    append: Callable[[Dict[str, Any]], Any],
+    drain: Callable[[], int],
+    threads: int,
+    events_per_thread: int,
+) -> float:
+    """Return events captured per second with `threads` producers."""
+    start_barrier = threading.Barrier(threads + 1)
+    producing = threading.Event()
+    producing.set()
+
+    def produce() -> None:
+        start_barrier.wait()
+        for _ in range(events_per_thread):
+            append(EVENT)
+
+    def collect() -> None:
+        while producing.is_set():
+            if not drain():
+                time.sleep(0.0005)
+        while drain():
+            pass
+
+    collector = threading.Thread(target=collect)
+    collector.start()
+    producers = [threading.Thread(target=produce) for _ in range(threads)]
+    for producer in producers:
+        producer.start()
+
+    start_barrier.wait()
+    started = time.perf_counter()
+    for producer in producers:
+        producer.join()
+    elapsed = time.perf_counter() - started
+
+    producing.clear()
+    collector.join()
+    return threads * events_per_thread / elapsed
+
+
+def sharded(threads: int, events_per_thread: int) -> float:
+    # Large shards so the benchmark measures capture cost, not drops.
+    buffer = ShardedEventBuffer(shard_capacity=events_per_thread)
+    return run(buffer.append, lambda: len(buffer.drain(1000)), threads, events_per_thread)
+
+
+def shared_queue(threads: int, events_per_thread: int) -> float:
+    events: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+
+    def drain() -> int:
+        drained: List[Dict[str, Any]] = []
+        while len(drained) < 1000:
+            try:
+                drained.append(events.get_nowait())
+            except queue.Empty:
+                break
+        return len(drained)
+
+    return run(events.put_nowait, drain, threads, events_per_thread)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events-per-thread", type=int, default=20_000)
+    args = parser.parse_args()
+
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"Python {sys.version.split()[0]}, GIL {'enabled' if gil else 'disabled'}")
+    print(f"{'threads':>7}  {'sharded ev/s':>14}  {'queue ev/s':>14}  {'speedup':>7}")
+    for threads in THREAD_COUNTS:
+        sharded_rate = sharded(threads, args.events_per_thread)
+        queue_rate = shared_queue(threads, args.events_per_thread)
+        print(
+            f"{threads:>7}  {sharded_rate:>14,.0f}  {queue_rate:>14,.0f}"
+            f"  {sharded_rate / queue_rate:>6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Cost of resolving watch names against the number of loaded modules.
+
+Loads N synthetic modules (50 attributes and one class each) into sys.modules
+and times `find_function` through the symbol index against the full
+sys.modules scan it replaced, for a bare function name, a `Class.method` name
+and a name that is not defined anywhere. Run with:
+
+    python benchmarks/bench_find_function.py [--lookups N]
+"""
+
+import argparse
+import sys
+import time
+import types
+from pathlib import Path
+from typing import Any, Callable, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from prodwatch.manager.finders.find_function import find_function  # noqa: E402
+from prodwatch.manager.finders.symbol_index import symbol_index  # noqa: E402
+
+MODULE_COUNTS = [250, 500, 1000, 2000, 4000, 8000]
+ATTRIBUTES_PER_MODULE = 50
+
+
+def scan_function(function_name: str) -> Any:
+    """The previous lookup: a hasattr/getattr on every module, for every name."""
+    if "." in function_name:
+        class_name, method_name = function_name.split(".", 1)
+        for module in list(sys.modules.values()):
+            if module is None or not hasattr(module, class_name):
+                continue
+            cls = getattr(module, class_name)
+            if isinstance(cls, type) and hasattr(cls, method_name):
+                return getattr(cls, method_name)
+    for module in list(sys.modules.values()):
+        if module is not None and hasattr(module, function_name):
+            func = getattr(module, function_name)
+            if callable(func):
+                return func
+    return None
+
+
+def load_modules(count: int) -> List[str]:
+    names = []
+    for number in range(count):
+        name = f"bench_module_{number}"
+        module = types.ModuleType(name)
+        for attribute in range(ATTRIBUTES_PER_MODULE):
+            setattr(module, f"function_{number}_{attribute}", lambda: None)
+        setattr(module, f"Class{number}", type(f"Class{number}", (), {"method": lambda self: None}))
+        sys.modules[name] = module
+        names.append(name)
+    return names
+
+
+def per_lookup_us(lookup: Callable[[str], Any], name: str, lookups: int) -> float:
+    start = time.perf_counter()
+    for _ in range(lookups):
+        lookup(name)
+    return (time.perf_counter() - start) / lookups * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lookups", type=int, default=200)
+    options = parser.parse_args()
+
+    print(f"Python {sys.version.split()[0]}, microseconds per lookup (index / scan)")
+    print(f"{'modules':>7}  {'function':>17}  {'Class.method':>17}  {'missing':>17}  {'build ms':>8}")
+    for count in MODULE_COUNTS:
+        names = load_modules(count)
+        try:
+            last = count - 1
+            symbol_index.clear()
+            start = time.perf_counter()
+            find_function("bench_module_warmup")
+            build_ms = (time.perf_counter() - start) * 1000
+
+            row = f"{len(sys.modules):>7}"
+            for name in (f"function_{last}_0", f"Class{last}.method", "not_defined_anywhere"):
+                indexed = per_lookup_us(find_function, name, options.lookups)
+                scanned = per_lookup_us(scan_function, name, options.lookups)
+                row += f"  {indexed:>7.1f} / {scanned:>7.1f}"
+            print(f"{row}  {build_ms:>8.1f}")
+        finally:
+            for name in names:
+                del sys.modules[name]
+
+
+if __name__ == "__main__":
+    main()
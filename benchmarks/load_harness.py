@@ -0,0 +1,240 @@
+"""End-to-end load run of a real Manager against the local fake server.
+
+Starts `tests/fake_server.py` with the given latency, error rate and stalls,
+points a `Manager` at it and lets the server ask for two functions to be
+watched: a plain function called from `--threads` threads and a coroutine
+awaited from `--tasks` asyncio tasks. Every call is timed from the caller's
+side, and so is an unwatched copy of each function beforehand, which gives
+the overhead the watch adds. Each worker makes `--rate` calls a second, or
+as many as it can with `--rate 0`. At the end it reports that overhead, events
+delivered per second, events lost, and how much the process's memory grew
+after warming up. Run with:
+
+    python benchmarks/load_harness.py [--duration 30] [--threads 8] [--tasks 100]
+        [--rate 200] [--latency 0.0] [--error-rate 0.0] [--stall-rate 0.0] [--stall-seconds 5.0]
+"""
+
+import argparse
+import asyncio
+import os
+import resource
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from prodwatch.manager import Manager  # noqa: E402
+from tests.fake_server import FakeProdwatchServer  # noqa: E402
+
+SYNC_TARGET = f"{__name__}.handle_request"
+ASYNC_TARGET = f"{__name__}.handle_request_async"
+
+
+def handle_request(request_id: int, user: str) -> int:
+    return sum(range(50)) + request_id
+
+
+async def handle_request_async(request_id: int, user: str) -> int:
+    await asyncio.sleep(0)
+    return sum(range(50)) + request_id
+
+
+def rss_bytes() -> int:
+    """Current resident set size, or the peak where the current one isn't available."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def percentile(samples: List[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+def sync_worker(stop: threading.Event, samples: List[float], interval: float) -> None:
+    clock = time.perf_counter
+    # Looked up on every call, so the watch is picked up once it's applied
+    module = sys.modules[__name__]
+    request_id = 0
+    next_call = clock()
+    while not stop.is_set():
+        start = clock()
+        module.handle_request(request_id, "user-1")
+        samples.append(clock() - start)
+        request_id += 1
+        next_call += interval
+        if next_call > start:
+            time.sleep(max(next_call - clock(), 0))
+
+
+async def async_worker(deadline: float, samples: List[float], interval: float) -> None:
+    clock = time.perf_counter
+    module = sys.modules[__name__]
+    request_id = 0
+    next_call = clock()
+    while clock() < deadline:
+        start = clock()
+        await module.handle_request_async(request_id, "user-1")
+        samples.append(clock() - start)
+        request_id += 1
+        next_call += interval
+        if next_call > start:
+            await asyncio.sleep(max(next_call - clock(), 0))
+
+
+def drive(
+    duration: float, threads: int, tasks: int, rate: float
+) -> Tuple[List[float], List[float], List[Tuple[float, int]]]:
+    """Call both functions for `duration` seconds; returns samples and memory readings."""
+    sync_samples: List[List[float]] = [[] for _ in range(threads)]
+    async_samples: List[List[float]] = [[] for _ in range(tasks)]
+    memory: List[Tuple[float, int]] = []
+    stop = threading.Event()
+    interval = 1 / rate if rate else 0.0
+
+    def run_tasks() -> None:
+        async def main() -> None:
+            deadline = time.perf_counter() + duration
+            await asyncio.gather(
+                *(async_worker(deadline, samples, interval) for samples in async_samples)
+            )
+
+        asyncio.run(main())
+
+    workers = [
+        threading.Thread(target=sync_worker, args=(stop, samples, interval))
+        for samples in sync_samples
+    ]
+    if tasks:
+        workers.append(threading.Thread(target=run_tasks))
+    started = time.monotonic()
+    for worker in workers:
+        worker.start()
+    while (elapsed := time.monotonic() - started) < duration:
+        memory.append((elapsed, rss_bytes()))
+        time.sleep(min(1.0, duration - elapsed))
+    stop.set()
+    for worker in workers:
+        worker.join()
+    memory.append((time.monotonic() - started, rss_bytes()))
+
+    return (
+        [sample for samples in sync_samples for sample in samples],
+        [sample for samples in async_samples for sample in samples],
+        memory,
+    )
+
+
+def wait_for(condition: Callable[[], bool], timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def overhead_row(name: str, baseline: List[float], watched: List[float]) -> str:
+    cells = []
+    for q in (0.5, 0.99):
+        cells.append(f"{(percentile(watched, q) - percentile(baseline, q)) * 1e6:>9.2f}")
+    return f"{name:<8} {len(watched):>10} " + " ".join(cells)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of watched load")
+    parser.add_argument("--baseline-duration", type=float, default=5.0)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--tasks", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=200.0, help="Calls per second per worker")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--stall-rate", type=float, default=0.0)
+    parser.add_argument("--stall-seconds", type=float, default=5.0)
+    parser.add_argument("--buffer-size", type=int, default=1024)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--spool-directory", help="Spool batches the server can't take here")
+    options = parser.parse_args(argv)
+
+    server = FakeProdwatchServer(
+        latency=options.latency,
+        error_rate=options.error_rate,
+        stall_rate=options.stall_rate,
+        stall_seconds=options.stall_seconds,
+        keep_posts=False,
+        seed=0,
+    ).start()
+    os.environ.setdefault("PRODWATCH_API_TOKEN", "load-harness-token")
+
+    print(
+        f"Python {sys.version.split()[0]}, {options.threads} threads and {options.tasks} tasks"
+        f" at {options.rate:g} calls/s each"
+    )
+    print(f"Unwatched baseline for {options.baseline_duration:.0f}s...")
+    baseline_sync, baseline_async, _ = drive(
+        options.baseline_duration, options.threads, options.tasks, options.rate
+    )
+
+    manager = Manager(
+        server.url,
+        app_name="load-harness",
+        poll_interval=1,
+        batch_size=options.batch_size,
+        buffer_size=options.buffer_size,
+        spool_directory=options.spool_directory,
+    )
+    server.function_names = [SYNC_TARGET, ASYNC_TARGET]
+    if not manager.check_connection():
+        print("Could not register with the fake server")
+        return 1
+    manager.start()
+    try:
+        if not wait_for(lambda: len(manager.watched_functions) == 2, timeout=30):
+            print(f"Watches were not applied: {sorted(manager.watched_functions)}")
+            return 1
+
+        print(f"Watched load for {options.duration:.0f}s...")
+        watched_sync, watched_async, memory = drive(
+            options.duration, options.threads, options.tasks, options.rate
+        )
+        self_stats: Dict[str, Any] = manager.stats()
+    finally:
+        manager.stop()
+        server.stop()
+
+    calls = len(watched_sync) + len(watched_async)
+    delivered = server.event_counts["log-function-call"]
+    print(f"\n{'':<8} {'calls':>10} {'p50 us':>9} {'p99 us':>9}   (overhead over unwatched)")
+    print(overhead_row("threads", baseline_sync, watched_sync))
+    print(overhead_row("tasks", baseline_async, watched_async))
+
+    print(f"\ndelivered   {delivered} events, {delivered / options.duration:,.0f}/s")
+    lost = calls - delivered
+    print(f"lost        {lost} ({lost / calls:.2%} of {calls} calls)" if calls else "lost        0")
+    print(f"dropped     {self_stats['events']['dropped']} at capture (buffers full)")
+    if self_stats["spool"] is not None:
+        print(f"spooled     {self_stats['spool']['pending']} batches still on disk at the end")
+    print(f"server      {dict(server.faults) or 'no faults injected'}")
+    print(f"breaker     {self_stats['circuit_breaker']['state']}, opened "
+          f"{self_stats['circuit_breaker']['opened']} times")
+
+    # Memory after the first tenth of the run, once buffers and caches have filled
+    warm = next((rss for elapsed, rss in memory if elapsed >= options.duration / 10), memory[0][1])
+    final = memory[-1][1]
+    print(f"memory      {warm / 2**20:.1f} MiB warm, {final / 2**20:.1f} MiB at end, "
+          f"{(final - warm) / 2**20:+.1f} MiB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,416 @@
+"""Microbenchmarks for the hot paths, with JSON baselines and a regression check.
+
+Times the three wrappers (`logged_function`, `logged_method`,
+`logged_property`) and their unwrapped baselines, the signature-specialized
+function and method wrappers, a function whose sampler turns most calls away
+with and without specialization, `find_function` with more and more modules
+loaded, `SystemInfoSerializer` and event batch encoding. Wrapped calls go
+through a real `Manager` whose session is replaced by a stub that answers 200
+without touching the network, with the flusher running, so each call does the
+same work it would in production. Each benchmark reports nanoseconds per call
+(the best of several rounds) and the peak bytes allocated during one call,
+measured separately with tracemalloc. Run with:
+
+    python benchmarks/suite.py [--filter SUBSTRING] [--rounds N]
+    python benchmarks/suite.py --save benchmarks/baseline.json
+    python benchmarks/suite.py --compare benchmarks/baseline.json [--threshold 0.10]
+
+`--compare` exits with status 1 if a hot-path benchmark is slower than its
+baseline by more than the threshold. Baselines only compare meaningfully on
+the machine and Python version that produced them, which are saved with them.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from bench_find_function import load_modules  # noqa: E402
+from prodwatch.manager import Manager  # noqa: E402
+from prodwatch.manager.finders.find_function import find_function  # noqa: E402
+from prodwatch.manager.finders.symbol_index import symbol_index  # noqa: E402
+from prodwatch.manager.sampling import FixedRateSampler  # noqa: E402
+from prodwatch.manager.system_identification import (  # noqa: E402
+    SystemInfoSerializer,
+    get_system_identifier,
+)
+from prodwatch.manager.wire_format import encode_batch  # noqa: E402
+from prodwatch.manager.wrappers.logged_function import create_logged_function  # noqa: E402
+from prodwatch.manager.wrappers.logged_method import create_logged_method  # noqa: E402
+from prodwatch.manager.wrappers.logged_property import create_logged_property  # noqa: E402
+
+Case = Callable[[], ContextManager[Callable[[], Any]]]
+
+DEFAULT_THRESHOLD = 0.10
+
+
+@dataclass
+class Benchmark:
+    name: str
+    case: Case
+    # Regressions in hot-path benchmarks fail --compare; the others are reported only
+    hot: bool
+    calls: int
+
+
+BENCHMARKS: List[Benchmark] = []
+
+
+def benchmark(name: str, hot: bool = True, calls: int = 20_000) -> Callable[[Case], Case]:
+    """Register a case: a context manager that sets up and yields the call to time."""
+
+    def register(case: Case) -> Case:
+        BENCHMARKS.append(Benchmark(name, case, hot, calls))
+        return case
+
+    return register
+
+
+class StubResponse:
+    status_code = 200
+
+
+class StubSession:
+    """Stands in for the manager's requests session; every request succeeds."""
+
+    def __init__(self) -> None:
+        self.requests = 0
+
+    def post(self, *args: Any, **kwargs: Any) -> StubResponse:
+        self.requests += 1
+        return StubResponse()
+
+    def get(self, *args: Any, **kwargs: Any) -> StubResponse:
+        self.requests += 1
+        return StubResponse()
+
+
+@contextmanager
+def running_manager() -> Iterator[Manager]:
+    os.environ.setdefault("PRODWATCH_API_TOKEN", "benchmark-token")
+    manager = Manager(
+        "http://benchmark.invalid", app_name="benchmark", buffer_size=65536, linger=0.05
+    )
+    manager.session = StubSession()  # type: ignore[assignment]
+    manager.event_shipper.start()
+    try:
+        yield manager
+    finally:
+        manager.event_shipper.stop()
+
+
+def target(order_id: int, user: str, retry: bool = False) -> int:
+    return order_id
+
+
+class Order:
+    def __init__(self, order_id: int) -> None:
+        self.order_id = order_id
+
+    def total(self, quantity: int, discount: float = 0.0) -> float:
+        return self.order_id * quantity * (1 - discount)
+
+    @property
+    def label(self) -> str:
+        return "order"
+
+    def __repr__(self) -> str:
+        return f"Order({self.order_id})"
+
+
+@benchmark("function.unwrapped", hot=False)
+@contextmanager
+def function_unwrapped() -> Iterator[Callable[[], Any]]:
+    yield lambda: target(42, "user-1", retry=True)
+
+
+@benchmark("function.logged")
+@contextmanager
+def function_logged() -> Iterator[Callable[[], Any]]:
+    with running_manager() as manager:
+        wrapped = create_logged_function(target, "target", manager.log_function_call)
+        yield lambda: wrapped(42, "user-1", retry=True)
+
+
+@benchmark("function.specialized")
+@contextmanager
+def function_specialized() -> Iterator[Callable[[], Any]]:
+    with running_manager() as manager:
+        wrapped = create_logged_function(
+            target, "target", manager.log_function_call, specialize=True
+        )
+        yield lambda: wrapped(42, "user-1", retry=True)
+
+
+def sampled_function_case(specialize: bool) -> Case:
+    """Calls of `target` with most of them turned away by a 1-in-100 sampler."""
+
+    @contextmanager
+    def case() -> Iterator[Callable[[], Any]]:
+        with running_manager() as manager:
+            wrapped = create_logged_function(
+                target,
+                "target",
+                manager.log_function_call,
+                FixedRateSampler(100),
+                specialize=specialize,
+            )
+            yield lambda: wrapped(42, "user-1", retry=True)
+
+    return case
+
+
+benchmark("function_sampled.logged")(sampled_function_case(False))
+benchmark("function_sampled.specialized")(sampled_function_case(True))
+
+
+@benchmark("method.unwrapped", hot=False)
+@contextmanager
+def method_unwrapped() -> Iterator[Callable[[], Any]]:
+    order = Order(7)
+    yield lambda: order.total(3, discount=0.1)
+
+
+@benchmark("method.logged")
+@contextmanager
+def method_logged() -> Iterator[Callable[[], Any]]:
+    with running_manager() as manager:
+        cls = type("LoggedOrder", (Order,), {})
+        cls.total = create_logged_method(  # type: ignore[method-assign]
+            Order.total, "Order.total", manager.log_function_call
+        )
+        order = cls(7)
+        yield lambda: order.total(3, discount=0.1)
+
+
+@benchmark("method.specialized")
+@contextmanager
+def method_specialized() -> Iterator[Callable[[], Any]]:
+    with running_manager() as manager:
+        cls = type("SpecializedOrder", (Order,), {})
+        cls.total = create_logged_method(  # type: ignore[method-assign]
+            Order.total, "Order.total", manager.log_function_call, specialize=True
+        )
+        order = cls(7)
+        yield lambda: order.total(3, discount=0.1)
+
+
+@benchmark("property.unwrapped", hot=False)
+@contextmanager
+def property_unwrapped() -> Iterator[Callable[[], Any]]:
+    order = Order(7)
+    yield lambda: order.label
+
+
+@benchmark("property.logged")
+@contextmanager
+def property_logged() -> Iterator[Callable[[], Any]]:
+    with running_manager() as manager:
+        getter = create_logged_property(
+            Order.__dict__["label"], "Order.label", manager.log_function_call
+        )
+        cls = type("LoggedOrder", (Order,), {"label": property(getter)})
+        order = cls(7)
+        yield lambda: order.label
+
+
+def find_function_case(module_count: int) -> Case:
+    @contextmanager
+    def case() -> Iterator[Callable[[], Any]]:
+        names = load_modules(module_count)
+        try:
+            symbol_index.clear()
+            name = f"function_{module_count - 1}_0" if module_count else "target"
+            find_function(name)
+            yield lambda: find_function(name)
+        finally:
+            for module_name in names:
+                del sys.modules[module_name]
+            symbol_index.clear()
+
+    return case
+
+
+for module_count in (0, 1000, 4000):
+    benchmark(f"find_function.modules_{module_count}", hot=False, calls=500)(
+        find_function_case(module_count)
+    )
+
+
+@benchmark("system_info.serialize", hot=False, calls=2_000)
+@contextmanager
+def system_info_serialize() -> Iterator[Callable[[], Any]]:
+    system_info = get_system_identifier()
+    yield lambda: SystemInfoSerializer.to_dict(system_info)
+
+
+def sample_events(count: int) -> List[Dict[str, Any]]:
+    now = time.time()
+    return [
+        {
+            "event_name": "log-function-call",
+            "function_name": f"app.module.function_{i % 5}",
+            "process_id": "9f1c3c5e-0d7e-4b6a-8b8e-2b1f4b7c8d9e",
+            "app_name": "benchmark",
+            "timestamp": now + i / 1000,
+            "args": [str(i), "user-1"],
+            "kwargs": {"retry": "True"},
+            "execution_time_ms": 0.25 + i / 100,
+            "error": None,
+            "sample_weight": 1.0,
+        }
+        for i in range(count)
+    ]
+
+
+@benchmark("encode.json_batch_100", calls=2_000)
+@contextmanager
+def encode_json() -> Iterator[Callable[[], Any]]:
+    events = sample_events(100)
+    payload = {"event_name": "event-batch", "process_id": "p", "app_name": "a", "events": events}
+    yield lambda: json.dumps(payload)
+
+
+@benchmark("encode.binary_batch_100", calls=2_000)
+@contextmanager
+def encode_binary() -> Iterator[Callable[[], Any]]:
+    events = sample_events(100)
+    yield lambda: encode_batch("p", "a", events)
+
+
+def time_call(call: Callable[[], Any], calls: int, rounds: int) -> float:
+    """Best nanoseconds per call over `rounds` rounds of `calls` calls."""
+    for _ in range(min(calls, 1_000)):
+        call()
+    clock = time.perf_counter_ns
+    best = float("inf")
+    for _ in range(rounds):
+        start = clock()
+        for _ in range(calls):
+            call()
+        best = min(best, (clock() - start) / calls)
+    return best
+
+
+def peak_bytes(call: Callable[[], Any], samples: int = 200) -> int:
+    """Median peak of memory allocated while one call runs."""
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(samples):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            call()
+            peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    finally:
+        tracemalloc.stop()
+    return sorted(peaks)[len(peaks) // 2]
+
+
+def run(benchmarks: List[Benchmark], rounds: int) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    for bench in benchmarks:
+        with bench.case() as call:
+            ns_per_call = time_call(call, bench.calls, rounds)
+            allocated = peak_bytes(call)
+        results[bench.name] = {
+            "ns_per_call": round(ns_per_call, 1),
+            "peak_bytes": allocated,
+            "hot": bench.hot,
+        }
+    return results
+
+
+def environment() -> Dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+    }
+
+
+def report(results: Dict[str, Dict[str, Any]]) -> None:
+    print(f"Python {sys.version.split()[0]}")
+    print(f"{'benchmark':<32} {'ns/call':>10} {'overhead':>10} {'peak B':>8}")
+    for name, result in results.items():
+        group, _, variant = name.rpartition(".")
+        baseline = results.get(f"{group}.unwrapped")
+        overhead = (
+            f"{result['ns_per_call'] - baseline['ns_per_call']:>10.0f}"
+            if baseline is not None and variant != "unwrapped"
+            else f"{'':>10}"
+        )
+        print(f"{name:<32} {result['ns_per_call']:>10.1f} {overhead} {result['peak_bytes']:>8}")
+
+
+def compare(
+    results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any], threshold: float
+) -> List[str]:
+    """Print each benchmark against the baseline and return the hot paths that regressed."""
+    if baseline.get("environment") != environment():
+        print(f"Warning: baseline was recorded on {baseline.get('environment')}")
+    regressions = []
+    print(f"\n{'benchmark':<32} {'baseline':>10} {'now':>10} {'change':>8}")
+    for name, result in results.items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"{name:<32} {'-':>10} {result['ns_per_call']:>10.1f} {'new':>8}")
+            continue
+        change = result["ns_per_call"] / before["ns_per_call"] - 1
+        regressed = result["hot"] and change > threshold
+        flag = "  REGRESSION" if regressed else ""
+        print(
+            f"{name:<32} {before['ns_per_call']:>10.1f} {result['ns_per_call']:>10.1f}"
+            f" {change:>+8.1%}{flag}"
+        )
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filter", default="", help="Only run benchmarks containing this")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--save", metavar="PATH", help="Write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="Compare against a JSON baseline")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Allowed slowdown of hot-path benchmarks as a fraction (default: %(default)s)",
+    )
+    options = parser.parse_args(argv)
+
+    selected = [bench for bench in BENCHMARKS if options.filter in bench.name]
+    results = run(selected, options.rounds)
+    report(results)
+
+    if options.save:
+        with open(options.save, "w") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=2)
+            f.write("\n")
+        print(f"\nSaved baseline to {options.save}")
+
+    if options.compare:
+        with open(options.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, options.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} hot path(s) slower by more than {options.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,37 @@
 import os
+from typing import Any, Dict, Optional
 from .manager import Manager
+from .manager.circuit_breaker import DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT
+from .manager.finders.find_pattern import DEFAULT_MAX_TARGETS
 from .exceptions import TokenError
 from .logging_config import configure_logging, get_logger
 
 DEFAULT_BASE_SERVER_URL = "https://getprodwatch.com"
 DEFAULT_LOG_LEVEL = "INFO"
 
+# The manager started by start_prodwatch, if any
+running_manager: Optional[Manager] = None
 
-def start_prodwatch(app_name: str) -> None:
+
+def start_prodwatch(
+    app_name: str,
+    batch_size: int = 100,
+    linger: float = 1.0,
+    buffer_size: int = 1024,
+    flush_on_shutdown: bool = True,
+    wire_format: str = "json",
+    defer_argument_rendering: bool = False,
+    instrumentation: str = "setattr",
+    agent_socket: Optional[str] = None,
+    spool_directory: Optional[str] = None,
+    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+    read_timeout: float = DEFAULT_READ_TIMEOUT,
+    long_poll_timeout: float = 0.0,
+    max_poll_interval: Optional[float] = None,
+    max_pattern_targets: int = DEFAULT_MAX_TARGETS,
+    specialize_wrappers: bool = False,
+) -> None:
+    global running_manager
     logger = None
     try:
         log_level = os.getenv("PRODWATCH_LOG_LEVEL", DEFAULT_LOG_LEVEL)
@@ -18,14 +42,43 @@ def start_prodwatch(app_name: str) -> None:
 
         base_server_url = os.getenv("PRODWATCH_API_URL", DEFAULT_BASE_SERVER_URL)
 
-        manager = Manager(base_server_url, app_name=app_name)
+        manager = Manager(
+            base_server_url,
+            app_name=app_name,
+            batch_size=batch_size,
+            linger=linger,
+            buffer_size=buffer_size,
+            flush_on_shutdown=flush_on_shutdown,
+            wire_format=wire_format,
+            defer_argument_rendering=defer_argument_rendering,
+            instrumentation=instrumentation,
+            agent_socket=agent_socket or os.getenv("PRODWATCH_AGENT_SOCKET"),
+            spool_directory=spool_directory or os.getenv("PRODWATCH_SPOOL_DIR"),
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            long_poll_timeout=long_poll_timeout,
+            max_poll_interval=max_poll_interval,
+            max_pattern_targets=max_pattern_targets,
+            specialize_wrappers=specialize_wrappers,
+        )
 
         if not manager.check_connection():
             return
 
         manager.start()
+        running_manager = manager
     except TokenError as e:
         if logger:
             logger.error(f"Token Error: {e}")
             logger.error("Prodwatch monitoring disabled.")
         return
+
+
+def stats() -> Dict[str, Any]:
+    """Health of the running ProdWatch manager, such as its circuit breaker state.
+
+    Empty if ProdWatch hasn't been started.
+    """
+    if running_manager is None:
+        return {}
+    return running_manager.stats()
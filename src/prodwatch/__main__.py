@@ -0,0 +1,60 @@
+"""Command line entry point: `python -m prodwatch agent`."""
+
+import os
+import sys
+import argparse
+from typing import List, Optional
+
+from . import DEFAULT_BASE_SERVER_URL, DEFAULT_LOG_LEVEL
+from .agent import AGENT_AVAILABLE, DEFAULT_SOCKET_PATH
+from .logging_config import configure_logging, get_logger
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m prodwatch")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    agent_parser = commands.add_parser(
+        "agent", help="Run the host-local agent that application processes connect to"
+    )
+    agent_parser.add_argument(
+        "--socket",
+        default=os.getenv("PRODWATCH_AGENT_SOCKET", DEFAULT_SOCKET_PATH),
+        help="Unix socket path to listen on (default: $PRODWATCH_AGENT_SOCKET or %(default)s)",
+    )
+    agent_parser.add_argument("--poll-interval", type=float, default=5.0)
+    agent_parser.add_argument("--batch-size", type=int, default=500)
+    agent_parser.add_argument("--linger", type=float, default=1.0)
+
+    args = parser.parse_args(argv)
+    configure_logging(os.getenv("PRODWATCH_LOG_LEVEL", DEFAULT_LOG_LEVEL))
+    logger = get_logger(__name__)
+
+    token = os.getenv("PRODWATCH_API_TOKEN")
+    if not token:
+        logger.error("PRODWATCH_API_TOKEN environment variable is required.")
+        return 1
+    if not AGENT_AVAILABLE:
+        logger.error("The agent needs Unix sockets, which this platform lacks.")
+        return 1
+
+    from .agent.server import Agent
+
+    agent = Agent(
+        os.getenv("PRODWATCH_API_URL", DEFAULT_BASE_SERVER_URL),
+        token=token,
+        socket_path=args.socket,
+        poll_interval=args.poll_interval,
+        batch_size=args.batch_size,
+        linger=args.linger,
+    )
+    try:
+        agent.run()
+    except OSError as e:
+        logger.error(f"Could not start the agent: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
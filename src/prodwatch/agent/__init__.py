@@ -0,0 +1,14 @@
+from typing import Any
+
+from .client import AGENT_AVAILABLE, DEFAULT_SOCKET_PATH, AgentClient
+
+__all__ = ["AGENT_AVAILABLE", "Agent", "AgentClient", "DEFAULT_SOCKET_PATH"]
+
+
+def __getattr__(name: str) -> Any:
+    # The server needs Unix domain sockets, so it is only imported when it is used
+    if name == "Agent":
+        from .server import Agent
+
+        return Agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
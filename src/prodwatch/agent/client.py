@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import json
+import socket
+import threading
+from typing import Any, Dict, List, Optional
+
+from ..manager.wire_format import encode_batch
+from .framing import (
+    EVENT,
+    EVENT_BATCH,
+    WATCH_LIST,
+    WATCH_LIST_REQUEST,
+    encode_frame,
+    encode_json_frame,
+    read_frame,
+)
+
+DEFAULT_SOCKET_PATH = "/tmp/prodwatch-agent.sock"
+
+# Windows has no Unix domain sockets, which processes reach the agent over
+AGENT_AVAILABLE = hasattr(socket, "AF_UNIX")
+
+
+class AgentClient:
+    """An application process's connection to the host agent.
+
+    Connects lazily and is shared by the polling and flusher threads. If the
+    connection breaks, the failing call raises OSError and the next call
+    reconnects, so an agent restart costs at most the frames in flight.
+    """
+
+    def __init__(self, socket_path: str, timeout: float = 5.0) -> None:
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.sock: Optional[socket.socket] = None
+
+    def connection(self) -> socket.socket:
+        if self.sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            self.sock = sock
+        return self.sock
+
+    def disconnect(self) -> None:
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+
+    def close(self) -> None:
+        with self.lock:
+            self.disconnect()
+
+    def reset_after_fork(self) -> None:
+        """In a forked child, stop sharing the parent's connection."""
+        self.lock = threading.Lock()
+        self.disconnect()
+
+    def send(self, frame: bytes) -> None:
+        with self.lock:
+            try:
+                self.connection().sendall(frame)
+            except OSError:
+                self.disconnect()
+                raise
+
+    def send_event(self, event: Dict[str, Any]) -> None:
+        """Send a control event for the agent to forward upstream right away."""
+        self.send(encode_json_frame(EVENT, event))
+
+    def send_batch(self, process_id: str, app_name: str, events: List[Dict[str, Any]]) -> None:
+        self.send(encode_frame(EVENT_BATCH, encode_batch(process_id, app_name, events)))
+
+    def watch_list(self, app_name: str, process_id: str) -> Dict[str, Any]:
+        """The agent's latest watch list for this app, as /pending-function-names returns it."""
+        request = encode_json_frame(
+            WATCH_LIST_REQUEST, {"app_name": app_name, "process_id": process_id}
+        )
+        with self.lock:
+            try:
+                sock = self.connection()
+                sock.sendall(request)
+                frame = read_frame(sock)
+            except (OSError, ValueError):
+                self.disconnect()
+                raise
+        if frame is None:
+            self.close()
+            raise ConnectionError("Agent closed the connection")
+        kind, payload = frame
+        if kind != WATCH_LIST:
+            self.close()
+            raise ConnectionError(f"Unexpected frame kind from agent: {kind}")
+        watch_list: Dict[str, Any] = json.loads(payload)
+        return watch_list
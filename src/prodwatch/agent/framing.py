@@ -0,0 +1,69 @@
+"""Framing for the Unix socket between application processes and the host agent.
+
+Every message is one frame:
+
+    uint32  big-endian length of what follows
+    uint8   kind
+    bytes   payload
+
+    EVENT_BATCH         a batch of queued events in the binary wire format
+                        (see manager/wire_format.py), from one process
+    EVENT               JSON of one control event (add-process, confirm-watcher,
+                        ...), forwarded upstream as soon as it arrives
+    WATCH_LIST_REQUEST  JSON {"app_name": ..., "process_id": ...}; the agent
+                        answers with a WATCH_LIST frame
+    WATCH_LIST          JSON {"function_names": [...], "unwatch_function_names": [...]}
+
+Only WATCH_LIST_REQUEST gets an answer, so processes never wait on the agent
+while shipping events.
+"""
+
+from __future__ import annotations
+
+import json
+import socket
+import struct
+from typing import Any, Dict, Optional, Tuple
+
+EVENT_BATCH = 1
+EVENT = 2
+WATCH_LIST_REQUEST = 3
+WATCH_LIST = 4
+
+HEADER = struct.Struct(">IB")
+
+# Frames larger than this are treated as a corrupt stream
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+
+
+def encode_frame(kind: int, payload: bytes) -> bytes:
+    return HEADER.pack(len(payload) + 1, kind) + payload
+
+
+def encode_json_frame(kind: int, data: Dict[str, Any]) -> bytes:
+    return encode_frame(kind, json.dumps(data, separators=(",", ":")).encode("utf-8"))
+
+
+def receive_exactly(sock: socket.socket, size: int) -> Optional[bytes]:
+    """Read exactly `size` bytes. Returns None if the peer closed the connection first."""
+    chunks = bytearray()
+    while len(chunks) < size:
+        chunk = sock.recv(size - len(chunks))
+        if not chunk:
+            return None
+        chunks += chunk
+    return bytes(chunks)
+
+
+def read_frame(sock: socket.socket) -> Optional[Tuple[int, bytes]]:
+    """Read one frame as (kind, payload). Returns None at the end of the stream."""
+    header = receive_exactly(sock, HEADER.size)
+    if header is None:
+        return None
+    length, kind = HEADER.unpack(header)
+    if not 1 <= length <= MAX_FRAME_SIZE:
+        raise ValueError(f"Invalid frame length: {length}")
+    payload = receive_exactly(sock, length - 1)
+    if payload is None:
+        return None
+    return kind, payload
@@ -0,0 +1,346 @@
+from __future__ import annotations
+
+import os
+import json
+import stat
+import uuid
+import errno
+import signal
+import socket
+import logging
+import threading
+import socketserver
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import requests
+
+from ..manager.aggregation import merge_summaries
+from ..manager.circuit_breaker import BreakerSession, CircuitBreaker
+from ..manager.event_shipper import EventShipper
+from ..manager.wire_format import decode_batch
+from .client import DEFAULT_SOCKET_PATH
+from .framing import (
+    EVENT,
+    EVENT_BATCH,
+    WATCH_LIST,
+    WATCH_LIST_REQUEST,
+    encode_json_frame,
+    read_frame,
+)
+
+logger = logging.getLogger(__name__)
+
+WatchList = Dict[str, Any]
+# The server keeps a watch list per process: (app_name, process_id)
+WatchListKey = Tuple[str, str]
+
+
+class AgentConnectionHandler(socketserver.BaseRequestHandler):
+    """Reads frames from one application process until it disconnects."""
+
+    server: "AgentSocketServer"
+
+    def handle(self) -> None:
+        # The processes that asked for watch lists on this connection, which
+        # the agent stops polling for once it closes
+        keys: Set[WatchListKey] = set()
+        try:
+            self.read_frames(keys)
+        finally:
+            self.server.agent.forget(keys)
+
+    def read_frames(self, keys: Set[WatchListKey]) -> None:
+        agent = self.server.agent
+        sock: socket.socket = self.request
+        while True:
+            try:
+                frame = read_frame(sock)
+            except (OSError, ValueError) as e:
+                logger.error(f"Dropping agent connection: {e}")
+                return
+            if frame is None:
+                return
+            kind, payload = frame
+            try:
+                reply = agent.handle_frame(kind, payload, keys)
+                if reply is not None:
+                    sock.sendall(reply)
+            except OSError as e:
+                logger.error(f"Dropping agent connection: {e}")
+                return
+            except Exception as e:
+                logger.error(f"Error handling frame of kind {kind}: {e}")
+
+
+def agent_listening(socket_path: str) -> bool:
+    """Whether something accepts connections on a Unix socket path."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except OSError:
+        return False
+    finally:
+        sock.close()
+    return True
+
+
+class AgentSocketServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, agent: "Agent") -> None:
+        self.agent = agent
+        super().__init__(socket_path, AgentConnectionHandler)
+
+
+class Agent:
+    """Host-local agent that stands between application processes and the server.
+
+    Processes on the host connect over a Unix socket instead of each talking to
+    the server. Function call events from all of them go into one EventShipper
+    and are sent upstream in shared batches; histogram summaries of the same
+    function that land in one batch are merged into a single summary. Control
+    events (add-process, confirm-watcher, ...) are forwarded as they arrive.
+    The server keeps a watch list per process, so the agent polls
+    `/pending-function-names` once per interval for each connected process,
+    under that process's own ID, and answers each process's watch list
+    requests from its own cached list. Processes never wait on the server for
+    their watch list, and the server sees one connection per host. Polls send
+    the last ETag in If-None-Match, and a 304 keeps the cached list.
+    """
+
+    def __init__(
+        self,
+        base_server_url: str,
+        token: str,
+        socket_path: str = DEFAULT_SOCKET_PATH,
+        poll_interval: float = 5.0,
+        batch_size: int = 500,
+        linger: float = 1.0,
+        buffer_size: int = 8192,
+    ) -> None:
+        self.base_server_url = base_server_url
+        self.socket_path = socket_path
+        self.poll_interval = poll_interval
+        # The identity of the shared event batches; each event in them carries
+        # the ID of the process it came from
+        self.process_id = uuid.uuid4()
+        self.session = BreakerSession(CircuitBreaker())
+        self.session.headers.update({"Authorization": f"Bearer {token}"})
+        self.event_shipper = EventShipper(
+            send_batch=self.send_upstream,
+            batch_size=batch_size,
+            linger=linger,
+            buffer_size=buffer_size,
+        )
+        self.watch_lists: Dict[WatchListKey, WatchList] = {}
+        # The server's ETag for each process's cached watch list, to poll conditionally
+        self.watch_list_etags: Dict[WatchListKey, str] = {}
+        self.watch_lists_lock = threading.Lock()
+        self.server: Optional[AgentSocketServer] = None
+        self.threads: List[threading.Thread] = []
+        self.stopped = threading.Event()
+
+    def start(self) -> None:
+        """Listen on the socket and start polling.
+
+        A socket left behind by an agent that didn't shut down cleanly is
+        removed first, but one a live agent is listening on is left alone and
+        raises OSError with EADDRINUSE.
+        """
+        if os.path.exists(self.socket_path):
+            if agent_listening(self.socket_path):
+                raise OSError(
+                    errno.EADDRINUSE, f"An agent is already listening on {self.socket_path}"
+                )
+            if stat.S_ISSOCK(os.stat(self.socket_path).st_mode):
+                # Left behind by an agent that didn't shut down cleanly
+                os.unlink(self.socket_path)
+        self.server = AgentSocketServer(self.socket_path, self)
+        self.stopped.clear()
+        self.event_shipper.start()
+        for target, name in (
+            (self.server.serve_forever, "prodwatch-agent-server"),
+            (self.polling_loop, "prodwatch-agent-poller"),
+        ):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        logger.info(f"Prodwatch agent listening on {self.socket_path}")
+
+    def stop(self) -> None:
+        if self.server is None:
+            return
+        self.stopped.set()
+        self.server.shutdown()
+        self.server.server_close()
+        self.server = None
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+        self.event_shipper.stop()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def run(self) -> None:
+        """Run until SIGINT or SIGTERM."""
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda signum, frame: self.stopped.set())
+        self.start()
+        try:
+            self.stopped.wait()
+        finally:
+            self.stop()
+
+    def handle_frame(
+        self, kind: int, payload: bytes, keys: Optional[Set[WatchListKey]] = None
+    ) -> Optional[bytes]:
+        """Handle one frame from a process. Returns the reply to send, if any.
+
+        The processes whose watch lists the frame asks for are added to `keys`.
+        """
+        if kind == EVENT_BATCH:
+            for event in decode_batch(payload)["events"]:
+                self.event_shipper.enqueue(event)
+            return None
+        if kind == EVENT:
+            event = json.loads(payload)
+            self.post_event(event)
+            if event.get("event_name") == "add-process":
+                # Fetch the new process's list now, so its first request is answered from cache
+                key = watch_list_key(event)
+                if key is not None:
+                    self.watch_list(key)
+                    if keys is not None:
+                        keys.add(key)
+            return None
+        if kind == WATCH_LIST_REQUEST:
+            key = watch_list_key(json.loads(payload))
+            if key is None:
+                raise ValueError("Watch list request needs an app_name and a process_id")
+            if keys is not None:
+                keys.add(key)
+            return encode_json_frame(WATCH_LIST, self.watch_list(key))
+        raise ValueError(f"Unknown frame kind: {kind}")
+
+    def watch_list(self, key: WatchListKey) -> WatchList:
+        """A process's cached watch list, fetched right away the first time it's asked for."""
+        with self.watch_lists_lock:
+            cached = self.watch_lists.get(key)
+        if cached is not None:
+            return cached
+        return self.refresh(key)
+
+    def forget(self, keys: Set[WatchListKey]) -> None:
+        """Stop polling for processes that have disconnected."""
+        with self.watch_lists_lock:
+            for key in keys:
+                self.watch_lists.pop(key, None)
+                self.watch_list_etags.pop(key, None)
+
+    def refresh(self, key: WatchListKey) -> WatchList:
+        app_name, process_id = key
+        params = {"process_id": process_id, "app_name": app_name}
+        watch_list: WatchList = {"function_names": [], "unwatch_function_names": []}
+        with self.watch_lists_lock:
+            etag = self.watch_list_etags.get(key)
+            cached = self.watch_lists.get(key)
+        options: Dict[str, Any] = {}
+        if etag is not None and cached is not None:
+            options["headers"] = {"If-None-Match": etag}
+        try:
+            response = self.session.get(
+                f"{self.base_server_url}/pending-function-names",
+                params=params,
+                allow_redirects=False,
+                **options,
+            )
+            if response.status_code == 304 and cached is not None:
+                return cached
+            if response.status_code == 200:
+                watch_list = response.json()
+                etag = response.headers.get("ETag")
+                with self.watch_lists_lock:
+                    if isinstance(etag, str):
+                        self.watch_list_etags[key] = etag
+                    else:
+                        self.watch_list_etags.pop(key, None)
+            else:
+                logger.error(f"Error from pending-function-names: Status {response.status_code}.")
+        except requests.RequestException as e:
+            logger.error(f"Error polling Prodwatch server: {e}")
+        with self.watch_lists_lock:
+            if cached is None or key in self.watch_lists:
+                # Unless the process disconnected while its list was being fetched
+                self.watch_lists[key] = watch_list
+        return watch_list
+
+    def polling_loop(self) -> None:
+        while not self.stopped.wait(self.poll_interval):
+            with self.watch_lists_lock:
+                keys = list(self.watch_lists)
+            for key in keys:
+                self.refresh(key)
+
+    def post_event(self, event: Dict[str, Any]) -> None:
+        try:
+            response = self.session.post(
+                f"{self.base_server_url}/events", json=event, allow_redirects=False
+            )
+            if response.status_code != 200:
+                logger.error(f"Error from {event.get('event_name')}: Status {response.status_code}.")
+        except requests.RequestException as e:
+            logger.error(f"Error forwarding {event.get('event_name')}: {e}")
+
+    def send_upstream(self, events: List[Dict[str, Any]]) -> None:
+        """Send events from all processes as one event-batch per app."""
+        by_app: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for event in merge_function_summaries(events):
+            by_app[event.get("app_name", "")].append(event)
+        for app_name, app_events in by_app.items():
+            self.post_event(
+                {
+                    "event_name": "event-batch",
+                    "process_id": str(self.process_id),
+                    "app_name": app_name,
+                    "events": app_events,
+                }
+            )
+
+
+def watch_list_key(message: Dict[str, Any]) -> Optional[WatchListKey]:
+    """The app name and process ID a message from a process carries, if it has both."""
+    app_name, process_id = message.get("app_name"), message.get("process_id")
+    if isinstance(app_name, str) and isinstance(process_id, str):
+        return app_name, process_id
+    return None
+
+
+def merge_function_summaries(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Merge function-summary events for the same app and function into one.
+
+    A merged summary lists the processes it came from under `process_ids`.
+    Summaries that can't be merged are passed through unchanged.
+    """
+    merged: List[Dict[str, Any]] = []
+    summaries: Dict[Tuple[str, str], List[Dict[str, Any]]] = defaultdict(list)
+    for event in events:
+        if event.get("event_name") == "function-summary":
+            summaries[(event.get("app_name", ""), event.get("function_name", ""))].append(event)
+        else:
+            merged.append(event)
+
+    for group in summaries.values():
+        if len(group) == 1:
+            merged.extend(group)
+            continue
+        try:
+            summary = merge_summaries(group)
+        except (KeyError, ValueError) as e:
+            logger.error(f"Error merging summaries for {group[0].get('function_name')}: {e}")
+            merged.extend(group)
+            continue
+        summary["process_ids"] = sorted({event["process_id"] for event in group})
+        merged.append(summary)
+    return merged
+
@@ -1,3 +1,3 @@
-from .exceptions import TokenError
+from .exceptions import CircuitOpenError, TokenError
 
-__all__ = ["TokenError"]
\ No newline at end of file
+__all__ = ["CircuitOpenError", "TokenError"]
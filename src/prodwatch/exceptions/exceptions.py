@@ -1,7 +1,14 @@
+from requests.exceptions import RequestException
+
+
 class ProdwatchError(Exception):
     """Base exception for Prodwatch errors"""
     pass
 
 class TokenError(ProdwatchError):
     """Raised when there are issues with the API token"""
-    pass
\ No newline at end of file
+    pass
+
+class CircuitOpenError(ProdwatchError, RequestException):
+    """Raised instead of making a request while the server is considered down"""
+    pass
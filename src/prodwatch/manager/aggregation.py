@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import time
+import threading
+from typing import Any, Dict, List, Optional
+
+from .histogram import LatencyHistogram
+
+SUMMARY_QUANTILES = {"p50": 0.5, "p90": 0.9, "p99": 0.99}
+
+
+class FunctionAggregate:
+    """Call, error and cancellation counts and latency histogram for one watched function.
+
+    Used in place of the per-call logging callback when a watch is in histogram
+    mode: it accepts the same arguments but only records the execution time and
+    whether the call failed, so arguments are never stringified. Two histograms
+    are preallocated and swapped at the end of each interval, so memory stays
+    fixed and collecting a summary never allocates buckets.
+    """
+
+    def __init__(self, function_name: str, relative_accuracy: float = 0.02) -> None:
+        self.function_name = function_name
+        self.lock = threading.Lock()
+        # Held for all of collect: a second collector would swap the histogram
+        # the first is still reading back in to record new calls
+        self.collect_lock = threading.Lock()
+        self.histogram = LatencyHistogram(relative_accuracy=relative_accuracy)
+        self.spare = LatencyHistogram(relative_accuracy=relative_accuracy)
+        self.errors = 0
+        self.cancelled = 0
+        self.interval_start = time.time()
+
+    def __call__(
+        self,
+        function_name: str,
+        args: List[Any],
+        kwargs: Dict[str, Any],
+        execution_time_ms: float,
+        error: Optional[str] = None,
+        sample_weight: float = 1.0,
+        cancelled: bool = False,
+        generator: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.record(execution_time_ms, error is not None, cancelled)
+
+    def record(self, execution_time_ms: float, failed: bool = False, cancelled: bool = False) -> None:
+        with self.lock:
+            self.histogram.record(execution_time_ms)
+            if failed:
+                self.errors += 1
+            if cancelled:
+                self.cancelled += 1
+
+    def reset_after_fork(self) -> None:
+        """In a forked child, start a fresh interval; the parent reports its own calls."""
+        self.lock = threading.Lock()
+        self.collect_lock = threading.Lock()
+        self.histogram.reset()
+        self.errors = 0
+        self.cancelled = 0
+        self.interval_start = time.time()
+
+    def collect(self) -> Optional[Dict[str, Any]]:
+        """Return the summary of the interval that just ended and start a new one.
+
+        Returns None if the function was not called during the interval. Safe to
+        call from several threads, e.g. when a watch is removed while a periodic
+        report is being collected.
+        """
+        with self.collect_lock:
+            now = time.time()
+            with self.lock:
+                histogram, errors, cancelled = self.histogram, self.errors, self.cancelled
+                interval_start = self.interval_start
+                self.histogram, self.spare = self.spare, histogram
+                self.errors = 0
+                self.cancelled = 0
+                self.interval_start = now
+
+            try:
+                if not histogram.count:
+                    return None
+                return {
+                    "function_name": self.function_name,
+                    "interval_start": interval_start,
+                    "interval_end": now,
+                    "calls": histogram.count,
+                    "errors": errors,
+                    "cancelled": cancelled,
+                    "execution_time_ms": {
+                        **{name: histogram.quantile(q) for name, q in SUMMARY_QUANTILES.items()},
+                        "histogram": histogram.to_dict(),
+                    },
+                }
+            finally:
+                histogram.reset()
+
+
+def merge_summaries(summaries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine summaries of the same function, e.g. from several processes, into one.
+
+    Counts are added, the interval covers all of them and the quantiles are
+    read from the merged histogram. Raises ValueError if the histograms can't
+    be merged.
+    """
+    first = summaries[0]
+    histogram = LatencyHistogram.from_dict(first["execution_time_ms"]["histogram"])
+    for summary in summaries[1:]:
+        histogram.merge(LatencyHistogram.from_dict(summary["execution_time_ms"]["histogram"]))
+    return {
+        **first,
+        "interval_start": min(summary["interval_start"] for summary in summaries),
+        "interval_end": max(summary["interval_end"] for summary in summaries),
+        "calls": sum(summary["calls"] for summary in summaries),
+        "errors": sum(summary["errors"] for summary in summaries),
+        "cancelled": sum(summary.get("cancelled", 0) for summary in summaries),
+        "execution_time_ms": {
+            **{name: histogram.quantile(q) for name, q in SUMMARY_QUANTILES.items()},
+            "histogram": histogram.to_dict(),
+        },
+    }
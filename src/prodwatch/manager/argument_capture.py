@@ -0,0 +1,41 @@
+from enum import Enum
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from .snapshot import capture_args, capture_kwargs
+from .summarizer import summarize_args, summarize_kwargs
+
+ArgsCapturer = Callable[[Sequence[Any]], List[Any]]
+KwargsCapturer = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+
+class ArgumentCapture(Enum):
+    """How a wrapper records the arguments of a call.
+
+    EAGER summarizes them to strings on the calling thread. DEFERRED takes a
+    cheap snapshot (see snapshot.capture) and leaves rendering to the flusher
+    thread. NONE records no arguments at all.
+    """
+
+    NONE = "none"
+    EAGER = "eager"
+    DEFERRED = "deferred"
+
+
+def no_args(args: Sequence[Any]) -> List[Any]:
+    return []
+
+
+def no_kwargs(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    return {}
+
+
+CAPTURERS: Dict[ArgumentCapture, Tuple[ArgsCapturer, KwargsCapturer]] = {
+    ArgumentCapture.NONE: (no_args, no_kwargs),
+    ArgumentCapture.EAGER: (summarize_args, summarize_kwargs),
+    ArgumentCapture.DEFERRED: (capture_args, capture_kwargs),
+}
+
+
+def capturers_for(mode: ArgumentCapture) -> Tuple[ArgsCapturer, KwargsCapturer]:
+    """The functions a wrapper applies to positional and keyword arguments in this mode."""
+    return CAPTURERS[mode]
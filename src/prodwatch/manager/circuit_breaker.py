@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import time
+import random
+import logging
+import threading
+from enum import Enum
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+from ..exceptions import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+# Called with the endpoint path, latency in milliseconds and whether the request failed
+RequestObserver = Callable[[str, float, bool], None]
+
+DEFAULT_CONNECT_TIMEOUT = 3.05
+DEFAULT_READ_TIMEOUT = 10.0
+
+
+class BreakerState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Stops calling a server that keeps failing, and probes it with backoff.
+
+    Closed, requests go through. After `failure_threshold` failures in a row the
+    breaker opens and every request is refused without touching the network.
+    Once the backoff has passed it goes half-open and lets one probe through: a
+    success closes it, a failure opens it again for twice as long, up to
+    `max_backoff`. Each backoff is jittered to between half and all of its
+    nominal length, so processes that lost the server together don't all
+    come back at the same moment.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+        jitter: Callable[[], float] = random.random,
+    ) -> None:
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be at least 1")
+        if backoff <= 0 or max_backoff < backoff:
+            raise ValueError("backoff must be positive and at most max_backoff")
+
+        self.failure_threshold = failure_threshold
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.jitter = jitter
+        self.lock = threading.Lock()
+        self.state = BreakerState.CLOSED
+        self.consecutive_failures = 0
+        # Times opened since last closed, which sets the next backoff
+        self.open_streak = 0
+        self.retry_at = 0.0
+        self.probing = False
+        self.opened = 0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+
+    def allow(self) -> bool:
+        """Whether a request may be made now. A refused request is counted."""
+        with self.lock:
+            if self.state is BreakerState.CLOSED:
+                return True
+            if self.state is BreakerState.OPEN and self.clock() >= self.retry_at:
+                self.state = BreakerState.HALF_OPEN
+            if self.state is BreakerState.HALF_OPEN and not self.probing:
+                self.probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self.lock:
+            if self.state is not BreakerState.CLOSED:
+                logger.info("Prodwatch server is reachable again.")
+            self.state = BreakerState.CLOSED
+            self.consecutive_failures = 0
+            self.open_streak = 0
+            self.probing = False
+
+    def record_failure(self, error: str) -> None:
+        with self.lock:
+            self.consecutive_failures += 1
+            self.last_error = error
+            self.probing = False
+            if (
+                self.state is BreakerState.HALF_OPEN
+                or self.consecutive_failures >= self.failure_threshold
+            ):
+                self.trip()
+
+    def trip(self) -> None:
+        nominal = min(self.backoff * 2**self.open_streak, self.max_backoff)
+        delay = nominal * (0.5 + self.jitter() / 2)
+        if self.state is not BreakerState.OPEN:
+            logger.warning(f"Prodwatch server unavailable, pausing requests for {delay:.1f}s.")
+        self.state = BreakerState.OPEN
+        self.open_streak += 1
+        self.opened += 1
+        self.retry_at = self.clock() + delay
+
+    def reset_after_fork(self) -> None:
+        """In a forked child, keep the state but not a lock another thread may hold."""
+        self.lock = threading.Lock()
+        self.probing = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "state": self.state.value,
+                "consecutive_failures": self.consecutive_failures,
+                "opened": self.opened,
+                "rejected": self.rejected,
+                "retry_in": (
+                    max(self.retry_at - self.clock(), 0.0)
+                    if self.state is BreakerState.OPEN
+                    else None
+                ),
+                "last_error": self.last_error,
+            }
+
+
+class BreakerSession(requests.Session):
+    """A Session with default timeouts whose requests go through a circuit breaker.
+
+    Connection errors, timeouts, 5xx and 429 responses count as failures. While
+    the breaker is open, requests raise CircuitOpenError instead of being made.
+    Requests that are made are reported to `observer`, if given.
+    """
+
+    def __init__(
+        self,
+        breaker: CircuitBreaker,
+        timeout: Tuple[float, float] = (DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT),
+        observer: Optional[RequestObserver] = None,
+    ) -> None:
+        super().__init__()
+        self.breaker = breaker
+        self.timeout = timeout
+        self.observer = observer
+
+    def request(  # type: ignore[override]
+        self, method: str, url: str, *args: Any, **kwargs: Any
+    ) -> requests.Response:
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Not calling {url} while the server is unavailable")
+        kwargs.setdefault("timeout", self.timeout)
+        started = time.perf_counter()
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except Exception as e:
+            self.breaker.record_failure(str(e))
+            self.observe(url, started, failed=True)
+            raise
+        if response.status_code >= 500 or response.status_code == 429:
+            self.breaker.record_failure(f"Status {response.status_code}")
+        else:
+            self.breaker.record_success()
+        self.observe(url, started, failed=response.status_code >= 400)
+        return response
+
+    def observe(self, url: str, started: float, failed: bool) -> None:
+        if self.observer is not None:
+            self.observer(urlparse(url).path, (time.perf_counter() - started) * 1000, failed)
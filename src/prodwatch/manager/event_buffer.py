@@ -0,0 +1,130 @@
+import threading
+from typing import Any, Dict, List, Optional
+
+Event = Dict[str, Any]
+
+
+def next_power_of_two(value: int) -> int:
+    return 1 << max(value - 1, 0).bit_length()
+
+
+class RingBuffer:
+    """Fixed-capacity ring of event slots with one producer and one consumer.
+
+    Slots are preallocated. The producer only ever writes `head` and the consumer
+    only ever writes `tail`, so neither side needs a lock, with or without the GIL.
+    """
+
+    __slots__ = ("capacity", "mask", "slots", "head", "tail", "dropped", "owner")
+
+    def __init__(self, capacity: int, owner: Optional[threading.Thread] = None) -> None:
+        self.capacity = next_power_of_two(capacity)
+        self.mask = self.capacity - 1
+        self.slots: List[Optional[Event]] = [None] * self.capacity
+        self.head = 0
+        self.tail = 0
+        self.dropped = 0
+        self.owner = owner
+
+    def __len__(self) -> int:
+        return self.head - self.tail
+
+    def push(self, event: Event) -> bool:
+        """Append an event. Called only from the owning thread."""
+        head = self.head
+        if head - self.tail >= self.capacity:
+            self.dropped += 1
+            return False
+        self.slots[head & self.mask] = event
+        self.head = head + 1
+        return True
+
+    def drain(self, limit: int) -> List[Event]:
+        """Remove up to `limit` events in the order they were pushed. Called only by the collector."""
+        tail = self.tail
+        count = min(self.head - tail, limit)
+        events: List[Event] = []
+        for position in range(tail, tail + count):
+            index = position & self.mask
+            event = self.slots[index]
+            self.slots[index] = None
+            if event is not None:
+                events.append(event)
+        self.tail = tail + count
+        return events
+
+
+class ShardedEventBuffer:
+    """Per-thread ring buffers drained by a single collector.
+
+    Each producing thread gets its own `RingBuffer` on first use, so appending an
+    event never contends with other threads. Shards belonging to threads that have
+    exited are dropped once they are empty.
+    """
+
+    def __init__(self, shard_capacity: int = 1024) -> None:
+        self.shard_capacity = shard_capacity
+        self.local = threading.local()
+        self.shards: List[RingBuffer] = []
+        self.shards_lock = threading.Lock()
+        self.retired_dropped = 0
+        self.next_shard = 0
+
+    def shard(self) -> RingBuffer:
+        """The calling thread's ring buffer, created on first use."""
+        try:
+            ring: RingBuffer = self.local.ring
+            return ring
+        except AttributeError:
+            ring = RingBuffer(self.shard_capacity, owner=threading.current_thread())
+            with self.shards_lock:
+                self.shards.append(ring)
+            self.local.ring = ring
+            return ring
+
+    def append(self, event: Event) -> bool:
+        """Append an event to the calling thread's shard. Returns False if it was dropped."""
+        try:
+            ring: RingBuffer = self.local.ring
+        except AttributeError:
+            ring = self.shard()
+        return ring.push(event)
+
+    def pending(self) -> int:
+        return sum(len(ring) for ring in self.shards)
+
+    @property
+    def dropped_events(self) -> int:
+        return self.retired_dropped + sum(ring.dropped for ring in self.shards)
+
+    def drain(self, limit: int) -> List[Event]:
+        """Remove up to `limit` events, visiting shards round-robin so no thread starves."""
+        shards = list(self.shards)
+        if not shards:
+            return []
+
+        events: List[Event] = []
+        start = self.next_shard % len(shards)
+        for offset in range(len(shards)):
+            if len(events) >= limit:
+                break
+            ring = shards[(start + offset) % len(shards)]
+            events.extend(ring.drain(limit - len(events)))
+        self.next_shard = start + 1
+
+        self.prune()
+        return events
+
+    def prune(self) -> None:
+        """Forget empty shards whose owning thread has exited."""
+        dead = [
+            ring
+            for ring in self.shards
+            if not len(ring) and ring.owner is not None and not ring.owner.is_alive()
+        ]
+        if not dead:
+            return
+        with self.shards_lock:
+            for ring in dead:
+                self.retired_dropped += ring.dropped
+                self.shards.remove(ring)
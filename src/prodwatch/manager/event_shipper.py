@@ -0,0 +1,159 @@
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+from .event_buffer import ShardedEventBuffer
+
+logger = logging.getLogger(__name__)
+
+Event = Dict[str, Any]
+BatchSender = Callable[[List[Event]], None]
+
+# Upper bound on how long the flusher sleeps before re-checking the buffers
+WAKEUP_INTERVAL = 0.1
+
+
+class EventShipper:
+    """Buffers events in memory and ships them in batches from a background thread.
+
+    Events are handed over with `enqueue`, which never blocks and never takes a
+    lock shared with other threads: each thread appends to its own ring buffer,
+    and a full buffer drops the event and counts it. The flusher thread sends a
+    batch as soon as `batch_size` events are waiting, or once the oldest waiting
+    event has lingered for `linger` seconds.
+    """
+
+    def __init__(
+        self,
+        send_batch: BatchSender,
+        batch_size: int = 100,
+        linger: float = 1.0,
+        buffer_size: int = 1024,
+        flush_on_shutdown: bool = True,
+    ) -> None:
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        if linger < 0:
+            raise ValueError("linger must not be negative")
+
+        self.send_batch = send_batch
+        self.batch_size = batch_size
+        self.linger = linger
+        self.buffer_size = buffer_size
+        self.flush_on_shutdown = flush_on_shutdown
+        self.active = False
+        self.flusher_thread: Optional[threading.Thread] = None
+        self.buffer = ShardedEventBuffer(shard_capacity=buffer_size)
+        self.wakeup = threading.Event()
+        self.shipped_events = 0
+        # Most events seen waiting at once, and CPU seconds spent shipping
+        self.high_water = 0
+        self.cpu_time = 0.0
+
+    @property
+    def dropped_events(self) -> int:
+        return self.buffer.dropped_events
+
+    def start(self) -> None:
+        if self.active:
+            return
+
+        self.active = True
+        self.flusher_thread = threading.Thread(
+            target=self.flush_loop, name="prodwatch-flusher", daemon=True
+        )
+        self.flusher_thread.start()
+
+    def stop(self) -> None:
+        if not self.active:
+            return
+
+        self.active = False
+        self.wakeup.set()
+        if self.flusher_thread:
+            self.flusher_thread.join()
+            self.flusher_thread = None
+
+        if self.flush_on_shutdown:
+            self.flush()
+
+    def reset_after_fork(self) -> None:
+        """In a forked child, forget the parent's flusher thread and buffered events.
+
+        The parent ships its own events; sending them again from the child would
+        duplicate them. The flusher has to be started again with `start`.
+        """
+        self.active = False
+        self.flusher_thread = None
+        self.buffer = ShardedEventBuffer(shard_capacity=self.buffer_size)
+        self.wakeup = threading.Event()
+        self.shipped_events = 0
+        self.high_water = 0
+        self.cpu_time = 0.0
+
+    def enqueue(self, event: Event) -> bool:
+        """Add an event to the calling thread's buffer. Returns False if it was dropped."""
+        ring = self.buffer.shard()
+        if not ring.push(event):
+            return False
+        if len(ring) == self.batch_size:
+            # This thread alone has filled a batch, so don't wait for the next tick.
+            self.wakeup.set()
+        return True
+
+    def pending(self) -> int:
+        return self.buffer.pending()
+
+    def drain(self, limit: int) -> List[Event]:
+        """Remove up to `limit` events from the buffers without waiting."""
+        return self.buffer.drain(limit)
+
+    def flush(self) -> int:
+        """Synchronously send every buffered event. Returns the number of events sent."""
+        sent = 0
+        while True:
+            batch = self.drain(self.batch_size)
+            if not batch:
+                return sent
+            self.ship(batch)
+            sent += len(batch)
+
+    def ship(self, batch: List[Event]) -> None:
+        started = time.thread_time()
+        try:
+            self.send_batch(batch)
+            self.shipped_events += len(batch)
+        except Exception as e:
+            logger.error(f"Error shipping {len(batch)} events: {e}")
+        finally:
+            self.cpu_time += time.thread_time() - started
+
+    def flush_loop(self) -> None:
+        tick = min(self.linger, WAKEUP_INTERVAL) or WAKEUP_INTERVAL
+        waiting_since: Optional[float] = None
+
+        while self.active:
+            self.wakeup.wait(timeout=tick)
+            self.wakeup.clear()
+
+            pending = self.pending()
+            if not pending:
+                waiting_since = None
+                continue
+
+            if pending > self.high_water:
+                self.high_water = pending
+            now = time.monotonic()
+            if waiting_since is None:
+                waiting_since = now
+
+            while pending >= self.batch_size and self.active:
+                self.ship(self.drain(self.batch_size))
+                pending = self.pending()
+
+            if pending and now - waiting_since >= self.linger:
+                self.ship(self.drain(self.batch_size))
+                pending = self.pending()
+
+            if not pending:
+                waiting_since = None
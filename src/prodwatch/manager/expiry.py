@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Callable, Dict, Optional
+
+
+class ExpiryReason(Enum):
+    """Which limit ended a watch."""
+
+    MAX_CALLS = "max_calls"
+    MAX_DURATION = "max_duration"
+    MAX_BYTES = "max_bytes"
+
+
+def positive(data: Dict[str, Any], key: str, kind: Callable[[Any], Any]) -> Any:
+    value = data.get(key)
+    if value is None:
+        return None
+    try:
+        value = kind(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Watch limit {key} must be a number, got {value!r}") from None
+    if value <= 0:
+        raise ValueError(f"Watch limit {key} must be positive")
+    return value
+
+
+@dataclass(frozen=True)
+class WatchLimits:
+    """Limits after which a watch removes itself, as configured by the server.
+
+    - max_calls: number of calls to the watched function.
+    - max_duration: seconds since the watch was applied, checked every second.
+    - max_bytes: bytes of events shipped for the function, measured as JSON.
+    """
+
+    max_calls: Optional[int] = None
+    max_duration: Optional[float] = None
+    max_bytes: Optional[int] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "WatchLimits":
+        """Parse watch limits sent by the server. Raises ValueError if they are invalid."""
+        if not isinstance(data, dict):
+            raise ValueError(f"Watch limits must be an object, got {data!r}")
+        return cls(
+            max_calls=positive(data, "max_calls", int),
+            max_duration=positive(data, "max_duration", float),
+            max_bytes=positive(data, "max_bytes", int),
+        )
+
+
+class CallLimit:
+    """Counts down the calls a watch may still report.
+
+    `admit` is called by the wrapper before each call. When the count runs
+    out, `on_exhausted` runs once to remove the watch; any call that races
+    past it before the original is restored is passed straight through.
+
+    Threads race on the count without a lock. Each compares the value it
+    computed itself, and the first call to find the count at or below zero
+    triggers expiry, so a count that two threads take past zero together is
+    still noticed.
+    """
+
+    __slots__ = ("remaining", "on_exhausted", "exhausted")
+
+    def __init__(self, max_calls: int, on_exhausted: Callable[[], None]) -> None:
+        self.remaining = max_calls
+        self.on_exhausted = on_exhausted
+        self.exhausted = False
+
+    def admit(self) -> bool:
+        remaining = self.remaining = self.remaining - 1
+        if remaining > 0:
+            return True
+        if not self.exhausted:
+            self.exhausted = True
+            self.on_exhausted()
+            return True
+        return False
@@ -1,12 +1,42 @@
 import sys
+from types import ModuleType
+from typing import Callable, Iterable
+
 from .finder_result import FinderResult, FunctionType
+from .symbol_index import symbol_index
+
+
+def class_member(module: ModuleType, cls: type, method_name: str) -> FinderResult:
+    """Find a method, classmethod, staticmethod or property of a class."""
+    if hasattr(cls, method_name):
+        method = getattr(cls, method_name)
+        # Check if it's a method, classmethod, staticmethod, or property
+        if isinstance(method, property):
+            return FinderResult(
+                module=module,
+                function=method,
+                function_type=FunctionType.PROPERTY,
+                klass=cls
+            )
+        elif callable(method):
+            return FinderResult(
+                module=module,
+                function=method,
+                function_type=FunctionType.METHOD,
+                klass=cls
+            )
+    return FinderResult.not_found()
 
 
-def find_class_method(method_name: str) -> FinderResult:
+def find_class_method(
+    method_name: str,
+    candidates: Callable[[str], Iterable[ModuleType]] = symbol_index.candidates,
+) -> FinderResult:
     """Find a class method, instance method, static method, or property in any loaded module.
 
     Args:
         method_name: The name of the method to find, in format 'ClassName.method_name'
+        candidates: Returns the modules that may define a class name
 
     Returns:
         A FinderResult instance containing the module, class, and method if found
@@ -16,31 +46,34 @@ def find_class_method(method_name: str) -> FinderResult:
 
     class_name, method_name = method_name.split(".", 1)
 
-    for name, module in sys.modules.items():
-        if module is None:
-            continue
-
+    for module in candidates(class_name):
         if hasattr(module, class_name):
             cls = getattr(module, class_name)
             if not isinstance(cls, type):
                 continue
 
-            if hasattr(cls, method_name):
-                method = getattr(cls, method_name)
-                # Check if it's a method, classmethod, staticmethod, or property
-                if isinstance(method, property):
-                    return FinderResult(
-                        module=module,
-                        function=method,
-                        function_type=FunctionType.PROPERTY,
-                        klass=cls
-                    )
-                elif callable(method):
-                    return FinderResult(
-                        module=module,
-                        function=method,
-                        function_type=FunctionType.METHOD,
-                        klass=cls
-                    )
+            result = class_member(module, cls, method_name)
+            if result.found:
+                return result
 
     return FinderResult.not_found()
+
+
+def find_qualified_method(full_name: str) -> FinderResult:
+    """Find a method or property of a class in a specific module.
+
+    Args:
+        full_name: The name in format 'module.ClassName.method_name'
+
+    Returns:
+        A FinderResult instance containing the module, class, and method if found
+    """
+    if full_name.count(".") < 2:
+        return FinderResult.not_found()
+
+    module_name, class_name, method_name = full_name.rsplit(".", 2)
+    module = sys.modules.get(module_name)
+    cls = getattr(module, class_name, None)
+    if module is None or not isinstance(cls, type):
+        return FinderResult.not_found()
+    return class_member(module, cls, method_name)
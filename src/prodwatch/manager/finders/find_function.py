@@ -1,19 +1,27 @@
-import sys
+from types import ModuleType
+from typing import Callable, Dict, Iterable
+
 from .find_module_function import find_module_function
-from .find_class_method import find_class_method
+from .find_class_method import find_class_method, find_qualified_method
 from .finder_result import FinderResult, FunctionType
+from .symbol_index import symbol_index
 
 
-def find_function(function_name: str) -> FinderResult:
+def find_function(
+    function_name: str,
+    candidates: Callable[[str], Iterable[ModuleType]] = symbol_index.candidates,
+) -> FinderResult:
     """Find a function or method in any loaded module.
 
-    Handles three cases:
+    Handles four cases:
     1. Module-qualified functions (e.g. 'mymodule.myfunction')
-    2. Class methods (e.g. 'MyClass.method')
-    3. Regular functions (e.g. 'myfunction')
+    2. Module-qualified class methods (e.g. 'mymodule.MyClass.method')
+    3. Class methods (e.g. 'MyClass.method')
+    4. Regular functions (e.g. 'myfunction')
 
     Args:
         function_name: The name of the function to find
+        candidates: Returns the modules that may define a name
 
     Returns:
         A FinderResult instance containing the found function details
@@ -24,15 +32,18 @@ def find_function(function_name: str) -> FinderResult:
         if result.found:
             return result
 
+        # Then, as a method of a class in a specific module
+        result = find_qualified_method(function_name)
+        if result.found:
+            return result
+
         # Then, try as a class method
-        result = find_class_method(function_name)
+        result = find_class_method(function_name, candidates)
         if result.found:
             return result
 
     # Finally, try as a regular function
-    for name, module in sys.modules.items():
-        if module is None:
-            continue
+    for module in candidates(function_name):
         if hasattr(module, function_name):
             func = getattr(module, function_name)
             if callable(func):
@@ -42,3 +53,28 @@ def find_function(function_name: str) -> FinderResult:
                     function_type=FunctionType.REGULAR
                 )
     return FinderResult.not_found()
+
+
+def find_functions(function_names: Iterable[str]) -> Dict[str, FinderResult]:
+    """Find several functions or methods at once.
+
+    The candidate modules for every class and function name in the batch are
+    looked up from the symbol index together, so the index is brought up to
+    date once for the whole batch, and the methods of one class share a single
+    lookup of the class.
+
+    Args:
+        function_names: The names of the functions to find
+
+    Returns:
+        A FinderResult for each distinct name
+    """
+    names = list(dict.fromkeys(function_names))
+    # find_function looks up the class part of dotted names, the whole of others
+    attributes = {name.split(".", 1)[0] if "." in name else name for name in names}
+    found = symbol_index.candidates_for(attributes)
+
+    def candidates(attribute: str) -> Iterable[ModuleType]:
+        return found.get(attribute, ())
+
+    return {name: find_function(name, candidates) for name in names}
@@ -0,0 +1,143 @@
+import sys
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
+from types import FunctionType as PlainFunction
+from typing import Any, Dict, Iterator, List, Tuple
+
+from .finder_result import FinderResult, FunctionType
+
+GLOB_CHARACTERS = "*?["
+
+# Most functions one pattern may instrument, unless configured otherwise
+DEFAULT_MAX_TARGETS = 100
+
+
+def is_pattern(name: str) -> bool:
+    """Whether a watch name is a glob pattern rather than the name of one function."""
+    return any(character in name for character in GLOB_CHARACTERS)
+
+
+@dataclass
+class PatternMatches:
+    """The targets a pattern matched, by the name each is watched under."""
+
+    targets: Dict[str, FinderResult] = field(default_factory=dict)
+    # More than `limit` targets matched; `targets` then holds only the first ones
+    truncated: bool = False
+
+
+def literal_prefix(pattern: str) -> str:
+    """The part of a pattern before its first wildcard."""
+    for i, character in enumerate(pattern):
+        if character in GLOB_CHARACTERS:
+            return pattern[:i]
+    return pattern
+
+
+def may_start_with(name: str, prefix: str) -> bool:
+    """Whether names under `name.` can start with `prefix`."""
+    scope = name + "."
+    return scope.startswith(prefix) or prefix.startswith(scope)
+
+
+def defined_in(value: Any, module_name: str) -> bool:
+    return getattr(value, "__module__", None) == module_name
+
+
+def class_members(klass: type) -> Iterator[Tuple[str, FinderResult]]:
+    """Methods and properties a class defines itself, as find_class_method would return them."""
+    for attr_name, raw in list(vars(klass).items()):
+        if attr_name.startswith("__"):
+            continue
+        if isinstance(raw, property):
+            yield attr_name, FinderResult(
+                module=sys.modules.get(klass.__module__),
+                function=raw,
+                function_type=FunctionType.PROPERTY,
+                klass=klass,
+            )
+        elif isinstance(raw, (PlainFunction, classmethod, staticmethod)):
+            yield attr_name, FinderResult(
+                module=sys.modules.get(klass.__module__),
+                function=getattr(klass, attr_name),
+                function_type=FunctionType.METHOD,
+                klass=klass,
+            )
+
+
+def find_pattern(pattern: str, limit: int) -> PatternMatches:
+    """Find every function, method and property a glob pattern matches.
+
+    Functions are matched both as 'function' and 'module.function', and
+    methods and properties as 'Class.method' and 'module.Class.method'. `*`
+    matches across dots, so 'mypkg.billing.*' covers the functions of
+    mypkg.billing and the methods of its classes. Only what a module or class
+    defines itself is matched, never what it imports or inherits, and names
+    starting with a double underscore are left out.
+
+    Targets are collected in one pass over the loaded modules; modules and
+    classes whose names can't start the way the pattern does are skipped
+    without looking inside them. Each target is named by its module-qualified
+    location, 'module.function' or 'module.Class.method', which find_function
+    resolves back to it, so same-named classes in different modules never
+    collide.
+
+    Args:
+        pattern: The glob pattern to match
+        limit: Stop after this many targets and set `truncated`
+
+    Returns:
+        A PatternMatches with the targets in sys.modules order
+    """
+    matches = PatternMatches()
+    prefix = literal_prefix(pattern)
+    # A pattern like 'OrderService.*' can only match classes with that exact name
+    class_name = prefix.split(".", 1)[0] if "." in prefix else None
+
+    def add(name: str, result: FinderResult, *keys: str) -> bool:
+        if name in matches.targets or not any(fnmatchcase(key, pattern) for key in keys):
+            return True
+        if len(matches.targets) == limit:
+            matches.truncated = True
+            return False
+        matches.targets[name] = result
+        return True
+
+    modules: List[Tuple[str, Any]] = list(sys.modules.items())
+    for module_name, module in modules:
+        try:
+            namespace: Dict[str, Any] = vars(module)
+        except TypeError:
+            continue
+        whole_module = may_start_with(module_name, prefix)
+        if whole_module:
+            attributes = list(namespace.items())
+        elif class_name is not None:
+            value = namespace.get(class_name)
+            attributes = [] if value is None else [(class_name, value)]
+        else:
+            attributes = [
+                (attr_name, value)
+                for attr_name, value in list(namespace.items())
+                if attr_name.startswith(prefix)
+            ]
+
+        for attr_name, value in attributes:
+            if attr_name.startswith("__") or not defined_in(value, module_name):
+                continue
+            if isinstance(value, PlainFunction):
+                qualified = f"{module_name}.{attr_name}"
+                result = FinderResult(
+                    module=module, function=value, function_type=FunctionType.REGULAR
+                )
+                if not add(qualified, result, qualified, attr_name):
+                    return matches
+            elif isinstance(value, type):
+                if not (whole_module or may_start_with(attr_name, prefix)):
+                    continue
+                for member_name, result in class_members(value):
+                    name = f"{attr_name}.{member_name}"
+                    qualified = f"{module_name}.{name}"
+                    if not add(qualified, result, name, qualified):
+                        return matches
+    return matches
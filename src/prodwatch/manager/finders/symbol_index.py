@@ -0,0 +1,204 @@
+import sys
+import threading
+from types import ModuleType
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+
+class IndexedModule:
+    """A module in the index and its position in sys.modules as of the last sync."""
+
+    __slots__ = ("name", "module", "position")
+
+    def __init__(self, name: str, module: Any, position: int) -> None:
+        self.name = name
+        self.module = module
+        self.position = position
+
+
+def is_dunder(name: str) -> bool:
+    return name[:1] == "_" and name.startswith("__") and name.endswith("__")
+
+
+def namespace(module: Any) -> Dict[str, Any] | None:
+    """The module's attribute dict, or None if it can't be indexed from its dict alone."""
+    try:
+        names = vars(module)
+    except TypeError:
+        return None
+    if not isinstance(names, dict) or "__getattr__" in names:
+        return None
+    return names
+
+
+class SymbolIndex:
+    """Maps attribute names to the loaded modules that define them.
+
+    Lookups used to scan every module in sys.modules. The index is built lazily
+    on first use and then kept current incrementally: each lookup indexes the
+    modules added to or replaced in sys.modules since the last one, and a
+    lookup that misses falls back to one scan of every module's namespace, so
+    names added to a module after it was indexed (mid-import, or by a reload)
+    are still found. Candidates are always verified against the live module
+    by the finders, so stale entries only cost a check, never a wrong result.
+
+    Candidates are returned in sys.modules order, so the first match is the
+    same one a full scan would find. Modules that resolve attributes
+    dynamically (a module-level __getattr__, or no __dict__) can't be indexed
+    and are returned as candidates for every name.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.modules: Dict[str, IndexedModule] = {}
+        self.symbols: Dict[str, IndexedModule | List[IndexedModule]] = {}
+        self.dynamic: List[IndexedModule] = []
+        # The modules in sys.modules as of the last sync, to tell cheaply whether it changed
+        self.synced_modules: List[Any] = []
+
+    def clear(self) -> None:
+        with self.lock:
+            self.modules.clear()
+            self.symbols.clear()
+            self.dynamic.clear()
+            self.synced_modules = []
+
+    def add(self, name: str, module: Any, position: int) -> None:
+        entry = IndexedModule(name, module, position)
+        self.modules[name] = entry
+        names = namespace(module)
+        if names is None:
+            self.dynamic.append(entry)
+            return
+        self.index_names(entry, names, new=True)
+
+    def index_names(self, entry: IndexedModule, names: Dict[str, Any], new: bool = False) -> None:
+        # Most names are defined by one module, so those map straight to the
+        # entry; a list is only allocated for names defined in several.
+        symbols = self.symbols
+        get = symbols.get
+        for attribute in list(names):
+            if attribute[0] == "_" and attribute.startswith("__") and attribute.endswith("__"):
+                continue
+            indexed = get(attribute)
+            if indexed is None:
+                symbols[attribute] = entry
+            elif isinstance(indexed, list):
+                if new or entry not in indexed:
+                    indexed.append(entry)
+            elif indexed is not entry:
+                symbols[attribute] = [indexed, entry]
+
+    def sync(self) -> None:
+        """Index modules added to sys.modules and forget ones that were removed or replaced.
+
+        sys.modules is compared with the last sync module by module, not just
+        by its size, so a module replaced under the same name (as by a test
+        or a plugin reloader) is noticed too.
+        """
+        current = list(sys.modules.values())
+        if current == self.synced_modules:
+            return
+        items: List[Tuple[str, Any]] = list(sys.modules.items())
+        self.synced_modules = [module for _, module in items]
+
+        modules = self.modules
+        replaced = False
+        live = 0
+        for position, (name, module) in enumerate(items):
+            if module is None:
+                continue
+            live += 1
+            entry = modules.get(name)
+            if entry is not None and entry.module is module:
+                entry.position = position
+                continue
+            replaced = replaced or entry is not None
+            self.add(name, module, position)
+
+        removed = len(modules) > live
+        if removed:
+            live_names = {name for name, module in items if module is not None}
+            for name in [name for name in modules if name not in live_names]:
+                del modules[name]
+        if (removed or replaced) and self.dynamic:
+            self.dynamic = [entry for entry in self.dynamic if modules.get(entry.name) is entry]
+
+    def scan(self, attributes: List[str]) -> None:
+        """Re-index the modules that define any of `attributes` but weren't indexed for them.
+
+        A module's namespace can change after it was indexed, e.g. while it
+        is still being imported or when it is reloaded. One pass covers
+        every attribute, so a batch of names that aren't defined anywhere
+        costs one scan, not one per name.
+        """
+        for entry in list(self.modules.values()):
+            names = namespace(entry.module)
+            if names is None:
+                continue
+            for attribute in attributes:
+                if attribute in names:
+                    self.index_names(entry, names)
+                    break
+
+    def lookup(self, attribute: str) -> List[IndexedModule]:
+        """Live entries for an attribute in position order, pruning ones that were removed."""
+        indexed = self.symbols.get(attribute)
+        if indexed is None:
+            return []
+        modules = self.modules
+        if not isinstance(indexed, list):
+            if modules.get(indexed.name) is indexed:
+                return [indexed]
+            del self.symbols[attribute]
+            return []
+
+        entries = [entry for entry in indexed if modules.get(entry.name) is entry]
+        entries.sort(key=lambda entry: entry.position)
+        if len(entries) > 1:
+            self.symbols[attribute] = entries
+        elif entries:
+            self.symbols[attribute] = entries[0]
+        else:
+            del self.symbols[attribute]
+        return list(entries)
+
+    def candidates(self, attribute: str) -> Iterator[ModuleType]:
+        """Modules that may define `attribute`, in sys.modules order."""
+        yield from self.candidates_for((attribute,))[attribute]
+
+    def candidates_for(self, attributes: Iterable[str]) -> Dict[str, List[ModuleType]]:
+        """Modules that may define each of several attributes, in sys.modules order.
+
+        The index is synced once for all of them, and if any misses, the
+        modules are scanned once for all the misses together.
+        """
+        found: Dict[str, List[ModuleType]] = {}
+        indexed: List[str] = []
+        for attribute in attributes:
+            if not attribute.isidentifier():
+                found[attribute] = []
+            elif is_dunder(attribute):
+                # Defined by nearly every module, so not indexed
+                modules: List[Any] = list(sys.modules.values())
+                found[attribute] = [module for module in modules if module is not None]
+            else:
+                indexed.append(attribute)
+        if not indexed:
+            return found
+
+        with self.lock:
+            self.sync()
+            entries = {attribute: self.lookup(attribute) for attribute in indexed}
+            missed = [attribute for attribute, matches in entries.items() if not matches]
+            if missed:
+                self.scan(missed)
+                for attribute in missed:
+                    entries[attribute] = self.lookup(attribute)
+            for attribute, matches in entries.items():
+                if self.dynamic:
+                    matches = sorted(matches + self.dynamic, key=lambda entry: entry.position)
+                found[attribute] = [entry.module for entry in matches]
+        return found
+
+
+symbol_index = SymbolIndex()
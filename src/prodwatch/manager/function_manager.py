@@ -1,6 +1,21 @@
+import time
+import types
+import inspect
 import logging
+import threading
+from dataclasses import dataclass
+from types import CodeType
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, cast
 from .types import LoggingCallback
-from .finders.find_function import find_function
+from .argument_capture import ArgumentCapture
+from .expiry import CallLimit, ExpiryReason
+from .monitoring import Instrumentation, MonitoringBackend, monitorable_code
+from .sampling import Sampler
+from .self_stats import SelfStats
+from .aggregation import FunctionAggregate
+from .watch_request import WatchMode, WatchOptions, WatchRequest
+from .finders.find_function import find_function, find_functions
+from .finders.find_pattern import find_pattern
 from .finders.finder_result import FunctionType, FinderResult
 from .wrappers.logged_function import create_logged_function
 from .wrappers.logged_method import create_logged_method
@@ -8,54 +23,431 @@ from .wrappers.logged_property import create_logged_property
 
 logger = logging.getLogger(__name__)
 
+# Marks an attribute that was inherited rather than set on the object itself
+MISSING = object()
+
+
+@dataclass
+class AppliedWatch:
+    """A wrapper installed by `watch_function`, and the attribute it replaced.
+
+    Watches installed through sys.monitoring leave the attribute alone and
+    record the monitored `code` object instead of a wrapper.
+    """
+
+    function_name: str
+    owner: Any
+    attr_name: str
+    original: Any
+    wrapper: Any = None
+    code: Optional[CodeType] = None
+    # Limits that remove the watch, if any (see expiry.WatchLimits)
+    deadline: Optional[float] = None
+    bytes_remaining: Optional[int] = None
+
+    @property
+    def location(self) -> Tuple[int, str]:
+        return id(self.owner), self.attr_name
+
+
+@dataclass
+class PatternWatch:
+    """The outcome of watching a glob pattern."""
+
+    pattern: str
+    # Names of the targets now watched as the pattern's group
+    targets: List[str]
+    # Targets that matched but couldn't be watched
+    failed: List[str]
+    # More targets matched than the pattern may instrument, so none were watched
+    too_many: bool = False
+
+
+@dataclass
+class ExpiredWatch:
+    """A watch that removed itself because it hit one of its limits."""
+
+    function_name: str
+    reason: ExpiryReason
+    aggregate: Optional[FunctionAggregate] = None
+
+
+def watch_owner(result: FinderResult) -> Any:
+    """The module or class whose attribute a watch on a resolved target replaces."""
+    return result.module if result.function_type == FunctionType.REGULAR else result.klass
+
+
+def own_attribute(owner: Any, attr_name: str) -> Any:
+    """The raw attribute stored on a module or class itself, or MISSING."""
+    return vars(owner).get(attr_name, MISSING)
+
+
+def method_target(klass: Any, attr_name: str, function: Any) -> Tuple[Any, Any]:
+    """The descriptor stored on the class for a method, and the function inside it.
+
+    Wrappers wrap that function rather than the bound method getattr returns.
+    """
+    descriptor = inspect.getattr_static(klass, attr_name, function)
+    if isinstance(descriptor, (classmethod, staticmethod)):
+        return descriptor, descriptor.__func__
+    if isinstance(descriptor, types.FunctionType):
+        return descriptor, descriptor
+    return descriptor, function
+
 
 class FunctionManager:
-    def __init__(self, log_function_call: LoggingCallback) -> None:
+    def __init__(
+        self,
+        log_function_call: LoggingCallback,
+        argument_capture: ArgumentCapture = ArgumentCapture.EAGER,
+        instrumentation: Instrumentation = Instrumentation.SETATTR,
+        specialize_wrappers: bool = False,
+        self_stats: Optional[SelfStats] = None,
+    ) -> None:
         self.log_function_call = log_function_call
+        self.argument_capture = argument_capture
+        # Generate wrappers matching each function's signature where possible
+        self.specialize_wrappers = specialize_wrappers
+        # Where wrappers record the overhead of each call they report
+        self.self_stats = self_stats
+        self.monitor = MonitoringBackend()
+        if instrumentation == Instrumentation.MONITORING and not self.monitor.available:
+            logger.warning("sys.monitoring needs Python 3.12 or newer; using wrappers instead")
+            instrumentation = Instrumentation.SETATTR
+        self.instrumentation = instrumentation
+        self.samplers: Dict[str, Sampler] = {}
+        self.aggregates: Dict[str, FunctionAggregate] = {}
+        self.watches: Dict[str, AppliedWatch] = {}
+        self.locations: Dict[Tuple[int, str], AppliedWatch] = {}
+        # Watches installed for a pattern, removed together, and each member's pattern
+        self.groups: Dict[str, List[str]] = {}
+        self.group_of: Dict[str, str] = {}
+        self.expired: List[ExpiredWatch] = []
+        # Watches can be removed from application threads when they hit a limit
+        self.lock = threading.RLock()
+
+    def reset_after_fork(self) -> None:
+        """In a forked child, keep the applied watches but drop what the parent collected.
+
+        Wrappers and monitored code objects are inherited as they are, so nothing
+        is resolved again. Locks are replaced, since a thread that held one in
+        the parent doesn't exist in the child.
+        """
+        self.lock = threading.RLock()
+        self.expired = []
+        self.monitor.reset_after_fork()
+        for sampler in self.samplers.values():
+            sampler.reset_after_fork()
+        for aggregate in self.aggregates.values():
+            aggregate.reset_after_fork()
+
+    def flush_samplers(self) -> None:
+        """Report calls held back by samplers whose interval has ended."""
+        for function_name, sampler in list(self.samplers.items()):
+            try:
+                sampler.flush()
+            except Exception as e:
+                logger.error(f"Error flushing sampler for {function_name}: {e}")
+
+    def watch_function(
+        self, function_name: str, options: Optional[WatchOptions] = None
+    ) -> tuple[bool, FinderResult]:
+        with self.lock:
+            return self.apply_watch(function_name, options)
+
+    def watch_functions(
+        self, requests: Sequence[WatchRequest]
+    ) -> List[tuple[bool, FinderResult]]:
+        """Watch several functions, resolving all their names in one pass.
+
+        Returns the outcome of each request, in order.
+        """
+        with self.lock:
+            found = find_functions(request.function_name for request in requests)
+            results = []
+            for request in requests:
+                name = request.function_name
+                results.append(self.apply_watch(name, request.options, found[name]))
+            return results
+
+    def watch_pattern(
+        self, pattern: str, options: Optional[WatchOptions], max_targets: int
+    ) -> PatternWatch:
+        """Watch everything a glob pattern matches, as one group named by the pattern.
 
-    def watch_function(self, function_name: str) -> tuple[bool, FinderResult]:
+        Targets that are already watched, under any name, are left as they are
+        and aren't part of the group. If the pattern matches more than
+        `max_targets` targets, nothing is watched.
+        """
+        with self.lock:
+            matches = find_pattern(pattern, max_targets)
+            if matches.truncated:
+                logger.warning(f"Pattern {pattern} matches more than {max_targets} targets")
+                return PatternWatch(pattern, [], [], too_many=True)
+
+            watch = PatternWatch(pattern, [], [])
+            for function_name, result in matches.targets.items():
+                location = (id(watch_owner(result)), function_name.split(".")[-1])
+                if function_name in self.watches or location in self.locations:
+                    continue
+                success, _ = self.apply_watch(function_name, options, result)
+                (watch.targets if success else watch.failed).append(function_name)
+            if watch.targets:
+                self.groups[pattern] = list(watch.targets)
+                for function_name in watch.targets:
+                    self.group_of[function_name] = pattern
+            return watch
+
+    def apply_watch(
+        self,
+        function_name: str,
+        options: Optional[WatchOptions] = None,
+        result: Optional[FinderResult] = None,
+    ) -> tuple[bool, FinderResult]:
         logger.info(f"Setting up watch for function: {function_name}")
-        result: FinderResult = find_function(function_name)
+        if result is None:
+            result = find_function(function_name)
 
         if not result.found:
             logger.warning(f"Function {function_name} not found in any module")
             return False, result
 
         attr_name = function_name.split(".")[-1]
+        owner = watch_owner(result)
+        existing = self.locations.get((id(owner), attr_name))
+        if existing is not None:
+            # Watched before, possibly under another name: start again from the
+            # original so wrappers never stack.
+            logger.info(f"Replacing existing watch {existing.function_name} with {function_name}")
+            self.unwatch_function(existing.function_name)
+            result = find_function(function_name)
+            if not result.found:
+                return False, result
+
+        options = options or WatchOptions()
+        log_function_call: LoggingCallback = self.log_function_call
+        argument_capture = self.argument_capture
+        aggregate: Optional[FunctionAggregate] = None
+        sampler: Optional[Sampler] = None
+        if options.mode == WatchMode.HISTOGRAM:
+            # Every call is recorded into the histogram, so sampling would only lose data
+            aggregate = FunctionAggregate(function_name)
+            log_function_call = aggregate
+            argument_capture = ArgumentCapture.NONE
+        elif options.sampling:
+            sampler = options.sampling.create_sampler()
+
+        applied = AppliedWatch(function_name, owner, attr_name, own_attribute(owner, attr_name))
+        limits = options.limits
+        call_limit: Optional[CallLimit] = None
+        if limits is not None:
+            if limits.max_calls is not None:
+                call_limit = CallLimit(
+                    limits.max_calls, lambda: self.expire(applied, ExpiryReason.MAX_CALLS)
+                )
+            if limits.max_duration is not None:
+                applied.deadline = time.monotonic() + limits.max_duration
+            applied.bytes_remaining = limits.max_bytes
+
+        if self.instrumentation == Instrumentation.MONITORING:
+            code = monitorable_code(self.hook_target(result, attr_name))
+            if code is not None:
+                # The same code object may be reachable under several names
+                for other in list(self.watches.values()):
+                    if other.code is code:
+                        logger.info(f"Replacing watch {other.function_name} with {function_name}")
+                        self.remove_watch(other.function_name)
+                if self.monitor.watch(
+                    code,
+                    function_name,
+                    log_function_call,
+                    sampler,
+                    argument_capture=argument_capture,
+                    call_limit=call_limit,
+                    self_stats=self.self_stats,
+                ):
+                    applied.code = code
+                    self.register(applied, sampler, aggregate)
+                    logger.info(f"Successfully set up monitored watch for {function_name}")
+                    return True, result
+
+        wrapper: Any
         match result.function_type:
             case FunctionType.REGULAR:
                 logger.info(f"Found regular function in module: {result.module}")
                 logged_function = create_logged_function(
                     result.function,
                     function_name,
-                    self.log_function_call,
+                    log_function_call,
+                    sampler,
+                    argument_capture=argument_capture,
+                    call_limit=call_limit,
+                    self_stats=self.self_stats,
+                    specialize=self.specialize_wrappers,
                 )
-                setattr(result.module, attr_name, logged_function)
+                wrapper = logged_function
 
             case FunctionType.PROPERTY:
                 logger.info(f"Found property in class: {result.klass.__name__}")
+                original_property = cast(property, result.function)
                 logged_property = create_logged_property(
-                    result.function,
+                    original_property,
                     function_name,
-                    self.log_function_call,
+                    log_function_call,
+                    sampler,
+                    argument_capture=argument_capture,
+                    call_limit=call_limit,
+                    self_stats=self.self_stats,
+                )
+                # Keeps the setter, deleter and docstring of the original property
+                wrapper = property(
+                    logged_property,
+                    original_property.fset,
+                    original_property.fdel,
+                    original_property.__doc__,
                 )
-                setattr(result.klass, attr_name, property(logged_property))
 
             case FunctionType.METHOD:
                 logger.info(f"Found method in class: {result.klass.__name__}")
+                descriptor, target = method_target(result.klass, attr_name, result.function)
                 logged_method = create_logged_method(
-                    result.function,
+                    target,
                     function_name,
-                    self.log_function_call,
+                    log_function_call,
+                    sampler,
+                    argument_capture=argument_capture,
+                    call_limit=call_limit,
+                    self_stats=self.self_stats,
+                    specialize=self.specialize_wrappers,
                 )
 
                 # Preserve original method type (classmethod, staticmethod, or instance method)
-                if isinstance(result.function, classmethod):
-                    logged_method = classmethod(logged_method)
-                elif isinstance(result.function, staticmethod):
-                    logged_method = staticmethod(logged_method)
+                if isinstance(descriptor, classmethod):
+                    wrapper = classmethod(logged_method)
+                elif isinstance(descriptor, staticmethod):
+                    wrapper = staticmethod(logged_method)
+                else:
+                    wrapper = logged_method
 
-                setattr(result.klass, attr_name, logged_method)
+        setattr(owner, attr_name, wrapper)
+        applied.wrapper = wrapper
+        self.register(applied, sampler, aggregate)
 
         logger.info(f"Successfully set up watch for {function_name}")
         return True, result
+
+    def hook_target(self, result: FinderResult, attr_name: str) -> Any:
+        """The plain function a watch on a resolved target ends up timing."""
+        match result.function_type:
+            case FunctionType.PROPERTY:
+                return cast(property, result.function).fget
+            case FunctionType.METHOD:
+                return method_target(result.klass, attr_name, result.function)[1]
+            case _:
+                return result.function
+
+    def register(
+        self,
+        applied: AppliedWatch,
+        sampler: Optional[Sampler],
+        aggregate: Optional[FunctionAggregate],
+    ) -> None:
+        self.watches[applied.function_name] = applied
+        self.locations[applied.location] = applied
+        if sampler is not None:
+            self.samplers[applied.function_name] = sampler
+        if aggregate is not None:
+            self.aggregates[applied.function_name] = aggregate
+
+    def is_watched(self, function_name: str) -> bool:
+        return function_name in self.watches
+
+    def unwatch_function(self, function_name: str) -> bool:
+        """Remove a watch and put back the exact object it replaced.
+
+        Calls held back by the watch's sampler are reported first. Returns False
+        if the function isn't watched. If something else has replaced the
+        wrapper since, that replacement is left in place. Given a pattern, every
+        watch in its group is removed.
+        """
+        with self.lock:
+            members = self.groups.pop(function_name, None)
+            if members is None:
+                return self.remove_watch(function_name)
+            for member in members:
+                self.remove_watch(member)
+            return True
+
+    def remove_watch(self, function_name: str) -> bool:
+        applied = self.watches.pop(function_name, None)
+        if applied is None:
+            return False
+        group = self.group_of.pop(function_name, None)
+        if group is not None and group in self.groups:
+            self.groups[group].remove(function_name)
+            if not self.groups[group]:
+                # Its last target is gone, so the pattern no longer watches anything
+                del self.groups[group]
+        self.locations.pop(applied.location, None)
+        self.aggregates.pop(function_name, None)
+        sampler = self.samplers.pop(function_name, None)
+        if sampler is not None:
+            try:
+                sampler.flush(force=True)
+            except Exception as e:
+                logger.error(f"Error flushing sampler for {function_name}: {e}")
+
+        if applied.code is not None:
+            self.monitor.unwatch(applied.code)
+            logger.info(f"Removed monitored watch for {function_name}")
+            return True
+        if own_attribute(applied.owner, applied.attr_name) is not applied.wrapper:
+            logger.warning(f"{function_name} was replaced after it was watched; leaving it")
+            return True
+        if applied.original is MISSING:
+            delattr(applied.owner, applied.attr_name)
+        else:
+            setattr(applied.owner, applied.attr_name, applied.original)
+        logger.info(f"Removed watch for {function_name}")
+        return True
+
+    def expire(self, applied: AppliedWatch, reason: ExpiryReason) -> None:
+        """Remove a watch that hit a limit and record why, to be reported by the Manager."""
+        with self.lock:
+            if self.watches.get(applied.function_name) is not applied:
+                return
+            aggregate = self.aggregates.get(applied.function_name)
+            group = self.group_of.get(applied.function_name)
+            self.remove_watch(applied.function_name)
+            self.expired.append(ExpiredWatch(applied.function_name, reason, aggregate))
+            if group is not None and group not in self.groups:
+                # The pattern's last target expired, so the pattern has too
+                self.expired.append(ExpiredWatch(group, reason))
+        logger.info(f"Watch for {applied.function_name} expired: {reason.value}")
+
+    def expire_overdue(self) -> None:
+        """Remove watches whose max_duration has passed."""
+        now = time.monotonic()
+        for applied in list(self.watches.values()):
+            if applied.deadline is not None and now >= applied.deadline:
+                self.expire(applied, ExpiryReason.MAX_DURATION)
+
+    def byte_limited_functions(self) -> Set[str]:
+        return {
+            name for name, applied in list(self.watches.items())
+            if applied.bytes_remaining is not None
+        }
+
+    def charge_bytes(self, function_name: str, size: int) -> None:
+        """Count bytes shipped for a watch against its max_bytes limit."""
+        applied = self.watches.get(function_name)
+        if applied is None or applied.bytes_remaining is None:
+            return
+        applied.bytes_remaining -= size
+        if applied.bytes_remaining <= 0:
+            self.expire(applied, ExpiryReason.MAX_BYTES)
+
+    def take_expired(self) -> List[ExpiredWatch]:
+        with self.lock:
+            expired, self.expired = self.expired, []
+        return expired
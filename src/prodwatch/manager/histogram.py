@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import math
+from array import array
+from typing import Any, Dict
+
+
+class LatencyHistogram:
+    """Log-bucketed histogram of durations with a fixed relative accuracy.
+
+    Bucket i covers (gamma^(i-1), gamma^i] scaled by `min_value`, where
+    gamma = (1 + a) / (1 - a) for relative accuracy a, as in DDSketch. Any
+    quantile read back is within a of the true value. Buckets are preallocated
+    for the whole [min_value, max_value] range, so memory is fixed and recording
+    is a log, a multiply and an array increment. Values outside the range are
+    clamped into the first or last bucket.
+
+    Histograms with the same parameters can be merged by adding their buckets.
+    """
+
+    __slots__ = (
+        "relative_accuracy",
+        "min_value",
+        "max_value",
+        "gamma",
+        "multiplier",
+        "offset",
+        "last_bucket",
+        "buckets",
+        "count",
+        "sum",
+        "min",
+        "max",
+    )
+
+    def __init__(
+        self,
+        relative_accuracy: float = 0.02,
+        min_value: float = 0.001,
+        max_value: float = 3_600_000.0,
+    ) -> None:
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be in (0, 1)")
+        if not 0 < min_value < max_value:
+            raise ValueError("min_value must be positive and below max_value")
+
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.max_value = max_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.multiplier = 1 / math.log(self.gamma)
+        self.offset = math.log(min_value) * self.multiplier
+        self.last_bucket = math.ceil(math.log(max_value) * self.multiplier - self.offset)
+        self.buckets = array("Q", bytes(8 * (self.last_bucket + 1)))
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def bucket_index(self, value: float) -> int:
+        if value <= self.min_value:
+            return 0
+        index = math.ceil(math.log(value) * self.multiplier - self.offset)
+        return index if index < self.last_bucket else self.last_bucket
+
+    def bucket_value(self, index: int) -> float:
+        """Representative value of a bucket: within relative_accuracy of anything in it."""
+        upper = self.min_value * self.gamma**index
+        return 2 * upper / (self.gamma + 1)
+
+    def record(self, value: float) -> None:
+        self.buckets[self.bucket_index(value)] += 1
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Approximate value at quantile q in [0, 1]. Returns 0.0 when empty."""
+        if not self.count:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = 0
+        for index, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen > rank:
+                return min(max(self.bucket_value(index), self.min), self.max)
+        return self.max
+
+    def compatible_with(self, other: "LatencyHistogram") -> bool:
+        return (
+            self.relative_accuracy == other.relative_accuracy
+            and self.min_value == other.min_value
+            and self.max_value == other.max_value
+        )
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """Add another histogram's counts into this one."""
+        if not self.compatible_with(other):
+            raise ValueError("Cannot merge histograms with different parameters")
+        buckets = self.buckets
+        for index, bucket_count in enumerate(other.buckets):
+            if bucket_count:
+                buckets[index] += bucket_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def reset(self) -> None:
+        buckets = self.buckets
+        for index in range(len(buckets)):
+            buckets[index] = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize to a compact dict: only non-empty buckets are included."""
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "min_value": self.min_value,
+            "max_value": self.max_value,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "buckets": {
+                str(index): bucket_count
+                for index, bucket_count in enumerate(self.buckets)
+                if bucket_count
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencyHistogram":
+        histogram = cls(
+            relative_accuracy=data["relative_accuracy"],
+            min_value=data["min_value"],
+            max_value=data["max_value"],
+        )
+        for index, bucket_count in data["buckets"].items():
+            histogram.buckets[int(index)] = bucket_count
+        histogram.count = data["count"]
+        histogram.sum = data["sum"]
+        if histogram.count:
+            histogram.min = data["min"]
+            histogram.max = data["max"]
+        return histogram
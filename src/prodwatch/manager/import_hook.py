@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import sys
+import logging
+import importlib.abc
+import importlib.util
+import threading
+from importlib.machinery import ModuleSpec, PathFinder
+from types import ModuleType
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .watch_request import WatchRequest
+
+logger = logging.getLogger(__name__)
+
+LoadedCallback = Callable[[str, List[WatchRequest]], None]
+
+
+def find_module_spec(module_name: str) -> Optional[ModuleSpec]:
+    """Find a module's spec without importing it or any package above it.
+
+    Below a package that isn't imported yet, only its path entries are searched.
+    """
+    parent_name = module_name.rpartition(".")[0]
+    try:
+        if not parent_name or parent_name in sys.modules:
+            return importlib.util.find_spec(module_name)
+        parent = find_module_spec(parent_name)
+        if parent is None or parent.submodule_search_locations is None:
+            return None
+        return PathFinder.find_spec(module_name, parent.submodule_search_locations)
+    except (ImportError, ValueError):
+        return None
+
+
+def is_importable(module_name: str) -> bool:
+    """Whether the module is loaded or can be found, without importing anything."""
+    return module_name in sys.modules or find_module_spec(module_name) is not None
+
+
+def target_module(function_name: str) -> Optional[str]:
+    """The module a module-qualified watch name refers to, or None if it names none.
+
+    That is the longest dotted prefix of the name that is a module: 'pkg.mod'
+    for both 'pkg.mod.func' and 'pkg.mod.Class.method'.
+    """
+    parts = function_name.split(".")
+    for end in range(len(parts) - 1, 0, -1):
+        module_name = ".".join(parts[:end])
+        if is_importable(module_name):
+            return module_name
+    return None
+
+
+def is_initialized(module: Optional[ModuleType]) -> bool:
+    """Whether a module is imported and its body has finished executing."""
+    if module is None:
+        return False
+    return not getattr(getattr(module, "__spec__", None), "_initializing", False)
+
+
+class WatchingLoader(importlib.abc.Loader):
+    """Wraps a module's loader to run a callback as soon as the module has executed."""
+
+    def __init__(self, loader: Any, on_executed: Callable[[ModuleType], None]) -> None:
+        self.loader = loader
+        self.on_executed = on_executed
+
+    def create_module(self, spec: ModuleSpec) -> Optional[ModuleType]:
+        module: Optional[ModuleType] = self.loader.create_module(spec)
+        return module
+
+    def exec_module(self, module: ModuleType) -> None:
+        try:
+            self.loader.exec_module(module)
+        finally:
+            # Hand the module back its real loader so nothing else sees the wrapper
+            if module.__spec__ is not None:
+                module.__spec__.loader = self.loader
+            module.__loader__ = self.loader
+        self.on_executed(module)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.loader, name)
+
+
+class DeferredWatchFinder(importlib.abc.MetaPathFinder):
+    """Holds watches for modules that aren't imported yet and applies them on import.
+
+    Installed at the front of sys.meta_path. For any module without pending
+    watches, `find_spec` is a single dict lookup and defers to the other
+    finders. For a module with pending watches, it finds the real spec with the
+    rest of sys.meta_path and wraps its loader, so `on_loaded` runs on the
+    importing thread right after the module body has executed, before the
+    import returns.
+    """
+
+    def __init__(self, on_loaded: LoadedCallback) -> None:
+        self.on_loaded = on_loaded
+        self.lock = threading.Lock()
+        self.pending: Dict[str, List[WatchRequest]] = {}
+
+    def install(self) -> None:
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self) -> None:
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def reset_after_fork(self) -> None:
+        self.lock = threading.Lock()
+
+    def defer(self, module_name: str, request: WatchRequest) -> None:
+        with self.lock:
+            requests = self.pending.setdefault(module_name, [])
+            if all(pending.function_name != request.function_name for pending in requests):
+                requests.append(request)
+
+    def cancel(self, function_name: str) -> bool:
+        """Drop a pending watch. Returns False if it wasn't pending."""
+        with self.lock:
+            for module_name, requests in self.pending.items():
+                remaining = [r for r in requests if r.function_name != function_name]
+                if len(remaining) == len(requests):
+                    continue
+                if remaining:
+                    self.pending[module_name] = remaining
+                else:
+                    del self.pending[module_name]
+                return True
+            return False
+
+    def is_deferred(self, function_name: str) -> bool:
+        with self.lock:
+            return any(
+                request.function_name == function_name
+                for requests in self.pending.values()
+                for request in requests
+            )
+
+    def find_spec(
+        self,
+        fullname: str,
+        path: Optional[Sequence[str]],
+        target: Optional[ModuleType] = None,
+    ) -> Optional[ModuleSpec]:
+        if fullname not in self.pending:
+            return None
+
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec: Optional[ModuleSpec] = finder.find_spec(fullname, path, target)
+            if spec is None:
+                continue
+            if spec.loader is None or not hasattr(spec.loader, "exec_module"):
+                # Namespace packages and legacy loaders are imported normally;
+                # their watches are retried by the polling loop instead.
+                return spec
+            spec.loader = WatchingLoader(spec.loader, self.module_executed)
+            return spec
+        return None
+
+    def module_executed(self, module: ModuleType) -> None:
+        with self.lock:
+            requests = self.pending.pop(module.__name__, [])
+        if not requests:
+            return
+        try:
+            self.on_loaded(module.__name__, requests)
+        except Exception as e:
+            logger.error(f"Error applying deferred watches for {module.__name__}: {e}")
+
+    def take_imported(self) -> List[WatchRequest]:
+        """Remove and return pending watches whose module was imported without the hook seeing it."""
+        with self.lock:
+            imported = [name for name in self.pending if is_initialized(sys.modules.get(name))]
+            return [request for name in imported for request in self.pending.pop(name)]
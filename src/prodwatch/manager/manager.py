@@ -1,83 +1,435 @@
 import os
+import sys
+import json
 import uuid
 import time
+import atexit
+import weakref
 import threading
 import requests
 import logging
-from typing import Optional, List, Dict, Any, cast
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, List, Dict, Any, Tuple, cast
 from requests.exceptions import RequestException
-from ..exceptions import TokenError
+from ..agent.client import AGENT_AVAILABLE, AgentClient
+from ..exceptions import CircuitOpenError, TokenError
+from .event_shipper import EventShipper
+from .argument_capture import ArgumentCapture
+from .aggregation import FunctionAggregate
+from .circuit_breaker import (
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_READ_TIMEOUT,
+    BreakerSession,
+    CircuitBreaker,
+)
 from .function_manager import FunctionManager
+from .monitoring import Instrumentation
+from .finders.find_pattern import DEFAULT_MAX_TARGETS, is_pattern
+from .finders.finder_result import FinderResult
+from .import_hook import DeferredWatchFinder, target_module
+from .poll_schedule import PollSchedule
+from .self_stats import SelfStats
+from .snapshot import render_arguments
+from .spool import DEFAULT_MAX_BYTES, SPOOL_AVAILABLE, DiskSpool
+from .watch_request import WatchRequest
+from .wire_format import CONTENT_TYPE, encode_batch
 from .system_identification import (
     SystemInfoSerializer,
     SystemIdentification,
     get_system_identifier,
 )
 
+WIRE_FORMATS = ("json", "binary")
+# How often a sleeping polling thread checks whether the manager was stopped
+STOP_CHECK_INTERVAL = 0.5
+# How often the housekeeping thread expires watches, flushes samplers and
+# checks whether a summary or stats report is due
+HOUSEKEEPING_INTERVAL = 1.0
+
+
+def weak_callback(method: Callable[[], None]) -> Callable[[], None]:
+    """A callback that calls a bound method only while its object is alive.
+
+    Fork handlers can't be unregistered, so they must not keep managers alive.
+    """
+    reference = weakref.WeakMethod(method)
+
+    def callback() -> None:
+        bound = reference()
+        if bound is not None:
+            bound()
+
+    return callback
+
 
 class Manager:
-    def __init__(self, base_server_url: str, app_name: str, poll_interval: int = 5):
+    def __init__(
+        self,
+        base_server_url: str,
+        app_name: str,
+        poll_interval: int = 5,
+        batch_size: int = 100,
+        linger: float = 1.0,
+        buffer_size: int = 1024,
+        flush_on_shutdown: bool = True,
+        summary_interval: float = 60.0,
+        stats_interval: float = 60.0,
+        wire_format: str = "json",
+        defer_argument_rendering: bool = False,
+        instrumentation: str = "setattr",
+        agent_socket: Optional[str] = None,
+        spool_directory: Optional[str] = None,
+        spool_max_bytes: int = DEFAULT_MAX_BYTES,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        long_poll_timeout: float = 0.0,
+        max_poll_interval: Optional[float] = None,
+        max_pattern_targets: int = DEFAULT_MAX_TARGETS,
+        specialize_wrappers: bool = False,
+    ):
+        if wire_format not in WIRE_FORMATS:
+            raise ValueError(f"wire_format must be one of {WIRE_FORMATS}, got {wire_format!r}")
+        instrumentations = tuple(mode.value for mode in Instrumentation)
+        if instrumentation not in instrumentations:
+            raise ValueError(
+                f"instrumentation must be one of {instrumentations}, got {instrumentation!r}"
+            )
+
         self.base_server_url = base_server_url
         self.poll_interval = poll_interval
+        self.poll_schedule = PollSchedule(poll_interval, max_poll_interval, long_poll_timeout)
+        # The watch list's ETag and contents as last fetched, to poll conditionally
+        self.watch_list_etag: Optional[str] = None
+        self.last_watch_list: Optional[Dict[str, Any]] = None
+        self.watch_list_changed = False
+        self.summary_interval = summary_interval
+        self.next_summary_at = time.monotonic() + summary_interval
+        self.stats_interval = stats_interval
+        self.next_stats_at = time.monotonic() + stats_interval
         self.active = False
         self.polling_thread: Optional[threading.Thread] = None
+        self.housekeeping_thread: Optional[threading.Thread] = None
         self.process_id: uuid.UUID = uuid.uuid4()
         self.app_name = app_name
+        self.wire_format = wire_format
+        self.defer_argument_rendering = defer_argument_rendering
         self.logger = logging.getLogger(__name__)
 
         self.token = os.getenv("PRODWATCH_API_TOKEN")
         if not self.token:
             raise TokenError("PRODWATCH_API_TOKEN environment variable is required.")
 
-        self.session = requests.Session()
-        self.session.headers.update({"Authorization": f"Bearer {self.token}"})
+        self.timeout = (connect_timeout, read_timeout)
+        self.circuit_breaker = CircuitBreaker()
+        self.self_stats = SelfStats()
+        self.session = self.create_session()
+        if agent_socket and not AGENT_AVAILABLE:
+            self.logger.warning(
+                "The agent needs Unix sockets, which this platform lacks; using the server"
+            )
+            agent_socket = None
+        # Talk to the host agent over this Unix socket instead of to the server
+        self.agent = AgentClient(agent_socket) if agent_socket else None
+        if spool_directory and not SPOOL_AVAILABLE:
+            self.logger.warning("Spooling needs fcntl, which this platform lacks; not spooling")
+            spool_directory = None
+        # Event batches the server can't take right now wait here, in order
+        self.spool = (
+            DiskSpool(spool_directory, max_bytes=spool_max_bytes) if spool_directory else None
+        )
+        self.upstream_healthy = True
+        self.next_replay_at = time.monotonic()
         self.watched_functions: set[str] = set()
+        # Most functions one pattern watch may instrument
+        self.max_pattern_targets = max_pattern_targets
+
+        self.event_shipper = EventShipper(
+            send_batch=self.send_event_batch,
+            batch_size=batch_size,
+            linger=linger,
+            buffer_size=buffer_size,
+            flush_on_shutdown=flush_on_shutdown,
+        )
 
         self.function_manager = FunctionManager(
             log_function_call=self.log_function_call,
+            argument_capture=(
+                ArgumentCapture.DEFERRED if defer_argument_rendering else ArgumentCapture.EAGER
+            ),
+            instrumentation=Instrumentation(instrumentation),
+            specialize_wrappers=specialize_wrappers,
+            self_stats=self.self_stats,
+        )
+
+        # Watches for modules that aren't imported yet, applied by an import hook
+        self.import_hook = DeferredWatchFinder(on_loaded=self.apply_deferred_watches)
+        self.deferred_results: List[Tuple[str, bool, FinderResult]] = []
+        self.deferred_results_lock = threading.Lock()
+        # Watcher events being collected to send as one report, per thread
+        self.watch_reports = threading.local()
+
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(
+                before=weak_callback(self.before_fork),
+                after_in_parent=weak_callback(self.after_fork_in_parent),
+                after_in_child=weak_callback(self.after_fork_in_child),
+            )
+
+    def create_session(self) -> requests.Session:
+        session = BreakerSession(
+            self.circuit_breaker, self.timeout, observer=self.self_stats.record_request
         )
+        session.headers.update({"Authorization": f"Bearer {self.token}"})
+        return session
 
     def start(self) -> None:
         if self.active:
             return
 
         self.active = True
+        self.import_hook.install()
+        self.event_shipper.start()
         self.polling_thread = threading.Thread(target=self.polling_loop, daemon=True)
         self.polling_thread.start()
+        self.housekeeping_thread = threading.Thread(target=self.housekeeping_loop, daemon=True)
+        self.housekeeping_thread.start()
+        atexit.register(self.stop)
 
     def stop(self) -> None:
         if not self.active:
             return
 
         self.active = False
+        atexit.unregister(self.stop)
+        self.import_hook.uninstall()
+        if self.housekeeping_thread:
+            # The final reports below must not overlap the thread's own
+            self.housekeeping_thread.join()
         if self.polling_thread:
-            self.polling_thread.join()
+            # A long poll in flight can't be interrupted; don't wait out the server's hold.
+            # Once stopped, the poller ignores the answer, so it reports nothing more.
+            self.polling_thread.join(timeout=1.0 if self.poll_schedule.long_poll else None)
+        self.report_summaries()
+        self.report_stats()
+        self.event_shipper.stop()
+        if self.agent is not None:
+            self.agent.close()
+        if self.spool is not None:
+            self.spool.close()
+
+    def before_fork(self) -> None:
+        # Hold the locks so no other thread is halfway through changing what they guard
+        self.function_manager.lock.acquire()
+        self.deferred_results_lock.acquire()
+
+    def after_fork_in_parent(self) -> None:
+        self.deferred_results_lock.release()
+        self.function_manager.lock.release()
+
+    def after_fork_in_child(self) -> None:
+        """Turn the copy of this manager in a forked child into one for a new process.
+
+        The child gets its own process ID and connection pool, keeps the watches
+        applied in the parent without resolving them again, and drops anything
+        the parent had buffered but not yet sent. If the manager was running,
+        its background threads are started again, and the polling thread
+        registers the child with the server before polling.
+        """
+        self.function_manager.reset_after_fork()
+        self.import_hook.reset_after_fork()
+        self.deferred_results_lock = threading.Lock()
+        self.deferred_results = []
+        self.watch_reports = threading.local()
+        self.event_shipper.reset_after_fork()
+        self.process_id = uuid.uuid4()
+        # The server keeps a watch list per process, so the parent's version means nothing
+        self.watch_list_etag = None
+        self.last_watch_list = None
+        self.poll_schedule.reset()
+        self.circuit_breaker.reset_after_fork()
+        self.self_stats.reset_after_fork()
+        self.session = self.create_session()
+        if self.agent is not None:
+            self.agent.reset_after_fork()
+        if self.spool is not None:
+            self.spool.reset_after_fork()
+        self.next_summary_at = time.monotonic() + self.summary_interval
+        self.next_stats_at = time.monotonic() + self.stats_interval
+        self.next_replay_at = time.monotonic()
+
+        if self.active:
+            self.event_shipper.start()
+            self.polling_thread = threading.Thread(target=self.rejoin_after_fork, daemon=True)
+            self.polling_thread.start()
+            self.housekeeping_thread = threading.Thread(
+                target=self.housekeeping_loop, daemon=True
+            )
+            self.housekeeping_thread.start()
+
+    def rejoin_after_fork(self) -> None:
+        """Register a forked child and confirm the watches it inherited, then poll as usual."""
+        try:
+            if self.check_connection():
+                for function_name in sorted(self.watched_functions):
+                    self.confirm_watcher(function_name)
+        except Exception as e:
+            self.logger.error(f"Error registering forked process: {e}")
+        self.polling_loop()
+
+    def stats(self) -> Dict[str, Any]:
+        """Prodwatch's own overhead and throughput, and the health of its connection.
+
+        Counters and histograms are cumulative since the manager was created.
+        """
+        return {
+            **self.self_stats.to_dict(self.event_shipper),
+            "circuit_breaker": self.circuit_breaker.stats(),
+            "spool": (
+                None
+                if self.spool is None
+                else {
+                    "pending": self.spool.pending(),
+                    "disk_usage": self.spool.disk_usage(),
+                    "evicted_records": self.spool.evicted_records,
+                }
+            ),
+        }
+
+    def report_stats(self) -> None:
+        """Queue a prodwatch-stats event with a snapshot of `stats()`."""
+        self.next_stats_at = time.monotonic() + self.stats_interval
+        self.event_shipper.enqueue(
+            {
+                "event_name": "prodwatch-stats",
+                "process_id": str(self.process_id),
+                "app_name": self.app_name,
+                "timestamp": time.time(),
+                **self.stats(),
+            }
+        )
 
     def handle_error(self, response: requests.Response, endpoint: str) -> None:
         """Handle non-200 responses by logging the error."""
         self.logger.error(f"Error from {endpoint}: Status {response.status_code}.")
 
-    def get_pending_function_names(self) -> List[str]:
-        """Get list of pending function watch requests from server."""
+    def post_event(self, payload: Dict[str, Any], endpoint: str) -> None:
+        """Send one event to the server, or to the host agent if one is configured."""
+        if self.agent is not None:
+            self.agent.send_event(payload)
+            return
+
+        response = self.session.post(
+            f"{self.base_server_url}/events",
+            json=payload,
+            allow_redirects=False,
+        )
+
+        if response.status_code != 200:
+            self.handle_error(response, endpoint)
+
+    @contextmanager
+    def batched_watch_reports(self) -> Iterator[None]:
+        """Send the watcher events reported inside the block together when it ends.
+
+        A single event is posted as it is, and several as one `event-batch`.
+        Nested blocks join the outermost one.
+        """
+        if getattr(self.watch_reports, "events", None) is not None:
+            yield
+            return
+        self.watch_reports.events = []
+        try:
+            yield
+        finally:
+            events, self.watch_reports.events = self.watch_reports.events, None
+            if len(events) == 1:
+                self.post_event(events[0], events[0]["event_name"])
+            elif events:
+                batch = {
+                    "event_name": "event-batch",
+                    "process_id": str(self.process_id),
+                    "app_name": self.app_name,
+                    "events": events,
+                }
+                self.post_event(batch, "event-batch")
+
+    def report_watcher(self, payload: Dict[str, Any], endpoint: str) -> None:
+        """Send a watcher event, or add it to the report being collected."""
+        events = getattr(self.watch_reports, "events", None)
+        if events is not None:
+            events.append(payload)
+        else:
+            self.post_event(payload, endpoint)
+
+    def get_watch_list(self) -> Tuple[List[str | Dict[str, Any]], List[str]]:
+        """Get pending watch requests and the names of watches to remove from the server.
+
+        Each watch request is either a function name, or an object with a
+        `function_name` key and per-watch options such as `sampling`. Watches to
+        remove are listed by name under `unwatch_function_names`.
+
+        Once the server has sent an ETag, the list is fetched conditionally with
+        If-None-Match, and a 304 Not Modified returns empty lists. With long
+        polling, the `wait` parameter asks the server to hold the request for up
+        to `long_poll_timeout` seconds until the list changes. Afterwards,
+        `watch_list_changed` says whether the list differs from the last one.
+        """
+        self.watch_list_changed = False
+        if self.agent is not None:
+            payload = self.agent.watch_list(self.app_name, str(self.process_id))
+            return self.read_watch_list(payload)
+
         params = {
             "process_id": str(self.process_id),
             "app_name": self.app_name
         }
+        options: Dict[str, Any] = {}
+        if self.watch_list_etag is not None:
+            options["headers"] = {"If-None-Match": self.watch_list_etag}
+        if self.poll_schedule.long_poll:
+            wait = self.poll_schedule.long_poll_timeout
+            params["wait"] = f"{wait:g}"
+            options["timeout"] = (self.timeout[0], self.timeout[1] + wait)
         response = self.session.get(
             f"{self.base_server_url}/pending-function-names", 
             params=params, 
-            allow_redirects=False
+            allow_redirects=False,
+            **options,
         )
+        if response.status_code == 304 or not self.active and self.poll_schedule.long_poll:
+            # Unchanged, or held until after the manager was stopped
+            return [], []
         if response.status_code != 200:
             self.handle_error(response, "pending-function-names")
-            return []
-        payload = response.json()
-        return cast(List[str], payload.get("function_names", []))
+            return [], []
+        etag = response.headers.get("ETag")
+        self.watch_list_etag = etag if isinstance(etag, str) else None
+        return self.read_watch_list(response.json())
+
+    def read_watch_list(
+        self, payload: Dict[str, Any]
+    ) -> Tuple[List[str | Dict[str, Any]], List[str]]:
+        self.watch_list_changed = payload != self.last_watch_list
+        self.last_watch_list = payload
+        return (
+            cast(List[str | Dict[str, Any]], payload.get("function_names", [])),
+            cast(List[str], payload.get("unwatch_function_names", [])),
+        )
+
+    def get_pending_function_names(self) -> List[str | Dict[str, Any]]:
+        """Get list of pending function watch requests from server."""
+        return self.get_watch_list()[0]
 
     def confirm_watcher(
-        self, function_name: str, finder_result: Optional[Dict[str, Any]] = None
+        self,
+        function_name: str,
+        finder_result: Optional[Dict[str, Any]] = None,
+        targets: Optional[List[str]] = None,
     ) -> None:
-        """Report successful watch request back to server."""
+        """Report successful watch request back to server.
+
+        For a pattern, `targets` lists the functions it watches.
+        """
         payload: Dict[str, Any] = {
             "event_name": "confirm-watcher",
             "function_name": function_name,
@@ -87,15 +439,10 @@ class Manager:
 
         if finder_result:
             payload["finder_result"] = finder_result
+        if targets is not None:
+            payload["targets"] = targets
 
-        response = self.session.post(
-            f"{self.base_server_url}/events",
-            json=payload,
-            allow_redirects=False,
-        )
-
-        if response.status_code != 200:
-            self.handle_error(response, "confirm-watcher")
+        self.report_watcher(payload, "confirm-watcher")
 
     def log_function_call(
         self,
@@ -104,52 +451,366 @@ class Manager:
         kwargs: Dict[str, Any],  # Can be a dict of any type
         execution_time_ms: float,
         error: Optional[str] = None,
+        sample_weight: float = 1.0,
+        cancelled: bool = False,
+        generator: Optional[Dict[str, Any]] = None,
     ) -> None:
-        """Report function call back to server."""
+        """Queue a function call event for the next batch sent to the server.
+
+        `sample_weight` is the number of calls this event stands for when the
+        watch is sampled, so the server can extrapolate call counts. `cancelled`
+        marks a coroutine that was cancelled instead of returning or raising.
+        `generator` holds the item count and timings of a generator run.
+        """
         data = {
             "event_name": "log-function-call",
             "function_name": function_name,
             "process_id": str(self.process_id),
             "app_name": self.app_name,
+            "timestamp": time.time(),
             "args": args,
             "kwargs": kwargs,
             "execution_time_ms": execution_time_ms,
             "error": error,
+            "sample_weight": sample_weight,
         }
+        if cancelled:
+            data["cancelled"] = True
+        if generator is not None:
+            data["generator"] = generator
+
+        if self.defer_argument_rendering:
+            # Snapshots from the wrappers, rendered by the flusher thread before sending
+            data["args"] = list(args)
+            data["kwargs"] = dict(kwargs)
+        else:
+            # Serialize args and kwargs to JSON strings
+            data["args"] = [str(arg) for arg in args]
+            data["kwargs"] = {k: str(v) for k, v in kwargs.items()}
+
+        # Never blocks: a full queue drops the event and counts it instead.
+        self.event_shipper.enqueue(data)
 
-        # Serialize args and kwargs to JSON strings
-        data["args"] = [str(arg) for arg in args]
-        data["kwargs"] = {k: str(v) for k, v in kwargs.items()}
+    def send_event_batch(self, events: List[Dict[str, Any]]) -> None:
+        """Send a batch of queued events to the server.
+
+        With a spool, a batch the server can't take is written to disk instead,
+        and so is every batch after it until the housekeeping thread has
+        replayed the spool, so events still arrive in order and a server that is
+        down costs one failed request per `poll_interval` instead of one per batch.
+        """
+        if self.defer_argument_rendering:
+            render_arguments(events)
+        self.charge_event_bytes(events)
+
+        if self.agent is not None:
+            # The agent always gets the compact encoding; it batches upstream itself
+            self.agent.send_batch(str(self.process_id), self.app_name, events)
+            return
+
+        payload = {
+            "event_name": "event-batch",
+            "process_id": str(self.process_id),
+            "app_name": self.app_name,
+            "events": events,
+        }
+        if self.spool is None:
+            self.deliver_batch(payload)
+            return
+
+        if self.upstream_healthy and not self.spool.pending():
+            try:
+                if self.deliver_batch(payload):
+                    return
+            except RequestException as e:
+                self.logger.error(f"Error sending event batch: {e}")
+            self.logger.warning("Prodwatch server unavailable, spooling events to disk.")
+            self.upstream_healthy = False
+        self.spool.append(payload)
+
+    def deliver_batch(self, payload: Dict[str, Any]) -> bool:
+        """POST one event-batch payload. Returns False if the server is unavailable.
+
+        With the binary wire format, a server that answers 415 Unsupported Media
+        Type is assumed not to understand it: the batch is resent as JSON, and
+        JSON is used from then on. Other errors are logged; a 5xx or 429 status
+        counts as the server being unavailable.
+        """
+        if self.wire_format == "binary":
+            response = self.session.post(
+                f"{self.base_server_url}/events",
+                data=encode_batch(payload["process_id"], payload["app_name"], payload["events"]),
+                headers={"Content-Type": CONTENT_TYPE},
+                allow_redirects=False,
+            )
+            if response.status_code != 415:
+                return self.accepted(response)
+            self.logger.info("Server does not accept binary event batches, using JSON.")
+            self.wire_format = "json"
 
         response = self.session.post(
             f"{self.base_server_url}/events",
-            json=data,
+            json=payload,
             allow_redirects=False,
         )
+        return self.accepted(response)
+
+    def accepted(self, response: requests.Response) -> bool:
         if response.status_code != 200:
-            self.handle_error(response, "log-function-call")
+            self.handle_error(response, "event-batch")
+        return response.status_code < 500 and response.status_code != 429
+
+    def replay_spool(self) -> None:
+        """Send spooled event batches oldest first, stopping at the first that fails."""
+        if self.spool is None or (self.upstream_healthy and not self.spool.pending()):
+            return
+        replayed = 0
+        while (payload := self.spool.peek()) is not None:
+            try:
+                delivered = self.deliver_batch(payload)
+            except RequestException as e:
+                self.logger.error(f"Error replaying spooled events: {e}")
+                delivered = False
+            if not delivered:
+                self.upstream_healthy = False
+                return
+            self.spool.commit()
+            replayed += 1
+        self.upstream_healthy = True
+        if replayed:
+            self.logger.info(f"Replayed {replayed} spooled event batches.")
 
-    def process_pending_watchers(self, function_names: List[str]) -> None:
-        """Process list of pending function watch requests."""
+    def charge_event_bytes(self, events: List[Dict[str, Any]]) -> None:
+        """Count the JSON size of events from watches with a max_bytes limit against it."""
+        limited = self.function_manager.byte_limited_functions()
+        if not limited:
+            return
+        for event in events:
+            function_name = event.get("function_name")
+            if function_name in limited:
+                size = len(json.dumps(event, separators=(",", ":"), default=str))
+                self.function_manager.charge_bytes(function_name, size)
+
+    def report_expired_watches(self) -> None:
+        """Report watches that removed themselves after hitting a limit."""
+        self.function_manager.expire_overdue()
+        for expired in self.function_manager.take_expired():
+            self.watched_functions.discard(expired.function_name)
+            if expired.aggregate is not None:
+                self.report_summary(expired.aggregate)
+            self.expired_watcher(expired.function_name, expired.reason.value)
+
+    def report_summaries(self) -> None:
+        """Queue one summary event per histogram-mode watch called since the last report."""
+        self.next_summary_at = time.monotonic() + self.summary_interval
+        for aggregate in list(self.function_manager.aggregates.values()):
+            self.report_summary(aggregate)
+
+    def report_summary(self, aggregate: FunctionAggregate) -> None:
+        summary = aggregate.collect()
+        if summary is None:
+            return
+        self.event_shipper.enqueue(
+            {
+                "event_name": "function-summary",
+                "process_id": str(self.process_id),
+                "app_name": self.app_name,
+                **summary,
+            }
+        )
+
+    def process_unwatch_requests(self, function_names: List[Any]) -> None:
+        """Remove watches the server no longer wants, restoring the original functions."""
         for function_name in function_names:
-            if function_name in self.watched_functions:
+            if not isinstance(function_name, str):
+                self.logger.error(f"Invalid unwatch request {function_name!r}")
+                continue
+
+            # A pattern's summaries are those of the functions in its group
+            names = [function_name, *self.function_manager.groups.get(function_name, [])]
+            aggregates = [self.function_manager.aggregates.get(name) for name in names]
+            removed = self.function_manager.unwatch_function(function_name)
+            removed = self.import_hook.cancel(function_name) or removed
+            self.watched_functions.discard(function_name)
+            for aggregate in aggregates:
+                if aggregate is not None:
+                    self.report_summary(aggregate)
+            if removed:
+                self.logger.info(f"Stopped watching {function_name}")
+            # Acknowledged even if it wasn't watched, so the server can stop asking
+            self.removed_watcher(function_name)
+
+    def process_pending_watchers(self, function_names: List[str | Dict[str, Any]]) -> None:
+        """Process list of pending function watch requests.
+
+        The new requests are resolved and applied together, and their
+        confirmations and failures are sent as one report. Glob patterns are
+        expanded into a group of watches each (see `FunctionManager.watch_pattern`).
+        """
+        requests: List[WatchRequest] = []
+        requested: set[str] = set()
+        for entry in function_names:
+            try:
+                request = WatchRequest.from_payload(entry)
+            except ValueError as e:
+                self.logger.error(f"Invalid watch request {entry!r}: {e}")
                 continue
-            success, finder_result = self.function_manager.watch_function(function_name)
+
+            function_name = request.function_name
+            if (
+                function_name in self.watched_functions
+                or function_name in requested
+                or self.import_hook.is_deferred(function_name)
+            ):
+                continue
+            requested.add(function_name)
+            requests.append(request)
+        if not requests:
+            return
+
+        patterns = [request for request in requests if is_pattern(request.function_name)]
+        requests = [request for request in requests if not is_pattern(request.function_name)]
+        outcomes = self.function_manager.watch_functions(requests) if requests else []
+        with self.batched_watch_reports():
+            for request in patterns:
+                self.process_pattern_watcher(request)
+            for request, (success, finder_result) in zip(requests, outcomes):
+                function_name = request.function_name
+                if success:
+                    self.confirm_watcher(function_name, finder_result.to_dict())
+                    self.watched_functions.add(function_name)
+                    continue
+
+                # A watch on a module that isn't imported yet waits for it; one on
+                # a loaded module names something that isn't there, and fails.
+                module_name = target_module(function_name)
+                if module_name and module_name not in sys.modules:
+                    self.import_hook.defer(module_name, request)
+                    self.deferred_watcher(function_name, module_name)
+                else:
+                    self.failed_watcher(function_name, finder_result.to_dict())
+
+    def process_pattern_watcher(self, request: WatchRequest) -> None:
+        pattern = request.function_name
+        watch = self.function_manager.watch_pattern(
+            pattern, request.options, self.max_pattern_targets
+        )
+        if watch.too_many:
+            self.failed_watcher(
+                pattern, reason=f"matches more than {self.max_pattern_targets} functions"
+            )
+        elif not watch.targets:
+            self.failed_watcher(pattern, reason="matches no functions that aren't watched")
+        else:
+            self.confirm_watcher(pattern, targets=watch.targets)
+            self.watched_functions.add(pattern)
+
+    def forget_emptied_patterns(self) -> None:
+        """Stop treating a pattern as watched once none of its targets are.
+
+        Targets leave a pattern's group when they are unwatched by name or
+        watched again on their own. Once the group is empty, the pattern is
+        expanded afresh the next time the server asks for it.
+        """
+        for function_name in list(self.watched_functions):
+            if is_pattern(function_name) and function_name not in self.function_manager.groups:
+                self.watched_functions.discard(function_name)
+
+    def apply_deferred_watches(self, module_name: str, requests: List[WatchRequest]) -> None:
+        """Watch functions in a module that was just imported.
+
+        Called by the import hook on the importing thread, so it only installs
+        the wrappers; the results are reported by the polling loop.
+        """
+        outcomes = self.function_manager.watch_functions(requests)
+        for request, (success, finder_result) in zip(requests, outcomes):
+            if success:
+                self.watched_functions.add(request.function_name)
+            with self.deferred_results_lock:
+                self.deferred_results.append((request.function_name, success, finder_result))
+
+    def report_deferred_watches(self) -> None:
+        """Confirm or report as failed the deferred watches applied since the last poll."""
+        imported = self.import_hook.take_imported()
+        if imported:
+            # Imported without going through the hook, e.g. by a legacy loader
+            self.apply_deferred_watches("", imported)
+
+        with self.deferred_results_lock:
+            results, self.deferred_results = self.deferred_results, []
+        for function_name, success, finder_result in results:
             if success:
                 self.confirm_watcher(function_name, finder_result.to_dict())
-                self.watched_functions.add(function_name)
             else:
                 self.failed_watcher(function_name, finder_result.to_dict())
 
     def polling_loop(self) -> None:
         while self.active:
+            started, cpu_started = time.perf_counter(), time.thread_time()
             try:
-                function_names = self.get_pending_function_names()
-                self.process_pending_watchers(function_names)
+                function_names, unwatch_names = self.get_watch_list()
+                with self.batched_watch_reports():
+                    self.process_unwatch_requests(unwatch_names)
+                    self.process_pending_watchers(function_names)
+                    self.report_deferred_watches()
+                self.forget_emptied_patterns()
+            except CircuitOpenError as e:
+                self.logger.debug(f"Skipped polling Prodwatch server: {e}")
             except Exception as e:
                 self.logger.error(f"Error polling Prodwatch server: {e}")
+            self.self_stats.record_poll(
+                (time.perf_counter() - started) * 1000, time.thread_time() - cpu_started
+            )
+
+            self.wait_for_next_poll(
+                self.poll_schedule.next_delay(
+                    self.watch_list_changed, time.perf_counter() - started
+                )
+            )
 
-            time.sleep(self.poll_interval)
+    def housekeeping_loop(self) -> None:
+        """Do the periodic work that mustn't wait for the next poll.
+
+        Polls can be minutes apart once they back off, or held open by the
+        server during a long poll, so expiring watches, flushing samplers,
+        sending summary and stats reports and replaying the spool run on their
+        own thread every HOUSEKEEPING_INTERVAL seconds instead.
+        """
+        while self.active:
+            cpu_started = time.thread_time()
+            try:
+                self.housekeeping()
+            except CircuitOpenError as e:
+                self.logger.debug(f"Skipped reporting to Prodwatch server: {e}")
+            except Exception as e:
+                self.logger.error(f"Error in Prodwatch housekeeping: {e}")
+            self.self_stats.record_background_cpu(time.thread_time() - cpu_started)
+            self.wait_for_next_poll(HOUSEKEEPING_INTERVAL)
+
+    def housekeeping(self) -> None:
+        self.function_manager.flush_samplers()
+        now = time.monotonic()
+        if now >= self.next_summary_at:
+            self.report_summaries()
+        if now >= self.next_stats_at:
+            self.report_stats()
+        with self.batched_watch_reports():
+            self.report_expired_watches()
+        if now >= self.next_replay_at:
+            # A server that is down is retried as often as it would have been polled
+            self.next_replay_at = now + self.poll_interval
+            self.replay_spool()
+
+    def wait_for_next_poll(self, delay: float) -> None:
+        """Sleep for `delay` seconds, waking up early if the manager is stopped."""
+        if delay <= 0:
+            return
+        deadline = time.monotonic() + delay
+        while True:
+            time.sleep(min(delay, STOP_CHECK_INTERVAL))
+            delay = deadline - time.monotonic()
+            if not self.active or delay <= 0:
+                return
 
     def check_connection(self) -> bool:
         events_url = f"{self.base_server_url}/events"
@@ -160,6 +821,15 @@ class Manager:
             "app_name": self.app_name,
             "system_info": SystemInfoSerializer.to_dict(system_info),
         }
+        if self.agent is not None:
+            agent_socket = self.agent.socket_path
+            try:
+                self.agent.send_event(payload)
+            except OSError as err:
+                self.logger.error(f"Failed to connect to prodwatch agent at {agent_socket}: {err}")
+                return False
+            self.logger.info(f"Connected to prodwatch agent at {agent_socket}")
+            return True
         try:
             response = self.session.post(
                 events_url, json=payload, allow_redirects=False
@@ -173,8 +843,46 @@ class Manager:
             self.logger.error(message)
             return False
 
+    def expired_watcher(self, function_name: str, reason: str) -> None:
+        """Report that a watch removed itself, and which limit it hit."""
+        payload: Dict[str, Any] = {
+            "event_name": "expired-watcher",
+            "function_name": function_name,
+            "reason": reason,
+            "process_id": str(self.process_id),
+            "app_name": self.app_name,
+        }
+
+        self.report_watcher(payload, "expired-watcher")
+
+    def removed_watcher(self, function_name: str) -> None:
+        """Report that a watch has been removed."""
+        payload: Dict[str, Any] = {
+            "event_name": "removed-watcher",
+            "function_name": function_name,
+            "process_id": str(self.process_id),
+            "app_name": self.app_name,
+        }
+
+        self.report_watcher(payload, "removed-watcher")
+
+    def deferred_watcher(self, function_name: str, module_name: str) -> None:
+        """Report that a watch will be applied when its module is imported."""
+        payload: Dict[str, Any] = {
+            "event_name": "deferred-watcher",
+            "function_name": function_name,
+            "module_name": module_name,
+            "process_id": str(self.process_id),
+            "app_name": self.app_name,
+        }
+
+        self.report_watcher(payload, "deferred-watcher")
+
     def failed_watcher(
-        self, function_name: str, finder_result: Optional[Dict[str, Any]] = None
+        self,
+        function_name: str,
+        finder_result: Optional[Dict[str, Any]] = None,
+        reason: Optional[str] = None,
     ) -> None:
         """Report failed watch request back to server."""
         payload: Dict[str, Any] = {
@@ -186,12 +894,7 @@ class Manager:
 
         if finder_result:
             payload["finder_result"] = finder_result
+        if reason is not None:
+            payload["reason"] = reason
 
-        response = self.session.post(
-            f"{self.base_server_url}/events",
-            json=payload,
-            allow_redirects=False,
-        )
-
-        if response.status_code != 200:
-            self.handle_error(response, "failed-watcher")
+        self.report_watcher(payload, "failed-watcher")
@@ -0,0 +1,306 @@
+"""Watching functions through sys.monitoring (PEP 669) instead of replacing them.
+
+The default instrumentation rebinds the module or class attribute to a
+wrapper, so references taken before the watch (`from mod import func`, a
+saved bound method, a callback registered at startup) keep calling the
+original. On Python 3.12+ the monitoring backend instead enables PY_START and
+PY_RETURN events on the target's code object, so every call is seen no matter
+how the caller got hold of the function. Removing the watch turns the local
+events off again, which brings the function back to full speed.
+
+Exceptions are seen through PY_UNWIND, which sys.monitoring can only enable
+for all code at once: while any function is watched this way, every frame
+that exits with an exception costs one dict lookup.
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+import inspect
+import logging
+import threading
+from enum import Enum
+from types import CodeType, FrameType
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .argument_capture import ArgumentCapture, capturers_for
+from .expiry import CallLimit
+from .sampling import Sampler
+from .self_stats import SelfStats
+from .types import LoggingCallback
+
+logger = logging.getLogger(__name__)
+
+# sys.monitoring is new in Python 3.12
+monitoring: Any = getattr(sys, "monitoring", None)
+MONITORING_AVAILABLE = monitoring is not None
+
+TOOL_NAME = "prodwatch"
+
+# Code flags of functions whose body runs across several resumptions; PY_START
+# and PY_RETURN don't bracket a single call for them, so they keep the wrappers.
+SUSPENDABLE_FLAGS = (
+    inspect.CO_GENERATOR
+    | inspect.CO_COROUTINE
+    | inspect.CO_ITERABLE_COROUTINE
+    | inspect.CO_ASYNC_GENERATOR
+)
+
+
+class Instrumentation(Enum):
+    """How watches are installed.
+
+    SETATTR replaces the attribute with a wrapper. MONITORING leaves the
+    attribute alone and uses sys.monitoring events on the function's code
+    object; it needs Python 3.12+ and falls back to SETATTR for anything it
+    can't watch.
+    """
+
+    SETATTR = "setattr"
+    MONITORING = "monitoring"
+
+
+def monitorable_code(target: Any) -> Optional[CodeType]:
+    """The code object to monitor for a resolved target, or None if it needs a wrapper."""
+    code = getattr(target, "__code__", None)
+    if not isinstance(code, CodeType) or code.co_flags & SUSPENDABLE_FLAGS:
+        return None
+    return code
+
+
+def frame_arguments(frame: FrameType) -> Tuple[List[Any], Dict[str, Any]]:
+    """The arguments of a call, read from its frame as it starts.
+
+    Positional parameters and extra positional arguments come back as args;
+    keyword-only parameters and extra keyword arguments as kwargs.
+    """
+    code = frame.f_code
+    values = frame.f_locals
+    names = code.co_varnames
+    positional = code.co_argcount
+    keyword_only = positional + code.co_kwonlyargcount
+
+    args = [values[name] for name in names[:positional] if name in values]
+    kwargs = {name: values[name] for name in names[positional:keyword_only] if name in values}
+    index = keyword_only
+    if code.co_flags & inspect.CO_VARARGS:
+        args.extend(values.get(names[index], ()))
+        index += 1
+    if code.co_flags & inspect.CO_VARKEYWORDS:
+        kwargs.update(values.get(names[index], {}))
+    return args, kwargs
+
+
+# Start time, arguments, and whether it is the last call a call limit admits
+RunningCall = Tuple[float, List[Any], Dict[str, Any], bool]
+
+
+class MonitoredCode:
+    """One watched code object and the calls currently running it, per thread."""
+
+    def __init__(
+        self,
+        function_name: str,
+        log_function_call: LoggingCallback,
+        sampler: Optional[Sampler],
+        argument_capture: ArgumentCapture,
+        call_limit: Optional[CallLimit],
+        self_stats: Optional[SelfStats] = None,
+    ) -> None:
+        self.function_name = function_name
+        self.self_stats = self_stats
+        self.log_function_call = log_function_call
+        self.sampler = sampler
+        self.call_limit = call_limit
+        self.capture_arguments = argument_capture != ArgumentCapture.NONE
+        self.capture_args, self.capture_kwargs = capturers_for(argument_capture)
+        # Stack of running calls on each thread, so recursion is timed per call.
+        # None marks a call that wasn't admitted.
+        self.local = threading.local()
+        self.on_exhausted: Optional[Callable[[], None]] = None
+        if call_limit is not None:
+            # Removing the watch turns off PY_RETURN, so the last admitted call
+            # removes it when it returns rather than when it starts.
+            self.on_exhausted = call_limit.on_exhausted
+            call_limit.on_exhausted = self.exhausted
+
+    def stack(self) -> List[Optional[RunningCall]]:
+        try:
+            stack: List[Optional[RunningCall]] = self.local.stack
+        except AttributeError:
+            stack = self.local.stack = []
+        return stack
+
+    def exhausted(self) -> None:
+        self.local.exhausting = True
+
+    def started(self, frame: FrameType) -> None:
+        stack = self.stack()
+        if (self.call_limit is not None and not self.call_limit.admit()) or (
+            self.sampler is not None and not self.sampler.admit()
+        ):
+            stack.append(None)
+            return
+        exhausting = vars(self.local).pop("exhausting", False)
+        args: List[Any] = []
+        kwargs: Dict[str, Any] = {}
+        if self.capture_arguments:
+            args, kwargs = frame_arguments(frame)
+        stack.append((time.perf_counter(), args, kwargs, exhausting))
+
+    def finished(self, error: Optional[BaseException]) -> None:
+        end_time = time.perf_counter()
+        stack = self.stack()
+        if not stack:
+            # The watch was applied while this call was already running
+            return
+        call = stack.pop()
+        if call is None:
+            return
+        start_time, args, kwargs, exhausting = call
+        try:
+            self.report(start_time, end_time, args, kwargs, error)
+        finally:
+            if exhausting and self.on_exhausted is not None:
+                self.on_exhausted()
+
+    def report(
+        self,
+        start_time: float,
+        end_time: float,
+        args: List[Any],
+        kwargs: Dict[str, Any],
+        error: Optional[BaseException],
+    ) -> None:
+        execution_time_ms = (end_time - start_time) * 1000
+        try:
+            serializable_args = self.capture_args(args)
+            serializable_kwargs = self.capture_kwargs(kwargs)
+            serialized = time.perf_counter()
+            if self.sampler is None:
+                self.log_function_call(
+                    self.function_name,
+                    serializable_args,
+                    serializable_kwargs,
+                    execution_time_ms=execution_time_ms,
+                    error=str(error) if error else None,
+                )
+            else:
+                self.sampler.emit(
+                    self.log_function_call,
+                    self.function_name,
+                    serializable_args,
+                    serializable_kwargs,
+                    execution_time_ms,
+                    str(error) if error else None,
+                )
+            if self.self_stats is not None:
+                self.self_stats.record_capture(end_time, serialized)
+        except Exception as e:
+            logger.error(f"Error logging monitored call: {e}")
+
+
+class MonitoringBackend:
+    """Installs watches as sys.monitoring events on code objects.
+
+    Claims a free sys.monitoring tool id the first time a code object is
+    watched, and releases it when the last watch is removed.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.watched: Dict[CodeType, MonitoredCode] = {}
+        self.tool_id: Optional[int] = None
+
+    @property
+    def available(self) -> bool:
+        return MONITORING_AVAILABLE
+
+    def reset_after_fork(self) -> None:
+        # Enabled events are part of the interpreter state, so a forked child keeps them
+        self.lock = threading.Lock()
+
+    def acquire_tool_id(self) -> Optional[int]:
+        # Ids between the profiler and the optimizer aren't reserved for any kind of tool
+        for tool_id in range(monitoring.PROFILER_ID + 1, monitoring.OPTIMIZER_ID):
+            if monitoring.get_tool(tool_id) is None:
+                monitoring.use_tool_id(tool_id, TOOL_NAME)
+                events = monitoring.events
+                monitoring.register_callback(tool_id, events.PY_START, self.on_start)
+                monitoring.register_callback(tool_id, events.PY_RETURN, self.on_return)
+                monitoring.register_callback(tool_id, events.PY_UNWIND, self.on_unwind)
+                monitoring.set_events(tool_id, events.PY_UNWIND)
+                return tool_id
+        return None
+
+    def release_tool_id(self) -> None:
+        if self.tool_id is None:
+            return
+        monitoring.set_events(self.tool_id, 0)
+        events = monitoring.events
+        for event in (events.PY_START, events.PY_RETURN, events.PY_UNWIND):
+            monitoring.register_callback(self.tool_id, event, None)
+        monitoring.free_tool_id(self.tool_id)
+        self.tool_id = None
+
+    def watch(
+        self,
+        code: CodeType,
+        function_name: str,
+        log_function_call: LoggingCallback,
+        sampler: Optional[Sampler] = None,
+        argument_capture: ArgumentCapture = ArgumentCapture.EAGER,
+        call_limit: Optional[CallLimit] = None,
+        self_stats: Optional[SelfStats] = None,
+    ) -> bool:
+        """Start reporting calls to `code`. Returns False if no tool id is free."""
+        if not self.available:
+            return False
+        with self.lock:
+            if self.tool_id is None:
+                self.tool_id = self.acquire_tool_id()
+                if self.tool_id is None:
+                    logger.warning("No free sys.monitoring tool id; using wrappers instead")
+                    return False
+            self.watched[code] = MonitoredCode(
+                function_name, log_function_call, sampler, argument_capture, call_limit, self_stats
+            )
+            events = monitoring.events
+            monitoring.set_local_events(self.tool_id, code, events.PY_START | events.PY_RETURN)
+            # A call that raced an earlier unwatch may have returned DISABLE for this code,
+            # which set_local_events doesn't undo
+            monitoring.restart_events()
+        return True
+
+    def unwatch(self, code: CodeType) -> None:
+        with self.lock:
+            if self.watched.pop(code, None) is None or self.tool_id is None:
+                return
+            monitoring.set_local_events(self.tool_id, code, 0)
+            if not self.watched:
+                self.release_tool_id()
+
+    def is_watching(self, code: CodeType) -> bool:
+        return code in self.watched
+
+    def on_start(self, code: CodeType, instruction_offset: int) -> Any:
+        monitored = self.watched.get(code)
+        if monitored is None:
+            return monitoring.DISABLE
+        # The callback's caller is the frame that just started
+        monitored.started(sys._getframe(1))
+        return None
+
+    def on_return(self, code: CodeType, instruction_offset: int, retval: object) -> Any:
+        monitored = self.watched.get(code)
+        if monitored is None:
+            return monitoring.DISABLE
+        monitored.finished(None)
+        return None
+
+    def on_unwind(self, code: CodeType, instruction_offset: int, exception: BaseException) -> None:
+        monitored = self.watched.get(code)
+        if monitored is not None:
+            monitored.finished(exception if isinstance(exception, Exception) else None)
+
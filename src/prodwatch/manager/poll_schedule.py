@@ -0,0 +1,45 @@
+from typing import Optional
+
+
+class PollSchedule:
+    """Decides how long the polling loop waits before asking for the watch list again.
+
+    Polls that find nothing new double the interval, from `interval` up to
+    `max_interval`, and a poll that finds a change brings it straight back
+    down. With long polling the server holds each request until the list
+    changes or `long_poll_timeout` runs out, so the next poll is made right
+    away; a server that answers a long poll sooner than `interval` without a
+    change evidently doesn't hold requests, and is polled on the normal
+    schedule instead.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        max_interval: Optional[float] = None,
+        long_poll_timeout: float = 0.0,
+    ) -> None:
+        if max_interval is not None and max_interval < interval:
+            raise ValueError("max_poll_interval must be at least poll_interval")
+        self.interval = interval
+        self.max_interval = interval if max_interval is None else max_interval
+        self.long_poll_timeout = long_poll_timeout
+        self.current = interval
+
+    @property
+    def long_poll(self) -> bool:
+        return self.long_poll_timeout > 0
+
+    def reset(self) -> None:
+        self.current = self.interval
+
+    def next_delay(self, changed: bool, elapsed: float) -> float:
+        """Seconds to wait after a poll that took `elapsed` seconds."""
+        if changed:
+            self.current = self.interval
+            return 0.0 if self.long_poll else self.interval
+        if self.long_poll and elapsed >= self.interval:
+            return 0.0
+        delay = self.current
+        self.current = min(self.current * 2, self.max_interval)
+        return delay
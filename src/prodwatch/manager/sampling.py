@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import random
+import itertools
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .types import LoggingCallback
+
+
+def number(data: Dict[str, Any], key: str, kind: Callable[[Any], Any], default: Any) -> Any:
+    value = data.get(key, default)
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Sampling {key} must be a number, got {value!r}") from None
+
+
+class SamplingMode(Enum):
+    FIXED = "fixed"
+    PROBABILISTIC = "probabilistic"
+    RESERVOIR = "reservoir"
+
+
+@dataclass(frozen=True)
+class SamplingPolicy:
+    """How often a watched function's calls are reported, as configured by the server.
+
+    - fixed: report every `rate`-th call.
+    - probabilistic: report each call with `probability`.
+    - reservoir: report a uniform sample of at most `size` calls per `interval` seconds.
+    """
+
+    mode: SamplingMode
+    rate: int = 1
+    probability: float = 1.0
+    size: int = 10
+    interval: float = 60.0
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SamplingPolicy":
+        """Parse a sampling policy sent by the server. Raises ValueError if it is invalid."""
+        if not isinstance(data, dict):
+            raise ValueError(f"Sampling policy must be an object, got {data!r}")
+        try:
+            mode = SamplingMode(data.get("mode"))
+        except ValueError:
+            raise ValueError(f"Unknown sampling mode: {data.get('mode')!r}") from None
+
+        policy = cls(
+            mode=mode,
+            rate=number(data, "rate", int, 1),
+            probability=number(data, "probability", float, 1.0),
+            size=number(data, "size", int, 10),
+            interval=number(data, "interval", float, 60.0),
+        )
+        if policy.rate < 1:
+            raise ValueError("Sampling rate must be at least 1")
+        if not 0 < policy.probability <= 1:
+            raise ValueError("Sampling probability must be in (0, 1]")
+        if policy.size < 1:
+            raise ValueError("Reservoir size must be at least 1")
+        if policy.interval <= 0:
+            raise ValueError("Reservoir interval must be positive")
+        return policy
+
+    def create_sampler(self) -> "Sampler":
+        match self.mode:
+            case SamplingMode.FIXED:
+                return FixedRateSampler(self.rate)
+            case SamplingMode.PROBABILISTIC:
+                return ProbabilisticSampler(self.probability)
+            case SamplingMode.RESERVOIR:
+                return ReservoirSampler(self.size, self.interval)
+
+
+class Sampler(ABC):
+    """Decides which calls of one watched function are reported.
+
+    Wrappers call `admit` before doing any work for a call; only admitted calls
+    are timed and handed to `emit`, which reports them with their sampling weight.
+    Extra `details` of a call, such as `cancelled`, are passed on to
+    `log_function_call` unchanged.
+    """
+
+    @abstractmethod
+    def admit(self) -> bool:
+        """Whether to time and report the call about to start."""
+
+    @abstractmethod
+    def emit(
+        self,
+        log_function_call: LoggingCallback,
+        function_name: str,
+        args: List[Any],
+        kwargs: Dict[str, Any],
+        execution_time_ms: float,
+        error: Optional[str],
+        **details: Any,
+    ) -> None:
+        """Report an admitted call, now or when the sampler's interval ends."""
+
+    def flush(self, force: bool = False) -> None:
+        """Report anything held back for the current interval, if it is over or `force` is set."""
+
+    def reset_after_fork(self) -> None:
+        """In a forked child, forget calls held back by the parent."""
+
+
+class WeightedSampler(Sampler):
+    """A sampler that reports admitted calls straight away with a fixed weight."""
+
+    weight: float = 1.0
+
+    def emit(
+        self,
+        log_function_call: LoggingCallback,
+        function_name: str,
+        args: List[Any],
+        kwargs: Dict[str, Any],
+        execution_time_ms: float,
+        error: Optional[str],
+        **details: Any,
+    ) -> None:
+        log_function_call(
+            function_name,
+            args,
+            kwargs,
+            execution_time_ms=execution_time_ms,
+            error=error,
+            sample_weight=self.weight,
+            **details,
+        )
+
+
+class FixedRateSampler(WeightedSampler):
+    """Admits the first call and every `rate`-th call after it."""
+
+    def __init__(self, rate: int) -> None:
+        self.rate = rate
+        self.weight = float(rate)
+        # next() on itertools.count is atomic, so no lock is needed
+        self.counter = itertools.count()
+
+    def admit(self) -> bool:
+        return next(self.counter) % self.rate == 0
+
+
+class ProbabilisticSampler(WeightedSampler):
+    """Admits each call independently with the given probability."""
+
+    def __init__(self, probability: float) -> None:
+        self.probability = probability
+        self.weight = 1.0 / probability
+        self.random = random.random
+
+    def admit(self) -> bool:
+        return self.random() < self.probability
+
+
+PendingCall = Tuple[
+    LoggingCallback, str, List[Any], Dict[str, Any], float, Optional[str], Dict[str, Any]
+]
+
+
+class ReservoirSampler(Sampler):
+    """Keeps a uniform random sample of at most `size` calls per interval.
+
+    Admission uses Algorithm R: the i-th call of an interval is admitted with
+    probability size/i, so most calls are rejected before any work is done once
+    the reservoir has filled. Admitted calls replace a random held call. When the
+    interval ends the held calls are reported, each weighted by calls seen / calls held.
+    """
+
+    def __init__(self, size: int, interval: float) -> None:
+        self.size = size
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.reservoir: List[PendingCall] = []
+        self.seen = 0
+        self.interval_end = time.monotonic() + interval
+
+    def admit(self) -> bool:
+        if time.monotonic() >= self.interval_end:
+            self.flush()
+        with self.lock:
+            self.seen += 1
+            seen = self.seen
+        return seen <= self.size or random.random() * seen < self.size
+
+    def reset_after_fork(self) -> None:
+        # The lock may have been held by a thread that doesn't exist in the child
+        self.lock = threading.Lock()
+        self.reservoir, self.seen = [], 0
+        self.interval_end = time.monotonic() + self.interval
+
+    def emit(
+        self,
+        log_function_call: LoggingCallback,
+        function_name: str,
+        args: List[Any],
+        kwargs: Dict[str, Any],
+        execution_time_ms: float,
+        error: Optional[str],
+        **details: Any,
+    ) -> None:
+        call = (log_function_call, function_name, args, kwargs, execution_time_ms, error, details)
+        with self.lock:
+            if len(self.reservoir) < self.size:
+                self.reservoir.append(call)
+            else:
+                self.reservoir[random.randrange(self.size)] = call
+
+    def flush(self, force: bool = False) -> None:
+        with self.lock:
+            now = time.monotonic()
+            if now < self.interval_end and not force:
+                return
+            reservoir, seen = self.reservoir, self.seen
+            self.reservoir, self.seen = [], 0
+            self.interval_end = now + self.interval
+
+        if not reservoir:
+            return
+        weight = max(seen, len(reservoir)) / len(reservoir)
+        # Plain callbacks without a sample_weight parameter work when nothing was dropped
+        weighted: Dict[str, Any] = {"sample_weight": weight} if weight != 1.0 else {}
+        for log_function_call, function_name, args, kwargs, execution_time_ms, error, details in (
+            reservoir
+        ):
+            log_function_call(
+                function_name,
+                args,
+                kwargs,
+                execution_time_ms=execution_time_ms,
+                error=error,
+                **weighted,
+                **details,
+            )
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import time
+import threading
+from typing import Any, Dict, List, Optional
+
+from .aggregation import SUMMARY_QUANTILES
+from .event_shipper import EventShipper
+from .histogram import LatencyHistogram
+
+
+# Calls in application threads recorded in the overhead histograms: one in this many
+SAMPLE_EVERY = 16
+
+
+def overhead_histogram() -> LatencyHistogram:
+    # Microseconds, from 10ns to 10s
+    return LatencyHistogram(min_value=0.01, max_value=10_000_000.0)
+
+
+def summarize(histogram: LatencyHistogram) -> Dict[str, Any]:
+    return {
+        **{name: histogram.quantile(q) for name, q in SUMMARY_QUANTILES.items()},
+        "histogram": histogram.to_dict(),
+    }
+
+
+class CaptureStats:
+    """Per-thread counters for the work done in application threads.
+
+    Written only by its own thread, so recording a call takes no lock. Every
+    call is counted and its overhead added to `overhead_seconds`; only one in
+    SAMPLE_EVERY is recorded in the histograms.
+    """
+
+    __slots__ = ("captured", "overhead_seconds", "overhead_us", "serialization_us", "owner")
+
+    def __init__(self, owner: Optional[threading.Thread] = None) -> None:
+        self.captured = 0
+        self.overhead_seconds = 0.0
+        self.overhead_us = overhead_histogram()
+        self.serialization_us = overhead_histogram()
+        self.owner = owner
+
+    def merge(self, other: CaptureStats) -> None:
+        self.captured += other.captured
+        self.overhead_seconds += other.overhead_seconds
+        self.overhead_us.merge(other.overhead_us)
+        self.serialization_us.merge(other.serialization_us)
+
+
+class EndpointStats:
+    __slots__ = ("requests", "errors", "latency_ms")
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.errors = 0
+        self.latency_ms = LatencyHistogram()
+
+
+class SelfStats:
+    """Live counters and histograms of prodwatch's own behavior.
+
+    Everything is cumulative since the manager was created (or since fork in a
+    child), so readers can take differences between two snapshots. Per-call
+    costs in application threads go to a per-thread `CaptureStats`; the rarer
+    background work (HTTP requests, polling) is recorded under a lock.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.monotonic()
+        self.local = threading.local()
+        self.captures: List[CaptureStats] = []
+        # Counters of threads that have exited, folded together
+        self.retired = CaptureStats()
+        self.lock = threading.Lock()
+        self.endpoints: Dict[str, EndpointStats] = {}
+        self.polling_ms = LatencyHistogram()
+        # CPU seconds spent in prodwatch's own background threads
+        self.background_cpu = 0.0
+
+    def reset_after_fork(self) -> None:
+        """In a forked child, start counting from zero; the parent reports its own."""
+        self.started = time.monotonic()
+        self.local = threading.local()
+        self.captures = []
+        self.retired = CaptureStats()
+        self.lock = threading.Lock()
+        self.endpoints = {}
+        self.polling_ms = LatencyHistogram()
+        self.background_cpu = 0.0
+
+    def capture_stats(self) -> CaptureStats:
+        """The calling thread's counters, created on first use."""
+        try:
+            stats: CaptureStats = self.local.stats
+            return stats
+        except AttributeError:
+            stats = CaptureStats(owner=threading.current_thread())
+            with self.lock:
+                # A new thread may well mean others have exited, as with a thread per request
+                self.prune()
+                self.captures.append(stats)
+            self.local.stats = stats
+            return stats
+
+    def record_capture(self, started: float, serialized: float) -> None:
+        """Count one call a wrapper reported from an application thread.
+
+        `started` is when the wrapper began capturing the call's arguments and
+        `serialized` when it had finished; the overhead runs until now, so it
+        covers handing the event to the manager or sampler as well.
+        """
+        finished = time.perf_counter()
+        stats = self.capture_stats()
+        # Only every SAMPLE_EVERY-th call goes into the histograms, which cost more to record
+        if not stats.captured % SAMPLE_EVERY:
+            stats.serialization_us.record((serialized - started) * 1_000_000)
+            stats.overhead_us.record((finished - started) * 1_000_000)
+        stats.captured += 1
+        stats.overhead_seconds += finished - started
+
+    def prune(self) -> None:
+        """Fold the counters of threads that have exited into `retired`. Call with the lock held."""
+        live = []
+        for stats in self.captures:
+            if stats.owner is not None and not stats.owner.is_alive():
+                self.retired.merge(stats)
+            else:
+                live.append(stats)
+        self.captures = live
+
+    def record_request(self, endpoint: str, latency_ms: float, failed: bool) -> None:
+        with self.lock:
+            stats = self.endpoints.get(endpoint)
+            if stats is None:
+                stats = self.endpoints[endpoint] = EndpointStats()
+            stats.requests += 1
+            if failed:
+                stats.errors += 1
+            stats.latency_ms.record(latency_ms)
+
+    def record_poll(self, duration_ms: float, cpu_seconds: float) -> None:
+        with self.lock:
+            self.polling_ms.record(duration_ms)
+            self.background_cpu += cpu_seconds
+
+    def record_background_cpu(self, cpu_seconds: float) -> None:
+        """Count CPU time a background thread other than the poller and shipper spent."""
+        with self.lock:
+            self.background_cpu += cpu_seconds
+
+    def to_dict(self, shipper: EventShipper) -> Dict[str, Any]:
+        """A snapshot of the stats, including the event shipper's counters."""
+        totals = CaptureStats()
+        with self.lock:
+            self.prune()
+            totals.merge(self.retired)
+            captures = list(self.captures)
+            endpoints = {
+                endpoint: {
+                    "requests": stats.requests,
+                    "errors": stats.errors,
+                    "latency_ms": summarize(stats.latency_ms),
+                }
+                for endpoint, stats in self.endpoints.items()
+            }
+            polling_ms = summarize(self.polling_ms)
+            background_cpu = self.background_cpu + shipper.cpu_time
+        for capture in captures:
+            totals.merge(capture)
+
+        # Time in application threads is wall time, which bounds their CPU time
+        prodwatch_cpu = totals.overhead_seconds + background_cpu
+        process_cpu = time.process_time()
+        return {
+            "uptime_s": time.monotonic() - self.started,
+            "events": {
+                "captured": totals.captured,
+                "shipped": shipper.shipped_events,
+                "dropped": shipper.dropped_events,
+                "pending": shipper.pending(),
+                "buffer_high_water": shipper.high_water,
+            },
+            "capture_overhead_us": {
+                "total": totals.overhead_seconds * 1_000_000,
+                **summarize(totals.overhead_us),
+            },
+            "serialization_us": summarize(totals.serialization_us),
+            "http": endpoints,
+            "polling_loop_ms": polling_ms,
+            "cpu": {
+                "process_s": process_cpu,
+                "prodwatch_s": prodwatch_cpu,
+                "prodwatch_fraction": prodwatch_cpu / process_cpu if process_cpu else 0.0,
+            },
+        }
+
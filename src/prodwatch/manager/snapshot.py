@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import array
+import collections
+import datetime
+import decimal
+import fractions
+import itertools
+import pathlib
+import uuid
+from types import BuiltinFunctionType, FunctionType, MethodType, ModuleType
+from typing import Any, Callable, Dict, List, Sequence, Set, Tuple
+
+from .summarizer import (
+    MAX_ITEMS,
+    SCALAR_TYPES,
+    Snapshot,
+    is_ndarray_like,
+    register_formatter,
+    render_mapping,
+    render_sequence,
+    summarize,
+)
+
+# Immutable built-in types, kept by reference and rendered later exactly as they
+# were. Only these exact types: a subclass can override __str__, which must not
+# run on the flusher thread, so subclasses (including every Enum) are rendered
+# when they are captured.
+IMMUTABLE_TYPES = frozenset(
+    (
+        str,
+        bytes,
+        int,
+        float,
+        complex,
+        bool,
+        type(None),
+        decimal.Decimal,
+        fractions.Fraction,
+        uuid.UUID,
+        datetime.date,
+        datetime.datetime,
+        datetime.time,
+        datetime.timedelta,
+        datetime.timezone,
+        pathlib.PurePosixPath,
+        pathlib.PureWindowsPath,
+        pathlib.PosixPath,
+        pathlib.WindowsPath,
+        range,
+    )
+)
+
+# Read only by name when rendered, so also kept by reference
+NAMED_TYPES = (type, ModuleType, FunctionType, BuiltinFunctionType, MethodType)
+
+# Buffers whose contents can change or that pin memory. Their shape, type and size
+# are cheap to read, so they are described immediately and never retained.
+BUFFER_TYPES = (bytearray, memoryview, array.array)
+
+SEQUENCE_TYPES = (list, tuple, set, frozenset, collections.deque)
+
+# Snapshots of nested containers keep only their type and length
+MAX_SNAPSHOT_DEPTH = 1
+
+
+class OpaqueSnapshot(Snapshot):
+    """Any object that is not safe to render later: kept as its type name and address."""
+
+    __slots__ = ("name", "address")
+
+    def __init__(self, value: Any) -> None:
+        self.name = type(value).__name__
+        self.address = id(value)
+
+    @property
+    def type_name(self) -> str:
+        return self.name
+
+
+class SequenceSnapshot(Snapshot):
+    """A shallow copy of a sequence or set's first items, plus its type and length."""
+
+    __slots__ = ("container_type", "length", "head")
+
+    def __init__(self, container_type: type, length: int, head: List[Any]) -> None:
+        self.container_type = container_type
+        self.length = length
+        self.head = head
+
+    @property
+    def type_name(self) -> str:
+        return self.container_type.__name__
+
+
+class MappingSnapshot(Snapshot):
+    """A shallow copy of a mapping's first items, plus its type and length."""
+
+    __slots__ = ("container_type", "length", "items")
+
+    def __init__(self, container_type: type, length: int, items: List[Tuple[Any, Any]]) -> None:
+        self.container_type = container_type
+        self.length = length
+        self.items = items
+
+    @property
+    def type_name(self) -> str:
+        return self.container_type.__name__
+
+
+def capture_sequence(value: Any, depth: int) -> Any:
+    if depth >= MAX_SNAPSHOT_DEPTH:
+        return SequenceSnapshot(type(value), len(value), [])
+    head = [capture(item, depth + 1) for item in itertools.islice(value, MAX_ITEMS)]
+    return SequenceSnapshot(type(value), len(value), head)
+
+
+def capture_mapping(value: Any, depth: int) -> Any:
+    if depth >= MAX_SNAPSHOT_DEPTH:
+        return MappingSnapshot(type(value), len(value), [])
+    items = [
+        (capture(key, depth + 1), capture(item, depth + 1))
+        for key, item in itertools.islice(value.items(), MAX_ITEMS)
+    ]
+    return MappingSnapshot(type(value), len(value), items)
+
+
+def capture_by_reference(value: Any, depth: int) -> Any:
+    return value
+
+
+def capture_description(value: Any, depth: int) -> Any:
+    return summarize(value)
+
+
+def capture_opaque(value: Any, depth: int) -> Any:
+    return OpaqueSnapshot(value)
+
+
+Capturer = Callable[[Any, int], Any]
+
+
+def resolve_capturer(cls: type) -> Capturer:
+    """Pick how values of a type are captured. Called once per type; the result is cached."""
+    if cls in IMMUTABLE_TYPES or issubclass(cls, NAMED_TYPES):
+        return capture_by_reference
+    if issubclass(cls, SCALAR_TYPES + (str, bytes)):
+        # Subclasses of the immutable types, such as Enums and IntFlags
+        return capture_description
+    if issubclass(cls, BUFFER_TYPES) or is_ndarray_like(cls):
+        return capture_description
+    if cls is dict or cls is collections.OrderedDict or cls is collections.defaultdict:
+        return capture_mapping
+    if cls in SEQUENCE_TYPES:
+        return capture_sequence
+    return capture_opaque
+
+
+CAPTURER_CACHE_SIZE = 1024
+capturer_cache: Dict[type, Capturer] = {}
+
+
+def capture(value: Any, depth: int = 0) -> Any:
+    """Capture a value cheaply so it can be rendered later on another thread.
+
+    The result is rendered by `summarize` exactly as the value would have been
+    at capture time, within these guarantees:
+
+    - Immutable values of the exact built-in types (str, bytes, numbers, None,
+      bool, Decimal, Fraction, UUID, date/time types, paths, ranges) are kept by
+      reference. Subclasses of them, Enum members included, are summarized
+      immediately, since their __str__ may be user code.
+    - Classes, modules and functions are kept by reference; only their names are
+      read when rendering.
+    - bytearray, memoryview, array.array and NumPy-style arrays are described
+      (shape, type, size) immediately and never retained.
+    - Built-in lists, tuples, sets, deques and dicts are shallow-copied: their
+      length and first few items, each captured by these same rules. Containers
+      nested inside them keep only their type and length.
+    - Anything else, including objects with a custom __repr__ and subclasses of
+      the built-in containers, is kept as its type name and address only, since
+      rendering it later could run user code concurrently with the application.
+    """
+    cls = type(value)
+    capturer = capturer_cache.get(cls)
+    if capturer is None:
+        capturer = resolve_capturer(cls)
+        if len(capturer_cache) >= CAPTURER_CACHE_SIZE:
+            capturer_cache.clear()
+        capturer_cache[cls] = capturer
+    try:
+        return capturer(value, depth)
+    except Exception:
+        # e.g. a dict resized by another thread while its items were copied
+        return OpaqueSnapshot(value)
+
+
+def capture_args(args: Sequence[Any]) -> List[Any]:
+    return [capture(arg) for arg in args]
+
+
+def capture_kwargs(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: capture(value) for key, value in kwargs.items()}
+
+
+def render_arguments(events: List[Dict[str, Any]]) -> None:
+    """Replace the captured args and kwargs of log-function-call events with their summaries."""
+    for event in events:
+        if event.get("event_name") != "log-function-call":
+            continue
+        event["args"] = [summarize(arg) for arg in event.get("args", [])]
+        event["kwargs"] = {key: summarize(value) for key, value in event.get("kwargs", {}).items()}
+
+
+def format_opaque(value: OpaqueSnapshot, budget: int, depth: int, seen: Set[int]) -> str:
+    return f"<{value.name} object at {hex(value.address)}>"
+
+
+def format_sequence_snapshot(
+    value: SequenceSnapshot, budget: int, depth: int, seen: Set[int]
+) -> str:
+    if value.length and not value.head:
+        return f"<{value.container_type.__name__} len={value.length}>"
+    return render_sequence(value.container_type, value.length, value.head, budget, depth, seen)
+
+
+def format_mapping_snapshot(
+    value: MappingSnapshot, budget: int, depth: int, seen: Set[int]
+) -> str:
+    if value.length and not value.items:
+        return f"<{value.container_type.__name__} len={value.length}>"
+    return render_mapping(value.container_type, value.length, value.items, budget, depth, seen)
+
+
+register_formatter(OpaqueSnapshot, format_opaque)
+register_formatter(SequenceSnapshot, format_sequence_snapshot)
+register_formatter(MappingSnapshot, format_mapping_snapshot)
@@ -0,0 +1,296 @@
+"""Disk spool for event batches that couldn't be sent.
+
+A spool is a directory of memory-mapped segment files, written append-only
+and replayed oldest first:
+
+    segment  magic b"PWSP", uint64 read offset (big-endian)
+             records, each a uint32 length followed by that many bytes of
+             UTF-8 JSON; a zero length or the end of the file ends the segment
+
+Segments are preallocated to `segment_size` bytes, so the spool's disk usage
+is the number of segments times their size. A record's payload is written
+before its length, so a process that dies mid-write leaves the record out
+rather than half in. The read offset is advanced in place as records are
+replayed, and a segment is deleted once it has been replayed and is no longer
+being written to. When a new segment would take the spool past `max_bytes`,
+the oldest segments are evicted first.
+
+Several processes can spool under the same root directory: each one claims
+the first numbered slot directory that no live process holds a lock on. A
+process that restarts, or any other process of the app, picks up what a dead
+one left behind in its slot.
+"""
+
+from __future__ import annotations
+
+import os
+import json
+import mmap
+import struct
+import logging
+import threading
+from typing import IO, Any, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    # Windows has no flock, which slots are claimed with
+    fcntl = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+# Spooling needs fcntl.flock to tell which slots a live process holds
+SPOOL_AVAILABLE = fcntl is not None
+
+MAGIC = b"PWSP"
+SEGMENT_HEADER = struct.Struct(">4sQ")
+RECORD_LENGTH = struct.Struct(">I")
+SEGMENT_SUFFIX = ".seg"
+LOCK_FILE = "lock"
+
+DEFAULT_SEGMENT_SIZE = 1 << 20
+DEFAULT_MAX_BYTES = 64 << 20
+
+Record = Dict[str, Any]
+
+
+class Segment:
+    """One preallocated, memory-mapped segment file."""
+
+    def __init__(self, path: str, size: Optional[int] = None) -> None:
+        self.path = path
+        self.file: IO[bytes] = open(path, "r+b" if size is None else "w+b")
+        try:
+            if size is not None:
+                self.file.truncate(size)
+            self.map = mmap.mmap(self.file.fileno(), 0)
+        except (OSError, ValueError):
+            self.file.close()
+            raise
+        if size is not None:
+            SEGMENT_HEADER.pack_into(self.map, 0, MAGIC, SEGMENT_HEADER.size)
+        if len(self.map) < SEGMENT_HEADER.size:
+            self.close()
+            raise ValueError(f"Not a spool segment: {path}")
+        magic, self.read_offset = SEGMENT_HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or not SEGMENT_HEADER.size <= self.read_offset <= len(self.map):
+            self.close()
+            raise ValueError(f"Not a spool segment: {path}")
+
+        # Find where writing left off and how many records are still to be replayed
+        self.records = 0
+        offset = self.read_offset
+        while (length := self.length_at(offset)) is not None:
+            offset += RECORD_LENGTH.size + length
+            self.records += 1
+        self.write_offset = offset
+
+    @property
+    def size(self) -> int:
+        return len(self.map)
+
+    def length_at(self, offset: int) -> Optional[int]:
+        """Length of the record at `offset`, or None if the segment ends there."""
+        if offset + RECORD_LENGTH.size > self.size:
+            return None
+        (length,) = RECORD_LENGTH.unpack_from(self.map, offset)
+        if not length or offset + RECORD_LENGTH.size + length > self.size:
+            return None
+        return int(length)
+
+    def append(self, data: bytes) -> bool:
+        """Write a record. Returns False if the segment has no room for it."""
+        offset = self.write_offset
+        end = offset + RECORD_LENGTH.size + len(data)
+        if end > self.size:
+            return False
+        self.map[offset + RECORD_LENGTH.size : end] = data
+        RECORD_LENGTH.pack_into(self.map, offset, len(data))
+        self.write_offset = end
+        self.records += 1
+        return True
+
+    def peek(self) -> Optional[bytes]:
+        length = self.length_at(self.read_offset)
+        if length is None:
+            return None
+        start = self.read_offset + RECORD_LENGTH.size
+        return self.map[start : start + length]
+
+    def commit(self) -> None:
+        """Mark the record returned by `peek` as replayed."""
+        length = self.length_at(self.read_offset)
+        if length is None:
+            return
+        self.read_offset += RECORD_LENGTH.size + length
+        SEGMENT_HEADER.pack_into(self.map, 0, MAGIC, self.read_offset)
+        self.records -= 1
+
+    def close(self) -> None:
+        try:
+            self.map.close()
+        finally:
+            self.file.close()
+
+    def delete(self) -> None:
+        self.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class DiskSpool:
+    """Append-only spool of records on disk, replayed in the order they were written.
+
+    Records are JSON-serializable dicts. `append` writes one, `peek` returns the
+    oldest one not yet replayed and `commit` marks it replayed. Thread-safe.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        segment_size: int = DEFAULT_SEGMENT_SIZE,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        if segment_size <= SEGMENT_HEADER.size + RECORD_LENGTH.size:
+            raise ValueError("segment_size is too small to hold a record")
+        if max_bytes < segment_size:
+            raise ValueError("max_bytes must be at least segment_size")
+
+        self.root = root
+        self.segment_size = segment_size
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.evicted_records = 0
+        self.directory = ""
+        self.lock_file: Optional[IO[bytes]] = None
+        self.segments: List[Segment] = []
+        self.next_sequence = 0
+        self.open()
+
+    def open(self) -> None:
+        self.directory, self.lock_file = claim_slot(self.root)
+        names = sorted(
+            name for name in os.listdir(self.directory) if name.endswith(SEGMENT_SUFFIX)
+        )
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                sequence = int(name[: -len(SEGMENT_SUFFIX)])
+                segment = Segment(path)
+            except (OSError, ValueError) as e:
+                logger.error(f"Discarding unreadable spool segment {path}: {e}")
+                os.unlink(path)
+                continue
+            self.segments.append(segment)
+            self.next_sequence = sequence + 1
+        self.discard_replayed()
+        if self.pending():
+            logger.info(f"Found {self.pending()} spooled event batches in {self.directory}")
+
+    def close(self) -> None:
+        with self.lock:
+            for segment in self.segments:
+                segment.close()
+            self.segments = []
+            if self.lock_file is not None:
+                self.lock_file.close()
+                self.lock_file = None
+
+    def reset_after_fork(self) -> None:
+        """In a forked child, let go of the parent's slot and claim one of its own.
+
+        The lock on the parent's slot is shared with the child through the
+        inherited file, so the child's claim skips it.
+        """
+        self.lock = threading.Lock()
+        for segment in self.segments:
+            segment.close()
+        self.segments = []
+        if self.lock_file is not None:
+            self.lock_file.close()
+        self.next_sequence = 0
+        self.open()
+
+    def pending(self) -> int:
+        """Number of records not yet replayed."""
+        return sum(segment.records for segment in self.segments)
+
+    def disk_usage(self) -> int:
+        return sum(segment.size for segment in self.segments)
+
+    def append(self, record: Record) -> None:
+        data = json.dumps(record, separators=(",", ":"), default=str).encode()
+        with self.lock:
+            if self.segments and self.segments[-1].append(data):
+                return
+            size = max(self.segment_size, SEGMENT_HEADER.size + RECORD_LENGTH.size + len(data))
+            if size > self.max_bytes:
+                logger.error(f"Dropping a {len(data)} byte record larger than the spool")
+                self.evicted_records += 1
+                return
+            while self.segments and self.disk_usage() + size > self.max_bytes:
+                oldest = self.segments.pop(0)
+                self.evicted_records += oldest.records
+                logger.warning(f"Spool full, evicting {oldest.records} oldest event batches")
+                oldest.delete()
+            segment = self.new_segment(size)
+            segment.append(data)
+
+    def new_segment(self, size: int) -> Segment:
+        path = os.path.join(self.directory, f"{self.next_sequence:016d}{SEGMENT_SUFFIX}")
+        self.next_sequence += 1
+        segment = Segment(path, size)
+        self.segments.append(segment)
+        return segment
+
+    def peek(self) -> Optional[Record]:
+        """The oldest record not yet replayed, or None if the spool is empty."""
+        with self.lock:
+            while self.segments:
+                data = self.segments[0].peek()
+                if data is not None:
+                    try:
+                        record: Record = json.loads(data)
+                        return record
+                    except ValueError as e:
+                        logger.error(f"Skipping unreadable spooled record: {e}")
+                        self.segments[0].commit()
+                        continue
+                if len(self.segments) == 1:
+                    return None
+                self.segments.pop(0).delete()
+            return None
+
+    def commit(self) -> None:
+        """Mark the record returned by the last `peek` as replayed."""
+        with self.lock:
+            if self.segments:
+                self.segments[0].commit()
+                self.discard_replayed()
+
+    def discard_replayed(self) -> None:
+        # The newest segment stays to be written to, even once it's replayed
+        while len(self.segments) > 1 and not self.segments[0].records:
+            self.segments.pop(0).delete()
+
+
+def claim_slot(root: str) -> Tuple[str, IO[bytes]]:
+    """Lock the first slot directory under `root` that no other process holds.
+
+    Returns the directory and the open lock file, which holds the lock until
+    it's closed or the process exits.
+    """
+    slot = 0
+    while True:
+        directory = os.path.join(root, str(slot))
+        os.makedirs(directory, exist_ok=True)
+        lock_file = open(os.path.join(directory, LOCK_FILE), "a+b")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            slot += 1
+            continue
+        return directory, lock_file
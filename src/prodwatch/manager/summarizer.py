@@ -0,0 +1,363 @@
+from __future__ import annotations
+
+import array
+import collections
+import dataclasses
+import datetime
+import decimal
+import enum
+import fractions
+import itertools
+import pathlib
+import uuid
+from abc import ABC, abstractmethod
+from types import BuiltinFunctionType, FunctionType, MethodType, ModuleType
+from typing import Any, Callable, Dict, List, Mapping, Sequence, Set, Tuple
+
+# Maximum length, in characters, of one summarized argument
+DEFAULT_BUDGET = 256
+
+# Number of leading items shown for containers
+MAX_ITEMS = 5
+
+# Containers nested deeper than this are shown by type and length only
+MAX_DEPTH = 3
+
+# Types whose str() is cheap and bounded by their value
+SCALAR_TYPES = (
+    int,
+    float,
+    complex,
+    bool,
+    type(None),
+    decimal.Decimal,
+    fractions.Fraction,
+    uuid.UUID,
+    datetime.date,
+    datetime.time,
+    datetime.timedelta,
+    datetime.timezone,
+    pathlib.PurePath,
+    enum.Enum,
+    range,
+)
+
+# Ints with more bits than this are summarized instead of converted to decimal,
+# which is quadratic in the number of digits.
+MAX_INT_BITS = 1024
+
+Formatter = Callable[[Any, int, int, Set[int]], str]
+
+
+def truncate(text: str, budget: int) -> str:
+    if len(text) <= budget:
+        return text
+    suffix = f"...({len(text)} chars)"
+    return text[: max(budget - len(suffix), 0)] + suffix
+
+
+def object_address(value: Any) -> str:
+    return f"<{type(value).__name__} object at {hex(id(value))}>"
+
+
+def format_str(value: str, budget: int, depth: int, seen: Set[int]) -> str:
+    return truncate(value if depth == 0 else repr(value[: budget + 1]), budget)
+
+
+def format_scalar(value: Any, budget: int, depth: int, seen: Set[int]) -> str:
+    if type(value) is int and value.bit_length() > MAX_INT_BITS:
+        return f"<int with {value.bit_length()} bits>"
+    return truncate(str(value), budget)
+
+
+def format_bytes(value: bytes | bytearray, budget: int, depth: int, seen: Set[int]) -> str:
+    text = repr(value[:budget])
+    if len(value) <= budget and len(text) <= budget:
+        return text
+    return truncate(f"<{type(value).__name__} len={len(value)}: {text}>", budget)
+
+
+def format_memoryview(value: memoryview, budget: int, depth: int, seen: Set[int]) -> str:
+    return truncate(
+        f"<memoryview shape={value.shape} format={value.format!r} nbytes={value.nbytes}>",
+        budget,
+    )
+
+
+def format_array(value: array.array[Any], budget: int, depth: int, seen: Set[int]) -> str:
+    nbytes = len(value) * value.itemsize
+    return truncate(
+        f"<array typecode={value.typecode!r} len={len(value)} nbytes={nbytes}>", budget
+    )
+
+
+def format_ndarray(value: Any, budget: int, depth: int, seen: Set[int]) -> str:
+    """Arrays from numpy and similar libraries, identified by their shape/dtype/nbytes attributes."""
+    try:
+        shape = tuple(value.shape)
+        return truncate(
+            f"<{type(value).__name__} shape={shape} dtype={value.dtype} nbytes={value.nbytes}>",
+            budget,
+        )
+    except Exception:
+        return object_address(value)
+
+
+def format_type(value: type, budget: int, depth: int, seen: Set[int]) -> str:
+    return truncate(f"<class '{value.__name__}'>", budget)
+
+
+def format_module(value: ModuleType, budget: int, depth: int, seen: Set[int]) -> str:
+    return truncate(f"<module '{value.__name__}'>", budget)
+
+
+def format_function(value: Any, budget: int, depth: int, seen: Set[int]) -> str:
+    name = getattr(value, "__qualname__", None) or getattr(value, "__name__", "?")
+    return truncate(f"<function {name}>", budget)
+
+
+def format_object(value: Any, budget: int, depth: int, seen: Set[int]) -> str:
+    return object_address(value)
+
+
+def instance_fields(value: Any) -> List[Tuple[str, Any]]:
+    """Up to MAX_ITEMS + 1 of an object's dataclass fields or instance attributes."""
+    cls = type(value)
+    if dataclasses.is_dataclass(cls):
+        names = [field.name for field in dataclasses.fields(cls)[: MAX_ITEMS + 1]]
+        return [(name, getattr(value, name)) for name in names]
+    return list(itertools.islice(getattr(value, "__dict__", {}).items(), MAX_ITEMS + 1))
+
+
+def render_fields(
+    fields: Sequence[Tuple[str, Any]], separator: str, budget: int, depth: int, seen: Set[int]
+) -> str:
+    item_budget = max(budget // (min(len(fields), MAX_ITEMS) + 1), 8)
+    rendered = separator.join(
+        f"{name}{render(item, item_budget, depth + 1, seen)}" for name, item in fields[:MAX_ITEMS]
+    )
+    return rendered + f"{separator}..." if len(fields) > MAX_ITEMS else rendered
+
+
+def format_custom(value: Any, budget: int, depth: int, seen: Set[int]) -> str:
+    """Objects whose class defines __str__ or __repr__.
+
+    Their own __str__ could do any amount of work, such as printing a whole
+    DataFrame, so it is never called. Exceptions are shown by their arguments,
+    sized objects by their length, and other objects by their first few fields.
+    """
+    cls = type(value)
+    is_exception = isinstance(value, BaseException)
+    if not is_exception and hasattr(cls, "__len__"):
+        return truncate(f"<{cls.__name__} len={len(value)}>", budget)
+    if depth >= MAX_DEPTH or id(value) in seen:
+        return object_address(value)
+
+    seen.add(id(value))
+    try:
+        if is_exception:
+            arguments = [("", arg) for arg in value.args[: MAX_ITEMS + 1]]
+            rendered = render_fields(arguments, ", ", budget, depth, seen)
+            return truncate(f"{cls.__name__}({rendered})", budget)
+        fields = [(f"{name}=", item) for name, item in instance_fields(value)]
+        if not fields:
+            return object_address(value)
+        rendered = render_fields(fields, " ", budget, depth, seen)
+        return truncate(f"<{cls.__name__} {rendered}>", budget)
+    finally:
+        seen.discard(id(value))
+
+
+class Snapshot(ABC):
+    """Base for values captured on the calling thread to be rendered later (see snapshot.py).
+
+    `type_name` is the name of the type of the value the snapshot stands for.
+    """
+
+    __slots__ = ()
+
+    @property
+    @abstractmethod
+    def type_name(self) -> str:
+        """The name of the type of the captured value."""
+
+
+def element_type(items: Sequence[Any]) -> str:
+    names = {item.type_name if isinstance(item, Snapshot) else type(item).__name__ for item in items}
+    return names.pop() if len(names) == 1 else "mixed"
+
+
+SEQUENCE_BRACKETS: Dict[type, Tuple[str, str]] = {
+    list: ("[", "]"),
+    tuple: ("(", ")"),
+    set: ("{", "}"),
+    frozenset: ("frozenset({", "})"),
+}
+
+
+def render_sequence(
+    cls: type, length: int, head: Sequence[Any], budget: int, depth: int, seen: Set[int]
+) -> str:
+    """Render a sequence or set of type `cls` from its length and first items."""
+    opening, closing = SEQUENCE_BRACKETS.get(cls, (f"{cls.__name__}([", "])"))
+    if length == 0:
+        return f"{opening}{closing}" if cls in (list, tuple) else f"{cls.__name__}()"
+
+    item_budget = max(budget // (len(head) + 1), 8)
+    rendered = ", ".join(render(item, item_budget, depth + 1, seen) for item in head)
+
+    if length <= MAX_ITEMS:
+        if cls is tuple and length == 1:
+            rendered += ","
+        text = f"{opening}{rendered}{closing}"
+        if len(text) <= budget:
+            return text
+    return truncate(
+        f"<{cls.__name__} len={length} of {element_type(head)}: {opening}{rendered}, ...{closing}>",
+        budget,
+    )
+
+
+def render_mapping(
+    cls: type,
+    length: int,
+    items: Sequence[Tuple[Any, Any]],
+    budget: int,
+    depth: int,
+    seen: Set[int],
+) -> str:
+    """Render a mapping of type `cls` from its length and first items."""
+    if length == 0:
+        return "{}" if cls is dict else f"{cls.__name__}()"
+
+    item_budget = max(budget // (2 * len(items) + 1), 8)
+    rendered = ", ".join(
+        f"{render(key, item_budget, depth + 1, seen)}: {render(item, item_budget, depth + 1, seen)}"
+        for key, item in items
+    )
+
+    if length <= MAX_ITEMS:
+        text = "{" + rendered + "}"
+        if len(text) <= budget:
+            return text
+    return truncate(f"<{cls.__name__} len={length}: {{{rendered}, ...}}>", budget)
+
+
+def format_sequence(value: Any, budget: int, depth: int, seen: Set[int]) -> str:
+    length = len(value)
+    if length and (depth >= MAX_DEPTH or id(value) in seen):
+        return f"<{type(value).__name__} len={length}>"
+
+    seen.add(id(value))
+    try:
+        head = list(itertools.islice(value, MAX_ITEMS))
+        return render_sequence(type(value), length, head, budget, depth, seen)
+    finally:
+        seen.discard(id(value))
+
+
+def format_mapping(value: Mapping[Any, Any], budget: int, depth: int, seen: Set[int]) -> str:
+    length = len(value)
+    if length and (depth >= MAX_DEPTH or id(value) in seen):
+        return f"<{type(value).__name__} len={length}>"
+
+    seen.add(id(value))
+    try:
+        items = list(itertools.islice(value.items(), MAX_ITEMS))
+        return render_mapping(type(value), length, items, budget, depth, seen)
+    finally:
+        seen.discard(id(value))
+
+
+def is_ndarray_like(cls: type) -> bool:
+    return all(hasattr(cls, attribute) for attribute in ("shape", "dtype", "nbytes"))
+
+
+def defines_own_str(cls: type) -> bool:
+    own_str: object = cls.__str__
+    own_repr: object = cls.__repr__
+    return own_str is not object.__str__ or own_repr is not object.__repr__
+
+
+# Formatters for types defined elsewhere in prodwatch, such as argument snapshots
+registered_formatters: Dict[type, Formatter] = {}
+
+
+def register_formatter(cls: type, formatter: Formatter) -> None:
+    registered_formatters[cls] = formatter
+    formatter_cache.pop(cls, None)
+
+
+def resolve_formatter(cls: type) -> Formatter:
+    """Pick the formatter for a type. Called once per type; the result is cached."""
+    for registered_cls, formatter in registered_formatters.items():
+        if issubclass(cls, registered_cls):
+            return formatter
+    if issubclass(cls, str):
+        return format_str
+    if issubclass(cls, SCALAR_TYPES):
+        return format_scalar
+    if issubclass(cls, (bytes, bytearray)):
+        return format_bytes
+    if issubclass(cls, memoryview):
+        return format_memoryview
+    if issubclass(cls, array.array):
+        return format_array
+    if issubclass(cls, type):
+        return format_type
+    if issubclass(cls, ModuleType):
+        return format_module
+    if issubclass(cls, (FunctionType, BuiltinFunctionType, MethodType)):
+        return format_function
+    if is_ndarray_like(cls):
+        return format_ndarray
+    if issubclass(cls, Mapping) or issubclass(cls, dict):
+        return format_mapping
+    if issubclass(cls, (list, tuple, set, frozenset, collections.deque)):
+        return format_sequence
+    if defines_own_str(cls):
+        return format_custom
+    return format_object
+
+
+# Formatters resolved so far, by exact type. Cleared if it grows past
+# FORMATTER_CACHE_SIZE so classes created at runtime can't grow it forever.
+FORMATTER_CACHE_SIZE = 1024
+formatter_cache: Dict[type, Formatter] = {}
+
+
+def formatter_for(cls: type) -> Formatter:
+    formatter = formatter_cache.get(cls)
+    if formatter is None:
+        formatter = resolve_formatter(cls)
+        if len(formatter_cache) >= FORMATTER_CACHE_SIZE:
+            formatter_cache.clear()
+        formatter_cache[cls] = formatter
+    return formatter
+
+
+def render(value: Any, budget: int, depth: int, seen: Set[int]) -> str:
+    try:
+        return formatter_for(type(value))(value, budget, depth, seen)
+    except Exception:
+        return object_address(value)
+
+
+def summarize(value: Any, budget: int = DEFAULT_BUDGET) -> str:
+    """Bounded, cycle-safe string form of an argument.
+
+    Strings and scalars are shown as str() would show them, truncated to `budget`
+    characters. Containers show their length, element type and first few items;
+    buffers and arrays show their shape, dtype/format and size in bytes. Other
+    objects never have their own __str__ or __repr__ called: those that define
+    one are shown by their first few fields, the rest by class name and address.
+    """
+    return render(value, budget, 0, set())
+
+
+def summarize_args(args: Sequence[Any], budget: int = DEFAULT_BUDGET) -> List[str]:
+    return [summarize(arg, budget) for arg in args]
+
+
+def summarize_kwargs(kwargs: Dict[str, Any], budget: int = DEFAULT_BUDGET) -> Dict[str, str]:
+    return {key: summarize(value, budget) for key, value in kwargs.items()}
@@ -15,4 +15,7 @@ class LoggingCallback(Protocol):
         kwargs: Dict[str, Any],
         execution_time_ms: float,
         error: Optional[str] = None,
+        sample_weight: float = 1.0,
+        cancelled: bool = False,
+        generator: Optional[Dict[str, Any]] = None,
     ) -> None: ...
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Dict, Optional
+
+from .expiry import WatchLimits
+from .sampling import SamplingPolicy
+
+
+class WatchMode(Enum):
+    """What a watch reports: every call as an event, or a latency summary per interval."""
+
+    EVENTS = "events"
+    HISTOGRAM = "histogram"
+
+
+@dataclass(frozen=True)
+class WatchOptions:
+    """Per-watch settings sent by the server alongside the function name."""
+
+    sampling: Optional[SamplingPolicy] = None
+    mode: WatchMode = WatchMode.EVENTS
+    limits: Optional[WatchLimits] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "WatchOptions":
+        sampling = data.get("sampling")
+        limits = data.get("limits")
+        try:
+            mode = WatchMode(data.get("mode", WatchMode.EVENTS.value))
+        except ValueError:
+            raise ValueError(f"Unknown watch mode: {data.get('mode')!r}") from None
+        return cls(
+            sampling=SamplingPolicy.from_dict(sampling) if sampling else None,
+            mode=mode,
+            limits=WatchLimits.from_dict(limits) if limits else None,
+        )
+
+
+@dataclass(frozen=True)
+class WatchRequest:
+    """A single entry from the server's list of functions to watch.
+
+    The server sends either a bare function name, or an object with a
+    `function_name` key and any per-watch options.
+    """
+
+    function_name: str
+    options: WatchOptions = field(default_factory=WatchOptions)
+
+    @classmethod
+    def from_payload(cls, entry: str | Dict[str, Any]) -> "WatchRequest":
+        """Parse one watch list entry. Raises ValueError if it is malformed."""
+        if isinstance(entry, str):
+            return cls(function_name=entry)
+        if not isinstance(entry, dict):
+            raise ValueError(f"Watch request must be a name or an object: {entry!r}")
+
+        function_name = entry.get("function_name")
+        if not isinstance(function_name, str):
+            raise ValueError(f"Watch request has no function_name: {entry!r}")
+        return cls(function_name=function_name, options=WatchOptions.from_dict(entry))
@@ -0,0 +1,271 @@
+"""Compact binary encoding for event batches.
+
+A batch starts with a header holding the fields every event shares, then the
+events themselves:
+
+    header   magic b"PWB", version byte
+             string process_id, string app_name
+             varint base timestamp (microseconds since the epoch)
+             varint function name count, then each name as a string
+             varint event count
+    event    kind byte
+             LOG_FUNCTION_CALL:
+                 varint function name id (index into the header's table)
+                 zigzag varint timestamp delta from the previous event (microseconds)
+                 varint execution time (nanoseconds)
+                 flags byte (FLAG_ERROR, FLAG_WEIGHTED)
+                 varint arg count, then each arg as a string
+                 varint kwarg count, then each key and value as strings
+                 string error, if FLAG_ERROR
+                 float64 sample weight, if FLAG_WEIGHTED
+             JSON_EVENT:
+                 length-prefixed UTF-8 JSON of any other event
+
+Strings are a varint byte length followed by UTF-8. `decode_batch` is the
+reference decoder and returns the same payload the JSON encoding would send.
+"""
+
+from __future__ import annotations
+
+import json
+import struct
+from typing import Any, Dict, List, Tuple
+
+CONTENT_TYPE = "application/vnd.prodwatch.batch"
+MAGIC = b"PWB"
+VERSION = 1
+
+LOG_FUNCTION_CALL = 1
+JSON_EVENT = 2
+
+FLAG_ERROR = 1
+FLAG_WEIGHTED = 2
+
+DOUBLE = struct.Struct("<d")
+
+# Fields of a log-function-call event that the binary form stores; any other
+# field means the event is sent as a JSON record instead.
+CALL_FIELDS = frozenset(
+    {
+        "event_name",
+        "function_name",
+        "process_id",
+        "app_name",
+        "timestamp",
+        "args",
+        "kwargs",
+        "execution_time_ms",
+        "error",
+        "sample_weight",
+    }
+)
+
+
+def write_varint(out: bytearray, value: int) -> None:
+    if value < 0:
+        raise ValueError("varint must not be negative")
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def write_zigzag(out: bytearray, value: int) -> None:
+    write_varint(out, (value << 1) if value >= 0 else ((-value << 1) - 1))
+
+
+def write_string(out: bytearray, value: str) -> None:
+    encoded = value.encode("utf-8", "surrogatepass")
+    write_varint(out, len(encoded))
+    out += encoded
+
+
+def is_compact_call(event: Dict[str, Any], process_id: str, app_name: str) -> bool:
+    return (
+        event.get("event_name") == "log-function-call"
+        and event.keys() <= CALL_FIELDS
+        and event.get("process_id", process_id) == process_id
+        and event.get("app_name", app_name) == app_name
+        and isinstance(event.get("timestamp"), (int, float))
+    )
+
+
+def encode_batch(process_id: str, app_name: str, events: List[Dict[str, Any]]) -> bytes:
+    """Encode a batch of events. Events other than log-function-call are embedded as JSON."""
+    function_ids: Dict[str, int] = {}
+    compact = [is_compact_call(event, process_id, app_name) for event in events]
+    timestamps = [
+        int(event["timestamp"] * 1_000_000) for event, is_call in zip(events, compact) if is_call
+    ]
+    base_timestamp = min(timestamps) if timestamps else 0
+
+    body = bytearray()
+    previous_timestamp = base_timestamp
+    for event, is_call in zip(events, compact):
+        if not is_call:
+            body.append(JSON_EVENT)
+            write_string(body, json.dumps(event, separators=(",", ":")))
+            continue
+
+        body.append(LOG_FUNCTION_CALL)
+        function_name = event["function_name"]
+        function_id = function_ids.setdefault(function_name, len(function_ids))
+        write_varint(body, function_id)
+
+        timestamp = int(event["timestamp"] * 1_000_000)
+        write_zigzag(body, timestamp - previous_timestamp)
+        previous_timestamp = timestamp
+
+        write_varint(body, max(0, round(event["execution_time_ms"] * 1_000_000)))
+
+        error = event.get("error")
+        sample_weight = event.get("sample_weight", 1.0)
+        flags = (FLAG_ERROR if error is not None else 0) | (
+            FLAG_WEIGHTED if sample_weight != 1.0 else 0
+        )
+        body.append(flags)
+
+        args = event.get("args", [])
+        write_varint(body, len(args))
+        for arg in args:
+            write_string(body, str(arg))
+
+        kwargs = event.get("kwargs", {})
+        write_varint(body, len(kwargs))
+        for key, value in kwargs.items():
+            write_string(body, key)
+            write_string(body, str(value))
+
+        if flags & FLAG_ERROR:
+            write_string(body, str(error))
+        if flags & FLAG_WEIGHTED:
+            body += DOUBLE.pack(sample_weight)
+
+    header = bytearray(MAGIC)
+    header.append(VERSION)
+    write_string(header, process_id)
+    write_string(header, app_name)
+    write_varint(header, base_timestamp)
+    write_varint(header, len(function_ids))
+    for function_name in function_ids:
+        write_string(header, function_name)
+    write_varint(header, len(events))
+
+    return bytes(header + body)
+
+
+class Reader:
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.position = 0
+
+    def byte(self) -> int:
+        if self.position >= len(self.data):
+            raise ValueError("Truncated batch")
+        value = self.data[self.position]
+        self.position += 1
+        return value
+
+    def varint(self) -> int:
+        result = 0
+        shift = 0
+        while True:
+            byte = self.byte()
+            result |= (byte & 0x7F) << shift
+            if not byte & 0x80:
+                return result
+            shift += 7
+
+    def zigzag(self) -> int:
+        value = self.varint()
+        return (value >> 1) ^ -(value & 1)
+
+    def string(self) -> str:
+        length = self.varint()
+        end = self.position + length
+        if end > len(self.data):
+            raise ValueError("Truncated string")
+        value = self.data[self.position : end].decode("utf-8", "surrogatepass")
+        self.position = end
+        return value
+
+    def double(self) -> float:
+        if self.position + DOUBLE.size > len(self.data):
+            raise ValueError("Truncated batch")
+        (value,) = DOUBLE.unpack_from(self.data, self.position)
+        self.position += DOUBLE.size
+        return float(value)
+
+
+def decode_batch(data: bytes) -> Dict[str, Any]:
+    """Decode a binary batch back into the payload shape of the JSON encoding."""
+    if data[:3] != MAGIC:
+        raise ValueError("Not a prodwatch batch")
+    reader = Reader(data)
+    reader.position = len(MAGIC)
+    version = reader.byte()
+    if version != VERSION:
+        raise ValueError(f"Unsupported batch version: {version}")
+
+    process_id = reader.string()
+    app_name = reader.string()
+    timestamp_us = reader.varint()
+    function_names = [reader.string() for _ in range(reader.varint())]
+
+    events: List[Dict[str, Any]] = []
+    try:
+        for _ in range(reader.varint()):
+            kind = reader.byte()
+            if kind == JSON_EVENT:
+                events.append(json.loads(reader.string()))
+                continue
+            if kind != LOG_FUNCTION_CALL:
+                raise ValueError(f"Unknown event kind: {kind}")
+
+            event, timestamp_us = decode_call(
+                reader, function_names, timestamp_us, process_id, app_name
+            )
+            events.append(event)
+    except IndexError:
+        raise ValueError("Truncated batch") from None
+
+    return {
+        "event_name": "event-batch",
+        "process_id": process_id,
+        "app_name": app_name,
+        "events": events,
+    }
+
+
+def decode_call(
+    reader: Reader,
+    function_names: List[str],
+    previous_timestamp_us: int,
+    process_id: str,
+    app_name: str,
+) -> Tuple[Dict[str, Any], int]:
+    function_name = function_names[reader.varint()]
+    timestamp_us = previous_timestamp_us + reader.zigzag()
+    execution_time_ms = reader.varint() / 1_000_000
+    flags = reader.byte()
+    args = [reader.string() for _ in range(reader.varint())]
+    kwargs = {}
+    for _ in range(reader.varint()):
+        key = reader.string()
+        kwargs[key] = reader.string()
+    error = reader.string() if flags & FLAG_ERROR else None
+    sample_weight = reader.double() if flags & FLAG_WEIGHTED else 1.0
+
+    event = {
+        "event_name": "log-function-call",
+        "function_name": function_name,
+        "process_id": process_id,
+        "app_name": app_name,
+        "timestamp": timestamp_us / 1_000_000,
+        "args": args,
+        "kwargs": kwargs,
+        "execution_time_ms": execution_time_ms,
+        "error": error,
+        "sample_weight": sample_weight,
+    }
+    return event, timestamp_us
@@ -0,0 +1,91 @@
+import time
+import asyncio
+import logging
+from typing import Any, Callable, Coroutine, Dict, Optional, TypeVar
+
+from ..argument_capture import ArgumentCapture, capturers_for
+from ..expiry import CallLimit
+from ..sampling import Sampler
+from ..self_stats import SelfStats
+from ..types import LoggingCallback
+
+logger = logging.getLogger(__name__)
+
+# TypeVar for the awaited result
+A = TypeVar("A")
+
+
+def create_logged_coroutine_function(
+    original_function: Callable[..., Coroutine[Any, Any, A]],
+    function_name: str,
+    log_function_call: LoggingCallback,
+    sampler: Optional[Sampler] = None,
+    argument_capture: ArgumentCapture = ArgumentCapture.EAGER,
+    call_limit: Optional[CallLimit] = None,
+    self_stats: Optional[SelfStats] = None,
+) -> Callable[..., Coroutine[Any, Any, A]]:
+    """Wrap an `async def` function or method so its awaited execution is timed.
+
+    The wrapper is itself a coroutine function, so `inspect.iscoroutinefunction`
+    and frameworks that dispatch on it still see one. Time is measured from the
+    first await of the call to its completion, including time suspended in the
+    event loop. A call that is cancelled is reported with `cancelled=True`
+    rather than as an error. Reporting only queues the event, so nothing here
+    blocks the event loop on I/O.
+    """
+    capture_args, capture_kwargs = capturers_for(argument_capture)
+
+    async def logged_coroutine(*args: Any, **kwargs: Any) -> A:
+        if call_limit is not None and not call_limit.admit():
+            return await original_function(*args, **kwargs)
+        if sampler is not None and not sampler.admit():
+            return await original_function(*args, **kwargs)
+
+        start_time = time.perf_counter()
+        error = None
+        cancelled = False
+        try:
+            result = await original_function(*args, **kwargs)
+            return result
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            end_time = time.perf_counter()
+            diff = end_time - start_time
+            execution_time_ms = diff * 1000
+            try:
+                serializable_args = capture_args(args)
+                serializable_kwargs = capture_kwargs(kwargs)
+                serialized = time.perf_counter()
+                # Plain callbacks without a cancelled parameter work for calls that completed
+                extra: Dict[str, Any] = {"cancelled": True} if cancelled else {}
+
+                if sampler is None:
+                    log_function_call(
+                        function_name,
+                        serializable_args,
+                        serializable_kwargs,
+                        execution_time_ms=execution_time_ms,
+                        error=str(error) if error else None,
+                        **extra,
+                    )
+                else:
+                    sampler.emit(
+                        log_function_call,
+                        function_name,
+                        serializable_args,
+                        serializable_kwargs,
+                        execution_time_ms,
+                        str(error) if error else None,
+                        **extra,
+                    )
+                if self_stats is not None:
+                    self_stats.record_capture(end_time, serialized)
+            except Exception as e:
+                logger.error(f"Error logging coroutine call: {e}")
+
+    return logged_coroutine
@@ -1,6 +1,17 @@
 import time
+import inspect
 import logging
-from typing import Callable
+from typing import Any, Callable, Optional, cast
+from ..argument_capture import ArgumentCapture, capturers_for
+from ..expiry import CallLimit
+from ..sampling import Sampler
+from ..self_stats import SelfStats
+from .logged_coroutine import create_logged_coroutine_function
+from .logged_generator import (
+    create_logged_async_generator_function,
+    create_logged_generator_function,
+)
+from .specialized import create_specialized_function
 from ..types import LoggingCallback, P, R
 
 logger = logging.getLogger(__name__)
@@ -10,8 +21,55 @@ def create_logged_function(
     original_function: Callable[P, R],
     function_name: str,
     log_function_call: LoggingCallback,
+    sampler: Optional[Sampler] = None,
+    argument_capture: ArgumentCapture = ArgumentCapture.EAGER,
+    call_limit: Optional[CallLimit] = None,
+    self_stats: Optional[SelfStats] = None,
+    specialize: bool = False,
 ) -> Callable[P, R]:
+    specialized: Optional[Callable[..., Any]] = None
+    if inspect.iscoroutinefunction(original_function):
+        specialized = create_logged_coroutine_function
+    elif inspect.isgeneratorfunction(original_function):
+        specialized = create_logged_generator_function
+    elif inspect.isasyncgenfunction(original_function):
+        specialized = create_logged_async_generator_function
+    if specialized is not None:
+        return cast(
+            Callable[P, R],
+            specialized(
+                original_function,
+                function_name,
+                log_function_call,
+                sampler,
+                argument_capture=argument_capture,
+                call_limit=call_limit,
+                self_stats=self_stats,
+            ),
+        )
+
+    if specialize:
+        # A wrapper generated for this signature, if it can have one
+        generated = create_specialized_function(
+            original_function,
+            function_name,
+            log_function_call,
+            sampler,
+            argument_capture=argument_capture,
+            call_limit=call_limit,
+            self_stats=self_stats,
+        )
+        if generated is not None:
+            return cast(Callable[P, R], generated)
+
+    capture_args, capture_kwargs = capturers_for(argument_capture)
+
     def logged_function(*args: P.args, **kwargs: P.kwargs) -> R:
+        if call_limit is not None and not call_limit.admit():
+            return original_function(*args, **kwargs)
+        if sampler is not None and not sampler.admit():
+            return original_function(*args, **kwargs)
+
         start_time = time.perf_counter()
         error = None
         try:
@@ -25,13 +83,28 @@ def create_logged_function(
             diff = end_time - start_time
             execution_time_ms = diff * 1000
             try:
-                log_function_call(
-                    function_name,
-                    list(args),  # Convert args tuple to list
-                    kwargs,
-                    execution_time_ms=execution_time_ms,
-                    error=str(error) if error else None,
-                )
+                serializable_args = capture_args(args)
+                serializable_kwargs = capture_kwargs(kwargs)
+                serialized = time.perf_counter()
+                if sampler is None:
+                    log_function_call(
+                        function_name,
+                        serializable_args,
+                        serializable_kwargs,
+                        execution_time_ms=execution_time_ms,
+                        error=str(error) if error else None,
+                    )
+                else:
+                    sampler.emit(
+                        log_function_call,
+                        function_name,
+                        serializable_args,
+                        serializable_kwargs,
+                        execution_time_ms,
+                        str(error) if error else None,
+                    )
+                if self_stats is not None:
+                    self_stats.record_capture(end_time, serialized)
             except Exception as e:
                 logger.error(f"Error logging function call: {e}")
 
@@ -0,0 +1,245 @@
+import time
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator, Callable, Dict, Generator, List, Optional, Tuple
+
+from ..argument_capture import ArgumentCapture, capturers_for
+from ..expiry import CallLimit
+from ..sampling import Sampler
+from ..self_stats import SelfStats
+from ..types import LoggingCallback
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StreamStats:
+    """Timings of one run of a watched generator, from its first resumption until it ends.
+
+    `active_time` only counts time spent inside the generator producing items,
+    not time it spent suspended at a `yield` waiting for the consumer.
+    """
+
+    started: float
+    items: int = 0
+    first_item: Optional[float] = None
+    active_time: float = 0.0
+
+    def to_dict(self, ended: float) -> Dict[str, Any]:
+        return {
+            "items": self.items,
+            "time_to_first_item_ms": (
+                (self.first_item - self.started) * 1000 if self.first_item is not None else None
+            ),
+            "active_time_ms": self.active_time * 1000,
+            "lifetime_ms": (ended - self.started) * 1000,
+        }
+
+
+def report_stream(
+    log_function_call: LoggingCallback,
+    sampler: Optional[Sampler],
+    function_name: str,
+    args: List[Any],
+    kwargs: Dict[str, Any],
+    stats: StreamStats,
+    error: Optional[BaseException],
+    cancelled: bool = False,
+) -> None:
+    details: Dict[str, Any] = {"generator": stats.to_dict(time.perf_counter())}
+    if cancelled:
+        details["cancelled"] = True
+    execution_time_ms = stats.active_time * 1000
+    if sampler is None:
+        log_function_call(
+            function_name,
+            args,
+            kwargs,
+            execution_time_ms=execution_time_ms,
+            error=str(error) if error else None,
+            **details,
+        )
+    else:
+        sampler.emit(
+            log_function_call,
+            function_name,
+            args,
+            kwargs,
+            execution_time_ms,
+            str(error) if error else None,
+            **details,
+        )
+
+
+def create_logged_generator_function(
+    original_function: Callable[..., Generator[Any, Any, Any]],
+    function_name: str,
+    log_function_call: LoggingCallback,
+    sampler: Optional[Sampler] = None,
+    argument_capture: ArgumentCapture = ArgumentCapture.EAGER,
+    call_limit: Optional[CallLimit] = None,
+    self_stats: Optional[SelfStats] = None,
+) -> Callable[..., Generator[Any, Any, Any]]:
+    """Wrap a generator function so each run is reported once it finishes.
+
+    The wrapper is itself a generator function that drives the original one,
+    forwarding `send`, `throw` and `close`, and reports a single event per run
+    when it is exhausted, fails or is closed. The event's execution time is the
+    active time, and its `generator` field holds the items yielded, time to
+    first item, active time and lifetime (see StreamStats).
+    """
+    capture_args, capture_kwargs = capturers_for(argument_capture)
+
+    def logged_generator(*args: Any, **kwargs: Any) -> Generator[Any, Any, Any]:
+        if call_limit is not None and not call_limit.admit():
+            return (yield from original_function(*args, **kwargs))
+        if sampler is not None and not sampler.admit():
+            return (yield from original_function(*args, **kwargs))
+
+        stats = StreamStats(time.perf_counter())
+        error = None
+        try:
+            generator = original_function(*args, **kwargs)
+            value: Any = None
+            thrown: Optional[BaseException] = None
+            while True:
+                start_time = time.perf_counter()
+                try:
+                    if thrown is None:
+                        item = generator.send(value)
+                    else:
+                        pending, thrown = thrown, None
+                        item = generator.throw(pending)
+                except StopIteration as stop:
+                    return stop.value
+                except Exception as e:
+                    error = e
+                    raise
+                finally:
+                    stats.active_time += time.perf_counter() - start_time
+
+                stats.items += 1
+                if stats.first_item is None:
+                    stats.first_item = time.perf_counter()
+                try:
+                    value = yield item
+                except GeneratorExit:
+                    generator.close()
+                    raise
+                except BaseException as e:
+                    # Raised into the wrapper by the consumer's throw(): pass it on
+                    thrown, value = e, None
+        finally:
+            try:
+                captured = time.perf_counter()
+                serializable_args = capture_args(args)
+                serializable_kwargs = capture_kwargs(kwargs)
+                serialized = time.perf_counter()
+                report_stream(
+                    log_function_call,
+                    sampler,
+                    function_name,
+                    serializable_args,
+                    serializable_kwargs,
+                    stats,
+                    error,
+                )
+                if self_stats is not None:
+                    self_stats.record_capture(captured, serialized)
+            except Exception as e:
+                logger.error(f"Error logging generator run: {e}")
+
+    return logged_generator
+
+
+def create_logged_async_generator_function(
+    original_function: Callable[..., AsyncGenerator[Any, Any]],
+    function_name: str,
+    log_function_call: LoggingCallback,
+    sampler: Optional[Sampler] = None,
+    argument_capture: ArgumentCapture = ArgumentCapture.EAGER,
+    call_limit: Optional[CallLimit] = None,
+    self_stats: Optional[SelfStats] = None,
+) -> Callable[..., AsyncGenerator[Any, Any]]:
+    """Wrap an async generator function so each run is reported once it finishes.
+
+    Like create_logged_generator_function, forwarding `asend`, `athrow` and
+    `aclose`. Active time includes awaits inside the generator while it produces
+    an item. A run cancelled while producing an item is reported with
+    `cancelled=True`.
+
+    The wrapper is a plain function that decides on each call whether the run
+    is reported. A run the call limit or sampler turns away gets the original
+    async generator, so it pays nothing per item; an async generator has no
+    `yield from` to delegate with cheaply the way the sync wrapper does.
+    """
+    capture_args, capture_kwargs = capturers_for(argument_capture)
+
+    async def logged_run(args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> AsyncGenerator[Any, Any]:
+        stats = StreamStats(time.perf_counter())
+        error = None
+        cancelled = False
+        try:
+            generator = original_function(*args, **kwargs)
+            value: Any = None
+            thrown: Optional[BaseException] = None
+            while True:
+                start_time = time.perf_counter()
+                try:
+                    if thrown is None:
+                        item = await generator.asend(value)
+                    else:
+                        pending, thrown = thrown, None
+                        item = await generator.athrow(pending)
+                except StopAsyncIteration:
+                    return
+                except asyncio.CancelledError:
+                    cancelled = True
+                    raise
+                except Exception as e:
+                    error = e
+                    raise
+                finally:
+                    stats.active_time += time.perf_counter() - start_time
+
+                stats.items += 1
+                if stats.first_item is None:
+                    stats.first_item = time.perf_counter()
+                try:
+                    value = yield item
+                except GeneratorExit:
+                    await generator.aclose()
+                    raise
+                except BaseException as e:
+                    # Raised into the wrapper by the consumer's athrow(): pass it on
+                    thrown, value = e, None
+        finally:
+            try:
+                captured = time.perf_counter()
+                serializable_args = capture_args(args)
+                serializable_kwargs = capture_kwargs(kwargs)
+                serialized = time.perf_counter()
+                report_stream(
+                    log_function_call,
+                    sampler,
+                    function_name,
+                    serializable_args,
+                    serializable_kwargs,
+                    stats,
+                    error,
+                    cancelled,
+                )
+                if self_stats is not None:
+                    self_stats.record_capture(captured, serialized)
+            except Exception as e:
+                logger.error(f"Error logging async generator run: {e}")
+
+    def logged_async_generator(*args: Any, **kwargs: Any) -> AsyncGenerator[Any, Any]:
+        if call_limit is not None and not call_limit.admit():
+            return original_function(*args, **kwargs)
+        if sampler is not None and not sampler.admit():
+            return original_function(*args, **kwargs)
+        return logged_run(args, kwargs)
+
+    return logged_async_generator
@@ -1,8 +1,18 @@
 import time
+import inspect
 import logging
-from types import ModuleType
-from typing import Any, Callable, TypeVar
+from typing import Any, Callable, Optional, cast, TypeVar
 
+from ..argument_capture import ArgumentCapture, capturers_for
+from ..expiry import CallLimit
+from ..sampling import Sampler
+from ..self_stats import SelfStats
+from .logged_coroutine import create_logged_coroutine_function
+from .logged_generator import (
+    create_logged_async_generator_function,
+    create_logged_generator_function,
+)
+from .specialized import create_specialized_function
 from ..types import LoggingCallback
 
 logger = logging.getLogger(__name__)
@@ -15,8 +25,55 @@ def create_logged_method(
     original_function: Callable[..., M],
     function_name: str,
     log_function_call: LoggingCallback,
+    sampler: Optional[Sampler] = None,
+    argument_capture: ArgumentCapture = ArgumentCapture.EAGER,
+    call_limit: Optional[CallLimit] = None,
+    self_stats: Optional[SelfStats] = None,
+    specialize: bool = False,
 ) -> Callable[..., M]:
+    specialized: Optional[Callable[..., Any]] = None
+    if inspect.iscoroutinefunction(original_function):
+        specialized = create_logged_coroutine_function
+    elif inspect.isgeneratorfunction(original_function):
+        specialized = create_logged_generator_function
+    elif inspect.isasyncgenfunction(original_function):
+        specialized = create_logged_async_generator_function
+    if specialized is not None:
+        return cast(
+            Callable[..., M],
+            specialized(
+                original_function,
+                function_name,
+                log_function_call,
+                sampler,
+                argument_capture=argument_capture,
+                call_limit=call_limit,
+                self_stats=self_stats,
+            ),
+        )
+
+    if specialize:
+        # A wrapper generated for this signature, if it can have one
+        generated = create_specialized_function(
+            original_function,
+            function_name,
+            log_function_call,
+            sampler,
+            argument_capture=argument_capture,
+            call_limit=call_limit,
+            self_stats=self_stats,
+        )
+        if generated is not None:
+            return cast(Callable[..., M], generated)
+
+    capture_args, capture_kwargs = capturers_for(argument_capture)
+
     def logged_method(*args: Any, **kwargs: Any) -> M:
+        if call_limit is not None and not call_limit.admit():
+            return original_function(*args, **kwargs)
+        if sampler is not None and not sampler.admit():
+            return original_function(*args, **kwargs)
+
         start_time = time.perf_counter()
         error = None
         try:
@@ -30,37 +87,29 @@ def create_logged_method(
             diff = end_time - start_time
             execution_time_ms = diff * 1000
             try:
-                # Convert args to serializable representations
-                serializable_args = []
-                for arg in args:
-                    if isinstance(arg, type):
-                        # Class object (for class methods)
-                        serializable_args.append(f"<class '{arg.__name__}'>")
-                    elif isinstance(arg, (int, float, bool)):
-                        # Convert numbers and booleans to their string representation
-                        serializable_args.append(str(arg))
-                    elif isinstance(arg, str):
-                        # Strings are already serializable
-                        serializable_args.append(arg)
-                    elif arg is None:
-                        # Handle None explicitly
-                        serializable_args.append("None")
-                    elif isinstance(arg, ModuleType):
-                        # Handle module objects
-                        serializable_args.append(f"<module '{arg.__name__}'>")
-                    else:
-                        # Instance objects and everything else
-                        serializable_args.append(
-                            f"<{arg.__class__.__name__} object at {hex(id(arg))}>"
-                        )
+                serializable_args = capture_args(args)
+                serializable_kwargs = capture_kwargs(kwargs)
+                serialized = time.perf_counter()
 
-                log_function_call(
-                    function_name,
-                    serializable_args,
-                    kwargs,
-                    execution_time_ms=execution_time_ms,
-                    error=str(error) if error else None,
-                )
+                if sampler is None:
+                    log_function_call(
+                        function_name,
+                        serializable_args,
+                        serializable_kwargs,
+                        execution_time_ms=execution_time_ms,
+                        error=str(error) if error else None,
+                    )
+                else:
+                    sampler.emit(
+                        log_function_call,
+                        function_name,
+                        serializable_args,
+                        serializable_kwargs,
+                        execution_time_ms,
+                        str(error) if error else None,
+                    )
+                if self_stats is not None:
+                    self_stats.record_capture(end_time, serialized)
             except Exception as e:
                 logger.error(f"Error logging method call: {e}")
 
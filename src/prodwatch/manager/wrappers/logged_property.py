@@ -1,7 +1,11 @@
 import time
 import logging
-from typing import Any, Callable, TypeVar
+from typing import Any, Callable, Optional, TypeVar
 
+from ..argument_capture import ArgumentCapture, capturers_for
+from ..expiry import CallLimit
+from ..sampling import Sampler
+from ..self_stats import SelfStats
 from ..types import LoggingCallback
 
 logger = logging.getLogger(__name__)
@@ -11,9 +15,22 @@ P = TypeVar("P", bound=Any)
 
 
 def create_logged_property(
-    original_function: property, function_name: str, log_function_call: LoggingCallback
+    original_function: property,
+    function_name: str,
+    log_function_call: LoggingCallback,
+    sampler: Optional[Sampler] = None,
+    argument_capture: ArgumentCapture = ArgumentCapture.EAGER,
+    call_limit: Optional[CallLimit] = None,
+    self_stats: Optional[SelfStats] = None,
 ) -> Callable[[Any], Any]:
+    capture_args, _ = capturers_for(argument_capture)
+
     def logged_property(self: Any) -> Any:
+        if call_limit is not None and not call_limit.admit() and callable(original_function.fget):
+            return original_function.fget(self)
+        if sampler is not None and not sampler.admit() and callable(original_function.fget):
+            return original_function.fget(self)
+
         start_time = time.perf_counter()
         error = None
         try:
@@ -34,17 +51,28 @@ def create_logged_property(
             execution_time_ms = diff * 1000
             try:
                 # For properties, we only pass the instance as an arg
-                serializable_args = [
-                    f"<{self.__class__.__name__} object at {hex(id(self))}>"
-                ]
-
-                log_function_call(
-                    function_name,
-                    serializable_args,
-                    {},  # no kwargs for properties
-                    execution_time_ms=execution_time_ms,
-                    error=str(error) if error else None,
-                )
+                serializable_args = capture_args((self,))
+                serialized = time.perf_counter()
+
+                if sampler is None:
+                    log_function_call(
+                        function_name,
+                        serializable_args,
+                        {},  # no kwargs for properties
+                        execution_time_ms=execution_time_ms,
+                        error=str(error) if error else None,
+                    )
+                else:
+                    sampler.emit(
+                        log_function_call,
+                        function_name,
+                        serializable_args,
+                        {},
+                        execution_time_ms,
+                        str(error) if error else None,
+                    )
+                if self_stats is not None:
+                    self_stats.record_capture(end_time, serialized)
             except Exception as e:
                 logger.error(f"Error logging property call: {e}")
 
@@ -0,0 +1,169 @@
+import time
+import inspect
+import keyword
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+from ..argument_capture import ArgumentCapture, capturers_for
+from ..expiry import CallLimit
+from ..sampling import Sampler
+from ..self_stats import SelfStats
+from ..types import LoggingCallback
+
+logger = logging.getLogger(__name__)
+
+# Names used by the generated code start with this, so parameters mustn't
+PREFIX = "_prodwatch_"
+
+NO_KWARGS: Dict[str, Any] = {}
+
+
+def wrapper_name(original_function: Any) -> str:
+    """The original's name where it is usable, so errors for bad calls read the same."""
+    name = original_function.__name__
+    if name.isidentifier() and not keyword.iskeyword(name) and not name.startswith(PREFIX):
+        return str(name)
+    return "logged_function"
+
+
+def wrapper_source(
+    original_function: Any, check_limit: bool, check_sampler: bool
+) -> Optional[str]:
+    """Source for a wrapper with the same parameters as `original_function`.
+
+    Returns None for signatures it can't reproduce: anything other than a plain
+    Python function, *args or **kwargs, or parameters that clash with the
+    generated code's own names.
+    """
+    if not inspect.isfunction(original_function):
+        return None
+    code = original_function.__code__
+    if code.co_flags & (inspect.CO_VARARGS | inspect.CO_VARKEYWORDS):
+        return None
+
+    positional: List[str] = list(code.co_varnames[: code.co_argcount])
+    keyword_only: List[str] = list(
+        code.co_varnames[code.co_argcount : code.co_argcount + code.co_kwonlyargcount]
+    )
+    if any(name.startswith(PREFIX) for name in positional + keyword_only):
+        return None
+
+    defaults = original_function.__defaults__ or ()
+    kwdefaults = original_function.__kwdefaults__ or {}
+    first_default = len(positional) - len(defaults)
+    parameters = []
+    for i, name in enumerate(positional):
+        if i == code.co_posonlyargcount and i:
+            parameters.append("/")
+        default = f"={PREFIX}defaults[{i - first_default}]" if i >= first_default else ""
+        parameters.append(name + default)
+    if positional and code.co_posonlyargcount == len(positional):
+        parameters.append("/")
+    if keyword_only:
+        parameters.append("*")
+    for name in keyword_only:
+        default = f"={PREFIX}kwdefaults[{name!r}]" if name in kwdefaults else ""
+        parameters.append(name + default)
+
+    arguments = ", ".join(positional + [f"{name}={name}" for name in keyword_only])
+    call = f"{PREFIX}original({arguments})"
+    recorded_args = f"({', '.join(positional)},)" if positional else "()"
+    recorded_kwargs = (
+        "{" + ", ".join(f"{name!r}: {name}" for name in keyword_only) + "}"
+        if keyword_only
+        else f"{PREFIX}no_kwargs"
+    )
+    elapsed = f"{PREFIX}clock() - {PREFIX}start"
+
+    lines = [f"def {wrapper_name(original_function)}({', '.join(parameters)}):"]
+    if check_limit:
+        lines += [f"    if not {PREFIX}call_limit.admit():", f"        return {call}"]
+    if check_sampler:
+        lines += [f"    if not {PREFIX}sampler.admit():", f"        return {call}"]
+    lines += [
+        f"    {PREFIX}start = {PREFIX}clock()",
+        "    try:",
+        f"        {PREFIX}result = {call}",
+        f"    except Exception as {PREFIX}error:",
+        f"        {PREFIX}emit({elapsed}, {recorded_args}, {recorded_kwargs}, {PREFIX}error)",
+        "        raise",
+        f"    {PREFIX}emit({elapsed}, {recorded_args}, {recorded_kwargs}, None)",
+        f"    return {PREFIX}result",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def create_specialized_function(
+    original_function: Callable[..., Any],
+    function_name: str,
+    log_function_call: LoggingCallback,
+    sampler: Optional[Sampler] = None,
+    argument_capture: ArgumentCapture = ArgumentCapture.EAGER,
+    call_limit: Optional[CallLimit] = None,
+    self_stats: Optional[SelfStats] = None,
+) -> Optional[Callable[..., Any]]:
+    """Generate a wrapper whose parameters match the function it wraps.
+
+    The generic wrappers take `*args, **kwargs`, so every call packs a tuple
+    and a dict before anything else happens. This reads the function's
+    parameters once, at watch time, and compiles a wrapper that takes the same
+    ones and passes them straight through, timed with perf_counter_ns. The
+    call limit and sampler checks are only generated if there is one, so a
+    call they turn away allocates nothing. Arguments are recorded by position,
+    with defaults filled in, and only keyword-only parameters as kwargs.
+
+    Returns None if the signature can't be specialized (see `wrapper_source`),
+    in which case the caller should fall back to a generic wrapper.
+    """
+    source = wrapper_source(original_function, call_limit is not None, sampler is not None)
+    if source is None:
+        return None
+
+    capture_args, capture_kwargs = capturers_for(argument_capture)
+
+    def emit(elapsed_ns: int, args: Any, kwargs: Dict[str, Any], error: Any) -> None:
+        try:
+            captured = time.perf_counter()
+            message = None if error is None else str(error)
+            serializable_args = capture_args(args)
+            serializable_kwargs = capture_kwargs(kwargs)
+            serialized = time.perf_counter()
+            if sampler is None:
+                log_function_call(
+                    function_name,
+                    serializable_args,
+                    serializable_kwargs,
+                    execution_time_ms=elapsed_ns / 1_000_000,
+                    error=message,
+                )
+            else:
+                sampler.emit(
+                    log_function_call,
+                    function_name,
+                    serializable_args,
+                    serializable_kwargs,
+                    elapsed_ns / 1_000_000,
+                    message,
+                )
+            if self_stats is not None:
+                self_stats.record_capture(captured, serialized)
+        except Exception as e:
+            logger.error(f"Error logging function call: {e}")
+
+    namespace: Dict[str, Any] = {
+        f"{PREFIX}original": original_function,
+        f"{PREFIX}defaults": original_function.__defaults__,
+        f"{PREFIX}kwdefaults": original_function.__kwdefaults__,
+        f"{PREFIX}clock": time.perf_counter_ns,
+        f"{PREFIX}emit": emit,
+        f"{PREFIX}call_limit": call_limit,
+        f"{PREFIX}sampler": sampler,
+        f"{PREFIX}no_kwargs": NO_KWARGS,
+    }
+    try:
+        exec(compile(source, f"<prodwatch wrapper for {function_name}>", "exec"), namespace)
+    except SyntaxError as e:
+        logger.warning(f"Could not generate a wrapper for {function_name}: {e}")
+        return None
+    wrapper: Callable[..., Any] = namespace[wrapper_name(original_function)]
+    return wrapper
@@ -0,0 +1,248 @@
+import os
+import sys
+import errno
+import socket
+import shutil
+import tempfile
+import time
+import subprocess
+import pytest
+import prodwatch
+from prodwatch.__main__ import main
+from prodwatch.agent import Agent, AgentClient
+from prodwatch.agent.server import merge_function_summaries
+from prodwatch.manager import Manager
+from prodwatch.manager.aggregation import FunctionAggregate
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def agent_target(x):
+    return x
+
+
+@pytest.fixture
+def socket_path():
+    # Unix socket paths are limited to ~100 bytes, so stay out of deep pytest temp dirs
+    directory = tempfile.mkdtemp(prefix="pw-agent-")
+    yield os.path.join(directory, "agent.sock")
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+@pytest.fixture
+def agent(fake_server, socket_path):
+    agent = Agent(
+        fake_server.url,
+        token="agent-token",
+        socket_path=socket_path,
+        poll_interval=0.05,
+        linger=0.05,
+    )
+    agent.start()
+    yield agent
+    agent.stop()
+
+
+def agent_manager(socket_path, **kwargs):
+    os.environ["PRODWATCH_API_TOKEN"] = "test-token-123"
+    return Manager(
+        "http://unused.invalid", app_name="test-app", agent_socket=socket_path, **kwargs
+    )
+
+
+class TestAgent:
+    def test_processes_are_answered_from_cache(self, fake_server, agent, socket_path):
+        """Each process's watch list is fetched once under its own ID, then served from cache"""
+        fake_server.function_names = ["mod.func"]
+        agent.poll_interval = 60
+        clients = [AgentClient(socket_path) for _ in range(5)]
+        try:
+            for i, client in enumerate(clients):
+                for _ in range(3):
+                    watch_list = client.watch_list("test-app", f"pid-{i}")
+                    assert watch_list["function_names"] == ["mod.func"]
+        finally:
+            for client in clients:
+                client.close()
+
+        assert sorted(poll["process_id"] for poll in fake_server.polls) == [
+            f"pid-{i}" for i in range(5)
+        ]
+
+    def test_each_process_gets_its_own_watch_list(self, fake_server, agent, socket_path):
+        fake_server.process_function_names = {"pid-a": ["mod.a"], "pid-b": ["mod.b"]}
+        first, second = AgentClient(socket_path), AgentClient(socket_path)
+        try:
+            assert first.watch_list("test-app", "pid-a")["function_names"] == ["mod.a"]
+            assert second.watch_list("test-app", "pid-b")["function_names"] == ["mod.b"]
+
+            fake_server.process_function_names["pid-b"] = ["mod.b", "mod.c"]
+            assert wait_for(
+                lambda: second.watch_list("test-app", "pid-b")["function_names"]
+                == ["mod.b", "mod.c"]
+            )
+            assert first.watch_list("test-app", "pid-a")["function_names"] == ["mod.a"]
+        finally:
+            first.close()
+            second.close()
+        assert {poll["process_id"] for poll in fake_server.polls} == {"pid-a", "pid-b"}
+
+    def test_disconnected_process_is_no_longer_polled(self, fake_server, agent, socket_path):
+        client = AgentClient(socket_path)
+        client.watch_list("test-app", "pid-a")
+        client.close()
+        assert wait_for(lambda: not agent.watch_lists)
+
+    def test_watch_list_is_refreshed(self, fake_server, agent, socket_path):
+        client = AgentClient(socket_path)
+        try:
+            assert client.watch_list("test-app", "pid")["function_names"] == []
+            fake_server.function_names = ["mod.func"]
+            assert wait_for(
+                lambda: client.watch_list("test-app", "pid")["function_names"] == ["mod.func"]
+            )
+        finally:
+            client.close()
+
+    def test_unchanged_watch_list_is_kept(self, fake_server, agent):
+        fake_server.function_names = ["mod.func"]
+        first = agent.watch_list(("test-app", "pid"))
+        assert agent.refresh(("test-app", "pid")) == first
+        assert fake_server.not_modified == 1
+        assert first["function_names"] == ["mod.func"]
+
+    def test_manager_through_agent(self, fake_server, agent, socket_path):
+        """A Manager with agent_socket registers, watches and ships events via the agent"""
+        fake_server.function_names = [f"{__name__}.agent_target"]
+        manager = agent_manager(socket_path, linger=0.05)
+        try:
+            assert manager.check_connection()
+            function_names, _ = manager.get_watch_list()
+            manager.process_pending_watchers(function_names)
+            manager.event_shipper.start()
+            for i in range(10):
+                agent_target(i)
+            manager.event_shipper.stop()
+
+            assert wait_for(lambda: len(fake_server.events("log-function-call")) == 10)
+        finally:
+            manager.function_manager.unwatch_function(f"{__name__}.agent_target")
+            manager.agent.close()
+
+        assert [event["process_id"] for event in fake_server.events("add-process")] == [
+            str(manager.process_id)
+        ]
+        assert {poll["process_id"] for poll in fake_server.polls} == {str(manager.process_id)}
+        (confirmed,) = fake_server.events("confirm-watcher")
+        assert confirmed["function_name"] == f"{__name__}.agent_target"
+        calls = fake_server.events("log-function-call")
+        assert {event["process_id"] for event in calls} == {str(manager.process_id)}
+        assert sorted(event["args"][0] for event in calls) == [str(i) for i in range(10)]
+
+    def test_batches_from_several_processes_are_merged(self, fake_server, agent, socket_path):
+        managers = [agent_manager(socket_path) for _ in range(3)]
+        try:
+            for manager in managers:
+                manager.log_function_call("func", [], {}, execution_time_ms=1.0)
+                manager.event_shipper.flush()
+            assert wait_for(lambda: len(fake_server.events("log-function-call")) == 3)
+        finally:
+            for manager in managers:
+                manager.agent.close()
+
+        batches = [post for post in fake_server.posts if post["event_name"] == "event-batch"]
+        assert len(batches) < 3
+        assert all(batch["process_id"] == str(agent.process_id) for batch in batches)
+
+    def test_unreachable_agent(self, socket_path):
+        manager = agent_manager(socket_path)
+        assert not manager.check_connection()
+        with pytest.raises(OSError):
+            manager.get_watch_list()
+
+    def test_stale_socket_is_replaced(self, fake_server, socket_path):
+        """A socket nobody listens on, left by an agent that died, is removed on start"""
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(socket_path)
+        stale.close()
+
+        agent = Agent(fake_server.url, token="agent-token", socket_path=socket_path)
+        agent.start()
+        try:
+            assert AgentClient(socket_path).watch_list("test-app", "p1")
+        finally:
+            agent.stop()
+
+    def test_live_agent_is_left_alone(self, fake_server, agent, socket_path):
+        second = Agent(fake_server.url, token="agent-token", socket_path=socket_path)
+        with pytest.raises(OSError) as raised:
+            second.start()
+        assert raised.value.errno == errno.EADDRINUSE
+
+        client = AgentClient(socket_path)
+        assert client.watch_list("test-app", "p1")
+        client.close()
+
+
+class TestMergeFunctionSummaries:
+    def summary(self, process_id, *latencies):
+        aggregate = FunctionAggregate("func")
+        for latency in latencies:
+            aggregate.record(latency, failed=latency > 100)
+        return {
+            "event_name": "function-summary",
+            "process_id": process_id,
+            "app_name": "app",
+            **aggregate.collect(),
+        }
+
+    def test_merges_same_function_across_processes(self):
+        events = [
+            self.summary("a", 1.0, 2.0),
+            self.summary("b", 3.0, 500.0),
+            {"event_name": "log-function-call", "function_name": "func"},
+        ]
+
+        merged = merge_function_summaries(events)
+
+        assert len(merged) == 2
+        summary = next(event for event in merged if event["event_name"] == "function-summary")
+        assert summary["calls"] == 4
+        assert summary["errors"] == 1
+        assert summary["process_ids"] == ["a", "b"]
+        assert summary["execution_time_ms"]["histogram"]["count"] == 4
+
+    def test_single_summary_is_unchanged(self):
+        event = self.summary("a", 1.0)
+        assert merge_function_summaries([event]) == [event]
+
+
+def test_command_needs_a_token(monkeypatch):
+    monkeypatch.delenv("PRODWATCH_API_TOKEN", raising=False)
+    assert main(["agent", "--socket", "/nonexistent/agent.sock"]) == 1
+
+
+def test_imports_without_unix_sockets():
+    """On platforms without Unix sockets, like Windows, prodwatch imports and skips the agent"""
+    code = (
+        "import socket, socketserver\n"
+        "del socket.AF_UNIX, socketserver.UnixStreamServer\n"
+        "import os; os.environ['PRODWATCH_API_TOKEN'] = 'token'\n"
+        "import prodwatch\n"
+        "from prodwatch.manager import Manager\n"
+        "manager = Manager('http://unused.invalid', app_name='app', agent_socket='/tmp/a.sock')\n"
+        "assert manager.agent is None\n"
+        "from prodwatch.__main__ import main\n"
+        "assert main(['agent']) == 1"
+    )
+    src = os.path.dirname(os.path.dirname(prodwatch.__file__))
+    subprocess.run(
+        [sys.executable, "-c", code], check=True, env={**os.environ, "PYTHONPATH": src}
+    )
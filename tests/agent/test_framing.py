@@ -0,0 +1,40 @@
+import socket
+import pytest
+from prodwatch.agent.framing import (
+    EVENT,
+    HEADER,
+    WATCH_LIST,
+    encode_frame,
+    encode_json_frame,
+    read_frame,
+)
+
+
+@pytest.fixture
+def socket_pair():
+    left, right = socket.socketpair()
+    yield left, right
+    left.close()
+    right.close()
+
+
+def test_round_trip(socket_pair):
+    left, right = socket_pair
+    left.sendall(encode_frame(EVENT, b"payload") + encode_json_frame(WATCH_LIST, {"a": [1]}))
+
+    assert read_frame(right) == (EVENT, b"payload")
+    assert read_frame(right) == (WATCH_LIST, b'{"a":[1]}')
+
+
+def test_end_of_stream(socket_pair):
+    left, right = socket_pair
+    left.sendall(encode_frame(EVENT, b"partial")[:4])
+    left.close()
+    assert read_frame(right) is None
+
+
+def test_invalid_length(socket_pair):
+    left, right = socket_pair
+    left.sendall(HEADER.pack(0, EVENT))
+    with pytest.raises(ValueError):
+        read_frame(right)
@@ -0,0 +1,193 @@
+"""A stdlib-only stand-in for the prodwatch server, for end-to-end tests and load runs.
+
+Serves `/pending-function-names` from a configurable watch list and records
+everything posted to `/events`, including the events inside event batches.
+Every request can be slowed down by `latency` seconds, answered with a 503 at
+`error_rate`, or held for `stall_seconds` at `stall_rate`, to see how clients
+behave against a slow or failing server. Set `keep_posts=False` for long runs:
+events are then only counted, by name, in `event_counts`.
+
+The server keeps a watch list per process: `process_function_names` gives
+some processes their own, and every other process gets `function_names`.
+The watch list is served with an ETag, and a request whose If-None-Match
+matches it gets a 304. With a `wait` parameter, such a request is held for
+up to that many seconds until the watch list changes, like a long poll.
+"""
+
+import json
+import hashlib
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeServerHandler(BaseHTTPRequestHandler):
+    server: "FakeProdwatchServer"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def send_json(
+        self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None
+    ) -> None:
+        encoded = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def send_not_modified(self, etag: str) -> None:
+        self.send_response(304)
+        self.send_header("ETag", etag)
+        self.end_headers()
+
+    def misbehave(self) -> bool:
+        """Apply the configured latency, stalls and errors. Returns True if an error was sent."""
+        fault = self.server.fault()
+        if fault == "stall":
+            time.sleep(self.server.stall_seconds)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if fault == "error":
+            self.send_json(503, {})
+            return True
+        return False
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        if self.misbehave():
+            return
+        if url.path != "/pending-function-names":
+            self.send_json(404, {})
+            return
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        with self.server.lock:
+            self.server.polls.append(params)
+        process_id = params.get("process_id")
+        watch_list, etag = self.server.watch_list(process_id)
+        if_none_match = self.headers.get("If-None-Match")
+        deadline = time.monotonic() + float(params.get("wait", 0))
+        while etag == if_none_match and time.monotonic() < deadline:
+            time.sleep(0.02)
+            watch_list, etag = self.server.watch_list(process_id)
+        if etag == if_none_match:
+            with self.server.lock:
+                self.server.not_modified += 1
+            self.send_not_modified(etag)
+            return
+        self.send_json(200, watch_list, headers={"ETag": etag})
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        if self.misbehave():
+            return
+        if urlparse(self.path).path != "/events":
+            self.send_json(404, {})
+            return
+        if self.headers.get("Content-Type") != "application/json":
+            self.send_json(415, {})
+            return
+        self.server.record(json.loads(body))
+        self.send_json(200, {})
+
+
+class FakeProdwatchServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        stall_rate: float = 0.0,
+        stall_seconds: float = 5.0,
+        keep_posts: bool = True,
+        seed: Optional[int] = None,
+    ) -> None:
+        super().__init__(("127.0.0.1", 0), FakeServerHandler)
+        self.lock = threading.Lock()
+        self.function_names: List[Any] = []
+        # Watch lists of processes that don't get `function_names`, by process ID
+        self.process_function_names: Dict[str, List[Any]] = {}
+        self.unwatch_function_names: List[str] = []
+        self.polls: List[Dict[str, str]] = []
+        # Watch list requests answered with a 304
+        self.not_modified = 0
+        self.posts: List[Dict[str, Any]] = []
+        self.latency = latency
+        self.error_rate = error_rate
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        self.keep_posts = keep_posts
+        self.random = random.Random(seed)
+        self.event_counts: Counter[str] = Counter()
+        self.faults: Counter[str] = Counter()
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    def fault(self) -> Optional[str]:
+        """Pick the fault to inject into the next request, if any."""
+        with self.lock:
+            roll = self.random.random()
+            if roll < self.stall_rate:
+                fault = "stall"
+            elif roll < self.stall_rate + self.error_rate:
+                fault = "error"
+            else:
+                return None
+            self.faults[fault] += 1
+            return fault
+
+    def watch_list(self, process_id: Optional[str] = None) -> Tuple[Dict[str, Any], str]:
+        """The current watch list of a process and its ETag."""
+        with self.lock:
+            function_names = self.process_function_names.get(
+                process_id or "", self.function_names
+            )
+            watch_list = {
+                "function_names": list(function_names),
+                "unwatch_function_names": list(self.unwatch_function_names),
+            }
+        digest = hashlib.sha1(json.dumps(watch_list, sort_keys=True).encode()).hexdigest()
+        return watch_list, f'"{digest[:16]}"'
+
+    def record(self, post: Dict[str, Any]) -> None:
+        events = post["events"] if post.get("event_name") == "event-batch" else [post]
+        with self.lock:
+            if self.keep_posts:
+                self.posts.append(post)
+            self.event_counts.update(event.get("event_name") for event in events)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeProdwatchServer":
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        self.thread.join()
+
+    def events(self, event_name: str) -> List[Dict[str, Any]]:
+        """Every event received with this name, including those inside event batches."""
+        with self.lock:
+            posts = list(self.posts)
+        received = []
+        for post in posts:
+            if post.get("event_name") == "event-batch":
+                received.extend(
+                    event for event in post["events"] if event.get("event_name") == event_name
+                )
+            elif post.get("event_name") == event_name:
+                received.append(post)
+        return received
@@ -1,7 +1,9 @@
 import os
+import sys
 import pytest
 from datetime import datetime, timezone
 from prodwatch.manager import Manager
+from .fake_server import FakeProdwatchServer
 from prodwatch.manager.system_identification import (
     SystemHardware,
     NetworkIdentity,
@@ -89,3 +91,28 @@ def fake_system_identification(
         process=fake_process,
         fingerprint=fake_fingerprint,
     )
+
+
+@pytest.fixture
+def unimported_package(tmp_path, monkeypatch):
+    """A package on sys.path that is not imported yet."""
+    root = tmp_path / "deferredpkg"
+    root.mkdir()
+    (root / "__init__.py").write_text("")
+    (root / "reports.py").write_text(
+        "def build():\n    return 'report'\n\n\n"
+        "class Builder:\n    def render(self):\n        return 'rendered'\n"
+    )
+    (root / "broken.py").write_text("raise RuntimeError('import failed')\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield "deferredpkg"
+    for name in list(sys.modules):
+        if name == "deferredpkg" or name.startswith("deferredpkg."):
+            del sys.modules[name]
+
+
+@pytest.fixture
+def fake_server():
+    server = FakeProdwatchServer().start()
+    yield server
+    server.stop()
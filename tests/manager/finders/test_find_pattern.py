@@ -0,0 +1,129 @@
+import sys
+import types
+import pytest
+from prodwatch.manager.finders.find_function import find_function
+from prodwatch.manager.finders.find_pattern import find_pattern, is_pattern
+from prodwatch.manager.finders.finder_result import FunctionType
+
+
+@pytest.fixture
+def billing():
+    """A module with functions and a class, removed from sys.modules after the test."""
+    module = types.ModuleType("patternpkg.billing")
+
+    def charge(amount):
+        return amount
+
+    def handle_refund():
+        pass
+
+    def _helper():
+        pass
+
+    class Invoice:
+        def total(self):
+            return 0
+
+        @classmethod
+        def create(cls):
+            return cls()
+
+        @property
+        def paid(self):
+            return False
+
+        def __repr__(self):
+            return "Invoice()"
+
+    class PaidInvoice(Invoice):
+        def handle_payment(self):
+            pass
+
+    for value in (charge, handle_refund, _helper, Invoice, PaidInvoice):
+        value.__module__ = module.__name__
+        setattr(module, value.__name__, value)
+    # Imported from elsewhere, so not the module's own
+    module.dumps = __import__("json").dumps
+    sys.modules[module.__name__] = module
+    yield module
+    del sys.modules[module.__name__]
+
+
+class TestFindPattern:
+    def test_whole_module(self, billing):
+        matches = find_pattern("patternpkg.billing.*", limit=100)
+        assert sorted(matches.targets) == [
+            "patternpkg.billing.Invoice.create",
+            "patternpkg.billing.Invoice.paid",
+            "patternpkg.billing.Invoice.total",
+            "patternpkg.billing.PaidInvoice.handle_payment",
+            "patternpkg.billing._helper",
+            "patternpkg.billing.charge",
+            "patternpkg.billing.handle_refund",
+        ]
+        assert not matches.truncated
+
+    def test_whole_class(self, billing):
+        matches = find_pattern("Invoice.*", limit=100)
+        assert sorted(matches.targets) == [
+            "patternpkg.billing.Invoice.create",
+            "patternpkg.billing.Invoice.paid",
+            "patternpkg.billing.Invoice.total",
+        ]
+        total = matches.targets["patternpkg.billing.Invoice.total"]
+        assert matches.targets["patternpkg.billing.Invoice.paid"].function_type == (
+            FunctionType.PROPERTY
+        )
+        assert total.function_type == FunctionType.METHOD
+        assert total.klass is billing.Invoice
+
+    def test_name_glob_across_modules(self, billing):
+        matches = find_pattern("*.handle_*", limit=100)
+        assert "patternpkg.billing.handle_refund" in matches.targets
+        assert "patternpkg.billing.PaidInvoice.handle_payment" in matches.targets
+        assert all(name.split(".")[-1].startswith("handle_") for name in matches.targets)
+
+    def test_results_match_the_targets(self, billing):
+        result = find_pattern("patternpkg.billing.ch?rge", limit=100).targets[
+            "patternpkg.billing.charge"
+        ]
+        assert result.module is billing
+        assert result.function is billing.charge
+        assert result.function_type == FunctionType.REGULAR
+
+    def test_same_class_name_in_two_modules(self, billing):
+        shipping = types.ModuleType("patternpkg.shipping")
+
+        class Invoice:
+            def total(self):
+                return 1
+
+        Invoice.__module__ = shipping.__name__
+        shipping.Invoice = Invoice
+        sys.modules[shipping.__name__] = shipping
+        try:
+            matches = find_pattern("Invoice.total", limit=100)
+        finally:
+            del sys.modules[shipping.__name__]
+
+        assert matches.targets["patternpkg.billing.Invoice.total"].klass is billing.Invoice
+        assert matches.targets["patternpkg.shipping.Invoice.total"].klass is Invoice
+
+    def test_targets_resolve_by_name(self, billing):
+        for name, result in find_pattern("patternpkg.billing.*", limit=100).targets.items():
+            found = find_function(name)
+            assert (found.function, found.klass) == (result.function, result.klass)
+
+    def test_limit(self, billing):
+        matches = find_pattern("patternpkg.billing.*", limit=3)
+        assert len(matches.targets) == 3
+        assert matches.truncated
+
+    def test_no_matches(self, billing):
+        assert find_pattern("patternpkg.billing.nothing_*", limit=100).targets == {}
+
+    def test_is_pattern(self):
+        assert is_pattern("mypkg.billing.*")
+        assert is_pattern("Invoice.ge?")
+        assert is_pattern("handle_[ab]")
+        assert not is_pattern("mypkg.billing.charge")
@@ -0,0 +1,202 @@
+import sys
+import types
+import importlib
+import pytest
+from prodwatch.manager.finders.find_function import find_function, find_functions
+from prodwatch.manager.finders.symbol_index import SymbolIndex
+
+
+@pytest.fixture
+def make_module():
+    """Create modules in sys.modules and remove them after the test."""
+    created = []
+
+    def make(name, **attributes):
+        module = types.ModuleType(name)
+        for key, value in attributes.items():
+            setattr(module, key, value)
+        sys.modules[name] = module
+        created.append(name)
+        return module
+
+    yield make
+    for name in created:
+        sys.modules.pop(name, None)
+
+
+def indexed_unique_function():
+    pass
+
+
+def indexed(index, name):
+    """Candidates found through the index, leaving out modules checked for every name."""
+    candidates = list(index.candidates(name))
+    dynamic = [entry.module for entry in index.dynamic]
+    return [module for module in candidates if module not in dynamic]
+
+
+class TestSymbolIndex:
+    def test_finds_modules_defining_a_name(self):
+        """Candidates include the modules that define the name"""
+        index = SymbolIndex()
+        assert indexed(index, "indexed_unique_function") == [sys.modules[__name__]]
+
+    def test_candidates_follow_sys_modules_order(self, make_module):
+        """When several modules define a name, they come back in sys.modules order"""
+        index = SymbolIndex()
+        first = make_module("symbol_index_first", shared_name=1)
+        second = make_module("symbol_index_second", shared_name=2)
+        assert indexed(index, "shared_name") == [first, second]
+
+    def test_new_modules_are_indexed_incrementally(self, make_module):
+        """Modules imported after the index was built are found"""
+        index = SymbolIndex()
+        assert indexed(index, "late_function") == []
+        module = make_module("symbol_index_late", late_function=lambda: None)
+        assert indexed(index, "late_function") == [module]
+
+    def test_attributes_added_after_indexing_are_found(self, make_module):
+        """A module whose namespace grew after indexing is re-indexed on a miss"""
+        index = SymbolIndex()
+        module = make_module("symbol_index_growing")
+        indexed(index, "anything")
+        module.added_later = lambda: None
+        assert indexed(index, "added_later") == [module]
+
+    def test_every_miss_is_checked_against_the_modules(self, make_module):
+        """A name missing from the index is looked for in the modules on every lookup"""
+        index = SymbolIndex()
+        module = make_module("symbol_index_rescanned", old_function=lambda: None)
+        indexed(index, "anything")
+        assert indexed(index, "new_function") == []
+        # Same namespace size, so only a scan can tell the name is there now
+        del module.old_function
+        module.new_function = lambda: None
+        assert indexed(index, "new_function") == [module]
+
+    def test_reloaded_modules_are_found(self, tmp_path, monkeypatch):
+        """Names a reload adds to a module are found right away"""
+        monkeypatch.syspath_prepend(str(tmp_path))
+        source = tmp_path / "symbol_index_reloaded.py"
+        source.write_text("def before_reload():\n    pass\n")
+        module = importlib.import_module("symbol_index_reloaded")
+        try:
+            index = SymbolIndex()
+            assert indexed(index, "before_reload") == [module]
+            assert indexed(index, "after_reload") == []
+            source.write_text("def after_reload():\n    pass\n")
+            importlib.invalidate_caches()
+            importlib.reload(module)
+            assert indexed(index, "after_reload") == [module]
+            result = find_function("after_reload", index.candidates)
+            assert result.found
+            assert result.module is module
+        finally:
+            sys.modules.pop("symbol_index_reloaded", None)
+
+    def test_removed_modules_are_dropped(self, make_module):
+        """Modules removed from sys.modules are no longer candidates"""
+        index = SymbolIndex()
+        make_module("symbol_index_removed", removed_function=lambda: None)
+        assert len(indexed(index, "removed_function")) == 1
+        del sys.modules["symbol_index_removed"]
+        assert indexed(index, "removed_function") == []
+
+    def test_replaced_modules_are_reindexed(self, make_module):
+        """A module replaced in sys.modules is indexed again"""
+        index = SymbolIndex()
+        make_module("symbol_index_replaced", old_function=lambda: None)
+        indexed(index, "old_function")
+        replacement = make_module("symbol_index_replaced", new_function=lambda: None)
+        assert indexed(index, "new_function") == [replacement]
+
+    def test_replacement_is_found_for_names_both_define(self, make_module):
+        """Replacing a module leaves sys.modules the same size, and the old one must not be used"""
+        index = SymbolIndex()
+        first = make_module("symbol_index_swapped_first", swapped_function=lambda: "first")
+        make_module("symbol_index_swapped", swapped_function=lambda: "old")
+        indexed(index, "swapped_function")
+        replacement = make_module("symbol_index_swapped", swapped_function=lambda: "new")
+        assert indexed(index, "swapped_function") == [first, replacement]
+
+    def test_modules_with_getattr_are_always_candidates(self, make_module):
+        """Modules that resolve attributes dynamically are checked for every name"""
+        index = SymbolIndex()
+        lazy = make_module("symbol_index_lazy", __getattr__=lambda name: None)
+        assert lazy in list(index.candidates("anything_at_all"))
+
+    def test_non_identifiers_have_no_candidates(self):
+        index = SymbolIndex()
+        assert list(index.candidates("a.b")) == []
+
+    def test_batch_misses_scan_once(self, make_module):
+        """Several names missing from the index cost one scan between them"""
+        index = SymbolIndex()
+        module = make_module("symbol_index_batch")
+        indexed(index, "anything")
+        module.first_added = module.second_added = lambda: None
+        scan = index.scan
+        scans = []
+
+        def counting_scan(attributes):
+            scans.append(attributes)
+            scan(attributes)
+
+        index.scan = counting_scan
+        found = index.candidates_for(["first_added", "second_added", "a.b"])
+        assert module in found["first_added"]
+        assert module in found["second_added"]
+        assert found["a.b"] == []
+        assert scans == [["first_added", "second_added"]]
+
+
+class TestFindFunctionWithIndex:
+    def test_first_module_wins(self, make_module):
+        """find_function resolves to the first module in sys.modules order"""
+        make_module("symbol_index_winner", contested_function=lambda: "first")
+        make_module("symbol_index_loser", contested_function=lambda: "second")
+        result = find_function("contested_function")
+        assert result.module.__name__ == "symbol_index_winner"
+
+    def test_class_in_new_module(self, make_module):
+        """Classes in modules loaded after the first lookup are found"""
+        find_function("indexed_unique_function")
+
+        class LateClass:
+            def method(self):
+                pass
+
+        make_module("symbol_index_classes", LateClass=LateClass)
+        result = find_function("LateClass.method")
+        assert result.found
+        assert result.klass is LateClass
+
+    def test_find_functions_matches_find_function(self, make_module):
+        """A batch resolves each name the same way find_function does"""
+
+        class BatchClass:
+            def first(self):
+                pass
+
+            @property
+            def second(self):
+                return 1
+
+        make_module("symbol_index_batch_classes", BatchClass=BatchClass, batch_function=len)
+        names = [
+            "BatchClass.first",
+            "BatchClass.second",
+            "batch_function",
+            "symbol_index_batch_classes.batch_function",
+            "BatchClass.missing",
+            "BatchClass.first",
+        ]
+        results = find_functions(names)
+        assert list(results) == names[:5]
+        for name, result in results.items():
+            expected = find_function(name)
+            assert (result.found, result.function, result.function_type) == (
+                expected.found,
+                expected.function,
+                expected.function_type,
+            )
@@ -0,0 +1,75 @@
+import threading
+
+from prodwatch.manager.aggregation import FunctionAggregate
+
+
+class TestFunctionAggregate:
+    """Calls are summarized instead of reported one by one."""
+
+    def test_accepts_logging_callback_arguments(self):
+        aggregate = FunctionAggregate("func")
+        aggregate("func", [object()], {"k": object()}, execution_time_ms=2.0)
+        aggregate("func", [], {}, execution_time_ms=4.0, error="boom")
+
+        summary = aggregate.collect()
+
+        assert summary["function_name"] == "func"
+        assert summary["calls"] == 2
+        assert summary["errors"] == 1
+        assert summary["execution_time_ms"]["histogram"]["sum"] == 6.0
+
+    def test_collect_starts_a_new_interval(self):
+        aggregate = FunctionAggregate("func")
+        aggregate.record(1.0)
+
+        first = aggregate.collect()
+        aggregate.record(2.0, failed=True)
+        second = aggregate.collect()
+
+        assert first["calls"] == 1
+        assert first["errors"] == 0
+        assert second["calls"] == 1
+        assert second["errors"] == 1
+        assert second["interval_start"] == first["interval_end"]
+
+    def test_concurrent_collects_count_every_call_once(self):
+        aggregate = FunctionAggregate("func")
+        summaries = []
+
+        def collect():
+            for _ in range(200):
+                aggregate.record(1.0)
+                summaries.append(aggregate.collect())
+
+        threads = [threading.Thread(target=collect) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        summaries.append(aggregate.collect())
+
+        assert sum(summary["calls"] for summary in summaries if summary) == 800
+
+    def test_collect_without_calls_returns_none(self):
+        aggregate = FunctionAggregate("func")
+        assert aggregate.collect() is None
+
+    def test_histograms_are_reused(self):
+        aggregate = FunctionAggregate("func")
+        histograms = {id(aggregate.histogram), id(aggregate.spare)}
+
+        for _ in range(3):
+            aggregate.record(1.0)
+            aggregate.collect()
+
+        assert {id(aggregate.histogram), id(aggregate.spare)} == histograms
+
+    def test_summary_quantiles(self):
+        aggregate = FunctionAggregate("func")
+        for value in range(1, 101):
+            aggregate.record(float(value))
+
+        timings = aggregate.collect()["execution_time_ms"]
+
+        assert abs(timings["p50"] - 50) / 50 < 0.03
+        assert abs(timings["p99"] - 99) / 99 < 0.03
@@ -0,0 +1,123 @@
+import pytest
+from unittest.mock import Mock, patch
+from requests.exceptions import ConnectionError
+from prodwatch.exceptions import CircuitOpenError
+from prodwatch.manager.circuit_breaker import BreakerSession, BreakerState, CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def breaker(clock, jitter=1.0, **kwargs):
+    return CircuitBreaker(clock=clock, jitter=lambda: jitter, **kwargs)
+
+
+class TestCircuitBreaker:
+    def test_opens_after_consecutive_failures(self, clock):
+        circuit = breaker(clock, failure_threshold=3)
+        for _ in range(2):
+            assert circuit.allow()
+            circuit.record_failure("down")
+        assert circuit.state is BreakerState.CLOSED
+
+        circuit.record_failure("down")
+        assert circuit.state is BreakerState.OPEN
+        assert not circuit.allow()
+        assert circuit.stats()["rejected"] == 1
+
+    def test_success_resets_failure_count(self, clock):
+        circuit = breaker(clock, failure_threshold=2)
+        circuit.record_failure("down")
+        circuit.record_success()
+        circuit.record_failure("down")
+        assert circuit.state is BreakerState.CLOSED
+
+    def test_half_open_allows_one_probe(self, clock):
+        circuit = breaker(clock, failure_threshold=1, backoff=1.0)
+        circuit.record_failure("down")
+
+        clock.now = 1.0
+        assert circuit.allow()
+        assert circuit.state is BreakerState.HALF_OPEN
+        assert not circuit.allow()
+
+        circuit.record_success()
+        assert circuit.state is BreakerState.CLOSED
+        assert circuit.allow()
+
+    def test_failed_probe_doubles_backoff(self, clock):
+        circuit = breaker(clock, failure_threshold=1, backoff=1.0, max_backoff=3.0)
+        circuit.record_failure("down")
+        retries = []
+        for _ in range(4):
+            retries.append(circuit.retry_at - clock.now)
+            clock.now = circuit.retry_at
+            assert circuit.allow()
+            circuit.record_failure("still down")
+
+        assert retries == [1.0, 2.0, 3.0, 3.0]
+        assert circuit.stats()["opened"] == 5
+
+    def test_backoff_is_jittered(self, clock):
+        circuit = breaker(clock, jitter=0.0, failure_threshold=1, backoff=4.0)
+        circuit.record_failure("down")
+        assert circuit.retry_at == 2.0
+
+    def test_stats(self, clock):
+        circuit = breaker(clock, failure_threshold=1, backoff=2.0)
+        assert circuit.stats()["state"] == "closed"
+        assert circuit.stats()["retry_in"] is None
+
+        circuit.record_failure("Status 503")
+        clock.now = 0.5
+        stats = circuit.stats()
+        assert stats["state"] == "open"
+        assert stats["retry_in"] == 1.5
+        assert stats["last_error"] == "Status 503"
+
+    def test_invalid_settings(self):
+        with pytest.raises(ValueError):
+            CircuitBreaker(failure_threshold=0)
+        with pytest.raises(ValueError):
+            CircuitBreaker(backoff=10.0, max_backoff=1.0)
+
+
+class TestBreakerSession:
+    def test_default_timeout(self):
+        session = BreakerSession(CircuitBreaker(), timeout=(1.0, 2.0))
+        with patch("requests.Session.request", return_value=Mock(status_code=200)) as request:
+            session.get("http://test-server.com/")
+            session.post("http://test-server.com/", timeout=5)
+
+        assert request.call_args_list[0].kwargs["timeout"] == (1.0, 2.0)
+        assert request.call_args_list[1].kwargs["timeout"] == 5
+
+    def test_open_breaker_skips_the_network(self):
+        session = BreakerSession(CircuitBreaker(failure_threshold=2))
+        with patch("requests.Session.request", side_effect=ConnectionError("refused")) as request:
+            for _ in range(2):
+                with pytest.raises(ConnectionError):
+                    session.get("http://test-server.com/")
+            with pytest.raises(CircuitOpenError):
+                session.get("http://test-server.com/")
+
+        assert request.call_count == 2
+
+    @pytest.mark.parametrize(
+        "status_code, failed", [(200, False), (404, False), (429, True), (503, True)]
+    )
+    def test_failing_statuses(self, status_code, failed):
+        session = BreakerSession(CircuitBreaker(failure_threshold=1))
+        with patch("requests.Session.request", return_value=Mock(status_code=status_code)):
+            session.get("http://test-server.com/")
+        assert (session.breaker.state is BreakerState.OPEN) == failed
@@ -0,0 +1,118 @@
+import threading
+from prodwatch.manager.event_buffer import RingBuffer, ShardedEventBuffer
+
+
+class TestRingBuffer:
+    """Events are stored in preallocated slots."""
+
+    def test_capacity_rounds_up_to_power_of_two(self):
+        assert RingBuffer(1000).capacity == 1024
+        assert RingBuffer(1024).capacity == 1024
+        assert RingBuffer(1).capacity == 1
+
+    def test_push_and_drain_in_order(self):
+        ring = RingBuffer(4)
+        for i in range(3):
+            assert ring.push({"i": i})
+
+        assert len(ring) == 3
+        assert ring.drain(10) == [{"i": 0}, {"i": 1}, {"i": 2}]
+        assert len(ring) == 0
+
+    def test_drain_respects_limit(self):
+        ring = RingBuffer(4)
+        for i in range(4):
+            ring.push({"i": i})
+
+        assert ring.drain(3) == [{"i": 0}, {"i": 1}, {"i": 2}]
+        assert ring.drain(3) == [{"i": 3}]
+
+    def test_full_ring_drops_events(self):
+        ring = RingBuffer(2)
+        assert ring.push({"i": 0})
+        assert ring.push({"i": 1})
+        assert not ring.push({"i": 2})
+
+        assert ring.dropped == 1
+        assert ring.drain(10) == [{"i": 0}, {"i": 1}]
+
+    def test_wraps_around(self):
+        ring = RingBuffer(2)
+        for i in range(10):
+            assert ring.push({"i": i})
+            assert ring.drain(1) == [{"i": i}]
+
+    def test_drained_slots_are_released(self):
+        ring = RingBuffer(2)
+        ring.push({"i": 0})
+        ring.drain(1)
+        assert ring.slots == [None, None]
+
+
+class TestShardedEventBuffer:
+    """Each thread appends to its own shard."""
+
+    def test_one_shard_per_thread(self):
+        buffer = ShardedEventBuffer(shard_capacity=8)
+        barrier = threading.Barrier(3)
+
+        def produce():
+            buffer.append({"thread": threading.get_ident()})
+            barrier.wait()
+
+        threads = [threading.Thread(target=produce) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert buffer.pending() == 3
+        assert len(buffer.drain(10)) == 3
+
+    def test_same_thread_reuses_shard(self):
+        buffer = ShardedEventBuffer()
+        buffer.append({"i": 0})
+        buffer.append({"i": 1})
+
+        assert len(buffer.shards) == 1
+        assert buffer.pending() == 2
+
+    def test_dead_thread_shards_are_pruned_once_empty(self):
+        buffer = ShardedEventBuffer(shard_capacity=1)
+
+        def produce():
+            buffer.append({"i": 0})
+            buffer.append({"i": 1})  # dropped
+
+        thread = threading.Thread(target=produce)
+        thread.start()
+        thread.join()
+
+        assert len(buffer.shards) == 1
+        assert buffer.drain(10) == [{"i": 0}]
+        assert buffer.shards == []
+        assert buffer.dropped_events == 1
+
+    def test_drain_visits_shards_round_robin(self):
+        buffer = ShardedEventBuffer()
+        ready = threading.Event()
+        done = threading.Event()
+
+        def produce():
+            for i in range(5):
+                buffer.append({"source": "other", "i": i})
+            ready.set()
+            done.wait()
+
+        thread = threading.Thread(target=produce)
+        thread.start()
+        ready.wait()
+        for i in range(5):
+            buffer.append({"source": "main", "i": i})
+
+        first = buffer.drain(2)
+        second = buffer.drain(2)
+        done.set()
+        thread.join()
+
+        assert {e["source"] for e in first} != {e["source"] for e in second}
@@ -0,0 +1,130 @@
+import time
+import threading
+import pytest
+from prodwatch.manager.event_shipper import EventShipper
+
+
+class RecordingSender:
+    def __init__(self):
+        self.batches = []
+        self.sent = threading.Event()
+
+    def __call__(self, batch):
+        self.batches.append(list(batch))
+        self.sent.set()
+
+
+class TestEventShipperBuffering:
+    """Events are buffered without blocking."""
+
+    def test_enqueue_and_flush(self):
+        sender = RecordingSender()
+        shipper = EventShipper(sender, batch_size=2)
+
+        for i in range(5):
+            assert shipper.enqueue({"i": i}) is True
+
+        assert shipper.flush() == 5
+        assert [len(batch) for batch in sender.batches] == [2, 2, 1]
+        assert [e["i"] for batch in sender.batches for e in batch] == [0, 1, 2, 3, 4]
+
+    def test_full_buffer_drops_events(self):
+        shipper = EventShipper(RecordingSender(), buffer_size=2)
+
+        assert shipper.enqueue({"i": 0}) is True
+        assert shipper.enqueue({"i": 1}) is True
+        assert shipper.enqueue({"i": 2}) is False
+
+        assert shipper.dropped_events == 1
+        assert shipper.pending() == 2
+
+    def test_events_from_many_threads_are_all_shipped(self):
+        sender = RecordingSender()
+        shipper = EventShipper(sender, batch_size=50)
+
+        def produce(thread_index):
+            for i in range(100):
+                shipper.enqueue({"thread": thread_index, "i": i})
+
+        threads = [threading.Thread(target=produce, args=(t,)) for t in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert shipper.flush() == 800
+        events = [e for batch in sender.batches for e in batch]
+        for thread_index in range(8):
+            sequence = [e["i"] for e in events if e["thread"] == thread_index]
+            assert sequence == list(range(100))
+
+    def test_send_errors_are_logged(self):
+        def failing_sender(batch):
+            raise Exception("Server down")
+
+        shipper = EventShipper(failing_sender)
+        shipper.enqueue({"i": 0})
+
+        # Should not raise
+        assert shipper.flush() == 1
+
+    def test_invalid_batch_size(self):
+        with pytest.raises(ValueError):
+            EventShipper(RecordingSender(), batch_size=0)
+
+
+class TestEventShipperThread:
+    """The flusher thread ships batches on size or time."""
+
+    def test_flushes_on_batch_size(self):
+        sender = RecordingSender()
+        shipper = EventShipper(sender, batch_size=3, linger=10.0)
+        shipper.start()
+        try:
+            for i in range(3):
+                shipper.enqueue({"i": i})
+            assert sender.sent.wait(timeout=2.0)
+            assert len(sender.batches[0]) == 3
+        finally:
+            shipper.flush_on_shutdown = False
+            shipper.stop()
+
+    def test_flushes_on_linger(self):
+        sender = RecordingSender()
+        shipper = EventShipper(sender, batch_size=100, linger=0.05)
+        shipper.start()
+        try:
+            start = time.monotonic()
+            shipper.enqueue({"i": 0})
+            assert sender.sent.wait(timeout=2.0)
+            assert time.monotonic() - start < 1.0
+            assert sender.batches == [[{"i": 0}]]
+        finally:
+            shipper.stop()
+
+    def test_stop_flushes_remaining_events(self):
+        sender = RecordingSender()
+        shipper = EventShipper(sender, batch_size=100, linger=0.05)
+        shipper.start()
+        shipper.active = False
+        shipper.flusher_thread.join()
+        shipper.active = True
+
+        shipper.enqueue({"i": 0})
+        shipper.stop()
+
+        assert sender.batches == [[{"i": 0}]]
+
+    def test_stop_without_flush_keeps_events(self):
+        sender = RecordingSender()
+        shipper = EventShipper(sender, linger=0.05, flush_on_shutdown=False)
+        shipper.start()
+        shipper.active = False
+        shipper.flusher_thread.join()
+        shipper.active = True
+
+        shipper.enqueue({"i": 0})
+        shipper.stop()
+
+        assert sender.batches == []
+        assert shipper.pending() == 1
@@ -0,0 +1,41 @@
+import pytest
+from prodwatch.manager.expiry import CallLimit, WatchLimits
+
+
+class TestWatchLimits:
+    def test_from_dict(self):
+        limits = WatchLimits.from_dict({"max_calls": "10", "max_duration": 1.5, "max_bytes": 2048})
+        assert limits == WatchLimits(max_calls=10, max_duration=1.5, max_bytes=2048)
+
+    def test_missing_limits_are_none(self):
+        assert WatchLimits.from_dict({"max_calls": 5}) == WatchLimits(max_calls=5)
+
+    @pytest.mark.parametrize(
+        "data",
+        [{"max_calls": 0}, {"max_duration": -1}, {"max_bytes": "lots"}, {"max_calls": [1]}, [5]],
+    )
+    def test_invalid_limits(self, data):
+        with pytest.raises(ValueError):
+            WatchLimits.from_dict(data)
+
+
+class TestCallLimit:
+    def test_admits_up_to_the_limit(self):
+        """The last allowed call is admitted and triggers expiry exactly once"""
+        exhausted = []
+        limit = CallLimit(3, lambda: exhausted.append(True))
+
+        assert [limit.admit() for _ in range(5)] == [True, True, True, False, False]
+        assert exhausted == [True]
+
+    def test_count_taken_past_zero_by_a_race_still_expires(self):
+        """A call whose decrement another thread overtook still triggers expiry"""
+        exhausted = []
+        limit = CallLimit(1, lambda: exhausted.append(True))
+        # Another thread has decremented but not yet compared
+        limit.remaining -= 1
+
+        assert limit.admit() is True
+        assert exhausted == [True]
+        assert limit.admit() is False
+        assert exhausted == [True]
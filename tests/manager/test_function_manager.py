@@ -1,10 +1,24 @@
+import time
+from prodwatch.manager.expiry import ExpiryReason, WatchLimits
 from prodwatch.manager.function_manager import FunctionManager
+from prodwatch.manager.sampling import SamplingMode, SamplingPolicy
+from prodwatch.manager.watch_request import WatchMode, WatchOptions, WatchRequest
 
 
 def sample_function():
     return "test result"
 
 
+def sampled_function():
+    return "sampled"
+
+
+def summarized_function(fail=False):
+    if fail:
+        raise ValueError("failed")
+    return "summarized"
+
+
 def sample_function_with_args(arg1, arg2, kwarg1=None):
     return f"test result with {arg1}, {arg2}, {kwarg1}"
 
@@ -78,3 +92,439 @@ class TestFunctionWatcher:
         # The function should still work even if reporting fails
         result = sample_function()
         assert result == "test result"
+
+    def test_watch_function_with_sampling(self, fake_logger):
+        calls = []
+
+        def log_function_call(function_name, args, kwargs, execution_time_ms, error=None, sample_weight=1.0):
+            calls.append(sample_weight)
+
+        watcher = FunctionManager(log_function_call)
+        options = WatchOptions(sampling=SamplingPolicy(mode=SamplingMode.FIXED, rate=5))
+
+        success, _ = watcher.watch_function("sampled_function", options)
+        assert success is True
+
+        for _ in range(10):
+            assert sampled_function() == "sampled"
+
+        assert calls == [5.0, 5.0]
+        assert "sampled_function" in watcher.samplers
+
+    def test_watch_function_in_histogram_mode(self, fake_logger):
+        log_function_call, calls = fake_logger
+        watcher = FunctionManager(log_function_call)
+
+        success, _ = watcher.watch_function(
+            "summarized_function", WatchOptions(mode=WatchMode.HISTOGRAM)
+        )
+        assert success is True
+
+        summarized_function()
+        summarized_function()
+        try:
+            summarized_function(fail=True)
+        except ValueError:
+            pass
+
+        # Calls are aggregated rather than logged individually
+        assert calls == []
+        summary = watcher.aggregates["summarized_function"].collect()
+        assert summary["calls"] == 3
+        assert summary["errors"] == 1
+
+
+def restorable_function(x):
+    return x * 2
+
+
+class RestorableBase:
+    def inherited_method(self):
+        return "inherited"
+
+
+class Restorable(RestorableBase):
+    def __init__(self):
+        self._value = 1
+
+    def instance_method(self, x):
+        return x + 1
+
+    @classmethod
+    def restorable_classmethod(cls, x):
+        return (cls.__name__, x)
+
+    @staticmethod
+    def restorable_staticmethod(x):
+        return x * 3
+
+    @property
+    def value(self):
+        """The value."""
+        return self._value
+
+    @value.setter
+    def value(self, new_value):
+        self._value = new_value
+
+
+class TestUnwatch:
+    def test_unwatch_restores_function(self, fake_logger):
+        """Unwatching puts back the exact original function"""
+        log_function_call, calls = fake_logger
+        original = restorable_function
+        manager = FunctionManager(log_function_call)
+
+        manager.watch_function("restorable_function")
+        assert globals()["restorable_function"] is not original
+
+        assert manager.unwatch_function("restorable_function") is True
+        assert globals()["restorable_function"] is original
+        restorable_function(1)
+        assert calls == []
+
+    def test_watch_functions_in_one_call(self, fake_logger):
+        """A batch of watches is applied together and reports each outcome in order"""
+        log_function_call, calls = fake_logger
+        manager = FunctionManager(log_function_call)
+        requests = [
+            WatchRequest("Restorable.instance_method"),
+            WatchRequest("no_such_function_anywhere"),
+            WatchRequest("Restorable.value"),
+        ]
+
+        outcomes = manager.watch_functions(requests)
+        try:
+            assert [success for success, _ in outcomes] == [True, False, True]
+            assert Restorable().instance_method(1) == 2
+            assert Restorable().value == 1
+            assert [call["function_name"] for call in calls] == [
+                "Restorable.instance_method",
+                "Restorable.value",
+            ]
+        finally:
+            manager.unwatch_function("Restorable.instance_method")
+            manager.unwatch_function("Restorable.value")
+
+    def test_unwatch_unknown_function(self, fake_logger):
+        log_function_call, _ = fake_logger
+        assert FunctionManager(log_function_call).unwatch_function("never_watched") is False
+
+    def test_classmethod_keeps_descriptor_type(self, fake_logger):
+        """A watched classmethod still receives the class, from the class and instances"""
+        log_function_call, calls = fake_logger
+        original = Restorable.__dict__["restorable_classmethod"]
+        manager = FunctionManager(log_function_call)
+
+        manager.watch_function("Restorable.restorable_classmethod")
+        assert isinstance(Restorable.__dict__["restorable_classmethod"], classmethod)
+        assert Restorable.restorable_classmethod(1) == ("Restorable", 1)
+        assert Restorable().restorable_classmethod(2) == ("Restorable", 2)
+        assert len(calls) == 2
+
+        manager.unwatch_function("Restorable.restorable_classmethod")
+        assert Restorable.__dict__["restorable_classmethod"] is original
+
+    def test_staticmethod_round_trip(self, fake_logger):
+        log_function_call, calls = fake_logger
+        original = Restorable.__dict__["restorable_staticmethod"]
+        manager = FunctionManager(log_function_call)
+
+        manager.watch_function("Restorable.restorable_staticmethod")
+        assert isinstance(Restorable.__dict__["restorable_staticmethod"], staticmethod)
+        assert Restorable().restorable_staticmethod(2) == 6
+        assert calls[0]["args"] == ["2"]
+
+        manager.unwatch_function("Restorable.restorable_staticmethod")
+        assert Restorable.__dict__["restorable_staticmethod"] is original
+
+    def test_specialized_wrappers_round_trip(self, fake_logger):
+        """Specialized wrappers take the original parameters and unwatch like the generic ones"""
+        log_function_call, calls = fake_logger
+        original_function = restorable_function
+        original_classmethod = Restorable.__dict__["restorable_classmethod"]
+        manager = FunctionManager(log_function_call, specialize_wrappers=True)
+
+        manager.watch_function("restorable_function")
+        manager.watch_function("Restorable.restorable_classmethod")
+        assert globals()["restorable_function"].__code__.co_varnames[:1] == ("x",)
+        assert isinstance(Restorable.__dict__["restorable_classmethod"], classmethod)
+        assert restorable_function(x=2) == 4
+        assert Restorable.restorable_classmethod(1) == ("Restorable", 1)
+        assert [call["args"] for call in calls] == [["2"], ["<class 'Restorable'>", "1"]]
+
+        manager.unwatch_function("restorable_function")
+        manager.unwatch_function("Restorable.restorable_classmethod")
+        assert globals()["restorable_function"] is original_function
+        assert Restorable.__dict__["restorable_classmethod"] is original_classmethod
+
+    def test_property_round_trip(self, fake_logger):
+        """A watched property keeps its setter and docstring, and is restored exactly"""
+        log_function_call, calls = fake_logger
+        original = Restorable.__dict__["value"]
+        manager = FunctionManager(log_function_call)
+
+        manager.watch_function("Restorable.value")
+        instance = Restorable()
+        instance.value = 5
+        assert instance.value == 5
+        assert Restorable.__dict__["value"].__doc__ == "The value."
+        assert len(calls) == 1
+
+        manager.unwatch_function("Restorable.value")
+        assert Restorable.__dict__["value"] is original
+
+    def test_inherited_method_is_removed_from_subclass(self, fake_logger):
+        """Unwatching an inherited method removes the override instead of copying the base's"""
+        log_function_call, _ = fake_logger
+        manager = FunctionManager(log_function_call)
+
+        manager.watch_function("Restorable.inherited_method")
+        assert "inherited_method" in Restorable.__dict__
+        assert Restorable().inherited_method() == "inherited"
+
+        manager.unwatch_function("Restorable.inherited_method")
+        assert "inherited_method" not in Restorable.__dict__
+
+    def test_double_watch_does_not_stack(self, fake_logger):
+        """Watching twice logs each call once and one unwatch restores the original"""
+        log_function_call, calls = fake_logger
+        original = Restorable.__dict__["instance_method"]
+        manager = FunctionManager(log_function_call)
+
+        manager.watch_function("Restorable.instance_method")
+        manager.watch_function("Restorable.instance_method")
+        assert Restorable().instance_method(1) == 2
+        assert len(calls) == 1
+
+        manager.unwatch_function("Restorable.instance_method")
+        assert Restorable.__dict__["instance_method"] is original
+
+    def test_watch_unwatch_cycles(self, fake_logger):
+        log_function_call, calls = fake_logger
+        original = restorable_function
+        manager = FunctionManager(log_function_call)
+
+        for _ in range(3):
+            manager.watch_function("restorable_function")
+            assert restorable_function(2) == 4
+            manager.unwatch_function("restorable_function")
+            assert globals()["restorable_function"] is original
+        assert len(calls) == 3
+
+    def test_same_function_under_two_names(self, fake_logger):
+        """A second name for an already-watched function replaces the first watch"""
+        log_function_call, calls = fake_logger
+        original = restorable_function
+        manager = FunctionManager(log_function_call)
+
+        manager.watch_function("restorable_function")
+        manager.watch_function(f"{__name__}.restorable_function")
+        restorable_function(1)
+        assert [call["function_name"] for call in calls] == [f"{__name__}.restorable_function"]
+        assert not manager.is_watched("restorable_function")
+
+        manager.unwatch_function(f"{__name__}.restorable_function")
+        assert globals()["restorable_function"] is original
+
+    def test_replacement_by_someone_else_is_kept(self, fake_logger):
+        """When the wrapper was replaced after watching, unwatch leaves the replacement alone"""
+        log_function_call, _ = fake_logger
+        original = restorable_function
+        manager = FunctionManager(log_function_call)
+
+        manager.watch_function("restorable_function")
+        replacement = lambda x: x  # noqa: E731
+        globals()["restorable_function"] = replacement
+        try:
+            manager.unwatch_function("restorable_function")
+            assert globals()["restorable_function"] is replacement
+        finally:
+            globals()["restorable_function"] = original
+
+    def test_unwatch_flushes_reservoir(self, fake_logger):
+        """Calls held in a reservoir are reported when the watch is removed"""
+        log_function_call, calls = fake_logger
+        manager = FunctionManager(log_function_call)
+        options = WatchOptions(
+            sampling=SamplingPolicy(mode=SamplingMode.RESERVOIR, size=5, interval=3600)
+        )
+
+        manager.watch_function("restorable_function", options)
+        restorable_function(1)
+        assert calls == []
+
+        manager.unwatch_function("restorable_function")
+        assert len(calls) == 1
+        assert "restorable_function" not in manager.samplers
+
+
+def expiring_function(x):
+    return x
+
+
+class TestExpiry:
+    def watch(self, fake_logger, **limits):
+        log_function_call, calls = fake_logger
+        manager = FunctionManager(log_function_call)
+        manager.watch_function("expiring_function", WatchOptions(limits=WatchLimits(**limits)))
+        return manager, calls
+
+    def test_max_calls_restores_original(self, fake_logger):
+        """After max_calls calls the watch removes itself and reports why"""
+        original = expiring_function
+        manager, calls = self.watch(fake_logger, max_calls=3)
+
+        for i in range(5):
+            expiring_function(i)
+
+        assert len(calls) == 3
+        assert globals()["expiring_function"] is original
+        expired = manager.take_expired()
+        assert [(e.function_name, e.reason) for e in expired] == [
+            ("expiring_function", ExpiryReason.MAX_CALLS)
+        ]
+        assert manager.take_expired() == []
+
+    def test_max_duration(self, fake_logger, monkeypatch):
+        original = expiring_function
+        manager, _ = self.watch(fake_logger, max_duration=60)
+
+        manager.expire_overdue()
+        assert manager.is_watched("expiring_function")
+
+        now = time.monotonic()
+        monkeypatch.setattr(time, "monotonic", lambda: now + 61)
+        manager.expire_overdue()
+        assert globals()["expiring_function"] is original
+        assert manager.take_expired()[0].reason == ExpiryReason.MAX_DURATION
+
+    def test_max_bytes(self, fake_logger):
+        original = expiring_function
+        manager, _ = self.watch(fake_logger, max_bytes=1000)
+        assert manager.byte_limited_functions() == {"expiring_function"}
+
+        manager.charge_bytes("expiring_function", 600)
+        assert manager.is_watched("expiring_function")
+        manager.charge_bytes("expiring_function", 600)
+        assert globals()["expiring_function"] is original
+        assert manager.take_expired()[0].reason == ExpiryReason.MAX_BYTES
+
+    def test_expired_call_limit_does_not_remove_a_newer_watch(self, fake_logger):
+        """A rewatch gets its own limits; the old counter can't expire it"""
+        manager, _ = self.watch(fake_logger, max_calls=1)
+        old_limit_wrapper = globals()["expiring_function"]
+        manager.watch_function("expiring_function")
+
+        old_limit_wrapper(1)
+
+        assert manager.is_watched("expiring_function")
+        assert manager.take_expired() == []
+        manager.unwatch_function("expiring_function")
+
+    def test_histogram_aggregate_is_kept_for_final_summary(self, fake_logger):
+        log_function_call, _ = fake_logger
+        manager = FunctionManager(log_function_call)
+        manager.watch_function(
+            "expiring_function",
+            WatchOptions(mode=WatchMode.HISTOGRAM, limits=WatchLimits(max_calls=1)),
+        )
+
+        expiring_function(1)
+
+        (expired,) = manager.take_expired()
+        assert expired.aggregate.collect()["calls"] == 1
+
+
+class PatternService:
+    def first(self, x):
+        return x
+
+    def second(self, x):
+        return x * 2
+
+    @property
+    def label(self):
+        return "service"
+
+
+class TestPatternWatch:
+    def test_pattern_is_watched_as_a_group(self, fake_logger):
+        log_function_call, calls = fake_logger
+        originals = dict(vars(PatternService))
+        manager = FunctionManager(log_function_call)
+
+        watch = manager.watch_pattern("PatternService.*", None, max_targets=10)
+        assert sorted(watch.targets) == [
+            f"{__name__}.PatternService.first",
+            f"{__name__}.PatternService.label",
+            f"{__name__}.PatternService.second",
+        ]
+        service = PatternService()
+        assert (service.first(1), service.second(1), service.label) == (1, 2, "service")
+        assert len(calls) == 3
+
+        assert manager.unwatch_function("PatternService.*") is True
+        for name in ("first", "second", "label"):
+            assert vars(PatternService)[name] is originals[name]
+        assert manager.groups == {}
+        assert manager.watches == {}
+
+    def test_too_many_targets(self, fake_logger):
+        log_function_call, _ = fake_logger
+        manager = FunctionManager(log_function_call)
+        watch = manager.watch_pattern("PatternService.*", None, max_targets=2)
+        assert watch.too_many
+        assert watch.targets == []
+        assert manager.watches == {}
+
+    def test_watched_targets_are_left_alone(self, fake_logger):
+        log_function_call, _ = fake_logger
+        manager = FunctionManager(log_function_call)
+        manager.watch_function("PatternService.first")
+        try:
+            watch = manager.watch_pattern("PatternService.*", None, max_targets=10)
+            assert f"{__name__}.PatternService.first" not in watch.targets
+            manager.unwatch_function("PatternService.*")
+            assert manager.is_watched("PatternService.first")
+        finally:
+            manager.unwatch_function("PatternService.first")
+
+    def test_group_is_dropped_when_its_last_target_is_removed(self, fake_logger):
+        log_function_call, _ = fake_logger
+        manager = FunctionManager(log_function_call)
+        watch = manager.watch_pattern("PatternService.*", None, max_targets=10)
+        first, *others = watch.targets
+        for function_name in others:
+            manager.unwatch_function(function_name)
+        assert manager.groups == {"PatternService.*": [first]}
+
+        # Watching the last target on its own takes it out of the group
+        manager.watch_function("PatternService.first")
+        try:
+            assert manager.groups == {}
+            assert manager.group_of == {}
+        finally:
+            manager.unwatch_function("PatternService.first")
+
+    def test_group_expires_with_its_last_target(self, fake_logger):
+        log_function_call, _ = fake_logger
+        manager = FunctionManager(log_function_call)
+        manager.watch_pattern(
+            "PatternService.*", WatchOptions(limits=WatchLimits(max_calls=1)), max_targets=10
+        )
+        service = PatternService()
+        service.first(1)
+        service.second(1)
+        assert [e.function_name for e in manager.take_expired()] == [
+            f"{__name__}.PatternService.first",
+            f"{__name__}.PatternService.second",
+        ]
+        assert manager.groups == {"PatternService.*": [f"{__name__}.PatternService.label"]}
+
+        service.label
+        assert [e.function_name for e in manager.take_expired()] == [
+            f"{__name__}.PatternService.label",
+            "PatternService.*",
+        ]
+        assert manager.groups == {}
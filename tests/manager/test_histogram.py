@@ -0,0 +1,94 @@
+import random
+import pytest
+from prodwatch.manager.histogram import LatencyHistogram
+
+
+class TestLatencyHistogram:
+    """Durations are recorded into fixed log-spaced buckets."""
+
+    def test_empty_histogram(self):
+        histogram = LatencyHistogram()
+        assert histogram.count == 0
+        assert histogram.quantile(0.5) == 0.0
+
+    def test_fixed_memory(self):
+        histogram = LatencyHistogram(relative_accuracy=0.02)
+        size = len(histogram.buckets)
+        for value in [0.0001, 1.0, 1e9]:
+            histogram.record(value)
+        assert len(histogram.buckets) == size
+        assert size < 1000
+
+    def test_quantiles_within_relative_accuracy(self):
+        histogram = LatencyHistogram(relative_accuracy=0.02)
+        rng = random.Random(42)
+        values = sorted(rng.lognormvariate(1, 2) for _ in range(10_000))
+        for value in values:
+            histogram.record(value)
+
+        for q in [0.5, 0.9, 0.99]:
+            expected = values[int(q * (len(values) - 1))]
+            assert histogram.quantile(q) == pytest.approx(expected, rel=0.021)
+
+    def test_tracks_count_sum_min_max(self):
+        histogram = LatencyHistogram()
+        for value in [1.0, 2.0, 3.0]:
+            histogram.record(value)
+
+        assert histogram.count == 3
+        assert histogram.sum == 6.0
+        assert histogram.min == 1.0
+        assert histogram.max == 3.0
+
+    def test_out_of_range_values_are_clamped(self):
+        histogram = LatencyHistogram(min_value=1.0, max_value=100.0)
+        histogram.record(0.0)
+        histogram.record(1e6)
+
+        assert histogram.buckets[0] == 1
+        assert histogram.buckets[histogram.last_bucket] == 1
+
+    def test_merge(self):
+        first = LatencyHistogram()
+        second = LatencyHistogram()
+        for value in [1.0, 2.0]:
+            first.record(value)
+        for value in [3.0, 400.0]:
+            second.record(value)
+
+        first.merge(second)
+
+        assert first.count == 4
+        assert first.max == 400.0
+        assert first.quantile(1.0) == pytest.approx(400.0, rel=0.02)
+
+    def test_merge_rejects_different_parameters(self):
+        with pytest.raises(ValueError):
+            LatencyHistogram(relative_accuracy=0.01).merge(LatencyHistogram(relative_accuracy=0.02))
+
+    def test_reset(self):
+        histogram = LatencyHistogram()
+        histogram.record(5.0)
+        histogram.reset()
+
+        assert histogram.count == 0
+        assert not any(histogram.buckets)
+
+    def test_dict_round_trip(self):
+        histogram = LatencyHistogram()
+        for value in [0.5, 5.0, 50.0, 50.0]:
+            histogram.record(value)
+
+        data = histogram.to_dict()
+        assert len(data["buckets"]) == 3
+
+        restored = LatencyHistogram.from_dict(data)
+        assert restored.count == 4
+        assert list(restored.buckets) == list(histogram.buckets)
+        assert restored.quantile(0.5) == histogram.quantile(0.5)
+
+    def test_invalid_parameters(self):
+        with pytest.raises(ValueError):
+            LatencyHistogram(relative_accuracy=0)
+        with pytest.raises(ValueError):
+            LatencyHistogram(min_value=10, max_value=1)
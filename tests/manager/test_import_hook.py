@@ -0,0 +1,104 @@
+import sys
+import pytest
+from prodwatch.manager.import_hook import (
+    DeferredWatchFinder,
+    is_importable,
+    target_module,
+)
+from prodwatch.manager.watch_request import WatchRequest
+
+
+@pytest.fixture
+def finder():
+    loaded = []
+    finder = DeferredWatchFinder(
+        on_loaded=lambda module_name, requests: loaded.append(
+            (module_name, [request.function_name for request in requests], sys.modules[module_name])
+        )
+    )
+    finder.loaded = loaded
+    finder.install()
+    yield finder
+    finder.uninstall()
+
+
+class TestTargetModule:
+    def test_module_qualified_name(self):
+        assert target_module("json.decoder.scanstring") == "json.decoder"
+
+    def test_method_of_a_class(self):
+        assert target_module("json.decoder.JSONDecoder.no_such_method") == "json.decoder"
+
+    def test_method_in_an_unimported_module(self, unimported_package):
+        assert target_module("deferredpkg.reports.Builder.render") == "deferredpkg.reports"
+        assert "deferredpkg" not in sys.modules
+
+    def test_bare_name(self):
+        assert target_module("func") is None
+
+    def test_no_such_module(self):
+        assert target_module("no_such_package_anywhere.mod.func") is None
+
+    def test_importable(self, unimported_package):
+        """Importability is checked without importing the module"""
+        assert is_importable("deferredpkg.reports")
+        assert not is_importable("deferredpkg.missing")
+        assert "deferredpkg" not in sys.modules
+        assert not is_importable("no_such_package_anywhere.mod")
+
+
+class TestDeferredWatchFinder:
+    def test_applies_watch_when_module_is_imported(self, unimported_package, finder):
+        """Pending watches run right after the module body executes"""
+        finder.defer("deferredpkg.reports", WatchRequest("deferredpkg.reports.build"))
+        assert finder.loaded == []
+
+        import deferredpkg.reports
+
+        assert finder.loaded == [
+            ("deferredpkg.reports", ["deferredpkg.reports.build"], deferredpkg.reports)
+        ]
+        assert not finder.is_deferred("deferredpkg.reports.build")
+
+    def test_module_keeps_its_own_loader(self, unimported_package, finder):
+        """The wrapping loader is removed once the module has executed"""
+        finder.defer("deferredpkg.reports", WatchRequest("deferredpkg.reports.build"))
+
+        import deferredpkg.reports
+
+        assert type(deferredpkg.reports.__loader__).__name__ == "SourceFileLoader"
+        assert deferredpkg.reports.__spec__.loader is deferredpkg.reports.__loader__
+
+    def test_other_modules_are_untouched(self, unimported_package, finder):
+        """Modules without pending watches are imported normally"""
+        import deferredpkg  # noqa: F401
+
+        assert finder.loaded == []
+
+    def test_failed_import_keeps_watch_pending(self, unimported_package, finder):
+        """When the module fails to import, the watch stays pending"""
+        finder.defer("deferredpkg.broken", WatchRequest("deferredpkg.broken.func"))
+
+        with pytest.raises(RuntimeError):
+            import deferredpkg.broken  # noqa: F401
+
+        assert finder.loaded == []
+        assert finder.is_deferred("deferredpkg.broken.func")
+
+    def test_same_watch_is_deferred_once(self, finder):
+        finder.defer("mod", WatchRequest("mod.func"))
+        finder.defer("mod", WatchRequest("mod.func"))
+        assert len(finder.pending["mod"]) == 1
+
+    def test_take_imported(self, unimported_package):
+        """Watches for modules imported while the hook wasn't installed are handed back"""
+        finder = DeferredWatchFinder(on_loaded=lambda module_name, requests: None)
+        finder.defer("deferredpkg.reports", WatchRequest("deferredpkg.reports.build"))
+        assert finder.take_imported() == []
+
+        import deferredpkg.reports  # noqa: F401
+
+        assert [request.function_name for request in finder.take_imported()] == [
+            "deferredpkg.reports.build"
+        ]
+        assert finder.pending == {}
@@ -1,6 +1,23 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import pytest
 from unittest.mock import Mock, patch
 from requests.exceptions import RequestException
+from prodwatch.manager import Manager
 from prodwatch.manager.finders.finder_result import FinderResult, FunctionType
+from prodwatch.manager.aggregation import FunctionAggregate
+from prodwatch.manager.argument_capture import ArgumentCapture
+from prodwatch.manager.manager import STOP_CHECK_INTERVAL
+from prodwatch.manager.monitoring import MONITORING_AVAILABLE, Instrumentation
+from prodwatch.manager.poll_schedule import PollSchedule
+from prodwatch.manager.sampling import SamplingMode, SamplingPolicy
+from prodwatch.manager.self_stats import SAMPLE_EVERY
+from prodwatch.manager.snapshot import capture_args, capture_kwargs
+from prodwatch.manager.watch_request import WatchMode, WatchOptions, WatchRequest
+from prodwatch.manager.wire_format import CONTENT_TYPE, decode_batch
 
 
 class TestManagerInitialization:
@@ -57,8 +74,8 @@ class TestManagerWatchRequests:
         # Create list with both new and already watched functions
         functions_to_watch = ["already_watched_func", "new_func"]
 
-        with patch.object(manager.function_manager, "watch_function") as mock_watch:
-            # Make watch_function return (True, FinderResult) to simulate successful watching
+        with patch.object(manager.function_manager, "watch_functions") as mock_watch:
+            # Make watch_functions return (True, FinderResult) to simulate successful watching
             mock_result = FinderResult(
                 module=None,
                 function=None,
@@ -66,13 +83,13 @@ class TestManagerWatchRequests:
                 found=True,
             )
 
-            mock_watch.return_value = (True, mock_result)
+            mock_watch.return_value = [(True, mock_result)]
 
             # Process the functions
             manager.process_pending_watchers(functions_to_watch)
 
-            # Verify watch_function was only called for new_func
-            mock_watch.assert_called_once_with("new_func")
+            # Verify watch_functions was only called for new_func
+            mock_watch.assert_called_once_with([WatchRequest("new_func", WatchOptions())])
 
             # Verify both functions are now in watched set
             assert "already_watched_func" in manager.watched_functions
@@ -82,19 +99,22 @@ class TestManagerWatchRequests:
         """Only successfully watched functions are added to watched set."""
         functions_to_watch = ["success_func", "fail_func"]
 
-        def mock_watch_function(func_name):
+        def mock_watch_functions(requests):
             # Simulate success only for success_func
-            success = func_name == "success_func"
-            mock_result = FinderResult(
-                module=None,
-                function=None,
-                function_type=FunctionType.REGULAR,
-                found=success,
-            )
-            return (success, mock_result)
+            outcomes = []
+            for request in requests:
+                success = request.function_name == "success_func"
+                mock_result = FinderResult(
+                    module=None,
+                    function=None,
+                    function_type=FunctionType.REGULAR,
+                    found=success,
+                )
+                outcomes.append((success, mock_result))
+            return outcomes
 
-        with patch.object(manager.function_manager, "watch_function") as mock_watch:
-            mock_watch.side_effect = mock_watch_function
+        with patch.object(manager.function_manager, "watch_functions") as mock_watch:
+            mock_watch.side_effect = mock_watch_functions
 
             # Process the functions
             manager.process_pending_watchers(functions_to_watch)
@@ -103,8 +123,9 @@ class TestManagerWatchRequests:
             assert "success_func" in manager.watched_functions
             assert "fail_func" not in manager.watched_functions
 
-            # Verify watch_function was called for both functions
-            assert mock_watch.call_count == 2
+            # Verify both functions were watched in one call
+            assert mock_watch.call_count == 1
+            assert len(mock_watch.call_args[0][0]) == 2
 
     def test_confirm_watcher_only_called_for_new_watches(self, manager):
         """confirm_watcher is only called for newly watched functions."""
@@ -114,7 +135,7 @@ class TestManagerWatchRequests:
         functions_to_watch = ["already_watched_func", "new_func"]
 
         with (
-            patch.object(manager.function_manager, "watch_function") as mock_watch,
+            patch.object(manager.function_manager, "watch_functions") as mock_watch,
             patch.object(manager, "confirm_watcher") as mock_confirm,
         ):
             mock_result = FinderResult(
@@ -123,7 +144,7 @@ class TestManagerWatchRequests:
                 function_type=FunctionType.REGULAR,
                 found=True,
             )
-            mock_watch.return_value = (True, mock_result)
+            mock_watch.return_value = [(True, mock_result)]
 
             # Process the functions
             manager.process_pending_watchers(functions_to_watch)
@@ -177,21 +198,73 @@ class TestManagerWatchRequests:
             found=True,
         )
 
-        manager.function_manager.watch_function = Mock(return_value=(True, mock_result))
+        manager.function_manager.watch_functions = Mock(
+            return_value=[(True, mock_result), (True, mock_result)]
+        )
         manager.confirm_watcher = Mock()
 
         function_names = ["func1", "func2"]
         manager.process_pending_watchers(function_names)
 
-        assert manager.function_manager.watch_function.call_count == 2
-        assert manager.confirm_watcher.call_count == 2
-
-        manager.function_manager.watch_function.assert_any_call("func1")
-        manager.function_manager.watch_function.assert_any_call("func2")
+        manager.function_manager.watch_functions.assert_called_once_with(
+            [WatchRequest("func1"), WatchRequest("func2")]
+        )
 
         # Note: confirm_watcher now takes finder_result.to_dict() as second parameter
         assert manager.confirm_watcher.call_count == 2
 
+    def test_process_watch_request_with_sampling(self, manager):
+        """Sampling options sent with a function name are passed to the function manager."""
+        mock_result = FinderResult(
+            module=None,
+            function=None,
+            function_type=FunctionType.REGULAR,
+            found=True,
+        )
+        manager.function_manager.watch_functions = Mock(return_value=[(True, mock_result)])
+        manager.confirm_watcher = Mock()
+
+        manager.process_pending_watchers(
+            [{"function_name": "func1", "sampling": {"mode": "fixed", "rate": 100}}]
+        )
+
+        manager.function_manager.watch_functions.assert_called_once_with(
+            [
+                WatchRequest(
+                    "func1",
+                    WatchOptions(sampling=SamplingPolicy(mode=SamplingMode.FIXED, rate=100)),
+                )
+            ]
+        )
+        assert "func1" in manager.watched_functions
+
+    def test_invalid_watch_request_is_skipped(self, manager):
+        """Malformed watch requests are logged and skipped."""
+        manager.function_manager.watch_functions = Mock()
+
+        manager.process_pending_watchers(
+            [{"function_name": "func1", "sampling": {"mode": "sometimes"}}, {"no_name": 1}]
+        )
+
+        manager.function_manager.watch_functions.assert_not_called()
+
+    def test_malformed_entry_does_not_drop_the_rest(self, manager):
+        """One entry with a bad sampling policy doesn't cost the other entries their watches"""
+        mock_result = FinderResult(
+            module=None,
+            function=None,
+            function_type=FunctionType.REGULAR,
+            found=True,
+        )
+        manager.function_manager.watch_functions = Mock(return_value=[(True, mock_result)])
+        manager.confirm_watcher = Mock()
+
+        manager.process_pending_watchers(
+            [{"function_name": "func1", "sampling": {"mode": "fixed", "rate": None}}, "func2"]
+        )
+
+        manager.function_manager.watch_functions.assert_called_once_with([WatchRequest("func2")])
+
     @patch("requests.Session.get")
     def test_polling_loop_with_exception(self, mock_get, manager):
         """Errors are logged in polling loop."""
@@ -235,3 +308,1060 @@ class TestManagerWatchRequests:
                 manager.failed_watcher("test_function")
 
                 mock_handle_error.assert_called_once()
+
+
+def reported_target():
+    pass
+
+
+class ReportedClass:
+    def method(self):
+        pass
+
+
+class TestManagerWatchReports:
+    """Watcher events from one poll are sent to the server together."""
+
+    def test_results_are_reported_in_one_batch(self, manager):
+        with patch("requests.Session.post") as mock_post:
+            mock_post.return_value.status_code = 200
+            manager.process_pending_watchers(
+                [f"{__name__}.reported_target", "ReportedClass.method", "nowhere"]
+            )
+        manager.function_manager.unwatch_function(f"{__name__}.reported_target")
+        manager.function_manager.unwatch_function("ReportedClass.method")
+
+        mock_post.assert_called_once()
+        batch = mock_post.call_args[1]["json"]
+        assert batch["event_name"] == "event-batch"
+        assert batch["process_id"] == str(manager.process_id)
+        assert [event["event_name"] for event in batch["events"]] == [
+            "confirm-watcher",
+            "confirm-watcher",
+            "failed-watcher",
+        ]
+        assert all("finder_result" in event for event in batch["events"])
+
+    def test_single_result_is_sent_alone(self, manager):
+        with patch("requests.Session.post") as mock_post:
+            mock_post.return_value.status_code = 200
+            manager.process_pending_watchers(["nowhere"])
+        assert mock_post.call_args[1]["json"]["event_name"] == "failed-watcher"
+
+    def test_polling_loop_reports_once_per_poll(self, manager):
+        manager.watched_functions.add("old_func")
+        manager.active = True
+
+        def stop_after_one_poll():
+            manager.active = False
+            return ["nowhere", "nowhere_else"], ["old_func"]
+
+        with (
+            patch.object(manager, "get_watch_list", side_effect=stop_after_one_poll),
+            patch.object(manager.function_manager, "unwatch_function", return_value=True),
+            patch("requests.Session.post") as mock_post,
+            patch("time.sleep"),
+        ):
+            mock_post.return_value.status_code = 200
+            manager.polling_loop()
+
+        mock_post.assert_called_once()
+        events = mock_post.call_args[1]["json"]["events"]
+        assert [event["event_name"] for event in events] == [
+            "removed-watcher",
+            "failed-watcher",
+            "failed-watcher",
+        ]
+
+
+class PatternTarget:
+    def first(self):
+        return 1
+
+    def second(self):
+        return 2
+
+
+class TestManagerPatternWatches:
+    """Glob patterns watch every function they match, as one group."""
+
+    def test_pattern_is_confirmed_with_its_targets(self, manager):
+        with patch.object(manager, "confirm_watcher") as mock_confirm:
+            manager.process_pending_watchers(["PatternTarget.*"])
+        try:
+            mock_confirm.assert_called_once_with(
+                "PatternTarget.*",
+                targets=[f"{__name__}.PatternTarget.first", f"{__name__}.PatternTarget.second"],
+            )
+            assert "PatternTarget.*" in manager.watched_functions
+            assert PatternTarget().first() == 1
+            assert manager.event_shipper.pending() == 1
+        finally:
+            manager.function_manager.unwatch_function("PatternTarget.*")
+
+    def test_pattern_is_removed_together(self, manager):
+        original = PatternTarget.__dict__["first"]
+        with patch.object(manager, "confirm_watcher"):
+            manager.process_pending_watchers(["PatternTarget.*"])
+        with patch.object(manager, "removed_watcher") as mock_removed:
+            manager.process_unwatch_requests(["PatternTarget.*"])
+        mock_removed.assert_called_once_with("PatternTarget.*")
+        assert PatternTarget.__dict__["first"] is original
+        assert "PatternTarget.*" not in manager.watched_functions
+
+    def test_pattern_is_forgotten_when_its_targets_are_unwatched(self, manager):
+        targets = [f"{__name__}.PatternTarget.first", f"{__name__}.PatternTarget.second"]
+        manager.active = True
+
+        def unwatch_targets():
+            manager.active = False
+            return [], targets
+
+        with patch.object(manager, "confirm_watcher"):
+            manager.process_pending_watchers(["PatternTarget.*"])
+        with (
+            patch.object(manager, "get_watch_list", side_effect=unwatch_targets),
+            patch.object(manager, "removed_watcher"),
+            patch("time.sleep"),
+        ):
+            manager.polling_loop()
+
+        assert manager.function_manager.groups == {}
+        assert "PatternTarget.*" not in manager.watched_functions
+
+    def test_pattern_over_the_cap_fails(self, manager):
+        manager.max_pattern_targets = 1
+        with patch.object(manager, "failed_watcher") as mock_failed:
+            manager.process_pending_watchers(["PatternTarget.*"])
+        mock_failed.assert_called_once_with(
+            "PatternTarget.*", reason="matches more than 1 functions"
+        )
+        assert manager.function_manager.watches == {}
+
+    def test_pattern_without_matches_fails(self, manager):
+        with patch.object(manager, "failed_watcher") as mock_failed:
+            manager.process_pending_watchers(["NoSuchClassAnywhere.*"])
+        mock_failed.assert_called_once()
+        assert "NoSuchClassAnywhere.*" not in manager.watched_functions
+
+
+class TestManagerEventShipping:
+    """Function call events are queued and shipped in batches."""
+
+    def test_log_function_call_does_not_post(self, manager):
+        """Logging a call only queues the event."""
+        with patch("requests.Session.post") as mock_post:
+            manager.log_function_call("func", [1, "a"], {"k": 2}, execution_time_ms=1.5)
+
+            mock_post.assert_not_called()
+            assert manager.event_shipper.pending() == 1
+
+    def test_queued_events_are_sent_as_one_batch(self, manager):
+        """Queued events are posted together in a single request."""
+        manager.log_function_call("func", [1], {}, execution_time_ms=1.0)
+        manager.log_function_call("func", [2], {"k": 3}, execution_time_ms=2.0, error="boom")
+
+        with patch("requests.Session.post") as mock_post:
+            mock_post.return_value.status_code = 200
+            manager.event_shipper.flush()
+
+            mock_post.assert_called_once()
+            payload = mock_post.call_args[1]["json"]
+            assert payload["event_name"] == "event-batch"
+            assert payload["process_id"] == str(manager.process_id)
+            assert payload["app_name"] == "test-app"
+
+            events = payload["events"]
+            assert len(events) == 2
+            assert events[0]["event_name"] == "log-function-call"
+            assert events[0]["args"] == ["1"]
+            assert events[1]["kwargs"] == {"k": "3"}
+            assert events[1]["error"] == "boom"
+            assert events[0]["sample_weight"] == 1.0
+
+    def test_sample_weight_is_reported(self, manager):
+        """Sampled calls carry their sampling weight."""
+        manager.log_function_call("func", [], {}, execution_time_ms=1.0, sample_weight=100.0)
+
+        events = manager.event_shipper.drain(10)
+        assert events[0]["sample_weight"] == 100.0
+
+    def test_batch_settings_are_configurable(self):
+        """Batch size and linger are passed through to the shipper."""
+        os.environ["PRODWATCH_API_TOKEN"] = "test-token-123"
+        manager = Manager(
+            "http://test-server.com",
+            app_name="test-app",
+            batch_size=10,
+            linger=0.25,
+            buffer_size=50,
+            flush_on_shutdown=False,
+        )
+
+        assert manager.event_shipper.batch_size == 10
+        assert manager.event_shipper.linger == 0.25
+        assert manager.event_shipper.buffer_size == 50
+        assert manager.event_shipper.flush_on_shutdown is False
+
+
+class TestManagerSummaries:
+    """Histogram-mode watches are reported as one summary per interval."""
+
+    def test_report_summaries_queues_one_event_per_function(self, manager):
+        aggregate = FunctionAggregate("func")
+        aggregate.record(1.0)
+        aggregate.record(3.0, failed=True)
+        manager.function_manager.aggregates["func"] = aggregate
+        manager.function_manager.aggregates["idle"] = FunctionAggregate("idle")
+
+        manager.report_summaries()
+
+        events = manager.event_shipper.drain(10)
+        assert len(events) == 1
+        assert events[0]["event_name"] == "function-summary"
+        assert events[0]["function_name"] == "func"
+        assert events[0]["process_id"] == str(manager.process_id)
+        assert events[0]["calls"] == 2
+        assert events[0]["errors"] == 1
+
+
+class TestManagerWireFormat:
+    """Event batches can be sent in the compact binary format."""
+
+    def binary_manager(self):
+        os.environ["PRODWATCH_API_TOKEN"] = "test-token-123"
+        return Manager("http://test-server.com", app_name="test-app", wire_format="binary")
+
+    def test_binary_batch(self):
+        manager = self.binary_manager()
+        manager.log_function_call("func", [1], {}, execution_time_ms=1.0)
+
+        with patch("requests.Session.post") as mock_post:
+            mock_post.return_value.status_code = 200
+            manager.event_shipper.flush()
+
+            mock_post.assert_called_once()
+            kwargs = mock_post.call_args[1]
+            assert kwargs["headers"]["Content-Type"] == CONTENT_TYPE
+            decoded = decode_batch(kwargs["data"])
+            assert decoded["process_id"] == str(manager.process_id)
+            assert decoded["events"][0]["function_name"] == "func"
+            assert decoded["events"][0]["args"] == ["1"]
+
+    def test_falls_back_to_json_on_415(self):
+        manager = self.binary_manager()
+        manager.log_function_call("func", [1], {}, execution_time_ms=1.0)
+
+        with patch("requests.Session.post") as mock_post:
+            unsupported = Mock(status_code=415)
+            ok = Mock(status_code=200)
+            mock_post.side_effect = [unsupported, ok]
+            manager.event_shipper.flush()
+
+            assert mock_post.call_count == 2
+            assert mock_post.call_args[1]["json"]["events"][0]["function_name"] == "func"
+            assert manager.wire_format == "json"
+
+    def test_invalid_wire_format(self):
+        os.environ["PRODWATCH_API_TOKEN"] = "test-token-123"
+        with pytest.raises(ValueError):
+            Manager("http://test-server.com", app_name="test-app", wire_format="xml")
+
+
+class TestManagerDeferredArguments:
+    """With deferred rendering, arguments are summarized on the flusher thread."""
+
+    def deferred_manager(self):
+        os.environ["PRODWATCH_API_TOKEN"] = "test-token-123"
+        return Manager("http://test-server.com", app_name="test-app", defer_argument_rendering=True)
+
+    def test_function_manager_defers_capture(self):
+        manager = self.deferred_manager()
+        assert manager.function_manager.argument_capture == ArgumentCapture.DEFERRED
+
+    def test_snapshots_are_rendered_when_sent(self):
+        manager = self.deferred_manager()
+        items = list(range(100))
+        manager.log_function_call(
+            "func", capture_args([items]), capture_kwargs({"name": "x" * 1000}), 1.0
+        )
+        items.clear()
+
+        with patch("requests.Session.post") as mock_post:
+            mock_post.return_value.status_code = 200
+            manager.event_shipper.flush()
+
+            event = mock_post.call_args[1]["json"]["events"][0]
+            assert event["args"] == ["<list len=100 of int: [0, 1, 2, 3, 4, ...]>"]
+            assert len(event["kwargs"]["name"]) <= 256
+
+    def test_snapshots_are_rendered_in_binary_batches(self):
+        manager = self.deferred_manager()
+        manager.wire_format = "binary"
+        manager.log_function_call("func", capture_args([(1, 2)]), {}, 1.0)
+
+        with patch("requests.Session.post") as mock_post:
+            mock_post.return_value.status_code = 200
+            manager.event_shipper.flush()
+
+            decoded = decode_batch(mock_post.call_args[1]["data"])
+            assert decoded["events"][0]["args"] == ["(1, 2)"]
+
+
+class TestManagerDeferredWatches:
+    """Watches for modules that aren't imported yet are applied when they are imported."""
+
+    def test_watch_is_deferred_until_import(self, manager, unimported_package):
+        with (
+            patch.object(manager, "deferred_watcher") as mock_deferred,
+            patch.object(manager, "failed_watcher") as mock_failed,
+            patch.object(manager, "confirm_watcher") as mock_confirm,
+        ):
+            manager.import_hook.install()
+            try:
+                manager.process_pending_watchers(["deferredpkg.reports.build"])
+                mock_deferred.assert_called_once_with(
+                    "deferredpkg.reports.build", "deferredpkg.reports"
+                )
+                mock_failed.assert_not_called()
+
+                import deferredpkg.reports
+
+                assert "deferredpkg.reports.build" in manager.watched_functions
+                assert deferredpkg.reports.build() == "report"
+                assert manager.event_shipper.pending() == 1
+
+                manager.report_deferred_watches()
+                assert mock_confirm.call_args[0][0] == "deferredpkg.reports.build"
+            finally:
+                manager.import_hook.uninstall()
+
+    def test_method_watch_is_deferred_until_import(self, manager, unimported_package):
+        with (
+            patch.object(manager, "deferred_watcher") as mock_deferred,
+            patch.object(manager, "confirm_watcher"),
+        ):
+            manager.import_hook.install()
+            try:
+                manager.process_pending_watchers(["deferredpkg.reports.Builder.render"])
+                mock_deferred.assert_called_once_with(
+                    "deferredpkg.reports.Builder.render", "deferredpkg.reports"
+                )
+
+                import deferredpkg.reports
+
+                assert "deferredpkg.reports.Builder.render" in manager.watched_functions
+                assert deferredpkg.reports.Builder().render() == "rendered"
+                assert manager.event_shipper.pending() == 1
+            finally:
+                manager.import_hook.uninstall()
+
+    def test_missing_method_of_imported_class_fails(self, manager):
+        with (
+            patch.object(manager, "deferred_watcher") as mock_deferred,
+            patch.object(manager, "failed_watcher") as mock_failed,
+        ):
+            manager.process_pending_watchers(["json.decoder.JSONDecoder.no_such_method"])
+        mock_deferred.assert_not_called()
+        assert mock_failed.call_args[0][0] == "json.decoder.JSONDecoder.no_such_method"
+        assert not manager.import_hook.pending
+
+    def test_deferred_watch_is_not_retried(self, manager, unimported_package):
+        with patch.object(manager, "deferred_watcher"):
+            manager.process_pending_watchers(["deferredpkg.reports.build"])
+            with patch.object(manager.function_manager, "watch_functions") as mock_watch:
+                manager.process_pending_watchers(["deferredpkg.reports.build"])
+                mock_watch.assert_not_called()
+
+    def test_unknown_package_fails_immediately(self, manager):
+        with (
+            patch.object(manager, "deferred_watcher") as mock_deferred,
+            patch.object(manager, "failed_watcher") as mock_failed,
+        ):
+            manager.process_pending_watchers(["no_such_package_anywhere.func"])
+            mock_deferred.assert_not_called()
+            mock_failed.assert_called_once()
+
+    def test_module_imported_without_hook(self, manager, unimported_package):
+        """Watches are applied by the polling loop if the hook didn't see the import"""
+        with (
+            patch.object(manager, "deferred_watcher"),
+            patch.object(manager, "confirm_watcher") as mock_confirm,
+        ):
+            manager.process_pending_watchers(["deferredpkg.reports.build"])
+
+            import deferredpkg.reports  # noqa: F401
+
+            manager.report_deferred_watches()
+            assert "deferredpkg.reports.build" in manager.watched_functions
+            mock_confirm.assert_called_once()
+
+    def test_deferred_watcher_event(self, manager):
+        with patch("requests.Session.post") as mock_post:
+            mock_post.return_value.status_code = 200
+            manager.deferred_watcher("pkg.mod.func", "pkg.mod")
+
+            assert mock_post.call_args[1]["json"] == {
+                "event_name": "deferred-watcher",
+                "function_name": "pkg.mod.func",
+                "module_name": "pkg.mod",
+                "process_id": str(manager.process_id),
+                "app_name": "test-app",
+            }
+
+
+def unwatch_target():
+    return "original"
+
+
+class TestManagerUnwatch:
+    """The server can remove watches, restoring the original functions."""
+
+    @patch("requests.Session.get")
+    def test_get_watch_list(self, mock_get, manager):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {
+            "function_names": ["func1"],
+            "unwatch_function_names": ["func2"],
+        }
+
+        assert manager.get_watch_list() == (["func1"], ["func2"])
+
+    @patch("requests.Session.get")
+    def test_get_watch_list_without_unwatches(self, mock_get, manager):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {"function_names": ["func1"]}
+
+        assert manager.get_watch_list() == (["func1"], [])
+
+    def test_unwatch_restores_function(self, manager):
+        original = unwatch_target
+        with patch.object(manager, "confirm_watcher"), patch.object(
+            manager, "removed_watcher"
+        ) as mock_removed:
+            manager.process_pending_watchers([f"{__name__}.unwatch_target"])
+            assert globals()["unwatch_target"] is not original
+
+            manager.process_unwatch_requests([f"{__name__}.unwatch_target"])
+
+            assert globals()["unwatch_target"] is original
+            assert f"{__name__}.unwatch_target" not in manager.watched_functions
+            mock_removed.assert_called_once_with(f"{__name__}.unwatch_target")
+
+    def test_unwatch_reports_final_summary(self, manager):
+        options = {"function_name": f"{__name__}.unwatch_target", "mode": "histogram"}
+        with patch.object(manager, "confirm_watcher"), patch.object(manager, "removed_watcher"):
+            manager.process_pending_watchers([options])
+            unwatch_target()
+            manager.process_unwatch_requests([f"{__name__}.unwatch_target"])
+
+        events = manager.event_shipper.drain(10)
+        assert [event["event_name"] for event in events] == ["function-summary"]
+        assert events[0]["calls"] == 1
+
+    def test_unwatch_cancels_deferred_watch(self, manager, unimported_package):
+        with patch.object(manager, "deferred_watcher"), patch.object(manager, "removed_watcher"):
+            manager.process_pending_watchers(["deferredpkg.reports.build"])
+            manager.process_unwatch_requests(["deferredpkg.reports.build"])
+
+        assert not manager.import_hook.is_deferred("deferredpkg.reports.build")
+
+    def test_unwatch_unknown_is_acknowledged(self, manager):
+        with patch.object(manager, "removed_watcher") as mock_removed:
+            manager.process_unwatch_requests(["never_watched", {"bad": 1}])
+            mock_removed.assert_called_once_with("never_watched")
+
+    def test_removed_watcher_event(self, manager):
+        with patch("requests.Session.post") as mock_post:
+            mock_post.return_value.status_code = 200
+            manager.removed_watcher("func")
+
+            assert mock_post.call_args[1]["json"] == {
+                "event_name": "removed-watcher",
+                "function_name": "func",
+                "process_id": str(manager.process_id),
+                "app_name": "test-app",
+            }
+
+
+def limited_target(x):
+    return x
+
+
+class TestManagerExpiringWatches:
+    """Watches with limits remove themselves and are reported as expired."""
+
+    def test_expired_watch_is_reported(self, manager):
+        request = {"function_name": f"{__name__}.limited_target", "limits": {"max_calls": 2}}
+        with patch.object(manager, "confirm_watcher"):
+            manager.process_pending_watchers([request])
+
+        for i in range(3):
+            limited_target(i)
+
+        with patch.object(manager, "expired_watcher") as mock_expired:
+            manager.report_expired_watches()
+            mock_expired.assert_called_once_with(f"{__name__}.limited_target", "max_calls")
+        assert f"{__name__}.limited_target" not in manager.watched_functions
+
+    def test_shipped_bytes_are_charged(self, manager):
+        request = {"function_name": f"{__name__}.limited_target", "limits": {"max_bytes": 500}}
+        with patch.object(manager, "confirm_watcher"):
+            manager.process_pending_watchers([request])
+
+        with patch("requests.Session.post") as mock_post:
+            mock_post.return_value.status_code = 200
+            for i in range(3):
+                limited_target("x" * 100)
+                manager.event_shipper.flush()
+
+        assert not manager.function_manager.is_watched(f"{__name__}.limited_target")
+        with patch.object(manager, "expired_watcher") as mock_expired:
+            manager.report_expired_watches()
+            mock_expired.assert_called_once_with(f"{__name__}.limited_target", "max_bytes")
+
+    def test_expired_watcher_event(self, manager):
+        with patch("requests.Session.post") as mock_post:
+            mock_post.return_value.status_code = 200
+            manager.expired_watcher("func", "max_calls")
+
+            assert mock_post.call_args[1]["json"] == {
+                "event_name": "expired-watcher",
+                "function_name": "func",
+                "reason": "max_calls",
+                "process_id": str(manager.process_id),
+                "app_name": "test-app",
+            }
+
+
+async def async_target(x):
+    await asyncio.sleep(0)
+    return x
+
+
+class TestManagerCoroutines:
+    """Watched coroutines report awaited calls without network I/O on the event loop."""
+
+    @pytest.mark.asyncio
+    async def test_no_network_io_on_the_event_loop(self, manager):
+        with patch.object(manager, "confirm_watcher"):
+            manager.process_pending_watchers([f"{__name__}.async_target"])
+
+        try:
+            with patch("requests.Session.post") as mock_post:
+                mock_post.return_value.status_code = 200
+                assert await asyncio.gather(*(async_target(i) for i in range(10))) == list(
+                    range(10)
+                )
+                mock_post.assert_not_called()
+
+            events = manager.event_shipper.drain(100)
+            assert len(events) == 10
+            assert {event["function_name"] for event in events} == {f"{__name__}.async_target"}
+        finally:
+            manager.function_manager.unwatch_function(f"{__name__}.async_target")
+
+    def test_cancelled_event(self, manager):
+        manager.log_function_call("func", [], {}, execution_time_ms=1.0, cancelled=True)
+        (event,) = manager.event_shipper.drain(10)
+        assert event["cancelled"] is True
+        assert event["error"] is None
+
+    def test_generator_event(self, manager):
+        stats = {"items": 2, "time_to_first_item_ms": 1.0, "active_time_ms": 2.0, "lifetime_ms": 5.0}
+        manager.log_function_call("func", [], {}, execution_time_ms=2.0, generator=stats)
+        (event,) = manager.event_shipper.drain(10)
+        assert event["generator"] == stats
+        assert "cancelled" not in event
+
+
+class TestManagerInstrumentation:
+    def test_invalid_instrumentation(self):
+        os.environ["PRODWATCH_API_TOKEN"] = "test-token-123"
+        with pytest.raises(ValueError):
+            Manager("http://test-server.com", app_name="test-app", instrumentation="ptrace")
+
+    def test_instrumentation_is_passed_to_function_manager(self):
+        os.environ["PRODWATCH_API_TOKEN"] = "test-token-123"
+        manager = Manager("http://test-server.com", app_name="test-app", instrumentation="monitoring")
+        expected = (
+            Instrumentation.MONITORING if MONITORING_AVAILABLE else Instrumentation.SETATTR
+        )
+        assert manager.function_manager.instrumentation == expected
+
+
+def forked_target(x):
+    return x
+
+
+class TestManagerFork:
+    """A manager started before fork works in the child as a separate process."""
+
+    def test_child_gets_new_identity_and_drops_parent_events(self, manager):
+        manager.function_manager.watch_function(f"{__name__}.forked_target")
+        manager.watched_functions.add(f"{__name__}.forked_target")
+        try:
+            forked_target(1)
+            parent_id = manager.process_id
+            parent_session = manager.session
+
+            manager.before_fork()
+            manager.after_fork_in_child()
+
+            assert manager.process_id != parent_id
+            assert manager.session is not parent_session
+            assert manager.session.headers["Authorization"] == "Bearer test-token-123"
+            assert manager.event_shipper.pending() == 0
+            # Inherited watch still reports, under the new process ID
+            forked_target(2)
+            (event,) = manager.event_shipper.drain(10)
+            assert event["process_id"] == str(manager.process_id)
+            assert event["args"] == ["2"]
+        finally:
+            manager.function_manager.unwatch_function(f"{__name__}.forked_target")
+
+    def test_parent_releases_locks(self, manager):
+        manager.before_fork()
+        manager.after_fork_in_parent()
+        assert manager.deferred_results_lock.acquire(blocking=False)
+        manager.deferred_results_lock.release()
+
+    def test_histogram_counts_restart_in_child(self, manager):
+        manager.function_manager.watch_function(
+            f"{__name__}.forked_target", WatchOptions(mode=WatchMode.HISTOGRAM)
+        )
+        try:
+            forked_target(1)
+            manager.after_fork_in_child()
+            aggregate = manager.function_manager.aggregates[f"{__name__}.forked_target"]
+            assert aggregate.collect() is None
+        finally:
+            manager.function_manager.unwatch_function(f"{__name__}.forked_target")
+
+    def test_running_child_restarts_threads_and_confirms_inherited_watches(self, manager):
+        manager.watched_functions.add("inherited.func")
+        manager.active = True
+        with (
+            patch.object(manager, "check_connection", return_value=True) as mock_check,
+            patch.object(manager, "confirm_watcher") as mock_confirm,
+            patch.object(manager, "polling_loop"),
+            patch.object(manager, "housekeeping_loop") as mock_housekeeping,
+        ):
+            manager.after_fork_in_child()
+            manager.polling_thread.join(timeout=5)
+            manager.housekeeping_thread.join(timeout=5)
+
+            mock_housekeeping.assert_called_once()
+
+            mock_check.assert_called_once()
+            mock_confirm.assert_called_once_with("inherited.func")
+        assert manager.event_shipper.active
+        manager.active = False
+        manager.event_shipper.stop()
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+    def test_real_fork(self, manager):
+        manager.function_manager.watch_function(f"{__name__}.forked_target")
+        try:
+            forked_target("before")
+            read_end, write_end = os.pipe()
+            pid = os.fork()
+            if pid == 0:  # pragma: no cover - runs in the child
+                try:
+                    forked_target("child")
+                    events = manager.event_shipper.drain(10)
+                    result = {
+                        "process_id": str(manager.process_id),
+                        "args": [event["args"] for event in events],
+                    }
+                    os.write(write_end, json.dumps(result).encode())
+                finally:
+                    os._exit(0)
+            os.close(write_end)
+            with os.fdopen(read_end) as reader:
+                result = json.loads(reader.read())
+            os.waitpid(pid, 0)
+
+            assert result["process_id"] != str(manager.process_id)
+            assert result["args"] == [["child"]]
+            assert [event["args"] for event in manager.event_shipper.drain(10)] == [["before"]]
+        finally:
+            manager.function_manager.unwatch_function(f"{__name__}.forked_target")
+
+
+class TestManagerSpool:
+    """Event batches the server can't take are spooled to disk and replayed in order."""
+
+    def spooling_manager(self, tmp_path, base_server_url):
+        os.environ["PRODWATCH_API_TOKEN"] = "test-token-123"
+        return Manager(base_server_url, app_name="test-app", spool_directory=str(tmp_path))
+
+    def batch(self, i):
+        return [{"event_name": "log-function-call", "function_name": "func", "i": i}]
+
+    def test_spooling_is_disabled_without_fcntl(self, tmp_path):
+        with patch("prodwatch.manager.manager.SPOOL_AVAILABLE", False):
+            manager = self.spooling_manager(tmp_path, "http://test-server.com")
+        assert manager.spool is None
+
+    def test_without_spool_errors_propagate(self, manager):
+        with patch("requests.Session.post", side_effect=RequestException("down")):
+            with pytest.raises(RequestException):
+                manager.send_event_batch(self.batch(0))
+
+    def test_unreachable_server_spools_and_stops_trying(self, tmp_path):
+        manager = self.spooling_manager(tmp_path, "http://test-server.com")
+        with patch("requests.Session.post", side_effect=RequestException("down")) as mock_post:
+            for i in range(3):
+                manager.send_event_batch(self.batch(i))
+
+        assert mock_post.call_count == 1
+        assert not manager.upstream_healthy
+        assert manager.spool.pending() == 3
+
+    def test_server_errors_spool_but_client_errors_do_not(self, tmp_path):
+        manager = self.spooling_manager(tmp_path, "http://test-server.com")
+        with patch("requests.Session.post", return_value=Mock(status_code=400)):
+            manager.send_event_batch(self.batch(0))
+        assert manager.spool.pending() == 0
+
+        with patch("requests.Session.post", return_value=Mock(status_code=503)):
+            manager.send_event_batch(self.batch(1))
+        assert manager.spool.pending() == 1
+
+    def test_replay_after_recovery(self, tmp_path, fake_server):
+        manager = self.spooling_manager(tmp_path, "http://127.0.0.1:9")
+        for i in range(3):
+            manager.send_event_batch(self.batch(i))
+        assert manager.spool.pending() == 3
+
+        manager.base_server_url = fake_server.url
+        manager.send_event_batch(self.batch(3))
+        assert fake_server.posts == []
+
+        manager.replay_spool()
+        manager.send_event_batch(self.batch(4))
+
+        assert manager.upstream_healthy
+        assert manager.spool.pending() == 0
+        assert [event["i"] for event in fake_server.events("log-function-call")] == [
+            0, 1, 2, 3, 4
+        ]
+
+    def test_spool_survives_restart(self, tmp_path, fake_server):
+        crashed = self.spooling_manager(tmp_path, "http://127.0.0.1:9")
+        crashed.send_event_batch(self.batch(0))
+        crashed_process_id = str(crashed.process_id)
+        crashed.spool.close()
+
+        manager = self.spooling_manager(tmp_path, fake_server.url)
+        assert manager.spool.pending() == 1
+        manager.replay_spool()
+
+        (post,) = fake_server.posts
+        assert post["process_id"] == crashed_process_id
+        assert post["events"] == self.batch(0)
+
+    def test_replay_keeps_binary_wire_format(self, tmp_path):
+        manager = self.spooling_manager(tmp_path, "http://test-server.com")
+        manager.wire_format = "binary"
+        manager.upstream_healthy = False
+        manager.send_event_batch(self.batch(0))
+
+        with patch("requests.Session.post", return_value=Mock(status_code=200)) as mock_post:
+            manager.replay_spool()
+
+        assert mock_post.call_args.kwargs["headers"] == {"Content-Type": CONTENT_TYPE}
+        assert decode_batch(mock_post.call_args.kwargs["data"])["events"] == self.batch(0)
+
+    def test_forked_child_claims_its_own_slot(self, tmp_path):
+        manager = self.spooling_manager(tmp_path, "http://test-server.com")
+        parent_directory = manager.spool.directory
+        # The parent's copy of the inherited lock file keeps holding the lock
+        parent_lock = os.dup(manager.spool.lock_file.fileno())
+        try:
+            manager.after_fork_in_child()
+            assert manager.spool.directory != parent_directory
+        finally:
+            os.close(parent_lock)
+
+
+class TestManagerCircuitBreaker:
+    """Requests to the server have timeouts and stop while it is down."""
+
+    def test_requests_have_timeouts(self):
+        os.environ["PRODWATCH_API_TOKEN"] = "test-token-123"
+        manager = Manager(
+            "http://test-server.com", app_name="test-app", connect_timeout=1.0, read_timeout=2.0
+        )
+        with patch("requests.Session.request", return_value=Mock(status_code=200)) as request:
+            manager.check_connection()
+        assert request.call_args.kwargs["timeout"] == (1.0, 2.0)
+
+    def test_open_breaker_skips_requests(self, manager):
+        with patch("requests.Session.request", side_effect=RequestException("down")) as request:
+            for _ in range(5):
+                assert not manager.check_connection()
+        assert request.call_count == manager.circuit_breaker.failure_threshold
+        assert manager.stats()["circuit_breaker"]["state"] == "open"
+
+    def test_stats(self, manager):
+        manager.log_function_call("func", [], {}, execution_time_ms=1.0)
+        stats = manager.stats()
+        assert stats["circuit_breaker"]["state"] == "closed"
+        assert stats["events"]["pending"] == 1
+        assert stats["spool"] is None
+
+
+def measured_target(x, key=None):
+    return x
+
+
+class TestManagerSelfStats:
+    """The manager measures its own overhead and ships it as prodwatch-stats events."""
+
+    def test_calls_are_counted(self, manager):
+        """Wrappers time capturing and reporting each call they report"""
+        manager.function_manager.watch_function(f"{__name__}.measured_target")
+        try:
+            for _ in range(SAMPLE_EVERY + 1):
+                measured_target([1] * 1000, key="a")
+        finally:
+            manager.function_manager.unwatch_function(f"{__name__}.measured_target")
+
+        stats = manager.stats()
+        assert stats["events"]["captured"] == SAMPLE_EVERY + 1
+        assert stats["capture_overhead_us"]["histogram"]["count"] == 2
+        assert stats["serialization_us"]["histogram"]["count"] == 2
+        assert stats["capture_overhead_us"]["total"] > 0
+        assert (
+            stats["capture_overhead_us"]["histogram"]["sum"]
+            >= stats["serialization_us"]["histogram"]["sum"]
+        )
+
+    def test_histogram_watches_are_counted(self, manager):
+        """Calls recorded into a histogram never reach log_function_call but still cost time"""
+        manager.function_manager.watch_function(
+            f"{__name__}.measured_target", WatchOptions(mode=WatchMode.HISTOGRAM)
+        )
+        try:
+            measured_target(1)
+        finally:
+            manager.function_manager.unwatch_function(f"{__name__}.measured_target")
+
+        assert manager.event_shipper.pending() == 0
+        assert manager.stats()["events"]["captured"] == 1
+
+    def test_direct_events_are_not_counted_as_captures(self, manager):
+        manager.log_function_call("func", [1], {"a": 2}, execution_time_ms=1.0)
+        assert manager.stats()["events"]["captured"] == 0
+
+    def test_http_requests_are_recorded(self, fake_server):
+        os.environ["PRODWATCH_API_TOKEN"] = "test-token-123"
+        manager = Manager(fake_server.url, app_name="test-app")
+        assert manager.check_connection()
+        manager.get_watch_list()
+
+        http = manager.stats()["http"]
+        assert http["/events"]["requests"] == 1
+        assert http["/pending-function-names"]["requests"] == 1
+
+    def test_prodwatch_stats_event(self, manager):
+        manager.report_stats()
+        (event,) = manager.event_shipper.drain(10)
+        assert event["event_name"] == "prodwatch-stats"
+        assert event["process_id"] == str(manager.process_id)
+        assert "capture_overhead_us" in event
+        assert event["circuit_breaker"]["state"] == "closed"
+        json.dumps(event)
+
+    def test_housekeeping_reports_stats(self, manager):
+        manager.stats_interval = 0
+        manager.next_stats_at = 0
+        manager.active = True
+
+        def stop_after_one_poll(*args):
+            manager.active = False
+            return [], []
+
+        with (
+            patch.object(manager, "get_watch_list", side_effect=stop_after_one_poll),
+            patch("time.sleep"),
+        ):
+            manager.polling_loop()
+        assert manager.event_shipper.drain(10) == []
+        manager.housekeeping()
+
+        (event,) = manager.event_shipper.drain(10)
+        assert event["event_name"] == "prodwatch-stats"
+        assert event["polling_loop_ms"]["histogram"]["count"] == 1
+
+
+def long_polled_target(x):
+    return x
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestManagerConditionalPolling:
+    """The watch list is fetched with If-None-Match, and optionally long-polled."""
+
+    @pytest.fixture
+    def server_manager(self, fake_server):
+        os.environ["PRODWATCH_API_TOKEN"] = "test-token-123"
+        return Manager(fake_server.url, app_name="test-app")
+
+    def test_unchanged_watch_list_is_not_modified(self, fake_server, server_manager):
+        fake_server.function_names = ["mod.func"]
+        assert server_manager.get_watch_list() == (["mod.func"], [])
+        assert server_manager.watch_list_changed
+
+        assert server_manager.get_watch_list() == ([], [])
+        assert not server_manager.watch_list_changed
+        assert fake_server.not_modified == 1
+
+    def test_changed_watch_list_is_fetched(self, fake_server, server_manager):
+        server_manager.get_watch_list()
+        fake_server.function_names = ["mod.func"]
+        assert server_manager.get_watch_list() == (["mod.func"], [])
+        assert server_manager.watch_list_changed
+        assert fake_server.not_modified == 0
+
+    def test_first_poll_is_unconditional(self, server_manager):
+        with patch.object(
+            server_manager.session, "get", return_value=Mock(status_code=304)
+        ) as get:
+            server_manager.get_watch_list()
+        assert "headers" not in get.call_args.kwargs
+
+    def test_forked_child_polls_unconditionally(self, server_manager):
+        server_manager.get_watch_list()
+        assert server_manager.watch_list_etag is not None
+        server_manager.after_fork_in_child()
+        assert server_manager.watch_list_etag is None
+
+    def test_long_poll_is_held_until_timeout(self, fake_server):
+        os.environ["PRODWATCH_API_TOKEN"] = "test-token-123"
+        manager = Manager(fake_server.url, app_name="test-app", long_poll_timeout=0.3)
+        manager.active = True
+        manager.get_watch_list()
+
+        started = time.monotonic()
+        assert manager.get_watch_list() == ([], [])
+        assert time.monotonic() - started >= 0.3
+        assert fake_server.polls[-1]["wait"] == "0.3"
+
+    def test_long_poll_applies_new_watch_quickly(self, fake_server):
+        os.environ["PRODWATCH_API_TOKEN"] = "test-token-123"
+        manager = Manager(fake_server.url, app_name="test-app", long_poll_timeout=2.0)
+        manager.start()
+        try:
+            assert wait_for(lambda: fake_server.not_modified or len(fake_server.polls) > 1)
+            started = time.monotonic()
+            fake_server.function_names = [f"{__name__}.long_polled_target"]
+            assert wait_for(lambda: manager.watched_functions, timeout=5.0)
+            assert time.monotonic() - started < 1.0
+        finally:
+            manager.stop()
+
+    def test_housekeeping_runs_during_a_long_poll(self, manager):
+        released = threading.Event()
+        reported = threading.Event()
+
+        def held_poll():
+            released.wait(5)
+            return [], []
+
+        manager.next_stats_at = 0
+        with (
+            patch.object(manager, "get_watch_list", side_effect=held_poll),
+            patch.object(manager, "report_stats", side_effect=reported.set),
+        ):
+            manager.start()
+            try:
+                assert reported.wait(5)
+            finally:
+                released.set()
+                manager.stop()
+
+    def test_housekeeping_cpu_counts_as_prodwatch_cpu(self, manager):
+        def busy_housekeeping():
+            started = time.thread_time()
+            while time.thread_time() - started < 0.02:
+                pass
+
+        def wait(delay):
+            manager.active = False
+
+        manager.active = True
+        with (
+            patch.object(manager, "housekeeping", side_effect=busy_housekeeping),
+            patch.object(manager, "wait_for_next_poll", side_effect=wait),
+        ):
+            manager.housekeeping_loop()
+
+        assert manager.self_stats.background_cpu >= 0.02
+        stats = manager.self_stats.to_dict(manager.event_shipper)
+        assert stats["cpu"]["prodwatch_s"] >= 0.02
+
+    def test_stop_reports_after_housekeeping_has_finished(self, manager):
+        released = threading.Event()
+        manager.poll_schedule = PollSchedule(1, long_poll_timeout=30)
+        reported_while_running = []
+
+        def held_poll():
+            released.wait(5)
+            return [], []
+
+        def report_summaries():
+            if not manager.active:
+                reported_while_running.append(manager.housekeeping_thread.is_alive())
+
+        with (
+            patch.object(manager, "get_watch_list", side_effect=held_poll),
+            patch.object(manager, "report_summaries", side_effect=report_summaries),
+        ):
+            manager.start()
+            try:
+                manager.stop()
+            finally:
+                released.set()
+                manager.polling_thread.join(timeout=5)
+        assert reported_while_running == [False]
+
+    def test_idle_polls_back_off(self, manager):
+        manager.poll_schedule = PollSchedule(1, max_interval=4)
+        manager.active = True
+        delays = []
+
+        def wait(delay):
+            delays.append(delay)
+            if len(delays) == 5:
+                manager.active = False
+
+        with (
+            patch.object(manager, "get_watch_list", return_value=([], [])),
+            patch.object(manager, "wait_for_next_poll", side_effect=wait),
+        ):
+            manager.polling_loop()
+
+        assert delays == [1, 2, 4, 4, 4]
+
+    def test_stop_interrupts_wait(self, manager):
+        manager.active = True
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            manager.active = False
+
+        with patch("time.sleep", side_effect=sleep):
+            manager.wait_for_next_poll(60)
+        assert sleeps == [STOP_CHECK_INTERVAL]
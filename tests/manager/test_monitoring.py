@@ -0,0 +1,250 @@
+import sys
+import pytest
+from unittest.mock import Mock, patch
+from prodwatch.manager.argument_capture import ArgumentCapture
+from prodwatch.manager.expiry import ExpiryReason, WatchLimits
+from prodwatch.manager.function_manager import FunctionManager
+from prodwatch.manager.monitoring import (
+    MONITORING_AVAILABLE,
+    Instrumentation,
+    MonitoringBackend,
+    frame_arguments,
+    monitorable_code,
+)
+from prodwatch.manager.sampling import SamplingMode, SamplingPolicy
+from prodwatch.manager.self_stats import SelfStats
+from prodwatch.manager.watch_request import WatchMode, WatchOptions
+
+requires_monitoring = pytest.mark.skipif(
+    not MONITORING_AVAILABLE, reason="sys.monitoring needs Python 3.12+"
+)
+
+
+def monitored_function(a, b=2, *rest, flag=False, **extra):
+    if a < 0:
+        raise ValueError("negative")
+    return a + b
+
+
+def recursive(n):
+    return 0 if n == 0 else 1 + recursive(n - 1)
+
+
+def catches_internally():
+    try:
+        raise KeyError("handled")
+    except KeyError:
+        return "ok"
+
+
+class Account:
+    def __init__(self, balance):
+        self.balance = balance
+
+    def deposit(self, amount):
+        self.balance += amount
+        return self.balance
+
+    @classmethod
+    def open(cls, balance):
+        return cls(balance)
+
+    @property
+    def summary(self):
+        return f"balance={self.balance}"
+
+
+def generator_function():
+    yield 1
+
+
+# Taken before any watch is applied, like `from module import function`
+imported_reference = monitored_function
+
+
+@pytest.fixture
+def monitored():
+    log_function_call = Mock()
+    manager = FunctionManager(log_function_call, instrumentation=Instrumentation.MONITORING)
+    manager.calls = log_function_call
+    yield manager
+    for function_name in list(manager.watches):
+        manager.unwatch_function(function_name)
+
+
+def test_frame_arguments():
+    captured = []
+
+    def probe(a, b=2, *rest, flag=False, **extra):
+        captured.append(frame_arguments(sys._getframe()))
+
+    probe(1, 3, 4, flag=True, z=5)
+    assert captured == [([1, 3, 4], {"flag": True, "z": 5})]
+
+
+def test_monitorable_code():
+    assert monitorable_code(monitored_function) is monitored_function.__code__
+    assert monitorable_code(generator_function) is None
+    assert monitorable_code(len) is None
+
+
+@pytest.mark.skipif(MONITORING_AVAILABLE, reason="only applies before Python 3.12")
+def test_falls_back_to_wrappers_without_sys_monitoring():
+    manager = FunctionManager(Mock(), instrumentation=Instrumentation.MONITORING)
+    assert manager.instrumentation == Instrumentation.SETATTR
+    assert not MonitoringBackend().watch(monitored_function.__code__, "f", Mock())
+
+
+@requires_monitoring
+class TestMonitoredWatches:
+    def test_attribute_is_left_alone(self, monitored):
+        original = monitored_function
+        success, _ = monitored.watch_function("monitored_function")
+
+        assert success
+        assert globals()["monitored_function"] is original
+        assert monitored.watches["monitored_function"].code is original.__code__
+
+    def test_reports_calls_through_earlier_references(self, monitored):
+        """References taken before the watch are covered too"""
+        monitored.watch_function("monitored_function")
+
+        assert imported_reference(1, 3, 4, flag=True, z=5) == 4
+
+        args, kwargs = monitored.calls.call_args
+        assert args[0] == "monitored_function"
+        assert args[1] == ["1", "3", "4"]
+        assert args[2] == {"flag": "True", "z": "5"}
+        assert kwargs["error"] is None
+        assert kwargs["execution_time_ms"] >= 0
+
+    def test_error(self, monitored):
+        monitored.watch_function("monitored_function")
+
+        with pytest.raises(ValueError):
+            monitored_function(-1)
+
+        assert monitored.calls.call_args[1]["error"] == "negative"
+
+    def test_exception_handled_inside_is_not_an_error(self, monitored):
+        monitored.watch_function("catches_internally")
+        assert catches_internally() == "ok"
+        assert monitored.calls.call_args[1]["error"] is None
+
+    def test_recursion(self, monitored):
+        """Each nested call is timed on its own"""
+        monitored.watch_function("recursive")
+        recursive(3)
+        assert monitored.calls.call_count == 4
+
+    def test_methods_classmethods_and_properties(self, monitored):
+        for name in ("Account.deposit", "Account.open", "Account.summary"):
+            assert monitored.watch_function(name)[0]
+        assert isinstance(vars(Account)["open"], classmethod)
+
+        account = Account.open(10)
+        account.deposit(5)
+        assert account.summary == "balance=15"
+
+        reported = [call[0][0] for call in monitored.calls.call_args_list]
+        assert reported == ["Account.open", "Account.deposit", "Account.summary"]
+
+    def test_unwatch_stops_reporting(self, monitored):
+        monitored.watch_function("monitored_function")
+        monitored.unwatch_function("monitored_function")
+
+        monitored_function(1)
+
+        monitored.calls.assert_not_called()
+        assert monitored.monitor.tool_id is None
+
+    def test_rewatch_after_a_call_raced_the_unwatch(self, monitored):
+        """A call that lands while unwatch is switching events off doesn't disable them for good"""
+        monitored.watch_function("recursive")
+        monitored.watch_function("monitored_function")
+        with patch.object(sys.monitoring, "set_local_events"):
+            # Events stay on, as if the call came between the two steps of unwatch
+            monitored.unwatch_function("monitored_function")
+            monitored_function(1)
+        monitored.calls.assert_not_called()
+
+        monitored.watch_function("monitored_function")
+        monitored_function(2)
+
+        assert monitored.calls.call_count == 1
+        assert monitored.calls.call_args[0][0] == "monitored_function"
+
+    def test_watching_an_alias_replaces_the_watch(self, monitored):
+        monitored.watch_function("monitored_function")
+        monitored.watch_function("imported_reference")
+
+        monitored_function(1)
+
+        assert list(monitored.watches) == ["imported_reference"]
+        assert monitored.calls.call_count == 1
+        assert monitored.calls.call_args[0][0] == "imported_reference"
+
+    def test_generators_use_wrappers(self, monitored):
+        original = generator_function
+        monitored.watch_function("generator_function")
+
+        assert globals()["generator_function"] is not original
+        assert list(generator_function()) == [1]
+        assert monitored.calls.call_args[1]["generator"]["items"] == 1
+
+    def test_sampling(self, monitored):
+        sampling = SamplingPolicy(SamplingMode.FIXED, rate=2)
+        monitored.watch_function("monitored_function", WatchOptions(sampling=sampling))
+
+        for i in range(4):
+            monitored_function(i)
+
+        assert monitored.calls.call_count == 2
+        assert monitored.calls.call_args[1]["sample_weight"] == 2.0
+
+    def test_histogram_mode(self, monitored):
+        monitored.watch_function("monitored_function", WatchOptions(mode=WatchMode.HISTOGRAM))
+        monitored_function(1)
+        assert monitored.aggregates["monitored_function"].collect()["calls"] == 1
+
+    def test_max_calls(self, monitored):
+        monitored.watch_function(
+            "monitored_function", WatchOptions(limits=WatchLimits(max_calls=2))
+        )
+
+        for i in range(4):
+            monitored_function(i)
+
+        assert monitored.calls.call_count == 2
+        assert [expired.reason for expired in monitored.take_expired()] == [
+            ExpiryReason.MAX_CALLS
+        ]
+        assert not monitored.is_watched("monitored_function")
+
+    def test_no_argument_capture(self):
+        log_function_call = Mock()
+        manager = FunctionManager(
+            log_function_call,
+            argument_capture=ArgumentCapture.NONE,
+            instrumentation=Instrumentation.MONITORING,
+        )
+        manager.watch_function("monitored_function")
+        try:
+            monitored_function(1)
+        finally:
+            manager.unwatch_function("monitored_function")
+        assert log_function_call.call_args[0][1:3] == ([], {})
+
+    def test_overhead_is_recorded(self):
+        self_stats = SelfStats()
+        manager = FunctionManager(
+            Mock(), instrumentation=Instrumentation.MONITORING, self_stats=self_stats
+        )
+        manager.watch_function("monitored_function")
+        try:
+            monitored_function(1)
+        finally:
+            manager.unwatch_function("monitored_function")
+        (capture,) = self_stats.captures
+        assert capture.captured == 1
+        assert capture.overhead_us.count == 1
@@ -0,0 +1,43 @@
+import pytest
+from prodwatch.manager.poll_schedule import PollSchedule
+
+
+class TestPollSchedule:
+    def test_fixed_interval_by_default(self):
+        schedule = PollSchedule(5)
+        assert [schedule.next_delay(False, 0.01) for _ in range(3)] == [5, 5, 5]
+        assert schedule.next_delay(True, 0.01) == 5
+
+    def test_idle_polls_back_off(self):
+        schedule = PollSchedule(1, max_interval=8)
+        delays = [schedule.next_delay(False, 0.01) for _ in range(6)]
+        assert delays == [1, 2, 4, 8, 8, 8]
+
+    def test_change_resets_backoff(self):
+        schedule = PollSchedule(1, max_interval=8)
+        for _ in range(4):
+            schedule.next_delay(False, 0.01)
+        assert schedule.next_delay(True, 0.01) == 1
+        assert schedule.next_delay(False, 0.01) == 1
+
+    def test_reset(self):
+        schedule = PollSchedule(1, max_interval=8)
+        for _ in range(4):
+            schedule.next_delay(False, 0.01)
+        schedule.reset()
+        assert schedule.next_delay(False, 0.01) == 1
+
+    def test_long_poll_reconnects_right_away(self):
+        schedule = PollSchedule(5, long_poll_timeout=30)
+        assert schedule.long_poll
+        assert schedule.next_delay(False, 30.0) == 0
+        assert schedule.next_delay(True, 0.5) == 0
+
+    def test_long_poll_not_held_falls_back_to_interval(self):
+        """A server that answers long polls straight away is polled on the normal schedule"""
+        schedule = PollSchedule(5, long_poll_timeout=30)
+        assert schedule.next_delay(False, 0.01) == 5
+
+    def test_max_interval_below_interval(self):
+        with pytest.raises(ValueError):
+            PollSchedule(5, max_interval=1)
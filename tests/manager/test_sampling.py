@@ -0,0 +1,131 @@
+import pytest
+from unittest.mock import Mock
+from prodwatch.manager.sampling import (
+    FixedRateSampler,
+    ProbabilisticSampler,
+    ReservoirSampler,
+    Sampler,
+    SamplingMode,
+    SamplingPolicy,
+)
+
+
+class TestSamplingPolicy:
+    """Sampling policies are parsed from server payloads."""
+
+    def test_fixed_policy(self):
+        policy = SamplingPolicy.from_dict({"mode": "fixed", "rate": 50})
+        assert policy.mode == SamplingMode.FIXED
+        assert isinstance(policy.create_sampler(), FixedRateSampler)
+
+    def test_probabilistic_policy(self):
+        policy = SamplingPolicy.from_dict({"mode": "probabilistic", "probability": 0.1})
+        assert policy.probability == 0.1
+        assert isinstance(policy.create_sampler(), ProbabilisticSampler)
+
+    def test_reservoir_policy(self):
+        policy = SamplingPolicy.from_dict({"mode": "reservoir", "size": 5, "interval": 30})
+        sampler = policy.create_sampler()
+        assert isinstance(sampler, ReservoirSampler)
+        assert sampler.size == 5
+        assert sampler.interval == 30.0
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            {"mode": "sometimes"},
+            {"mode": "fixed", "rate": 0},
+            {"mode": "probabilistic", "probability": 0},
+            {"mode": "probabilistic", "probability": 1.5},
+            {"mode": "reservoir", "size": 0},
+            {"mode": "reservoir", "interval": -1},
+            {"mode": "fixed", "rate": None},
+            {"mode": "fixed", "rate": "often"},
+            {"mode": "probabilistic", "probability": [0.5]},
+            {"mode": ["fixed"]},
+            "fixed",
+            ["fixed", 10],
+        ],
+    )
+    def test_invalid_policies(self, data):
+        with pytest.raises(ValueError):
+            SamplingPolicy.from_dict(data)
+
+    def test_sampler_is_abstract(self):
+        with pytest.raises(TypeError):
+            Sampler()
+
+
+class TestFixedRateSampler:
+    def test_admits_one_in_n(self):
+        sampler = FixedRateSampler(4)
+        admitted = [sampler.admit() for _ in range(12)]
+        assert admitted == [True, False, False, False] * 3
+
+    def test_emits_with_weight(self):
+        log_function_call = Mock()
+        sampler = FixedRateSampler(4)
+
+        sampler.emit(log_function_call, "f", [1], {}, 2.0, None)
+
+        log_function_call.assert_called_once_with(
+            "f", [1], {}, execution_time_ms=2.0, error=None, sample_weight=4.0
+        )
+
+
+class TestProbabilisticSampler:
+    def test_admits_roughly_probability(self):
+        sampler = ProbabilisticSampler(0.25)
+        admitted = sum(sampler.admit() for _ in range(10_000))
+        assert 2000 < admitted < 3000
+        assert sampler.weight == 4.0
+
+    def test_probability_one_admits_everything(self):
+        sampler = ProbabilisticSampler(1.0)
+        assert all(sampler.admit() for _ in range(100))
+
+
+class TestReservoirSampler:
+    def test_holds_at_most_size_calls(self):
+        sampler = ReservoirSampler(size=3, interval=60)
+        log_function_call = Mock()
+
+        for i in range(100):
+            if sampler.admit():
+                sampler.emit(log_function_call, "f", [i], {}, 1.0, None)
+
+        assert len(sampler.reservoir) == 3
+        assert sampler.seen == 100
+        log_function_call.assert_not_called()
+
+    def test_admission_rate_drops_as_calls_grow(self):
+        sampler = ReservoirSampler(size=10, interval=60)
+        admitted = sum(sampler.admit() for _ in range(10_000))
+        # Expected admissions are about size * (1 + ln(n / size)), roughly 79
+        assert admitted < 300
+
+    def test_flush_reports_weighted_calls_after_interval(self):
+        sampler = ReservoirSampler(size=2, interval=60)
+        log_function_call = Mock()
+
+        for i in range(10):
+            if sampler.admit():
+                sampler.emit(log_function_call, "f", [i], {}, 1.0, None)
+
+        sampler.flush()
+        log_function_call.assert_not_called()  # Interval not over yet
+
+        sampler.interval_end = 0
+        sampler.flush()
+
+        assert log_function_call.call_count == 2
+        for call in log_function_call.call_args_list:
+            assert call[1]["sample_weight"] == 5.0
+        assert sampler.reservoir == []
+        assert sampler.seen == 0
+
+
+def test_fixed_rate_sampler_passes_cancelled():
+    log_function_call = Mock()
+    FixedRateSampler(2).emit(log_function_call, "f", [], {}, 1.0, None, cancelled=True)
+    assert log_function_call.call_args[1]["cancelled"] is True
@@ -0,0 +1,96 @@
+import threading
+from prodwatch.manager.event_shipper import EventShipper
+from prodwatch.manager.self_stats import SAMPLE_EVERY, SelfStats
+
+
+def shipper():
+    return EventShipper(lambda batch: None)
+
+
+class TestSelfStats:
+    def test_capture_stats_are_per_thread(self):
+        stats = SelfStats()
+        main = stats.capture_stats()
+        assert stats.capture_stats() is main
+
+        other = []
+        thread = threading.Thread(target=lambda: other.append(stats.capture_stats()))
+        thread.start()
+        thread.join()
+        assert other[0] is not main
+        assert len(stats.captures) == 2
+
+    def test_capture_totals_across_threads(self):
+        stats = SelfStats()
+
+        def capture():
+            capture_stats = stats.capture_stats()
+            capture_stats.captured += SAMPLE_EVERY
+            capture_stats.overhead_seconds += 0.001
+            capture_stats.overhead_us.record(4.0)
+
+        threads = [threading.Thread(target=capture) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        snapshot = stats.to_dict(shipper())
+        assert snapshot["events"]["captured"] == 3 * SAMPLE_EVERY
+        assert round(snapshot["capture_overhead_us"]["total"]) == 3000
+        assert snapshot["capture_overhead_us"]["histogram"]["count"] == 3
+        assert 3.9 < snapshot["capture_overhead_us"]["p50"] < 4.1
+
+    def test_exited_threads_are_folded_into_totals(self):
+        """Counters of threads that have exited are kept as totals, not per thread"""
+        stats = SelfStats()
+
+        def capture():
+            capture_stats = stats.capture_stats()
+            capture_stats.captured += 1
+            capture_stats.overhead_us.record(4.0)
+
+        for _ in range(50):
+            thread = threading.Thread(target=capture)
+            thread.start()
+            thread.join()
+
+        assert len(stats.captures) == 1
+        snapshot = stats.to_dict(shipper())
+        assert stats.captures == []
+        assert snapshot["events"]["captured"] == 50
+        assert snapshot["capture_overhead_us"]["histogram"]["count"] == 50
+
+    def test_requests_per_endpoint(self):
+        stats = SelfStats()
+        stats.record_request("/events", 10.0, failed=False)
+        stats.record_request("/events", 30.0, failed=True)
+        stats.record_request("/pending-function-names", 5.0, failed=False)
+
+        http = stats.to_dict(shipper())["http"]
+        assert http["/events"]["requests"] == 2
+        assert http["/events"]["errors"] == 1
+        assert http["/events"]["latency_ms"]["histogram"]["count"] == 2
+        assert http["/pending-function-names"]["errors"] == 0
+
+    def test_shipper_counters(self):
+        events = EventShipper(lambda batch: None, batch_size=2)
+        for i in range(3):
+            events.enqueue({"i": i})
+        events.flush()
+
+        snapshot = SelfStats().to_dict(events)
+        assert snapshot["events"]["shipped"] == 3
+        assert snapshot["events"]["pending"] == 0
+        assert snapshot["cpu"]["prodwatch_s"] >= 0
+        assert 0 <= snapshot["cpu"]["prodwatch_fraction"]
+
+    def test_reset_after_fork(self):
+        stats = SelfStats()
+        stats.capture_stats().captured += 1
+        stats.record_poll(2.0, 0.001)
+        stats.reset_after_fork()
+
+        snapshot = stats.to_dict(shipper())
+        assert snapshot["events"]["captured"] == 0
+        assert snapshot["polling_loop_ms"]["histogram"]["count"] == 0
@@ -0,0 +1,167 @@
+import array
+import enum
+import pathlib
+import sys
+import threading
+import pytest
+from prodwatch.manager.snapshot import (
+    MappingSnapshot,
+    OpaqueSnapshot,
+    SequenceSnapshot,
+    capture,
+    capture_args,
+    capture_kwargs,
+    render_arguments,
+)
+from prodwatch.manager.summarizer import Snapshot, summarize
+
+
+class Plain:
+    pass
+
+
+class WithRepr:
+    def __init__(self):
+        self.calls = 0
+
+    def __repr__(self):
+        self.calls += 1
+        return "WithRepr()"
+
+
+class ShrinkingList(list):
+    pass
+
+
+class Port(int):
+    renders = 0
+
+    def __str__(self):
+        Port.renders += 1
+        return f"port {int(self)}"
+
+
+class Color(enum.Enum):
+    RED = 1
+
+    def __str__(self):
+        raise AssertionError("rendered later")
+
+
+class TestCapture:
+    def test_immutable_values_are_kept_by_reference(self):
+        text = "x" * 1000
+        assert capture(text) is text
+        assert capture(5) == 5
+        assert capture(None) is None
+        assert capture(Plain) is Plain
+        assert capture(sys) is sys
+
+    def test_only_exact_builtin_types_are_kept_by_reference(self):
+        path = pathlib.Path("/tmp")
+        assert capture(path) is path
+
+    def test_subclasses_of_immutable_types_are_rendered_immediately(self):
+        Port.renders = 0
+        snapshot = capture(Port(80))
+        assert Port.renders == 1
+        assert summarize(snapshot) == "port 80"
+        assert Port.renders == 1
+
+    def test_enum_members_are_rendered_immediately(self):
+        # A custom __str__ runs on the calling thread, where it fails harmlessly
+        assert isinstance(capture(Color.RED), str)
+
+    def test_buffers_are_described_immediately(self):
+        data = bytearray(b"abc")
+        snapshot = capture(data)
+        data[:] = b"changed"
+        assert snapshot == "bytearray(b'abc')"
+        assert capture(array.array("d", [1.0])) == "<array typecode='d' len=1 nbytes=8>"
+
+    def test_containers_are_shallow_copied(self):
+        items = list(range(100))
+        snapshot = capture(items)
+        items.clear()
+        assert isinstance(snapshot, SequenceSnapshot)
+        assert snapshot.length == 100
+        assert snapshot.head == [0, 1, 2, 3, 4]
+
+    def test_mappings_are_shallow_copied(self):
+        mapping = {"a": 1}
+        snapshot = capture(mapping)
+        mapping["b"] = 2
+        assert isinstance(snapshot, MappingSnapshot)
+        assert summarize(snapshot) == "{'a': 1}"
+
+    def test_nested_containers_keep_type_and_length(self):
+        assert summarize(capture([[1, 2], []])) == "[<list len=2>, []]"
+
+    def test_objects_with_custom_repr_are_opaque(self):
+        value = WithRepr()
+        snapshot = capture(value)
+        summarize(snapshot)
+        assert isinstance(snapshot, OpaqueSnapshot)
+        assert value.calls == 0
+        assert summarize(snapshot) == f"<WithRepr object at {hex(id(value))}>"
+
+    def test_container_subclasses_are_opaque(self):
+        assert isinstance(capture(ShrinkingList([1])), OpaqueSnapshot)
+
+    def test_does_not_retain_arbitrary_objects(self):
+        value = Plain()
+        snapshot = capture(value)
+        assert value not in (getattr(snapshot, slot) for slot in snapshot.__slots__)
+
+
+class TestRendering:
+    def test_renders_like_eager_summaries(self):
+        values = [
+            "text",
+            3.5,
+            (1,),
+            (),
+            set(),
+            list(range(200_000)),
+            {i: str(i) for i in range(100)},
+            [Plain, sys],
+            frozenset({1}),
+        ]
+        for value in values:
+            assert summarize(capture(value)) == summarize(value)
+
+    def test_snapshot_types_must_name_their_type(self):
+        class Nameless(Snapshot):
+            __slots__ = ()
+
+        with pytest.raises(TypeError):
+            Nameless()
+
+    def test_element_type_uses_captured_types(self):
+        snapshot = capture([Plain() for _ in range(10)])
+        assert summarize(snapshot).startswith("<list len=10 of Plain:")
+
+    def test_render_arguments(self):
+        events = [
+            {
+                "event_name": "log-function-call",
+                "args": capture_args([[1, 2], "x" * 1000]),
+                "kwargs": capture_kwargs({"mapping": {"a": 1}}),
+            },
+            {"event_name": "function-summary", "calls": 1},
+        ]
+        render_arguments(events)
+        assert events[0]["args"][0] == "[1, 2]"
+        assert len(events[0]["args"][1]) <= 256
+        assert events[0]["kwargs"] == {"mapping": "{'a': 1}"}
+        assert events[1] == {"event_name": "function-summary", "calls": 1}
+
+    def test_rendering_on_another_thread(self):
+        items = list(range(10))
+        snapshot = capture(items)
+        items.append(99)
+        rendered = []
+        thread = threading.Thread(target=lambda: rendered.append(summarize(snapshot)))
+        thread.start()
+        thread.join()
+        assert rendered == ["<list len=10 of int: [0, 1, 2, 3, 4, ...]>"]
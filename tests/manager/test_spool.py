@@ -0,0 +1,137 @@
+import os
+import sys
+import subprocess
+import pytest
+import prodwatch
+from prodwatch.manager.spool import DiskSpool, Segment, claim_slot
+
+
+def drain(spool):
+    records = []
+    while (record := spool.peek()) is not None:
+        records.append(record)
+        spool.commit()
+    return records
+
+
+def test_imports_without_fcntl():
+    """Platforms without fcntl, like Windows, can import prodwatch and just don't spool"""
+    code = (
+        "import sys; sys.modules['fcntl'] = None\n"
+        "import prodwatch\n"
+        "from prodwatch.manager.spool import SPOOL_AVAILABLE\n"
+        "assert not SPOOL_AVAILABLE"
+    )
+    src = os.path.dirname(os.path.dirname(prodwatch.__file__))
+    subprocess.run(
+        [sys.executable, "-c", code], check=True, env={**os.environ, "PYTHONPATH": src}
+    )
+
+
+class TestDiskSpool:
+    def test_replays_in_order(self, tmp_path):
+        spool = DiskSpool(str(tmp_path), segment_size=256, max_bytes=1 << 20)
+        for i in range(50):
+            spool.append({"i": i})
+
+        assert spool.pending() == 50
+        assert len(spool.segments) > 1
+        assert [record["i"] for record in drain(spool)] == list(range(50))
+        assert spool.pending() == 0
+        assert len(spool.segments) == 1
+
+    def test_peek_without_commit_returns_same_record(self, tmp_path):
+        spool = DiskSpool(str(tmp_path))
+        spool.append({"i": 0})
+        spool.append({"i": 1})
+
+        assert spool.peek() == {"i": 0}
+        assert spool.peek() == {"i": 0}
+        spool.commit()
+        assert spool.peek() == {"i": 1}
+
+    def test_survives_restart(self, tmp_path):
+        spool = DiskSpool(str(tmp_path), segment_size=256, max_bytes=1 << 20)
+        for i in range(20):
+            spool.append({"i": i})
+        for _ in range(5):
+            spool.commit()
+        spool.close()
+
+        reopened = DiskSpool(str(tmp_path), segment_size=256, max_bytes=1 << 20)
+        assert reopened.pending() == 15
+        reopened.append({"i": 20})
+        assert [record["i"] for record in drain(reopened)] == list(range(5, 21))
+
+    def test_evicts_oldest_segments_at_cap(self, tmp_path):
+        spool = DiskSpool(str(tmp_path), segment_size=256, max_bytes=1024)
+        for i in range(200):
+            spool.append({"i": i})
+
+        assert spool.disk_usage() <= 1024
+        assert spool.evicted_records > 0
+        replayed = [record["i"] for record in drain(spool)]
+        assert replayed == list(range(200 - len(replayed), 200))
+        assert spool.evicted_records + len(replayed) == 200
+
+    def test_record_larger_than_a_segment(self, tmp_path):
+        spool = DiskSpool(str(tmp_path), segment_size=256, max_bytes=1 << 20)
+        spool.append({"data": "x" * 1000})
+        assert drain(spool) == [{"data": "x" * 1000}]
+
+    def test_record_larger_than_the_spool_is_dropped(self, tmp_path):
+        spool = DiskSpool(str(tmp_path), segment_size=256, max_bytes=512)
+        spool.append({"data": "x" * 1000})
+        assert spool.pending() == 0
+        assert spool.evicted_records == 1
+
+    def test_unreadable_segment_is_discarded(self, tmp_path):
+        spool = DiskSpool(str(tmp_path))
+        spool.append({"i": 0})
+        spool.close()
+        with open(os.path.join(tmp_path, "0", "0000000000000007.seg"), "wb") as f:
+            f.write(b"garbage")
+
+        reopened = DiskSpool(str(tmp_path))
+        assert drain(reopened) == [{"i": 0}]
+        assert not os.path.exists(os.path.join(tmp_path, "0", "0000000000000007.seg"))
+
+    def test_torn_write_is_left_out(self, tmp_path):
+        spool = DiskSpool(str(tmp_path))
+        spool.append({"i": 0})
+        segment = spool.segments[-1]
+        # A payload without its length, as left by a process that died mid-append
+        segment.map[segment.write_offset + 4 : segment.write_offset + 10] = b'{"i":1'
+        spool.close()
+
+        assert drain(DiskSpool(str(tmp_path))) == [{"i": 0}]
+
+    def test_processes_claim_separate_slots(self, tmp_path):
+        first = DiskSpool(str(tmp_path))
+        second = DiskSpool(str(tmp_path))
+        assert first.directory != second.directory
+
+        first.close()
+        third = DiskSpool(str(tmp_path))
+        assert third.directory == first.directory
+
+    def test_invalid_sizes(self, tmp_path):
+        with pytest.raises(ValueError):
+            DiskSpool(str(tmp_path), segment_size=8)
+        with pytest.raises(ValueError):
+            DiskSpool(str(tmp_path), segment_size=1024, max_bytes=512)
+
+
+def test_segment_rejects_other_files(tmp_path):
+    path = tmp_path / "other.seg"
+    path.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        Segment(str(path))
+
+
+def test_claim_slot_creates_directories(tmp_path):
+    directory, lock_file = claim_slot(str(tmp_path / "spool"))
+    try:
+        assert os.path.isdir(directory)
+    finally:
+        lock_file.close()
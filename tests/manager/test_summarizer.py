@@ -0,0 +1,169 @@
+import array
+import sys
+from dataclasses import dataclass
+
+from prodwatch.manager.summarizer import (
+    formatter_cache,
+    format_custom,
+    summarize,
+    summarize_args,
+    summarize_kwargs,
+)
+
+
+class Plain:
+    pass
+
+
+class WithRepr:
+    def __init__(self, id=5, status="paid"):
+        self.id = id
+        self.status = status
+
+    def __repr__(self):
+        raise AssertionError("repr called")
+
+
+class BrokenRepr:
+    def __repr__(self):
+        raise RuntimeError("no")
+
+
+@dataclass
+class Order:
+    id: int
+    items: list
+
+    def __str__(self):
+        raise AssertionError("str called")
+
+
+class HugeTable:
+    def __len__(self):
+        return 1_000_000
+
+    def __str__(self):
+        raise AssertionError("str called")
+
+
+class FakeNdarray:
+    shape = (3, 4)
+    dtype = "float64"
+    nbytes = 96
+
+
+class TestScalars:
+    def test_strings_are_not_quoted(self):
+        assert summarize("value") == "value"
+
+    def test_numbers(self):
+        assert summarize(5) == "5"
+        assert summarize(2.5) == "2.5"
+        assert summarize(True) == "True"
+        assert summarize(None) == "None"
+
+    def test_huge_ints_are_not_converted(self):
+        assert summarize(10**10_000) == "<int with 33220 bits>"
+
+    def test_long_strings_are_truncated(self):
+        result = summarize("x" * 10_000, budget=50)
+        assert len(result) <= 50
+        assert result.endswith("...(10000 chars)")
+
+
+class TestContainers:
+    def test_small_containers_look_like_repr(self):
+        assert summarize([1, 2, 3]) == "[1, 2, 3]"
+        assert summarize((1,)) == "(1,)"
+        assert summarize({"a": "b"}) == "{'a': 'b'}"
+        assert summarize(set()) == "set()"
+
+    def test_large_list(self):
+        assert summarize(list(range(200_000))) == "<list len=200000 of int: [0, 1, 2, 3, 4, ...]>"
+
+    def test_mixed_element_types(self):
+        assert "of mixed" in summarize([1, "a", 2.0, None, 3, 4])
+
+    def test_large_dict(self):
+        result = summarize({i: i for i in range(100)})
+        assert result.startswith("<dict len=100: {0: 0, 1: 1")
+
+    def test_cycles_are_safe(self):
+        items = [1]
+        items.append(items)
+        assert summarize(items) == "[1, <list len=2>]"
+
+        mapping = {}
+        mapping["self"] = mapping
+        assert summarize(mapping) == "{'self': <dict len=1>}"
+
+    def test_deep_nesting_is_cut_off(self):
+        assert summarize([[[[[1]]]]]) == "[[[<list len=1>]]]"
+
+    def test_budget_is_respected(self):
+        result = summarize([["x" * 1000] * 3] * 3, budget=100)
+        assert len(result) <= 100
+
+
+class TestBuffers:
+    def test_bytes(self):
+        assert summarize(b"abc") == "b'abc'"
+        assert summarize(b"x" * 1000, budget=40).startswith("<bytes len=1000:")
+
+    def test_memoryview(self):
+        assert summarize(memoryview(b"abcd")) == "<memoryview shape=(4,) format='B' nbytes=4>"
+
+    def test_array(self):
+        assert summarize(array.array("d", [1.0, 2.0])) == "<array typecode='d' len=2 nbytes=16>"
+
+    def test_ndarray_like(self):
+        assert summarize(FakeNdarray()) == "<FakeNdarray shape=(3, 4) dtype=float64 nbytes=96>"
+
+
+class TestObjects:
+    def test_plain_object(self):
+        assert summarize(Plain()).startswith("<Plain object at 0x")
+
+    def test_custom_repr_is_never_called(self):
+        assert summarize(WithRepr()) == "<WithRepr id=5 status='paid'>"
+
+    def test_dataclass_fields(self):
+        assert summarize(Order(5, list(range(100)))) == (
+            "<Order id=5 items=<list len=100 of int: [0, 1, 2, 3, 4, ...]>>"
+        )
+
+    def test_sized_object(self):
+        assert summarize(HugeTable()) == "<HugeTable len=1000000>"
+
+    def test_exception(self):
+        assert summarize(ValueError("bad input", 3)) == "ValueError('bad input', 3)"
+
+    def test_nested_objects(self):
+        assert summarize(WithRepr(id=WithRepr())) == (
+            "<WithRepr id=<WithRepr id=5 status='paid'> status='paid'>"
+        )
+
+    def test_self_reference(self):
+        value = WithRepr()
+        value.id = value
+        assert summarize(value).startswith("<WithRepr id=<WithRepr object at 0x")
+
+    def test_fields_are_bounded(self):
+        assert len(summarize(WithRepr(status="x" * 10_000), budget=64)) <= 64
+
+    def test_broken_repr(self):
+        assert summarize(BrokenRepr()).startswith("<BrokenRepr object at 0x")
+
+    def test_class_and_module(self):
+        assert summarize(Plain) == "<class 'Plain'>"
+        assert summarize(sys) == "<module 'sys'>"
+
+    def test_formatter_is_cached_per_type(self):
+        summarize(WithRepr())
+        assert formatter_cache[WithRepr] is format_custom
+
+
+class TestArgumentLists:
+    def test_summarize_args_and_kwargs(self):
+        assert summarize_args((1, "a")) == ["1", "a"]
+        assert summarize_kwargs({"k": [1]}) == {"k": "[1]"}
@@ -0,0 +1,59 @@
+import pytest
+from prodwatch.manager.sampling import SamplingMode
+from prodwatch.manager.watch_request import WatchMode, WatchOptions, WatchRequest
+
+
+class TestWatchRequest:
+    """Watch list entries are parsed from server payloads."""
+
+    def test_bare_function_name(self):
+        request = WatchRequest.from_payload("mymodule.func")
+        assert request.function_name == "mymodule.func"
+        assert request.options == WatchOptions()
+
+    def test_object_with_sampling(self):
+        request = WatchRequest.from_payload(
+            {"function_name": "func", "sampling": {"mode": "probabilistic", "probability": 0.5}}
+        )
+        assert request.function_name == "func"
+        assert request.options.sampling.mode == SamplingMode.PROBABILISTIC
+        assert request.options.sampling.probability == 0.5
+
+    def test_object_without_options(self):
+        request = WatchRequest.from_payload({"function_name": "func"})
+        assert request.options == WatchOptions()
+
+    def test_missing_function_name(self):
+        with pytest.raises(ValueError):
+            WatchRequest.from_payload({"sampling": {"mode": "fixed"}})
+
+    @pytest.mark.parametrize(
+        "entry",
+        [
+            42,
+            ["func"],
+            {"function_name": "func", "sampling": {"mode": "fixed", "rate": None}},
+            {"function_name": "func", "sampling": "fixed"},
+            {"function_name": "func", "limits": [100]},
+        ],
+    )
+    def test_malformed_entries_raise_value_error(self, entry):
+        """Anything the server sends that isn't a valid entry is a ValueError, skipped by the poll"""
+        with pytest.raises(ValueError):
+            WatchRequest.from_payload(entry)
+
+    def test_histogram_mode(self):
+        request = WatchRequest.from_payload({"function_name": "func", "mode": "histogram"})
+        assert request.options.mode == WatchMode.HISTOGRAM
+
+    def test_unknown_mode(self):
+        with pytest.raises(ValueError):
+            WatchRequest.from_payload({"function_name": "func", "mode": "everything"})
+
+    def test_limits(self):
+        request = WatchRequest.from_payload(
+            {"function_name": "func", "limits": {"max_calls": 100, "max_duration": 60}}
+        )
+        assert request.options.limits.max_calls == 100
+        assert request.options.limits.max_duration == 60.0
+        assert request.options.limits.max_bytes is None
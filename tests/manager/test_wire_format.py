@@ -0,0 +1,96 @@
+import json
+import pytest
+from prodwatch.manager.wire_format import decode_batch, encode_batch
+
+
+def call_event(function_name="mod.func", timestamp=1_700_000_000.0, **overrides):
+    event = {
+        "event_name": "log-function-call",
+        "function_name": function_name,
+        "process_id": "pid",
+        "app_name": "app",
+        "timestamp": timestamp,
+        "args": ["1", "two"],
+        "kwargs": {"k": "v"},
+        "execution_time_ms": 1.5,
+        "error": None,
+        "sample_weight": 1.0,
+    }
+    event.update(overrides)
+    return event
+
+
+class TestWireFormatRoundTrip:
+    """Batches decode to the same payload the JSON encoding sends."""
+
+    def test_round_trip(self):
+        events = [
+            call_event(),
+            call_event("mod.other", timestamp=1_700_000_000.25, error="boom"),
+            call_event(timestamp=1_699_999_999.5, sample_weight=100.0, args=[], kwargs={}),
+        ]
+
+        decoded = decode_batch(encode_batch("pid", "app", events))
+
+        assert decoded["event_name"] == "event-batch"
+        assert decoded["process_id"] == "pid"
+        assert decoded["app_name"] == "app"
+        assert decoded["events"] == events
+
+    def test_other_events_are_embedded_as_json(self):
+        summary = {"event_name": "function-summary", "function_name": "f", "calls": 3}
+        events = [call_event(), summary]
+
+        decoded = decode_batch(encode_batch("pid", "app", events))
+
+        assert decoded["events"] == events
+
+    def test_calls_with_extra_fields_are_embedded_as_json(self):
+        event = call_event(stream={"items": 3})
+        assert decode_batch(encode_batch("pid", "app", [event]))["events"] == [event]
+
+    def test_unicode_strings(self):
+        event = call_event("mod.café", args=["日本語", "\U0001f600"])
+        assert decode_batch(encode_batch("pid", "app", [event]))["events"] == [event]
+
+    def test_empty_batch(self):
+        assert decode_batch(encode_batch("pid", "app", []))["events"] == []
+
+
+class TestWireFormatSize:
+    """Static fields are sent once per batch."""
+
+    def test_smaller_than_json(self):
+        events = [call_event(timestamp=1_700_000_000.0 + i / 1000) for i in range(100)]
+        payload = {"event_name": "event-batch", "process_id": "pid", "app_name": "app", "events": events}
+
+        binary = encode_batch("pid", "app", events)
+
+        assert len(binary) * 4 < len(json.dumps(payload))
+
+    def test_function_names_are_interned(self):
+        events = [call_event("a.very.long.module.path.function_name") for _ in range(10)]
+        encoded = encode_batch("pid", "app", events)
+        assert encoded.count(b"function_name") == 1
+
+
+class TestWireFormatErrors:
+    def test_bad_magic(self):
+        with pytest.raises(ValueError):
+            decode_batch(b"JSON")
+
+    def test_truncated(self):
+        encoded = encode_batch("pid", "app", [call_event()])
+        with pytest.raises(ValueError):
+            decode_batch(encoded[:-3])
+
+    def test_truncated_sample_weight(self):
+        encoded = encode_batch("pid", "app", [call_event(sample_weight=4.0)])
+        assert decode_batch(encoded)["events"][0]["sample_weight"] == 4.0
+        with pytest.raises(ValueError, match="Truncated batch"):
+            decode_batch(encoded[:-3])
+
+    def test_truncated_header(self):
+        encoded = encode_batch("pid", "app", [call_event()])
+        with pytest.raises(ValueError, match="Truncated batch"):
+            decode_batch(encoded[:4])
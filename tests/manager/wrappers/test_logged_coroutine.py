@@ -0,0 +1,155 @@
+import asyncio
+import inspect
+import pytest
+from unittest.mock import Mock
+from prodwatch.manager.aggregation import FunctionAggregate
+from prodwatch.manager.expiry import CallLimit
+from prodwatch.manager.sampling import ReservoirSampler
+from prodwatch.manager.wrappers.logged_coroutine import create_logged_coroutine_function
+from prodwatch.manager.wrappers.logged_function import create_logged_function
+from prodwatch.manager.wrappers.logged_method import create_logged_method
+
+
+async def sample_coroutine(x, delay=0.01):
+    """Sample coroutine for testing"""
+    await asyncio.sleep(delay)
+    return x * 2
+
+
+async def failing_coroutine():
+    await asyncio.sleep(0)
+    raise ValueError("boom")
+
+
+class SampleService:
+    async def fetch(self, key):
+        await asyncio.sleep(0)
+        return key.upper()
+
+
+def test_wrapper_is_a_coroutine_function():
+    """Coroutine functions are detected and wrapped by a coroutine function"""
+    logged = create_logged_function(sample_coroutine, "sample_coroutine", Mock())
+    assert inspect.iscoroutinefunction(logged)
+
+    logged_method = create_logged_method(SampleService.fetch, "SampleService.fetch", Mock())
+    assert inspect.iscoroutinefunction(logged_method)
+
+
+@pytest.mark.asyncio
+async def test_times_awaited_execution():
+    """The reported time covers the awaited body, not just creating the coroutine"""
+    mock_logger = Mock()
+    logged = create_logged_function(sample_coroutine, "sample_coroutine", mock_logger)
+
+    coroutine = logged(5, delay=0.05)
+    mock_logger.assert_not_called()
+    assert await coroutine == 10
+
+    mock_logger.assert_called_once()
+    _, kwargs = mock_logger.call_args
+    assert kwargs["execution_time_ms"] >= 40
+    assert kwargs["error"] is None
+    assert "cancelled" not in kwargs
+
+
+@pytest.mark.asyncio
+async def test_method():
+    mock_logger = Mock()
+    SampleService.fetch = create_logged_method(
+        SampleService.__dict__["fetch"], "SampleService.fetch", mock_logger
+    )
+    try:
+        assert await SampleService().fetch("key") == "KEY"
+    finally:
+        del SampleService.fetch
+    assert mock_logger.call_args[0][0] == "SampleService.fetch"
+
+
+@pytest.mark.asyncio
+async def test_error():
+    mock_logger = Mock()
+    logged = create_logged_function(failing_coroutine, "failing_coroutine", mock_logger)
+
+    with pytest.raises(ValueError):
+        await logged()
+
+    assert mock_logger.call_args[1]["error"] == "boom"
+
+
+@pytest.mark.asyncio
+async def test_cancellation_is_its_own_outcome():
+    """A cancelled call is reported as cancelled, not as an error, and still cancels"""
+    mock_logger = Mock()
+    logged = create_logged_function(sample_coroutine, "sample_coroutine", mock_logger)
+
+    task = asyncio.create_task(logged(1, delay=10))
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    _, kwargs = mock_logger.call_args
+    assert kwargs["cancelled"] is True
+    assert kwargs["error"] is None
+
+
+@pytest.mark.asyncio
+async def test_cancellation_is_counted_in_histogram_mode():
+    aggregate = FunctionAggregate("sample_coroutine")
+    logged = create_logged_coroutine_function(sample_coroutine, "sample_coroutine", aggregate)
+
+    await logged(1, delay=0)
+    task = asyncio.create_task(logged(1, delay=10))
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    summary = aggregate.collect()
+    assert summary["calls"] == 2
+    assert summary["cancelled"] == 1
+    assert summary["errors"] == 0
+
+
+@pytest.mark.asyncio
+async def test_sampled_cancellation_keeps_outcome():
+    mock_logger = Mock()
+    sampler = ReservoirSampler(size=5, interval=60)
+    logged = create_logged_coroutine_function(
+        sample_coroutine, "sample_coroutine", mock_logger, sampler
+    )
+
+    task = asyncio.create_task(logged(1, delay=10))
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    sampler.flush(force=True)
+
+    assert mock_logger.call_args[1]["cancelled"] is True
+
+
+@pytest.mark.asyncio
+async def test_call_limit_passes_through_when_exhausted():
+    mock_logger = Mock()
+    call_limit = CallLimit(1, lambda: None)
+    logged = create_logged_coroutine_function(
+        sample_coroutine, "sample_coroutine", mock_logger, call_limit=call_limit
+    )
+
+    assert await logged(1, delay=0) == 2
+    assert await logged(2, delay=0) == 4
+    assert mock_logger.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_are_timed_independently():
+    """Interleaved calls on one loop each report their own duration"""
+    mock_logger = Mock()
+    logged = create_logged_function(sample_coroutine, "sample_coroutine", mock_logger)
+
+    await asyncio.gather(logged(1, delay=0.05), logged(2, delay=0.0))
+
+    times = sorted(call[1]["execution_time_ms"] for call in mock_logger.call_args_list)
+    assert times[0] < 40 <= times[1]
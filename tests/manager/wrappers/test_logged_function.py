@@ -2,6 +2,11 @@ import pytest
 from unittest.mock import Mock, call
 import time
 from prodwatch.manager.wrappers.logged_function import create_logged_function
+from prodwatch.manager.argument_capture import ArgumentCapture
+from prodwatch.manager.sampling import FixedRateSampler
+from prodwatch.manager.self_stats import SelfStats
+from prodwatch.manager.snapshot import SequenceSnapshot
+from prodwatch.manager.summarizer import summarize
 
 
 def sample_function(x, y=10):
@@ -38,8 +43,8 @@ def test_logged_function_passes_args():
     mock_logger.assert_called_once()
     call_args = mock_logger.call_args[0]
     assert call_args[0] == "sample_function"  # function_name
-    assert call_args[1] == [5]  # args
-    assert call_args[2] == {"y": 15}  # kwargs
+    assert call_args[1] == ["5"]  # args
+    assert call_args[2] == {"y": "15"}  # kwargs
 
 
 def test_execution_time_logging():
@@ -98,7 +103,7 @@ def test_preserves_function_error():
     mock_logger.assert_called_once()
     call_args = mock_logger.call_args
     assert call_args[0][0] == "failing_function"  # function_name
-    assert call_args[0][1] == [5]  # args
+    assert call_args[0][1] == ["5"]  # args
     assert call_args[0][2] == {}  # kwargs
     assert call_args[1]["error"] == "Test error"
     assert call_args[1]["execution_time_ms"] > 0
@@ -121,10 +126,103 @@ def test_multiple_calls_logged():
 
     # Check first call
     assert calls[0][0][0] == "sample_function"
-    assert calls[0][0][1] == [5]
+    assert calls[0][0][1] == ["5"]
     assert calls[0][0][2] == {}
 
     # Check second call
     assert calls[1][0][0] == "sample_function"
-    assert calls[1][0][1] == [10]
-    assert calls[1][0][2] == {"y": 20}
+    assert calls[1][0][1] == ["10"]
+    assert calls[1][0][2] == {"y": "20"}
+
+
+def test_sampled_out_calls_are_not_logged():
+    """When the sampler rejects a call, the function runs but nothing is logged"""
+    mock_logger = Mock()
+    sampler = FixedRateSampler(3)
+    logged_func = create_logged_function(
+        sample_function,
+        "sample_function",
+        mock_logger,
+        sampler,
+    )
+
+    results = [logged_func(i) for i in range(6)]
+
+    assert results == [i + 10 for i in range(6)]
+    assert mock_logger.call_count == 2
+    assert [c[0][1] for c in mock_logger.call_args_list] == [["0"], ["3"]]
+    assert all(c[1]["sample_weight"] == 3.0 for c in mock_logger.call_args_list)
+
+
+def test_sampler_decides_before_arguments_are_used():
+    """Rejected calls never reach the logger, so their arguments are never stringified"""
+
+    class Unprintable:
+        def __str__(self):
+            raise AssertionError("stringified")
+
+    sampler = Mock()
+    sampler.admit.return_value = False
+    logged_func = create_logged_function(lambda x: x, "identity", Mock(), sampler)
+
+    value = Unprintable()
+    assert logged_func(value) is value
+    sampler.emit.assert_not_called()
+
+
+def test_large_arguments_are_summarized():
+    """When the function gets large containers, they are summarized instead of fully stringified"""
+    mock_logger = Mock()
+    logged_func = create_logged_function(lambda items, mapping: None, "f", mock_logger)
+
+    logged_func(list(range(200_000)), mapping={i: i for i in range(1000)})
+
+    args, kwargs = mock_logger.call_args[0][1], mock_logger.call_args[0][2]
+    assert args == ["<list len=200000 of int: [0, 1, 2, 3, 4, ...]>"]
+    assert kwargs["mapping"].startswith("<dict len=1000:")
+
+
+def test_arguments_are_not_captured_when_disabled():
+    """When argument capture is off, only the timing is logged"""
+    mock_logger = Mock()
+    logged_func = create_logged_function(
+        sample_function, "sample_function", mock_logger, argument_capture=ArgumentCapture.NONE
+    )
+
+    logged_func(5, y=15)
+
+    assert mock_logger.call_args[0][1] == []
+    assert mock_logger.call_args[0][2] == {}
+
+
+def test_deferred_capture_logs_snapshots():
+    """When capture is deferred, snapshots are logged and render like the eager summary"""
+    mock_logger = Mock()
+    logged_func = create_logged_function(
+        lambda items, y=10: None, "f", mock_logger, argument_capture=ArgumentCapture.DEFERRED
+    )
+    items = list(range(100))
+
+    logged_func(items, y="z")
+    items.clear()
+
+    (snapshot,) = mock_logger.call_args[0][1]
+    assert isinstance(snapshot, SequenceSnapshot)
+    assert summarize(snapshot) == "<list len=100 of int: [0, 1, 2, 3, 4, ...]>"
+    assert mock_logger.call_args[0][2] == {"y": "z"}
+
+
+def test_overhead_of_reported_calls_is_recorded():
+    """Capturing and reporting a call is timed; a call turned away by the sampler is not"""
+    self_stats = SelfStats()
+    logged_func = create_logged_function(
+        lambda x: x, "identity", Mock(), FixedRateSampler(2), self_stats=self_stats
+    )
+
+    logged_func(1)
+    logged_func(2)
+
+    (capture,) = self_stats.captures
+    assert capture.captured == 1
+    assert capture.overhead_us.count == 1
+    assert capture.serialization_us.max <= capture.overhead_us.max
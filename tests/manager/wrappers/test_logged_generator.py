@@ -0,0 +1,235 @@
+import asyncio
+import inspect
+import time
+import pytest
+from unittest.mock import Mock
+from prodwatch.manager.aggregation import FunctionAggregate
+from prodwatch.manager.sampling import FixedRateSampler
+from prodwatch.manager.wrappers.logged_function import create_logged_function
+from prodwatch.manager.wrappers.logged_generator import (
+    create_logged_async_generator_function,
+    create_logged_generator_function,
+)
+from prodwatch.manager.wrappers.logged_method import create_logged_method
+
+
+def countdown(n, delay=0.0):
+    """Sample generator for testing"""
+    while n > 0:
+        time.sleep(delay)
+        yield n
+        n -= 1
+    return "done"
+
+
+def echo():
+    received = []
+    try:
+        while True:
+            received.append((yield len(received)))
+    except KeyError:
+        yield "handled"
+    return received
+
+
+def failing_generator():
+    yield 1
+    raise ValueError("boom")
+
+
+async def async_countdown(n, delay=0.0):
+    while n > 0:
+        await asyncio.sleep(delay)
+        yield n
+        n -= 1
+
+
+class Pipeline:
+    def stages(self):
+        yield from ("parse", "load")
+
+
+def test_wrappers_keep_the_function_kind():
+    """Generator functions are wrapped by generator functions, async ones return async generators"""
+    assert inspect.isgeneratorfunction(create_logged_function(countdown, "countdown", Mock()))
+    assert inspect.isasyncgen(
+        create_logged_function(async_countdown, "async_countdown", Mock())(1)
+    )
+    assert inspect.isgeneratorfunction(
+        create_logged_method(Pipeline.stages, "Pipeline.stages", Mock())
+    )
+
+
+def test_reports_one_event_per_run():
+    mock_logger = Mock()
+    logged = create_logged_generator_function(countdown, "countdown", mock_logger)
+
+    assert list(logged(3)) == [3, 2, 1]
+
+    mock_logger.assert_called_once()
+    args, kwargs = mock_logger.call_args
+    assert args[0] == "countdown"
+    assert kwargs["error"] is None
+    assert kwargs["generator"]["items"] == 3
+    assert kwargs["generator"]["time_to_first_item_ms"] is not None
+
+
+def test_return_value_is_kept():
+    logged = create_logged_generator_function(countdown, "countdown", Mock())
+    generator = logged(1)
+    next(generator)
+    with pytest.raises(StopIteration) as stop:
+        next(generator)
+    assert stop.value.value == "done"
+
+
+def test_active_time_excludes_consumer_time():
+    """Time the consumer spends between items isn't counted as active time"""
+    mock_logger = Mock()
+    logged = create_logged_generator_function(countdown, "countdown", mock_logger)
+
+    for _ in logged(3, delay=0.01):
+        time.sleep(0.03)
+
+    stats = mock_logger.call_args[1]["generator"]
+    assert 25 <= stats["active_time_ms"] < 60
+    assert stats["lifetime_ms"] >= 90
+    assert stats["time_to_first_item_ms"] >= 9
+    assert mock_logger.call_args[1]["execution_time_ms"] == stats["active_time_ms"]
+
+
+def test_send_and_throw_are_forwarded():
+    mock_logger = Mock()
+    logged = create_logged_generator_function(echo, "echo", mock_logger)
+
+    generator = logged()
+    assert next(generator) == 0
+    assert generator.send("a") == 1
+    assert generator.throw(KeyError("stop")) == "handled"
+    with pytest.raises(StopIteration) as stop:
+        next(generator)
+    assert stop.value.value == ["a"]
+    assert mock_logger.call_args[1]["generator"]["items"] == 3
+
+
+def test_close_reports_partial_run():
+    """A consumer that stops early still produces an event, and the generator is closed"""
+    closed = []
+
+    def tracked():
+        try:
+            yield from range(100)
+        finally:
+            closed.append(True)
+
+    mock_logger = Mock()
+    generator = create_logged_generator_function(tracked, "tracked", mock_logger)()
+    assert [next(generator) for _ in range(5)] == [0, 1, 2, 3, 4]
+    generator.close()
+
+    assert closed == [True]
+    assert mock_logger.call_args[1]["generator"]["items"] == 5
+    assert mock_logger.call_args[1]["error"] is None
+
+
+def test_error():
+    mock_logger = Mock()
+    logged = create_logged_generator_function(failing_generator, "failing_generator", mock_logger)
+
+    with pytest.raises(ValueError):
+        list(logged())
+
+    assert mock_logger.call_args[1]["error"] == "boom"
+    assert mock_logger.call_args[1]["generator"]["items"] == 1
+
+
+def test_unsampled_runs_pass_through():
+    mock_logger = Mock()
+    logged = create_logged_generator_function(
+        countdown, "countdown", mock_logger, FixedRateSampler(2)
+    )
+
+    assert list(logged(2)) == [2, 1]
+    assert list(logged(2)) == [2, 1]
+    assert mock_logger.call_count == 1
+    assert mock_logger.call_args[1]["sample_weight"] == 2.0
+
+
+def test_histogram_mode_records_active_time():
+    aggregate = FunctionAggregate("countdown")
+    logged = create_logged_generator_function(countdown, "countdown", aggregate)
+
+    list(logged(3))
+
+    assert aggregate.collect()["calls"] == 1
+
+
+@pytest.mark.asyncio
+async def test_async_generator():
+    mock_logger = Mock()
+    logged = create_logged_async_generator_function(
+        async_countdown, "async_countdown", mock_logger
+    )
+
+    items = []
+    async for item in logged(3, delay=0.01):
+        items.append(item)
+        await asyncio.sleep(0.02)
+
+    assert items == [3, 2, 1]
+    stats = mock_logger.call_args[1]["generator"]
+    assert stats["items"] == 3
+    assert 25 <= stats["active_time_ms"] < 55
+    assert stats["lifetime_ms"] >= 85
+
+
+@pytest.mark.asyncio
+async def test_unsampled_async_runs_get_the_original_generator():
+    mock_logger = Mock()
+    logged = create_logged_async_generator_function(
+        async_countdown, "async_countdown", mock_logger, FixedRateSampler(2)
+    )
+
+    sampled, unsampled = logged(2), logged(2)
+
+    assert unsampled.ag_code is async_countdown.__code__
+    assert sampled.ag_code is not async_countdown.__code__
+    assert [item async for item in sampled] == [2, 1]
+    assert [item async for item in unsampled] == [2, 1]
+    assert mock_logger.call_count == 1
+    assert mock_logger.call_args[1]["sample_weight"] == 2.0
+
+
+@pytest.mark.asyncio
+async def test_async_generator_aclose():
+    mock_logger = Mock()
+    generator = create_logged_async_generator_function(
+        async_countdown, "async_countdown", mock_logger
+    )(10)
+
+    assert await generator.__anext__() == 10
+    await generator.aclose()
+
+    assert mock_logger.call_args[1]["generator"]["items"] == 1
+
+
+@pytest.mark.asyncio
+async def test_async_generator_cancelled():
+    mock_logger = Mock()
+    logged = create_logged_async_generator_function(
+        async_countdown, "async_countdown", mock_logger
+    )
+
+    async def consume():
+        async for _ in logged(3, delay=10):
+            pass
+
+    task = asyncio.create_task(consume())
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert mock_logger.call_args[1]["cancelled"] is True
+    assert mock_logger.call_args[1]["generator"]["items"] == 0
+    assert mock_logger.call_args[1]["generator"]["time_to_first_item_ms"] is None
@@ -2,6 +2,7 @@ import pytest
 from unittest.mock import Mock
 import time
 from prodwatch.manager.wrappers.logged_property import create_logged_property
+from prodwatch.manager.sampling import FixedRateSampler
 
 
 class SampleClass:
@@ -145,3 +146,22 @@ def test_multiple_calls_logged():
     _ = test_obj.sample_property
 
     assert mock_logger.call_count == 3
+
+
+def test_sampled_out_property_reads_are_not_logged():
+    """When the sampler rejects a read, the value is returned but nothing is logged"""
+
+    class Sampled:
+        @property
+        def value(self):
+            return 7
+
+    mock_logger = Mock()
+    Sampled.value = property(  # type: ignore
+        create_logged_property(Sampled.value, "Sampled.value", mock_logger, FixedRateSampler(2))
+    )
+    test_obj = Sampled()
+
+    assert [test_obj.value for _ in range(4)] == [7, 7, 7, 7]
+    assert mock_logger.call_count == 2
+    assert mock_logger.call_args[1]["sample_weight"] == 2.0
@@ -3,6 +3,7 @@ from unittest.mock import Mock
 import time
 from typing import Any, ClassVar
 from prodwatch.manager.wrappers.logged_method import create_logged_method
+from prodwatch.manager.sampling import FixedRateSampler
 
 
 class FakeClass:
@@ -55,7 +56,7 @@ def test_logged_instance_method():
     assert call_args[1][0].startswith("<FakeClass object at ")
     assert call_args[1][1] == "5"  # x argument
     assert call_args[1][1] == "5"  # x argument
-    assert call_args[2] == {"y": 15}  # kwargs
+    assert call_args[2] == {"y": "15"}  # kwargs
 
 
 def test_logged_class_method():
@@ -195,4 +196,23 @@ def test_multiple_calls_logged():
     assert calls[1][0][0] == "FakeClass.instance_method"
     assert calls[1][0][1][0].startswith("<FakeClass object at ")
     assert calls[1][0][1][1] == "10"  # x argument as string
-    assert calls[1][0][2] == {"y": 20}
+    assert calls[1][0][2] == {"y": "20"}
+
+
+def test_sampled_out_method_calls_are_not_logged():
+    """Test that calls rejected by the sampler are not logged"""
+    mock_logger = Mock()
+    test_instance = FakeClass(42)
+    logged_method = create_logged_method(
+        FakeClass.instance_method,
+        "FakeClass.instance_method",
+        mock_logger,
+        FixedRateSampler(2),
+    )
+
+    assert logged_method(test_instance, 1) == 53
+    assert logged_method(test_instance, 2) == 54
+
+    mock_logger.assert_called_once()
+    assert mock_logger.call_args[0][1][1] == "1"
+    assert mock_logger.call_args[1]["sample_weight"] == 2.0
@@ -0,0 +1,189 @@
+import pytest
+from unittest.mock import Mock
+from prodwatch.manager.wrappers.specialized import create_specialized_function, wrapper_source
+from prodwatch.manager.wrappers.logged_function import create_logged_function
+from prodwatch.manager.wrappers.logged_method import create_logged_method
+from prodwatch.manager.argument_capture import ArgumentCapture
+from prodwatch.manager.expiry import CallLimit
+from prodwatch.manager.sampling import FixedRateSampler
+
+
+def sample_function(x, y=10):
+    """Sample function for testing"""
+    return x + y
+
+
+def keyword_function(a, /, b, *, c, d=4):
+    return a + b + c + d
+
+
+def test_specialized_function_returns_original_result():
+    """The generated wrapper passes its arguments through and returns the result"""
+    logged_func = create_specialized_function(sample_function, "sample_function", Mock())
+
+    assert logged_func(5, y=15) == 20
+    assert logged_func(5) == 15
+
+
+def test_specialized_function_records_arguments_by_position():
+    """Arguments are recorded by position, with defaults filled in"""
+    mock_logger = Mock()
+    logged_func = create_specialized_function(sample_function, "sample_function", mock_logger)
+
+    logged_func(5)
+
+    call_args = mock_logger.call_args[0]
+    assert call_args == ("sample_function", ["5", "10"], {})
+    assert mock_logger.call_args[1]["execution_time_ms"] >= 0
+    assert mock_logger.call_args[1]["error"] is None
+
+
+def test_specialized_function_records_keyword_only_arguments_as_kwargs():
+    mock_logger = Mock()
+    logged_func = create_specialized_function(keyword_function, "keyword_function", mock_logger)
+
+    assert logged_func(1, b=2, c=3) == 10
+
+    call_args = mock_logger.call_args[0]
+    assert call_args[1] == ["1", "2"]
+    assert call_args[2] == {"c": "3", "d": "4"}
+
+
+def test_specialized_function_keeps_the_signature():
+    """Bad calls fail the way they would on the original function"""
+    logged_func = create_specialized_function(keyword_function, "keyword_function", Mock())
+
+    with pytest.raises(TypeError, match="keyword_function"):
+        logged_func(a=1, b=2, c=3)
+    with pytest.raises(TypeError):
+        logged_func(1, 2, 3)
+
+
+def test_specialized_function_preserves_error():
+    """Errors are logged and re-raised unchanged"""
+    mock_logger = Mock()
+
+    def failing_function(x):
+        raise ValueError(f"bad {x}")
+
+    logged_func = create_specialized_function(failing_function, "failing_function", mock_logger)
+
+    with pytest.raises(ValueError, match="bad 1"):
+        logged_func(1)
+    assert mock_logger.call_args[1]["error"] == "bad 1"
+
+
+def test_specialized_function_handles_logger_exception():
+    def failing_logger(*args, **kwargs):
+        raise Exception("Logger failed")
+
+    logged_func = create_specialized_function(sample_function, "sample_function", failing_logger)
+
+    assert logged_func(5) == 15
+
+
+def test_specialized_function_sampled_out_calls_are_not_logged():
+    mock_logger = Mock()
+    logged_func = create_specialized_function(
+        sample_function, "sample_function", mock_logger, FixedRateSampler(3)
+    )
+
+    for i in range(6):
+        assert logged_func(i) == i + 10
+
+    assert mock_logger.call_count == 2
+
+
+def test_specialized_function_stops_reporting_at_call_limit():
+    mock_logger = Mock()
+    on_exhausted = Mock()
+    logged_func = create_specialized_function(
+        sample_function,
+        "sample_function",
+        mock_logger,
+        call_limit=CallLimit(2, on_exhausted),
+    )
+
+    for i in range(4):
+        assert logged_func(i) == i + 10
+
+    assert mock_logger.call_count == 2
+    on_exhausted.assert_called_once()
+
+
+def test_specialized_function_honours_argument_capture():
+    mock_logger = Mock()
+    logged_func = create_specialized_function(
+        sample_function,
+        "sample_function",
+        mock_logger,
+        argument_capture=ArgumentCapture.NONE,
+    )
+
+    logged_func(5)
+
+    assert mock_logger.call_args[0][1:] == ([], {})
+
+
+@pytest.mark.parametrize(
+    "function",
+    [
+        lambda *args: args,
+        lambda **kwargs: kwargs,
+        lambda _prodwatch_start: _prodwatch_start,
+        len,
+        Mock(),
+    ],
+    ids=["varargs", "varkwargs", "name-clash", "builtin", "not-a-function"],
+)
+def test_unsupported_signatures_are_not_specialized(function):
+    assert wrapper_source(function, False, False) is None
+    assert create_specialized_function(function, "function", Mock()) is None
+
+
+def test_specialized_function_without_parameters():
+    mock_logger = Mock()
+    logged_func = create_specialized_function(lambda: 42, "answer", mock_logger)
+
+    assert logged_func() == 42
+    assert mock_logger.call_args[0] == ("answer", [], {})
+
+
+def test_create_logged_function_specializes_when_asked():
+    mock_logger = Mock()
+    logged_func = create_logged_function(
+        sample_function, "sample_function", mock_logger, specialize=True
+    )
+
+    assert logged_func.__code__.co_varnames[:2] == ("x", "y")
+    assert logged_func(5) == 15
+    assert mock_logger.call_args[0][1] == ["5", "10"]
+
+
+def test_create_logged_function_falls_back_for_unsupported_signatures():
+    mock_logger = Mock()
+
+    def variadic(*args):
+        return sum(args)
+
+    logged_func = create_logged_function(variadic, "variadic", mock_logger, specialize=True)
+
+    assert logged_func(1, 2) == 3
+    assert mock_logger.call_args[0][1] == ["1", "2"]
+
+
+def test_create_logged_method_specializes_when_asked():
+    mock_logger = Mock()
+
+    class Counter:
+        def add(self, amount, step=1):
+            return amount + step
+
+    logged_method = create_logged_method(
+        Counter.add, "Counter.add", mock_logger, specialize=True
+    )
+    Counter.add = logged_method
+
+    assert Counter().add(2) == 3
+    assert logged_method.__code__.co_varnames[:3] == ("self", "amount", "step")
+    assert mock_logger.call_args[0][1][1:] == ["2", "1"]
@@ -0,0 +1,79 @@
+import time
+import threading
+import pytest
+import requests
+from .fake_server import FakeProdwatchServer
+
+
+@pytest.fixture
+def make_server():
+    servers = []
+
+    def make(**kwargs):
+        server = FakeProdwatchServer(**kwargs).start()
+        servers.append(server)
+        return server
+
+    yield make
+    for server in servers:
+        server.stop()
+
+
+class TestFakeProdwatchServer:
+    def test_counts_events_inside_batches(self, make_server):
+        server = make_server(keep_posts=False)
+        batch = {
+            "event_name": "event-batch",
+            "events": [{"event_name": "log-function-call"}, {"event_name": "function-summary"}],
+        }
+        requests.post(f"{server.url}/events", json=batch)
+        requests.post(f"{server.url}/events", json={"event_name": "add-process"})
+
+        assert server.posts == []
+        assert server.event_counts == {
+            "log-function-call": 1,
+            "function-summary": 1,
+            "add-process": 1,
+        }
+
+    def test_error_rate(self, make_server):
+        server = make_server(error_rate=1.0)
+        response = requests.get(f"{server.url}/pending-function-names")
+        assert response.status_code == 503
+        assert server.polls == []
+        assert server.faults["error"] == 1
+
+    def test_latency(self, make_server):
+        server = make_server(latency=0.2)
+        started = time.monotonic()
+        requests.get(f"{server.url}/pending-function-names")
+        assert time.monotonic() - started >= 0.2
+
+    def test_stalls_time_out_clients(self, make_server):
+        server = make_server(stall_rate=1.0, stall_seconds=1.0)
+        with pytest.raises(requests.Timeout):
+            requests.post(f"{server.url}/events", json={"event_name": "add-process"}, timeout=0.1)
+        assert server.faults["stall"] == 1
+
+    def test_conditional_watch_list(self, make_server):
+        server = make_server()
+        etag = requests.get(f"{server.url}/pending-function-names").headers["ETag"]
+        response = requests.get(
+            f"{server.url}/pending-function-names", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 304
+        assert server.not_modified == 1
+
+    def test_long_poll_returns_on_change(self, make_server):
+        server = make_server()
+        etag = requests.get(f"{server.url}/pending-function-names").headers["ETag"]
+        threading.Timer(0.2, lambda: setattr(server, "function_names", ["mod.func"])).start()
+        started = time.monotonic()
+        response = requests.get(
+            f"{server.url}/pending-function-names",
+            params={"wait": "5"},
+            headers={"If-None-Match": etag},
+        )
+        assert 0.2 <= time.monotonic() - started < 5
+        assert response.json()["function_names"] == ["mod.func"]
+        assert response.headers["ETag"] != etag